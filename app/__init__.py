@@ -1,31 +1,125 @@
+import logging
+import os
 from flask import Flask
+from sqlalchemy.engine import make_url
 from app.config import Config
-from app.database.connection import init_database, db
+from app.database.connection import init_database
+
+logger = logging.getLogger(__name__)
+
+# SQLite files shared by the workers on a host. Relative paths are resolved in
+# the app's instance folder, as Flask-SQLAlchemy does for a relative SQLite URL
+LOCAL_STORE_PATHS = (
+    'ANALYTICS_CACHE_VERSION_PATH', 'USER_CACHE_VERSION_PATH', 'INGEST_JOURNAL_PATH',
+    'SSE_EVENT_LOG_PATH', 'RATE_LIMIT_STORE_PATH',
+)
+
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    for name in LOCAL_STORE_PATHS:
+        # Blank keeps its meaning (e.g. a per-worker cache version)
+        if app.config[name] and not os.path.isabs(app.config[name]):
+            app.config[name] = os.path.join(app.instance_path, app.config[name])
+    
+    from app.services.logs import init_logging
+    init_logging(app)
+    
+    from app.services.serialization import init_json
+    init_json(app)
     
-    # Initialize database first
-    if init_database(app):
-        # Import models INSIDE app context to avoid circular imports
+    init_database(app)
+    
+    # Import models so their tables are registered on db.metadata
+    from app.models.user import User  # ✅ Import User FIRST
+    from app.models.organization import Organization
+    from app.models.location import Location
+    from app.models.water_quality import WaterQuality
+    from app.models.rollup import DailyLocationRollup
+    from app.models.reading_chunk import ReadingChunk
+    from app.models.alert import AlertRule, Alert
+    from app.models.job import Job, JobRun
+    
+    from app.services.tenancy import init_tenancy
+    init_tenancy(app)
+    
+    # Schema changes run once per deploy via 'flask upgrade-db', so startup does
+    # no DDL, reflection or database round trips. AUTO_MIGRATE (off by default)
+    # does it at boot instead.
+    if app.config['AUTO_MIGRATE']:
+        from app.database.migrations import upgrade_schema
         with app.app_context():
-            from app.models.user import User  # ✅ Import User FIRST
-            from app.models.water_quality import WaterQuality
-            db.create_all()  # Now both tables exist
+            try:
+                created, buckets, locations, organizations, partitions = upgrade_schema()
+                database = make_url(app.config['SQLALCHEMY_DATABASE_URI']).render_as_string(hide_password=True)
+                logger.info('Database connected', extra={'database': database})
+                for name in created:
+                    logger.info('Created column/index', extra={'schema_object': name})
+                if organizations is not None:
+                    logger.info('Linked users to organizations', extra={'users': organizations[0], 'rows': organizations[1]})
+                if partitions is not None:
+                    logger.info('Partitioned readings by organization', extra={'partitions': partitions})
+                if locations is not None:
+                    logger.info('Linked readings to locations', extra={'readings': locations[1], 'locations_created': locations[0]})
+                if buckets is not None:
+                    logger.info('Backfilled daily rollup', extra={'buckets': buckets})
+            except Exception:
+                logger.exception('Database setup failed')
+    
+    from app.database.migrations import init_migration_commands
+    init_migration_commands(app)
+    
+    from app.middleware.cache import init_cache
+    init_cache(app)
+    
+    from app.middleware.metrics import init_metrics
+    init_metrics(app)
+    
+    from app.middleware.rate_limit import init_rate_limiting
+    init_rate_limiting(app)
+    
+    from app.services.passwords import init_password_hasher
+    init_password_hasher(app)
+    
+    from app.services.events import init_events
+    init_events(app)
+    
+    from app.services.alerts import init_alerts
+    init_alerts(app)
+    
+    from app.services.ingest import init_ingest
+    init_ingest(app)
+    
+    from app.services.geo import init_geo
+    init_geo(app)
+    
+    from app.services.series import init_series
+    init_series(app)
+    
+    from app.services.jobs import init_jobs
+    init_jobs(app)
     
-    print("🔄 Starting route registration...")
+    logger.debug('Registering routes')
     
     # Initialize all routes
     from app.routes.main import init_main_routes
     from app.routes.water import init_water_routes  
     from app.routes.auth import init_auth_routes
+    from app.routes.alerts import init_alert_routes
+    from app.routes.locations import init_location_routes
+    from app.routes.jobs import init_job_routes
+    from app.routes.organizations import init_organization_routes
     from app.routes.analytics import analytics_bp
     
     init_main_routes(app)
     init_water_routes(app)
     init_auth_routes(app)
+    init_alert_routes(app)
+    init_location_routes(app)
+    init_job_routes(app)
+    init_organization_routes(app)
     app.register_blueprint(analytics_bp, url_prefix='/analytics')
     
-    print("✅ All routes registered successfully!")
+    logger.info('Application ready', extra={'routes': len(list(app.url_map.iter_rules()))})
     return app
\ No newline at end of file
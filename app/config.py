@@ -1,22 +1,246 @@
+import json
 import os
 from dotenv import load_dotenv
 
 load_dotenv()
 
+
+def _normalize_database_url(url):
+    # Render uses postgres://, SQLAlchemy needs postgresql://
+    if url and url.startswith('postgres://'):
+        return url.replace('postgres://', 'postgresql://', 1)
+    return url
+
+
+def _env_flag(name, default):
+    return os.environ.get(name, str(default)).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
+def _engine_options(database_uri):
+    """Engine/pool options for SQLALCHEMY_ENGINE_OPTIONS, driven by DB_* environment variables"""
+    options = {
+        # Test connections on checkout so idle-killed connections never reach a request
+        'pool_pre_ping': _env_flag('DB_POOL_PRE_PING', True),
+    }
+    if database_uri.startswith('sqlite'):
+        return options
+    
+    options.update({
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': int(os.environ.get('DB_POOL_TIMEOUT', 30)),
+        # Recycle before typical server/proxy idle timeouts close connections underneath us
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+    })
+    statement_timeout_ms = int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 30000))
+    if statement_timeout_ms > 0 and database_uri.startswith('postgresql'):
+        options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+    return options
+
+
 class Config:
     # ✅ SECURITY CRITICAL: Use ONLY environment variable, no hardcoded fallback in production
     SECRET_KEY = os.environ.get('SECRET_KEY')
     
     # ✅ DATABASE: Use Render's PostgreSQL or environment variable
-    # Handles both PostgreSQL (Render) and SQLite (development)
+    # Handles both PostgreSQL (Render) and SQLite (development). A relative
+    # SQLite path lives in the instance folder, as do the relative *_PATH
+    # stores below (cache versions, ingest journal, event log, rate limits)
     database_url = os.environ.get('DATABASE_URL', 'sqlite:///water_quality.db')
     
     # Fix for PostgreSQL URL format (Render uses postgres://, SQLAlchemy needs postgresql://)
-    if database_url.startswith('postgres://'):
-        SQLALCHEMY_DATABASE_URI = database_url.replace('postgres://', 'postgresql://', 1)
-    else:
-        SQLALCHEMY_DATABASE_URI = database_url
+    SQLALCHEMY_DATABASE_URI = _normalize_database_url(database_url)
+    
+    # Connection pool: DB_POOL_SIZE, DB_MAX_OVERFLOW, DB_POOL_TIMEOUT, DB_POOL_RECYCLE,
+    # DB_POOL_PRE_PING and DB_STATEMENT_TIMEOUT_MS (PostgreSQL only, 0 disables)
+    SQLALCHEMY_ENGINE_OPTIONS = _engine_options(SQLALCHEMY_DATABASE_URI)
+    
+    # Optional read replica; analytics and export reads are routed to it
+    DATABASE_REPLICA_URL = _normalize_database_url(os.environ.get('DATABASE_REPLICA_URL'))
+    SQLALCHEMY_BINDS = {'replica': DATABASE_REPLICA_URL} if DATABASE_REPLICA_URL else {}
     
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    
+    # Run schema upgrades (create_all, indexes, rollup backfill) on every app start.
+    # Off by default so boot does no DDL: run 'flask upgrade-db' once per deploy
+    # (and once on a new development database) instead.
+    AUTO_MIGRATE = _env_flag('AUTO_MIGRATE', False)
     SESSION_TYPE = 'filesystem'
-    PERMANENT_SESSION_LIFETIME = 3600
\ No newline at end of file
+    PERMANENT_SESSION_LIFETIME = 3600
+    
+    # Upper bound on readings accepted by one /api/water/readings/bulk request
+    BULK_INGEST_MAX_ROWS = int(os.environ.get('BULK_INGEST_MAX_ROWS', 5000))
+    
+    # Keyset pagination for /api/water/readings
+    READINGS_PAGE_SIZE = int(os.environ.get('READINGS_PAGE_SIZE', 100))
+    READINGS_MAX_PAGE_SIZE = int(os.environ.get('READINGS_MAX_PAGE_SIZE', 1000))
+    
+    # JSON encoder for responses: 'auto' (orjson when installed), 'orjson' or 'stdlib'
+    JSON_BACKEND = os.environ.get('JSON_BACKEND', 'auto')
+    
+    # Analytics response cache: 'memory' (per-worker LRU), 'redis' (shared) or 'none'.
+    # The memory backend's data version lives in an SQLite file shared by the
+    # workers on this host (ANALYTICS_CACHE_VERSION_PATH; blank: per worker,
+    # for a single worker only), so a write through any worker invalidates
+    # them all. With several hosts use 'redis'.
+    ANALYTICS_CACHE_BACKEND = os.environ.get('ANALYTICS_CACHE_BACKEND', 'memory')
+    ANALYTICS_CACHE_URL = os.environ.get('ANALYTICS_CACHE_URL', 'redis://localhost:6379/0')
+    ANALYTICS_CACHE_VERSION_PATH = os.environ.get('ANALYTICS_CACHE_VERSION_PATH', 'analytics_cache_version.db')
+    ANALYTICS_CACHE_TTL = int(os.environ.get('ANALYTICS_CACHE_TTL', 300))
+    ANALYTICS_CACHE_MAX_ENTRIES = int(os.environ.get('ANALYTICS_CACHE_MAX_ENTRIES', 1024))
+    
+    # Most points the trends endpoint returns before downsampling (LTTB)
+    TRENDS_MAX_POINTS = int(os.environ.get('TRENDS_MAX_POINTS', 1000))
+    
+    # Location series held as NumPy arrays for /analytics/api/location/<name>/stats
+    # and /anomalies (per worker): how many locations are kept, and how often one
+    # is reloaded (readings added through other workers are picked up at once,
+    # deletes after this)
+    ANALYTICS_SERIES_MAX_ENTRIES = int(os.environ.get('ANALYTICS_SERIES_MAX_ENTRIES', 32))
+    ANALYTICS_SERIES_TTL = int(os.environ.get('ANALYTICS_SERIES_TTL', 300))
+    
+    # Rows fetched per server-side cursor round trip by /api/water/export
+    EXPORT_CHUNK_SIZE = int(os.environ.get('EXPORT_CHUNK_SIZE', 5000))
+    
+    # Partial overrides of app.services.scoring.DEFAULT_THRESHOLDS, as JSON, e.g.
+    # {"turbidity_ntu": {"good": [null, 4]}, "tds_factor": 0.55}
+    WATER_QUALITY_THRESHOLDS = json.loads(os.environ.get('WATER_QUALITY_THRESHOLDS', '{}'))
+    
+    # Flask-Login user loader cache (per worker); 0 disables. A committed
+    # change to any user bumps a generation kept next to the analytics cache
+    # version (USER_CACHE_VERSION_PATH, shared by the workers on this host),
+    # which drops every worker's entries. Blank: per worker, so other workers
+    # keep a changed role or organization for up to USER_CACHE_TTL seconds
+    USER_CACHE_TTL = int(os.environ.get('USER_CACHE_TTL', 30))
+    USER_CACHE_MAX_ENTRIES = int(os.environ.get('USER_CACHE_MAX_ENTRIES', 1024))
+    USER_CACHE_VERSION_PATH = os.environ.get('USER_CACHE_VERSION_PATH', ANALYTICS_CACHE_VERSION_PATH)
+    
+    # 'sync' stores each POST /api/water/reading before answering; 'write-behind'
+    # answers 202 once the reading is in a local durable journal (an SQLite
+    # file shared by the workers on this host) and stores readings in batches.
+    # While the database is unreachable the journal is kept and flushes are
+    # retried with backoff up to INGEST_RETRY_MAX_SECONDS apart; only readings
+    # the database rejects are dead-lettered ('flask replay-dead-letters')
+    INGEST_MODE = os.environ.get('INGEST_MODE', 'sync').lower()
+    INGEST_JOURNAL_PATH = os.environ.get('INGEST_JOURNAL_PATH', 'ingest_journal.db')
+    INGEST_FLUSH_BATCH_SIZE = int(os.environ.get('INGEST_FLUSH_BATCH_SIZE', 500))
+    INGEST_FLUSH_INTERVAL = float(os.environ.get('INGEST_FLUSH_INTERVAL', 1.0))
+    INGEST_RETRY_MAX_SECONDS = float(os.environ.get('INGEST_RETRY_MAX_SECONDS', 60))
+    
+    # Live feed (/api/water/stream). Each open stream occupies a worker
+    # thread, so it is off unless LIVE_FEED_ENABLED is set, which should only
+    # be done with a threaded/gevent worker class (e.g. gunicorn -k gevent or
+    # --threads); with sync workers a few open tabs starve the app. Without it
+    # the dashboards refetch after their own changes instead.
+    # Events go through a log shared by the workers on this host (an SQLite
+    # file keeping the last SSE_REPLAY_EVENTS), which each worker with open
+    # streams polls every SSE_POLL_INTERVAL seconds
+    LIVE_FEED_ENABLED = _env_flag('LIVE_FEED_ENABLED', False)
+    SSE_EVENT_LOG_PATH = os.environ.get('SSE_EVENT_LOG_PATH', 'live_feed_events.db')
+    SSE_POLL_INTERVAL = float(os.environ.get('SSE_POLL_INTERVAL', 0.25))
+    SSE_MAX_CLIENTS = int(os.environ.get('SSE_MAX_CLIENTS', 1000))
+    SSE_CLIENT_QUEUE_SIZE = int(os.environ.get('SSE_CLIENT_QUEUE_SIZE', 256))
+    SSE_REPLAY_EVENTS = int(os.environ.get('SSE_REPLAY_EVENTS', 1000))
+    SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', 15))
+    SSE_RETRY_AFTER = int(os.environ.get('SSE_RETRY_AFTER', 5))
+    
+    # Alert rules are reloaded from the database this often (edits made through
+    # this worker apply immediately). Notifiers: log, stream (live feed),
+    # webhook (needs ALERT_WEBHOOK_URL) or 'package.module:ClassName'
+    ALERT_RULES_TTL = int(os.environ.get('ALERT_RULES_TTL', 60))
+    ALERT_NOTIFIERS = os.environ.get('ALERT_NOTIFIERS', 'log,stream')
+    ALERT_WEBHOOK_URL = os.environ.get('ALERT_WEBHOOK_URL')
+    
+    # Tiered retention ('flask apply-retention'): readings older than
+    # READINGS_HOT_DAYS are compacted into compressed per-series chunks, one
+    # per READINGS_CHUNK_DAYS window of at most READINGS_CHUNK_ROWS readings;
+    # chunks older than READINGS_RETENTION_DAYS are dropped (0 keeps them)
+    READINGS_HOT_DAYS = int(os.environ.get('READINGS_HOT_DAYS', 90))
+    READINGS_CHUNK_DAYS = int(os.environ.get('READINGS_CHUNK_DAYS', 7))
+    READINGS_CHUNK_ROWS = int(os.environ.get('READINGS_CHUNK_ROWS', 2000))
+    READINGS_RETENTION_DAYS = int(os.environ.get('READINGS_RETENTION_DAYS', 0))
+    
+    # Location map queries (/api/locations) use a per-worker grid index over
+    # the sites with coordinates: cell size in degrees, rebuilt this often
+    # (edits made through this worker apply immediately)
+    GEO_GRID_CELL_DEGREES = float(os.environ.get('GEO_GRID_CELL_DEGREES', 1.0))
+    GEO_INDEX_TTL = int(os.environ.get('GEO_INDEX_TTL', 60))
+    
+    # Organizations (app.services.tenancy): signed-in users other than admins
+    # only see their organization's readings, rollups, chunks and alerts.
+    # New users join DEFAULT_ORGANIZATION until an admin moves them; only
+    # admins create organizations.
+    # READINGS_PARTITIONING='organization' (PostgreSQL only) list-partitions
+    # water_quality by organization, one partition each, via 'flask upgrade-db'
+    TENANT_ISOLATION = _env_flag('TENANT_ISOLATION', True)
+    DEFAULT_ORGANIZATION = os.environ.get('DEFAULT_ORGANIZATION', 'Unaffiliated')
+    READINGS_PARTITIONING = os.environ.get('READINGS_PARTITIONING', 'none').lower()
+    
+    # Background jobs (app.services.jobs): 'in-process' runs the scheduler and
+    # JOB_WORKERS job threads in every web worker, 'sidecar' leaves them to a
+    # separate 'flask run-jobs' process. A running job's process refreshes its
+    # heartbeat every poll; a run whose heartbeat is older than
+    # JOB_HEARTBEAT_TIMEOUT seconds (its process died) is marked failed, however
+    # long it has been going. JOB_RUN_HISTORY finished runs are kept per job.
+    # JOB_SCHEDULES overrides default cron schedules (UTC) as JSON, e.g.
+    # {"apply_retention": "30 3 * * *", "user_statistics": null}
+    JOBS_MODE = os.environ.get('JOBS_MODE', 'in-process').lower()
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 2))
+    JOB_POLL_INTERVAL = float(os.environ.get('JOB_POLL_INTERVAL', 5))
+    JOB_HEARTBEAT_TIMEOUT = int(os.environ.get('JOB_HEARTBEAT_TIMEOUT', 60))
+    JOB_RUN_HISTORY = int(os.environ.get('JOB_RUN_HISTORY', 100))
+    JOB_SCHEDULES = json.loads(os.environ.get('JOB_SCHEDULES', '{}'))
+    # /analytics/api/location-insights and /user-statistics serve the latest
+    # job snapshot while it is younger than this many seconds (0: always compute)
+    ANALYTICS_SNAPSHOT_MAX_AGE = int(os.environ.get('ANALYTICS_SNAPSHOT_MAX_AGE', 900))
+    
+    # Logging: 'text' or 'json' lines on stdout, written by a background thread
+    # from a queue of at most LOG_QUEUE_SIZE records (when it is full, records
+    # are dropped and counted rather than blocking requests)
+    LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO').upper()
+    LOG_FORMAT = os.environ.get('LOG_FORMAT', 'text').lower()
+    LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+    
+    # Request timing: every request is counted in /metrics; LOG_REQUESTS also
+    # logs each one, and requests slower than LOG_SLOW_REQUEST_MS are logged as
+    # warnings (0 disables). /metrics requires METRICS_TOKEN as a bearer token
+    # when it is set.
+    LOG_REQUESTS = _env_flag('LOG_REQUESTS', False)
+    LOG_SLOW_REQUEST_MS = int(os.environ.get('LOG_SLOW_REQUEST_MS', 1000))
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')
+    
+    # bcrypt cost (2^rounds iterations). Hashes made at another cost are
+    # upgraded on the user's next successful login.
+    BCRYPT_LOG_ROUNDS = int(os.environ.get('BCRYPT_LOG_ROUNDS', 12))
+    # Hashing runs on this many processes per app worker (0 = inline); when
+    # more than PASSWORD_HASH_MAX_PENDING jobs are in flight, login/register
+    # answer 503 with Retry-After instead of queueing
+    PASSWORD_HASH_WORKERS = int(os.environ.get('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+    PASSWORD_HASH_MAX_PENDING = int(os.environ.get('PASSWORD_HASH_MAX_PENDING', 16))
+    PASSWORD_HASH_TIMEOUT = float(os.environ.get('PASSWORD_HASH_TIMEOUT', 10))
+    PASSWORD_HASH_RETRY_AFTER = int(os.environ.get('PASSWORD_HASH_RETRY_AFTER', 1))
+    
+    # Rate limits (app.middleware.rate_limit): token buckets per endpoint and
+    # client (the signed-in user, else the client IP); over the limit, 429
+    # with Retry-After. RATE_LIMITS overrides the defaults by endpoint as
+    # JSON, e.g. {"api_login": "20/minute", "add_water_readings_bulk": null}.
+    # 'memory' keeps buckets per worker, 'local' shares them between the
+    # workers on this host through an SQLite file. Behind proxies that append
+    # X-Forwarded-For, set RATE_LIMIT_TRUSTED_PROXIES to how many there are.
+    RATE_LIMIT_ENABLED = _env_flag('RATE_LIMIT_ENABLED', True)
+    RATE_LIMIT_BACKEND = os.environ.get('RATE_LIMIT_BACKEND', 'memory').lower()
+    RATE_LIMIT_STORE_PATH = os.environ.get('RATE_LIMIT_STORE_PATH', 'rate_limits.db')
+    RATE_LIMITS = json.loads(os.environ.get('RATE_LIMITS', '{}'))
+    RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', 100000))
+    RATE_LIMIT_TRUSTED_PROXIES = int(os.environ.get('RATE_LIMIT_TRUSTED_PROXIES', 0))
+    
+    # Admission control: at most ADMISSION_MAX_CONCURRENCY requests in progress
+    # per worker (default: the database pool's size plus overflow, so excess
+    # requests are turned away rather than queueing for a connection; 0
+    # disables). A request waits up to ADMISSION_QUEUE_TIMEOUT seconds for a
+    # slot, then gets 503 with Retry-After: ADMISSION_RETRY_AFTER
+    ADMISSION_MAX_CONCURRENCY = int(os.environ.get(
+        'ADMISSION_MAX_CONCURRENCY', int(os.environ.get('DB_POOL_SIZE', 5)) + int(os.environ.get('DB_MAX_OVERFLOW', 10))
+    ))
+    ADMISSION_QUEUE_TIMEOUT = float(os.environ.get('ADMISSION_QUEUE_TIMEOUT', 0.1))
+    ADMISSION_RETRY_AFTER = int(os.environ.get('ADMISSION_RETRY_AFTER', 1))
\ No newline at end of file
@@ -1,32 +1,118 @@
+import logging
+from flask import g, has_app_context, current_app
+from sqlalchemy import insert
+from sqlalchemy.orm import make_transient_to_detached
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import LoginManager
+from app.database.pool import TimedQueuePool, configure_engine
 
-db = SQLAlchemy()
+logger = logging.getLogger(__name__)
+
+
+class RoutingSession(Session):
+    """Session that sends reads to the 'replica' bind while g.use_read_replica is set.
+    
+    Writes (anything issued during a flush) always go to the primary.
+    """
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and has_app_context() and g.get('use_read_replica'):
+            replica = db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 login_manager = LoginManager()
 
+
+def use_read_replica():
+    """Route this request's reads to the read replica, if one is configured.
+    
+    Only for read-only handlers that tolerate replication lag.
+    """
+    g.use_read_replica = True
+
+
+def insert_rows(model, rows, with_ids=False):
+    """Insert row dicts into a model's table with one executemany statement.
+    
+    With `with_ids` (and a database that supports RETURNING on executemany)
+    each row dict gets the 'id' it was stored under.
+    """
+    statement = insert(model)
+    if with_ids and db.engine.dialect.insert_executemany_returning_sort_by_parameter_order:
+        ids = db.session.execute(statement.returning(model.id, sort_by_parameter_order=True), rows).scalars().all()
+        for row, row_id in zip(rows, ids):
+            row['id'] = row_id
+    else:
+        db.session.execute(statement, rows)
+
+
 def init_database(app):
     """Initialize SQLAlchemy and Flask-Login."""
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        # Records checkout wait times for pool metrics
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'poolclass': TimedQueuePool, **app.config['SQLALCHEMY_ENGINE_OPTIONS']}
     db.init_app(app)
     login_manager.init_app(app)
     login_manager.login_view = 'login'
 
+    if app.config['USER_CACHE_TTL'] > 0:
+        from app.middleware.cache import MemoryCacheBackend, SharedVersion, USER_VERSION
+        path = app.config['USER_CACHE_VERSION_PATH']
+        app.extensions['user_cache'] = MemoryCacheBackend(
+            app.config['USER_CACHE_MAX_ENTRIES'], SharedVersion(path, USER_VERSION) if path else None
+        )
+    
+    # Engines connect lazily, so nothing here touches the database
     with app.app_context():
-        try:
-            # Only create tables if the connection works
-            db.create_all()
-            print(f"✅ Database connected: {app.config['SQLALCHEMY_DATABASE_URI']}")
-            return True
-        except Exception as e:
-            print(f"❌ Database setup failed: {e}")
-            return False
+        for engine in db.engines.values():
+            configure_engine(engine)
+
+
+# What the loader cache keeps of a user: enough for authorization and tenant
+# scoping, never the password hash or contact details (loaded on first access)
+CACHED_USER_COLUMNS = ('id', 'name', 'email', 'role', 'organization_id')
+
+
+def invalidate_cached_users():
+    """Drop every user from the loader cache of every worker sharing USER_CACHE_VERSION_PATH"""
+    cache = current_app.extensions.get('user_cache') if has_app_context() else None
+    if cache is not None:
+        cache.bump_version()
 
 
 @login_manager.user_loader
 def load_user(user_id):
-    """Load user for Flask-Login."""
+    """Load user for Flask-Login.
+    
+    The dashboard fires several API calls per page, each of which would load
+    the same user by primary key. CACHED_USER_COLUMNS are cached for
+    USER_CACHE_TTL seconds and turned back into a persistent User without a
+    query. Entries are keyed by the cache's generation, which a committed
+    change to any user bumps for all workers on this host (see
+    USER_CACHE_VERSION_PATH), so a demoted or moved user is reloaded on the
+    next request wherever it lands.
+    """
     from app.models.user import User
     try:
-        return User.query.get(int(user_id))
-    except Exception as e:
-        print(f"⚠️ Error loading user: {e}")
+        user_id = int(user_id)
+        cache = current_app.extensions.get('user_cache')
+        key = (cache.get_version(), user_id) if cache is not None else None
+        values = cache.get(key) if cache is not None else None
+        
+        if values is not None:
+            user = User(**values)
+            make_transient_to_detached(user)
+            return db.session.merge(user, load=False)
+        
+        user = db.session.get(User, user_id)
+        if user is not None and cache is not None:
+            cache.set(key, {name: getattr(user, name) for name in CACHED_USER_COLUMNS},
+                      current_app.config['USER_CACHE_TTL'])
+        return user
+    except Exception:
+        logger.exception('Error loading user')
         return None
@@ -0,0 +1,524 @@
+import click
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import inspect, select, update, insert, bindparam, text, func, MetaData, Table
+from sqlalchemy.schema import AddConstraint
+from app.database.connection import db
+
+
+def upgrade_columns():
+    """Add nullable model columns missing from existing tables.
+    
+    Only columns that can be added without a default or a rewrite are
+    handled (nullable, no server default); anything else needs a manual
+    migration. Returns the added columns as 'table.column' names.
+    """
+    inspector = inspect(db.engine)
+    preparer = db.engine.dialect.identifier_preparer
+    added = []
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing or not column.nullable or column.server_default is not None:
+                continue
+            column_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as connection:
+                connection.execute(text(
+                    f'ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {column_type}'
+                ))
+            added.append(f'{table.name}.{column.name}')
+    
+    return added
+
+
+def upgrade_indexes():
+    """Create any model indexes missing from existing tables.
+    
+    db.create_all() skips tables that already exist, so indexes added to a
+    model later never reach deployed databases. Index DDL is generated by
+    SQLAlchemy, so this works unchanged on SQLite and PostgreSQL. Returns the
+    names of the indexes that were created.
+    """
+    inspector = inspect(db.engine)
+    created = []
+    
+    for table in db.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        existing = {index['name'] for index in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            if index.name not in existing:
+                index.create(bind=db.engine)
+                created.append(index.name)
+    
+    return created
+
+
+def take_unkeyed_rollup():
+    """Drop a daily_location_rollup that predates organizations, keeping what can't be rebuilt.
+    
+    The rollup is derived, so backfill_rollups() recomputes it per
+    organization from the readings. Buckets older than the oldest retained
+    reading (whose readings were purged) can't be, so they are returned as
+    row dicts for restore_rollup_buckets(). Returns None if the table is
+    already keyed by organization (or doesn't exist yet).
+    """
+    inspector = inspect(db.engine)
+    if not inspector.has_table('daily_location_rollup'):
+        return None
+    if 'organization_id' in {column['name'] for column in inspector.get_columns('daily_location_rollup')}:
+        return None
+    old = Table('daily_location_rollup', MetaData(), autoload_with=db.engine)
+    oldest = [
+        db.session.execute(text('SELECT min(timestamp) FROM water_quality')).scalar(),
+        db.session.execute(text('SELECT min(start_time) FROM reading_chunk')).scalar()
+        if inspector.has_table('reading_chunk') else None
+    ]
+    oldest = min((timestamp for timestamp in oldest if timestamp), default=None)
+    query = select(old)
+    if oldest is not None:
+        if isinstance(oldest, str):
+            oldest = datetime.fromisoformat(oldest)
+        query = query.where(old.c.date < oldest.date())
+    kept = [dict(row._mapping) for row in db.session.execute(query)]
+    db.session.commit()
+    old.drop(bind=db.engine)
+    return kept
+
+
+def restore_rollup_buckets(buckets):
+    """Put buckets saved by take_unkeyed_rollup() back under the default organization"""
+    from app.models.organization import Organization
+    from app.models.rollup import DailyLocationRollup
+    if buckets:
+        organization_id = Organization.default_id()
+        db.session.execute(insert(DailyLocationRollup), [{**bucket, 'organization_id': organization_id} for bucket in buckets])
+        db.session.commit()
+
+
+def backfill_organizations():
+    """Turn users' free-text organization names into organizations and stamp existing rows with them.
+    
+    Users are linked to the organization with their organization's name
+    (spelling variants merge; blank names join DEFAULT_ORGANIZATION).
+    Readings, compacted chunks and alerts without an organization get
+    their author's, with one UPDATE per table. Alert rules that named an
+    organization in the old free-text column get that organization. Returns
+    (users linked, rows stamped), or None if nothing needed doing.
+    """
+    from app.models.organization import Organization, normalize_organization_name
+    from app.models.user import User
+    from app.models.water_quality import WaterQuality
+    from app.models.reading_chunk import ReadingChunk
+    from app.models.alert import Alert
+    
+    tables = [model.__table__ for model in (WaterQuality, ReadingChunk, Alert)]
+    users = db.session.execute(select(User.id, User.organization).where(User.organization_id.is_(None))).all()
+    unstamped = [
+        table for table in tables
+        if db.session.execute(select(table.c.id).where(table.c.organization_id.is_(None)).limit(1)).first() is not None
+    ]
+    legacy_rules = _legacy_organization_rules()
+    if not users and not unstamped and not legacy_rules:
+        return None
+    
+    default_id = Organization.default_id()
+    organizations = {}
+    linked = []
+    for user_id, name in users:
+        key = normalize_organization_name(name or '')
+        if key not in organizations:
+            organizations[key] = Organization.resolve(name)
+        organization = organizations[key]
+        # Canonical spelling; a blank name stays blank
+        linked.append({
+            'user_id': user_id,
+            'new_organization_id': organization.id,
+            'new_organization': organization.name if key else name
+        })
+    if linked:
+        user_table = User.__table__
+        db.session.execute(
+            update(user_table).where(user_table.c.id == bindparam('user_id')).values(
+                organization_id=bindparam('new_organization_id'), organization=bindparam('new_organization')
+            ),
+            linked
+        )
+    
+    user_table = User.__table__
+    stamped = 0
+    for table in unstamped:
+        author = select(user_table.c.organization_id).where(user_table.c.id == table.c.user_id).scalar_subquery()
+        stamped += db.session.execute(
+            update(table).where(table.c.organization_id.is_(None)).values(organization_id=func.coalesce(author, default_id))
+        ).rowcount
+    if legacy_rules:
+        rules_table = Table('alert_rule', MetaData(), autoload_with=db.engine)
+        for rule_id, name in legacy_rules:
+            key = normalize_organization_name(name)
+            if key not in organizations:
+                organizations[key] = Organization.resolve(name)
+            db.session.execute(
+                update(rules_table).where(rules_table.c.id == rule_id)
+                .values(organization_id=organizations[key].id, organization=None)
+            )
+        stamped += len(legacy_rules)
+    db.session.commit()
+    return len(users), stamped
+
+
+def _legacy_organization_rules():
+    """(id, organization name) of alert rules still scoped by the dropped free-text organization column"""
+    from app.models.organization import normalize_organization_name
+    inspector = inspect(db.engine)
+    if not inspector.has_table('alert_rule'):
+        return []
+    if 'organization' not in {column['name'] for column in inspector.get_columns('alert_rule')}:
+        return []
+    rules_table = Table('alert_rule', MetaData(), autoload_with=db.engine)
+    return [
+        (rule_id, name) for rule_id, name in db.session.execute(
+            select(rules_table.c.id, rules_table.c.organization)
+            .where(rules_table.c.organization_id.is_(None), rules_table.c.organization.is_not(None))
+        )
+        if normalize_organization_name(name)
+    ]
+
+
+def readings_partitioned():
+    """Whether water_quality is a partitioned table (PostgreSQL)"""
+    if db.engine.dialect.name != 'postgresql':
+        return False
+    return db.session.execute(text(
+        "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+        "WHERE c.relname = 'water_quality' AND pg_table_is_visible(c.oid)"
+    )).first() is not None
+
+
+def _partition_ddl(organization_id):
+    return f'CREATE TABLE IF NOT EXISTS water_quality_org_{int(organization_id)} ' \
+           f'PARTITION OF water_quality FOR VALUES IN ({int(organization_id)})'
+
+
+def create_reading_partition(organization_id):
+    """Give a new organization its own water_quality partition, in the caller's transaction.
+    
+    Only when READINGS_PARTITIONING is 'organization' and the table has
+    been partitioned; returns whether a partition was created.
+    """
+    if current_app.config['READINGS_PARTITIONING'] != 'organization' or not readings_partitioned():
+        return False
+    db.session.execute(text(_partition_ddl(organization_id)))
+    return True
+
+
+def partition_readings():
+    """Rebuild water_quality as a table list-partitioned by organization_id (PostgreSQL).
+    
+    Every organization gets its own partition (new ones get theirs when
+    they are created) and a DEFAULT partition catches anything else, so a
+    tenant's scans, vacuums and index depths depend on its own readings
+    only. PostgreSQL requires the partition key in unique constraints: the
+    primary key becomes (id, organization_id) and the client_reading_id
+    index gains organization_id. Copies the table in one transaction under
+    an exclusive lock, so run it in a maintenance window. Returns the number
+    of partitions created, or None if the table is already partitioned.
+    """
+    from app.models.organization import Organization
+    from app.models.water_quality import WaterQuality
+    
+    if db.engine.dialect.name != 'postgresql':
+        raise RuntimeError('Partitioning readings requires PostgreSQL')
+    if readings_partitioned():
+        return None
+    default_id = Organization.default_id()
+    organization_ids = db.session.execute(select(Organization.id).order_by(Organization.id)).scalars().all()
+    table = WaterQuality.__table__
+    
+    def execute(statement, **params):
+        return db.session.execute(text(statement), params)
+    
+    execute('LOCK TABLE water_quality IN ACCESS EXCLUSIVE MODE')
+    execute('UPDATE water_quality SET organization_id = :default_id WHERE organization_id IS NULL', default_id=default_id)
+    sequence = execute("SELECT pg_get_serial_sequence('water_quality', 'id')").scalar()
+    execute('ALTER TABLE water_quality RENAME TO water_quality_unpartitioned')
+    execute('CREATE TABLE water_quality (LIKE water_quality_unpartitioned INCLUDING DEFAULTS) '
+            'PARTITION BY LIST (organization_id)')
+    execute('ALTER TABLE water_quality ALTER COLUMN organization_id SET NOT NULL')
+    for organization_id in organization_ids:
+        execute(_partition_ddl(organization_id))
+    execute('CREATE TABLE water_quality_default PARTITION OF water_quality DEFAULT')
+    execute('INSERT INTO water_quality SELECT * FROM water_quality_unpartitioned')
+    if sequence:
+        # Keep the id sequence when the old table goes
+        execute(f'ALTER SEQUENCE {sequence} OWNED BY water_quality.id')
+    execute('DROP TABLE water_quality_unpartitioned')
+    
+    # Constraints and indexes are created on the parent and cascade to every partition
+    execute('ALTER TABLE water_quality ADD PRIMARY KEY (id, organization_id)')
+    for constraint in table.foreign_key_constraints:
+        db.session.execute(AddConstraint(constraint))
+    execute('CREATE UNIQUE INDEX ix_water_quality_client_reading ON water_quality (user_id, client_reading_id, organization_id)')
+    connection = db.session.connection()
+    for index in sorted(table.indexes, key=lambda index: index.name):
+        if index.name != 'ix_water_quality_client_reading':
+            index.create(bind=connection)
+    execute('ANALYZE water_quality')
+    db.session.commit()
+    return len(organization_ids) + 1
+
+
+def backfill_rollups():
+    """Build the daily rollup if it is empty but readings already exist.
+    
+    Covers databases that predate the rollup table; afterwards the water
+    routes keep it up to date incrementally. Returns the number of buckets
+    built, or None if nothing needed doing.
+    """
+    from app.models.rollup import DailyLocationRollup
+    from app.models.water_quality import WaterQuality
+    
+    if db.session.query(DailyLocationRollup.date).first() is not None:
+        return None
+    if db.session.query(WaterQuality.id).first() is None:
+        return None
+    return DailyLocationRollup.rebuild()
+
+
+def backfill_locations(chunk_size=50000):
+    """Link readings that have no location_id to Location rows, merging spelling variants.
+    
+    Names that normalize alike ('Lake Victoria', 'lake  victoria ') become one
+    location named after its most used spelling (or the existing location's
+    name), and the readings are relabelled with it. Readings are updated
+    chunk by chunk in primary-key order with one executemany UPDATE each.
+    Returns (locations created, readings linked), or None if nothing needed doing.
+    """
+    from app.models.location import Location, normalize_location_name
+    from app.models.rollup import DailyLocationRollup
+    from app.models.water_quality import WaterQuality
+    
+    table = WaterQuality.__table__
+    if db.session.execute(select(table.c.id).where(table.c.location_id.is_(None)).limit(1)).first() is None:
+        return None
+    
+    # Pick one canonical spelling per normalized name
+    variants = {}
+    for name, count in db.session.execute(
+        select(table.c.location_name, func.count()).where(table.c.location_id.is_(None)).group_by(table.c.location_name)
+    ):
+        variants.setdefault(normalize_location_name(name), []).append((count, name))
+    existing = {location.normalized_name: location for location in Location.query.filter(
+        Location.normalized_name.in_(list(variants))
+    )}
+    created = 0
+    for key, spellings in variants.items():
+        if key not in existing:
+            count, name = max(spellings, key=lambda spelling: (spelling[0], spelling[1]))
+            existing[key] = Location(name=' '.join(name.split()), normalized_name=key)
+            db.session.add(existing[key])
+            created += 1
+    db.session.flush()
+    targets = {
+        name: (existing[key].id, existing[key].name)
+        for key, spellings in variants.items() for _, name in spellings
+    }
+    renamed = any(name != canonical for name, (_, canonical) in targets.items())
+    db.session.commit()
+    Location.forget_cached()
+    
+    statement = update(table)\
+        .where(table.c.id == bindparam('reading_id'))\
+        .values(location_id=bindparam('new_location_id'), location_name=bindparam('new_location_name'))
+    linked = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.location_name)
+            .where(table.c.id > last_id, table.c.location_id.is_(None))
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            break
+        db.session.execute(statement, [
+            {'reading_id': reading_id, 'new_location_id': targets[name][0], 'new_location_name': targets[name][1]}
+            for reading_id, name in rows
+        ])
+        db.session.commit()
+        linked += len(rows)
+        last_id = rows[-1][0]
+    
+    if renamed:
+        # Rollup buckets are keyed by name, so merged spellings need re-aggregating
+        DailyLocationRollup.rebuild()
+    return created, linked
+
+
+def _previous_thresholds(previous_tds_factor):
+    """Current thresholds, but with the TDS factor stored TDS may have been derived with"""
+    from app.services import scoring
+    
+    if previous_tds_factor is None:
+        previous_tds_factor = scoring.DEFAULT_THRESHOLDS['tds_factor']
+    return dict(scoring.get_thresholds(), tds_factor=float(previous_tds_factor))
+
+
+def rescore_readings(chunk_size=50000, previous_tds_factor=None):
+    """Recompute status and derived TDS for every reading, chunk by chunk.
+    
+    TDS is recomputed where it is missing or where it equals the value
+    derived with `previous_tds_factor` (the factor in use before a change to
+    WATER_QUALITY_THRESHOLDS, by default the built-in one); anything else
+    was measured and is kept. Each chunk is loaded as plain columns, scored
+    with NumPy and written back with one executemany UPDATE. Returns the
+    number of rows processed.
+    """
+    import numpy as np
+    from app.models.water_quality import WaterQuality
+    from app.services import scoring
+    
+    previous = _previous_thresholds(previous_tds_factor)
+    table = WaterQuality.__table__
+    statement = update(table)\
+        .where(table.c.id == bindparam('reading_id'))\
+        .values(status=bindparam('new_status'), total_dissolved_solids=bindparam('new_tds'))
+    
+    processed = 0
+    last_id = 0
+    while True:
+        rows = db.session.execute(
+            select(table.c.id, table.c.ph_level, table.c.dissolved_oxygen, table.c.turbidity_ntu,
+                   table.c.conductivity_us, table.c.total_dissolved_solids)
+            .where(table.c.id > last_id)
+            .order_by(table.c.id)
+            .limit(chunk_size)
+        ).all()
+        if not rows:
+            return processed
+        
+        ids, ph, dissolved_oxygen, turbidity, conductivity, existing_tds = zip(*rows)
+        statuses = scoring.status_names(scoring.score_batch(ph, dissolved_oxygen, turbidity))
+        # Keep any TDS that was measured rather than derived
+        existing_tds = scoring.as_column(existing_tds)
+        measured = ~np.isnan(existing_tds) & ~scoring.derived_tds_mask(existing_tds, conductivity, previous)
+        tds = scoring.tds_batch(conductivity)
+        tds[measured] = existing_tds[measured]
+        
+        db.session.execute(statement, [
+            {'reading_id': reading_id, 'new_status': status, 'new_tds': row_tds}
+            for reading_id, status, row_tds in zip(ids, statuses, scoring.nan_to_none(tds))
+        ])
+        db.session.commit()
+        
+        processed += len(rows)
+        last_id = ids[-1]
+
+
+def resummarize_chunks(previous_tds_factor=None):
+    """Recount the status summary of every compacted chunk under the current thresholds.
+    
+    Stored TDS derived with `previous_tds_factor` is re-derived as in
+    rescore_readings().
+    """
+    from app.models.reading_chunk import ReadingChunk
+    
+    previous = _previous_thresholds(previous_tds_factor)
+    processed = 0
+    last_id = 0
+    while True:
+        chunks = ReadingChunk.query.filter(ReadingChunk.id > last_id).order_by(ReadingChunk.id).limit(100).all()
+        if not chunks:
+            return processed
+        for chunk in chunks:
+            chunk.rederive_tds(previous)
+            chunk._summarize(chunk.columns())
+            processed += chunk.reading_count
+        db.session.commit()
+        last_id = chunks[-1].id
+
+
+def upgrade_schema():
+    """Bring the database schema up to date: tables, columns, indexes and the backfills.
+    
+    Runs DDL and reflects the schema, so it belongs in a deploy/release step
+    ('flask upgrade-db'), not in every worker boot. Returns (added column and
+    created index names, backfilled rollup buckets or None, backfill_locations()
+    result or None, backfill_organizations() result or None, readings
+    partitions created or None).
+    """
+    unkeyed_buckets = take_unkeyed_rollup()
+    db.create_all()
+    created = upgrade_columns()
+    created += upgrade_indexes()
+    organizations = backfill_organizations()
+    locations = backfill_locations()
+    buckets = backfill_rollups()
+    restore_rollup_buckets(unkeyed_buckets)
+    partitions = None
+    if current_app.config['READINGS_PARTITIONING'] == 'organization':
+        partitions = partition_readings()
+    return created, buckets, locations, organizations, partitions
+
+
+def init_migration_commands(app):
+    @app.cli.command('upgrade-db')
+    def upgrade_db_command():
+        """Create missing tables, columns and indexes, and backfill organizations, locations and the daily rollup"""
+        created, buckets, locations, organizations, partitions = upgrade_schema()
+        if created:
+            click.echo(f"✅ Added columns/indexes: {', '.join(created)}")
+        if organizations is not None:
+            click.echo(f"✅ Linked {organizations[0]} users to organizations, stamped {organizations[1]} rows")
+        if partitions is not None:
+            click.echo(f"✅ Partitioned readings by organization: {partitions} partitions")
+        if locations is not None:
+            click.echo(f"✅ Linked {locations[1]} readings to locations ({locations[0]} created)")
+        if buckets is not None:
+            click.echo(f"✅ Backfilled daily rollup: {buckets} buckets")
+        if not created and buckets is None and locations is None and organizations is None and partitions is None:
+            click.echo("✅ Database schema is up to date")
+
+    @app.cli.command('rebuild-rollups')
+    def rebuild_rollups_command():
+        """Backfill/rebuild the daily location rollup from all readings"""
+        from app.models.rollup import DailyLocationRollup
+        buckets = DailyLocationRollup.rebuild()
+        # Bumps the shared data version, so every worker on this host (or Redis) drops its entries
+        from app.middleware.cache import invalidate_analytics_cache
+        invalidate_analytics_cache()
+        click.echo(f"✅ Rebuilt daily rollup: {buckets} buckets")
+    
+    @app.cli.command('rescore-readings')
+    @click.option('--chunk-size', default=50000, show_default=True, help='Rows scored per transaction')
+    @click.option('--previous-tds-factor', type=float,
+                  help='TDS factor stored TDS was derived with, if it has changed (default: the built-in 0.64)')
+    def rescore_readings_command(chunk_size, previous_tds_factor):
+        """Recompute status/total_dissolved_solids for existing readings"""
+        processed = rescore_readings(chunk_size, previous_tds_factor)
+        processed += resummarize_chunks(previous_tds_factor)
+        from app.middleware.cache import invalidate_analytics_cache
+        invalidate_analytics_cache()
+        click.echo(f"✅ Rescored {processed} readings")
+    
+    @app.cli.command('apply-retention')
+    @click.option('--hot-days', type=int, help='Override READINGS_HOT_DAYS')
+    def apply_retention_command(hot_days):
+        """Compact readings older than READINGS_HOT_DAYS into compressed chunks and purge expired ones"""
+        from app.services.retention import apply_retention
+        config = dict(app.config)
+        if hot_days is not None:
+            config['READINGS_HOT_DAYS'] = hot_days
+        result = apply_retention(config)
+        from app.middleware.cache import invalidate_analytics_cache
+        invalidate_analytics_cache()
+        if result['compacted']:
+            click.echo(f"✅ Compacted {result['compacted']} readings into {result['chunks']} chunks "
+                       f"({result['compressed_bytes'] / result['compacted']:.1f} bytes/reading)")
+        else:
+            click.echo("✅ No readings old enough to compact")
+        if result['purged']:
+            click.echo(f"🗑️ Purged {result['purged']} readings older than {config['READINGS_RETENTION_DAYS']} days")
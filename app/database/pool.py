@@ -0,0 +1,76 @@
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+# Applied to every new SQLite connection (development / single-host deployments)
+SQLITE_PRAGMAS = (
+    'PRAGMA journal_mode=WAL',      # readers don't block the writer
+    'PRAGMA synchronous=NORMAL',    # safe with WAL, far fewer fsyncs
+    'PRAGMA busy_timeout=5000',     # wait for locks instead of failing immediately
+    'PRAGMA temp_store=MEMORY',
+    'PRAGMA cache_size=-20000',     # ~20 MB page cache
+)
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long checkouts wait for a connection"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            with self._stats_lock:
+                self.timeouts += 1
+            raise
+        finally:
+            waited = time.perf_counter() - start
+            with self._stats_lock:
+                self.checkouts += 1
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    for pragma in SQLITE_PRAGMAS:
+        cursor.execute(pragma)
+    cursor.close()
+
+
+def configure_engine(engine):
+    """Attach per-dialect connection setup to a newly created engine"""
+    if engine.dialect.name == 'sqlite':
+        event.listen(engine, 'connect', set_sqlite_pragmas)
+
+
+def pool_stats(engines):
+    """Pool occupancy and checkout-wait metrics for each engine, keyed by bind name"""
+    stats = {}
+    for name, engine in engines.items():
+        pool = engine.pool
+        entry = {'pool': type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            entry.update({
+                'size': pool.size(),
+                'checked_out': pool.checkedout(),
+                'overflow': pool.overflow(),
+            })
+        if isinstance(pool, TimedQueuePool):
+            entry.update({
+                'checkouts': pool.checkouts,
+                'timeouts': pool.timeouts,
+                'avg_wait_ms': round(pool.total_wait / pool.checkouts * 1000, 3) if pool.checkouts else 0.0,
+                'max_wait_ms': round(pool.max_wait * 1000, 3),
+            })
+        stats[name or 'default'] = entry
+    return stats
@@ -0,0 +1,241 @@
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+from flask import current_app, make_response, request
+from flask_login import current_user
+from app.services.tenancy import current_tenant
+
+logger = logging.getLogger(__name__)
+
+
+# Counters kept in one SharedVersion file
+ANALYTICS_VERSION = 1
+USER_VERSION = 2
+
+
+class SharedVersion:
+    """A counter in an SQLite file, shared by the workers on this host; one file holds several"""
+    def __init__(self, path, counter=ANALYTICS_VERSION):
+        self.path = path
+        self.counter = counter
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        connection.execute('CREATE TABLE IF NOT EXISTS version (id INTEGER PRIMARY KEY, value INTEGER NOT NULL)')
+        connection.execute('INSERT OR IGNORE INTO version (id, value) VALUES (?, 0)', (counter,))
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Losing a bump in a crash only matters to entries cached in that process
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def get(self):
+        return self._connection().execute('SELECT value FROM version WHERE id = ?', (self.counter,)).fetchone()[0]
+
+    def bump(self):
+        self._connection().execute('UPDATE version SET value = value + 1 WHERE id = ?', (self.counter,))
+
+
+class MemoryCacheBackend:
+    """In-process LRU cache with per-entry TTL.
+
+    Entries are per worker. The version is too, unless a SharedVersion is
+    given: then a bump by any worker on this host makes every worker's
+    older entries unreachable.
+    """
+    def __init__(self, max_entries=1024, shared_version=None):
+        self.max_entries = max_entries
+        self.shared_version = shared_version
+        self._entries = OrderedDict()
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def get_version(self):
+        if self.shared_version is not None:
+            return self.shared_version.get()
+        return self._version
+
+    def bump_version(self):
+        if self.shared_version is not None:
+            self.shared_version.bump()
+        with self._lock:
+            self._version += 1
+            # Old-version entries can never be read again
+            self._entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache shared by all workers on any Redis-protocol server (Redis, Valkey, KeyDB...)"""
+    VERSION_KEY = 'wqm:analytics:version'
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("ANALYTICS_CACHE_BACKEND=redis requires the 'redis' package")
+        self._client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        return self._client.get(key)
+
+    def set(self, key, value, ttl):
+        self._client.set(key, value, ex=ttl)
+
+    def delete(self, key):
+        self._client.delete(key)
+
+    def get_version(self):
+        return int(self._client.get(self.VERSION_KEY) or 0)
+
+    def bump_version(self):
+        self._client.incr(self.VERSION_KEY)
+
+
+class ResponseCache:
+    """Caches JSON response bodies keyed by endpoint, visibility scope and data version.
+
+    Every write to the readings bumps the data version, which makes all
+    previously cached entries unreachable; TTL/LRU then evicts them.
+    """
+    def __init__(self, backend, ttl):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, endpoint, scope):
+        return f'wqm:analytics:{self.backend.get_version()}:{endpoint}:{scope}'
+
+    def get(self, key):
+        value = self.backend.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        etag, _, body = value.partition(b'\n')
+        return etag.decode(), body
+
+    def set(self, key, body):
+        etag = hashlib.md5(body).hexdigest()
+        self.backend.set(key, etag.encode() + b'\n' + body, self.ttl)
+        return etag
+
+    def invalidate(self):
+        self.backend.bump_version()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            'backend': type(self.backend).__name__,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+def init_cache(app):
+    """Attach the analytics response cache configured by ANALYTICS_CACHE_* to the app"""
+    backend_name = app.config['ANALYTICS_CACHE_BACKEND']
+    if backend_name == 'none':
+        cache = None
+    elif backend_name == 'redis':
+        cache = ResponseCache(RedisCacheBackend(app.config['ANALYTICS_CACHE_URL']), app.config['ANALYTICS_CACHE_TTL'])
+    else:
+        path = app.config['ANALYTICS_CACHE_VERSION_PATH']
+        backend = MemoryCacheBackend(app.config['ANALYTICS_CACHE_MAX_ENTRIES'], SharedVersion(path) if path else None)
+        cache = ResponseCache(backend, app.config['ANALYTICS_CACHE_TTL'])
+    app.extensions['analytics_cache'] = cache
+
+
+def get_cache():
+    return current_app.extensions.get('analytics_cache')
+
+
+def invalidate_analytics_cache():
+    """Call after committing any change to readings (or users) that analytics depend on"""
+    cache = get_cache()
+    if cache is not None:
+        try:
+            cache.invalidate()
+        except Exception as e:
+            logger.warning('Analytics cache invalidation failed: %s', e)
+
+
+def visibility_scope():
+    """Cache scope: per organization (or everything, unscoped) for roles that see all data, otherwise per user"""
+    if not current_user.can_view_all_data():
+        return f'user:{current_user.id}'
+    tenant = current_tenant()
+    return 'all' if tenant is None else f'organization:{tenant}'
+
+
+def cached_response(f):
+    """Cache a JSON view's 200 responses per visibility scope, with ETag/If-None-Match support.
+
+    Apply below login_required/role decorators so only authorised requests reach the cache.
+    """
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return f(*args, **kwargs)
+
+        try:
+            key = cache.key(request.full_path, visibility_scope())
+            cached = cache.get(key)
+        except Exception as e:
+            logger.warning('Analytics cache unavailable: %s', e)
+            return f(*args, **kwargs)
+
+        if cached is not None:
+            etag, body = cached
+            response = current_app.response_class(body, mimetype='application/json')
+        else:
+            response = make_response(f(*args, **kwargs))
+            if response.status_code != 200:
+                return response
+            try:
+                etag = cache.set(key, response.get_data())
+            except Exception as e:
+                logger.warning('Analytics cache write failed: %s', e)
+                return response
+
+        response.set_etag(etag)
+        # Browsers must revalidate, which If-None-Match turns into a cheap 304
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response.make_conditional(request)
+    return decorated_function
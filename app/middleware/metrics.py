@@ -0,0 +1,192 @@
+"""Per-request timing, exposed in Prometheus text format at /metrics.
+
+Each request records its route (the URL rule, so every reading id shares
+one series), method, status, total latency, time spent in database calls
+and the number of queries. Latency, DB time and query counts are kept as
+histograms; a Server-Timing header carries the same numbers to the client.
+
+Metrics live in this worker's memory: scrape every worker, or aggregate
+per host. For streamed responses (export, the live feed) latency is the
+time to the first byte, not the length of the stream.
+"""
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from flask import current_app, g, has_app_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+# Requests that matched no route share one label rather than one per path
+UNMATCHED_ROUTE = '<unmatched>'
+
+logger = logging.getLogger(__name__)
+
+_listening = False
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class RequestTiming:
+    __slots__ = ('start', 'db_time', 'queries')
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.db_time = 0.0
+        self.queries = 0
+
+
+def _labels(**labels):
+    escaped = (str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for value in labels.values())
+    return '{' + ','.join(f'{name}="{value}"' for name, value in zip(labels, escaped)) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_progress = 0
+        self.requests = defaultdict(int)  # (method, route, status) -> count
+        self.latency = {}                 # (method, route) -> Histogram, for each of the three below
+        self.db_time = {}
+        self.queries = {}
+
+    def started(self):
+        with self._lock:
+            self.in_progress += 1
+
+    def finished(self):
+        with self._lock:
+            self.in_progress -= 1
+
+    def observe(self, method, route, status, seconds, db_seconds, queries):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            if key not in self.latency:
+                self.latency[key] = Histogram(LATENCY_BUCKETS)
+                self.db_time[key] = Histogram(LATENCY_BUCKETS)
+                self.queries[key] = Histogram(QUERY_BUCKETS)
+            self.latency[key].observe(seconds)
+            self.db_time[key].observe(db_seconds)
+            self.queries[key].observe(queries)
+
+    def render(self, gauges=(), counters=()):
+        """Prometheus text exposition; gauges/counters are extra (name, help, [(labels, value)]) families"""
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {kind}')
+
+        def histograms(name, help_text, series):
+            family(name, 'histogram', help_text)
+            for (method, route), histogram in sorted(series.items()):
+                cumulative = 0
+                for bound, count in zip(histogram.buckets + ('+Inf',), histogram.counts):
+                    cumulative += count
+                    le = bound if bound == '+Inf' else _number(bound)
+                    lines.append(f'{name}_bucket{_labels(method=method, route=route, le=le)} {cumulative}')
+                lines.append(f'{name}_sum{_labels(method=method, route=route)} {_number(histogram.sum)}')
+                lines.append(f'{name}_count{_labels(method=method, route=route)} {histogram.count}')
+
+        with self._lock:
+            family('http_requests_total', 'counter', 'Requests handled, by route and status')
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f'http_requests_total{_labels(method=method, route=route, status=status)} {count}')
+            family('http_requests_in_progress', 'gauge', 'Requests being handled by this worker')
+            lines.append(f'http_requests_in_progress {self.in_progress}')
+            histograms('http_request_duration_seconds', 'Time to produce the response', self.latency)
+            histograms('http_request_db_seconds', 'Time spent in database calls per request', self.db_time)
+            histograms('http_request_db_queries', 'Database statements executed per request', self.queries)
+
+        for kind, families in (('gauge', gauges), ('counter', counters)):
+            for name, help_text, samples in families:
+                family(name, kind, help_text)
+                for labels, value in samples:
+                    lines.append(f'{name}{_labels(**labels) if labels else ""} {_number(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # Statements on one connection never overlap, so one slot is enough
+    conn.info['query_start'] = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    timing = g.get('request_timing') if has_app_context() else None
+    if timing is not None:
+        timing.db_time += time.perf_counter() - conn.info['query_start']
+        timing.queries += 1
+
+
+def _start_request():
+    g.request_timing = RequestTiming()
+    current_app.extensions['metrics'].started()
+
+
+def _record_request(response):
+    timing = g.get('request_timing')
+    if timing is None:
+        return response
+    elapsed = time.perf_counter() - timing.start
+    route = request.url_rule.rule if request.url_rule is not None else UNMATCHED_ROUTE
+    current_app.extensions['metrics'].observe(
+        request.method, route, response.status_code, elapsed, timing.db_time, timing.queries
+    )
+    response.headers['Server-Timing'] = (
+        f'app;dur={elapsed * 1000:.1f}, db;dur={timing.db_time * 1000:.1f};desc="{timing.queries} queries"'
+    )
+
+    slow_ms = current_app.config['LOG_SLOW_REQUEST_MS']
+    slow = slow_ms and elapsed * 1000 >= slow_ms
+    if slow or current_app.config['LOG_REQUESTS']:
+        logger.log(logging.WARNING if slow else logging.INFO, 'Slow request' if slow else 'Request', extra={
+            'method': request.method,
+            'route': route,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 1),
+            'db_ms': round(timing.db_time * 1000, 1),
+            'queries': timing.queries
+        })
+    return response
+
+
+def _end_request(exception=None):
+    if g.pop('request_timing', None) is not None:
+        current_app.extensions['metrics'].finished()
+
+
+def init_metrics(app):
+    global _listening
+    app.extensions['metrics'] = MetricsRegistry()
+    app.before_request(_start_request)
+    app.after_request(_record_request)
+    app.teardown_request(_end_request)
+    if not _listening:
+        # On the Engine class, so the replica bind is timed too
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        _listening = True
+
+
+def get_metrics():
+    return current_app.extensions['metrics']
\ No newline at end of file
@@ -0,0 +1,293 @@
+"""Per-client rate limits and global admission control.
+
+Rate limits are token buckets, one per (endpoint, client). A policy such as
+'10/minute' allows a burst of 10 requests and refills at 10 per minute. The
+client is the signed-in user, otherwise the client IP. Requests over the
+limit get 429 with Retry-After before the view runs. Buckets live in this
+worker's memory ('memory') or in an SQLite file shared by the workers on
+this host ('local'); with several hosts, each enforces its own share.
+
+Admission control caps the requests in progress per worker. A request that
+finds every slot busy waits briefly for one, then gets 503 with
+Retry-After, so overload is shed at the door instead of queueing for a
+database connection until the pool times out.
+"""
+import logging
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from flask import current_app, g, jsonify, request
+from flask_login import current_user
+
+logger = logging.getLogger(__name__)
+
+# Policies by endpoint; RATE_LIMITS overrides them (null removes one)
+DEFAULT_RATE_LIMITS = {
+    'api_login': '10/minute',
+    'api_register': '5/minute',
+    'add_water_reading': '120/minute',
+    'add_water_readings_bulk': '30/minute',
+}
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+# Endpoints admission control never turns away: the live feed holds its
+# request open for as long as the client listens, and /metrics must answer
+# while the worker is overloaded
+ADMISSION_EXEMPT = {'stream_readings', 'metrics', 'static'}
+
+STORE_SCHEMA = """CREATE TABLE IF NOT EXISTS bucket (
+    key TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    allowed INTEGER NOT NULL
+) WITHOUT ROWID"""
+
+# One statement refills, decides and takes, so concurrent workers can't both spend the last token
+TAKE_SQL = """INSERT INTO bucket (key, tokens, updated_at, allowed) VALUES (:key, :burst - 1, :now, 1)
+ON CONFLICT (key) DO UPDATE SET
+    tokens = min(:burst, tokens + max(:now - updated_at, 0) * :rate)
+             - (min(:burst, tokens + max(:now - updated_at, 0) * :rate) >= 1),
+    allowed = min(:burst, tokens + max(:now - updated_at, 0) * :rate) >= 1,
+    updated_at = :now
+RETURNING tokens, allowed"""
+
+
+class RateLimitPolicy:
+    """A token bucket shape: `burst` requests at once, refilled at `rate` per second"""
+    __slots__ = ('spec', 'rate', 'burst')
+
+    def __init__(self, spec):
+        try:
+            count, period = str(spec).split('/')
+            self.burst = int(count)
+            self.rate = self.burst / PERIODS[period.strip().lower()]
+        except (KeyError, ValueError):
+            raise ValueError(f"Invalid rate limit {spec!r}: expected 'N/second|minute|hour|day'")
+        if self.burst < 1:
+            raise ValueError(f'Invalid rate limit {spec!r}: N must be at least 1')
+        self.spec = spec
+
+    @property
+    def refill_seconds(self):
+        """How long an empty bucket takes to fill (after that, a bucket is as good as new)"""
+        return self.burst / self.rate
+
+
+class MemoryRateLimitBackend:
+    """Buckets in this worker's memory, at most `max_keys` of them (least recently used go first)"""
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()  # key -> [tokens, updated_at]
+        self._lock = threading.Lock()
+
+    def take(self, key, policy):
+        """Spend one token; returns 0 if allowed, else the seconds until a token is available"""
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                self._buckets[key] = [policy.burst - 1, now]
+                if len(self._buckets) > self.max_keys:
+                    self._buckets.popitem(last=False)
+                return 0
+            self._buckets.move_to_end(key)
+            tokens = min(policy.burst, bucket[0] + (now - bucket[1]) * policy.rate)
+            bucket[1] = now
+            if tokens >= 1:
+                bucket[0] = tokens - 1
+                return 0
+            bucket[0] = tokens
+            return (1 - tokens) / policy.rate
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class LocalRateLimitBackend:
+    """Buckets in an SQLite file, shared by the workers on this host.
+
+    Bucket state is disposable (losing it only resets limits), so writes
+    skip fsync. Buckets idle for longer than `idle_seconds` (the longest
+    refill time) are full again and are pruned now and then.
+    """
+    PRUNE_EVERY = 1000
+
+    def __init__(self, path, idle_seconds):
+        self.path = path
+        self.idle_seconds = idle_seconds
+        self._local = threading.local()
+        self._takes = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection().execute(STORE_SCHEMA)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=1, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def take(self, key, policy):
+        """Spend one token; returns 0 if allowed, else the seconds until a token is available"""
+        now = time.time()  # wall clock: shared with other processes
+        connection = self._connection()
+        tokens, allowed = connection.execute(
+            TAKE_SQL, {'key': key, 'burst': policy.burst, 'rate': policy.rate, 'now': now}
+        ).fetchone()
+        self._takes += 1
+        if self._takes % self.PRUNE_EVERY == 0:
+            connection.execute('DELETE FROM bucket WHERE updated_at < ?', (now - self.idle_seconds,))
+        return 0 if allowed else (1 - tokens) / policy.rate
+
+    def __len__(self):
+        return self._connection().execute('SELECT COUNT(*) FROM bucket').fetchone()[0]
+
+
+class RateLimiter:
+    """Per-endpoint policies over a bucket backend, with rejection counts for /metrics"""
+    def __init__(self, policies, backend, trusted_proxies=0):
+        self.policies = policies
+        self.backend = backend
+        self.trusted_proxies = trusted_proxies
+        self.limited = defaultdict(int)  # endpoint -> requests answered 429
+        self.errors = 0
+
+    def client_key(self):
+        """Whose bucket a request draws from: the signed-in user, else the client IP"""
+        user = current_user._get_current_object()
+        if user.is_authenticated:
+            return f'user:{user.id}'
+        if self.trusted_proxies:
+            # Each trusted proxy appends the address it received the request from
+            forwarded = [part.strip() for part in request.headers.get('X-Forwarded-For', '').split(',')]
+            if len(forwarded) >= self.trusted_proxies and forwarded[-self.trusted_proxies]:
+                return f'ip:{forwarded[-self.trusted_proxies]}'
+        return f'ip:{request.remote_addr}'
+
+    def check(self, endpoint):
+        """Seconds the client must wait before calling `endpoint` again, or 0 if this request may proceed"""
+        policy = self.policies.get(endpoint)
+        if policy is None:
+            return 0
+        try:
+            wait = self.backend.take(f'{endpoint}:{self.client_key()}', policy)
+        except sqlite3.Error as e:
+            # Fail open: a stuck bucket store must not take the API down with it
+            self.errors += 1
+            logger.warning('Rate limit check failed: %s', e, extra={'endpoint': endpoint})
+            return 0
+        if wait:
+            self.limited[endpoint] += 1
+        return wait
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__,
+            'policies': {endpoint: policy.spec for endpoint, policy in sorted(self.policies.items())},
+            'limited': dict(self.limited),
+            'errors': self.errors
+        }
+
+
+class AdmissionController:
+    """Bounds the requests in progress in this worker; the rest wait up to `timeout` seconds, then are shed"""
+    def __init__(self, max_concurrency, timeout, retry_after):
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.rejected = 0
+
+    def admit(self):
+        if not self._slots.acquire(timeout=self.timeout):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+
+def load_policies(overrides):
+    """DEFAULT_RATE_LIMITS with RATE_LIMITS applied, as {endpoint: RateLimitPolicy}"""
+    specs = {**DEFAULT_RATE_LIMITS, **overrides}
+    return {endpoint: RateLimitPolicy(spec) for endpoint, spec in specs.items() if spec is not None}
+
+
+def _too_many_requests(message, status, retry_after):
+    response = jsonify({'error': message})
+    response.status_code = status
+    response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+def _limit_request():
+    wait = current_app.extensions['rate_limiter'].check(request.endpoint)
+    if wait:
+        return _too_many_requests('Too many requests, slow down', 429, wait)
+
+
+def _admit_request():
+    if request.endpoint in ADMISSION_EXEMPT:
+        return None
+    admission = current_app.extensions['admission']
+    if not admission.admit():
+        return _too_many_requests('Server is at capacity, retry shortly', 503, admission.retry_after)
+    g.admitted = True
+
+
+def _release_request(exception=None):
+    if g.pop('admitted', False):
+        current_app.extensions['admission'].release()
+
+
+def init_rate_limiting(app):
+    """Attach the rate limiter and admission control configured by RATE_LIMIT_* / ADMISSION_*"""
+    limiter = None
+    if app.config['RATE_LIMIT_ENABLED']:
+        policies = load_policies(app.config['RATE_LIMITS'])
+        backend_name = app.config['RATE_LIMIT_BACKEND']
+        if backend_name == 'local':
+            idle_seconds = max((policy.refill_seconds for policy in policies.values()), default=0)
+            backend = LocalRateLimitBackend(app.config['RATE_LIMIT_STORE_PATH'], idle_seconds)
+        elif backend_name == 'memory':
+            backend = MemoryRateLimitBackend(app.config['RATE_LIMIT_MAX_KEYS'])
+        else:
+            raise ValueError("RATE_LIMIT_BACKEND must be 'memory' or 'local'")
+        limiter = RateLimiter(policies, backend, app.config['RATE_LIMIT_TRUSTED_PROXIES'])
+        app.before_request(_limit_request)
+    app.extensions['rate_limiter'] = limiter
+
+    admission = None
+    if app.config['ADMISSION_MAX_CONCURRENCY'] > 0:
+        admission = AdmissionController(
+            app.config['ADMISSION_MAX_CONCURRENCY'],
+            app.config['ADMISSION_QUEUE_TIMEOUT'],
+            app.config['ADMISSION_RETRY_AFTER']
+        )
+        # After the rate limit check, so rejected clients never hold a slot
+        app.before_request(_admit_request)
+        app.teardown_request(_release_request)
+    app.extensions['admission'] = admission
+
+
+def get_rate_limiter():
+    return current_app.extensions.get('rate_limiter')
+
+
+def get_admission():
+    return current_app.extensions.get('admission')
\ No newline at end of file
@@ -0,0 +1,171 @@
+from app.database.connection import db
+from app.models.organization import TenantScoped
+from sqlalchemy import bindparam, delete, insert, select
+from datetime import datetime
+
+# Reading parameters a rule can watch
+ALERT_PARAMETERS = ('ph_level', 'turbidity_ntu', 'dissolved_oxygen', 'temperature_c', 'conductivity_us')
+
+# threshold:      value <op> threshold
+# rate_of_change: change since the previous reading at the location, per hour, <op> threshold
+# consecutive:    value <op> threshold for `window` readings in a row
+# rolling_mean:   mean of the last `window` values <op> threshold
+ALERT_KINDS = ('threshold', 'rate_of_change', 'consecutive', 'rolling_mean')
+ALERT_OPERATORS = ('>', '>=', '<', '<=')
+ALERT_SEVERITIES = ('warning', 'critical')
+
+
+class AlertRule(TenantScoped, db.Model):
+    """A condition on one reading parameter, optionally scoped to a location.
+
+    A rule belongs to the organization whose readings it watches; rules
+    without one (created by admins) watch every organization's readings.
+    """
+    __tablename__ = 'alert_rule'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    parameter = db.Column(db.String(30), nullable=False)
+    kind = db.Column(db.String(20), nullable=False, default='threshold')
+    operator = db.Column(db.String(2), nullable=False)
+    threshold = db.Column(db.Float, nullable=False)
+    window = db.Column(db.Integer, nullable=False, default=1)
+    # NULL means every location
+    location_name = db.Column(db.String(255))
+    severity = db.Column(db.String(20), nullable=False, default='warning')
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def validate(self):
+        """Raise ValueError if the rule can't be compiled"""
+        if not self.name:
+            raise ValueError('name is required')
+        if self.parameter not in ALERT_PARAMETERS:
+            raise ValueError(f"parameter must be one of: {', '.join(ALERT_PARAMETERS)}")
+        if self.kind not in ALERT_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(ALERT_KINDS)}")
+        if self.operator not in ALERT_OPERATORS:
+            raise ValueError(f"operator must be one of: {', '.join(ALERT_OPERATORS)}")
+        if self.severity not in ALERT_SEVERITIES:
+            raise ValueError(f"severity must be one of: {', '.join(ALERT_SEVERITIES)}")
+        if self.threshold is None:
+            raise ValueError('threshold is required')
+        if self.kind in ('consecutive', 'rolling_mean') and (self.window or 0) < 1:
+            raise ValueError('window must be at least 1')
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'parameter': self.parameter,
+            'kind': self.kind,
+            'operator': self.operator,
+            'threshold': self.threshold,
+            'window': self.window,
+            'location_name': self.location_name,
+            'organization_id': self.organization_id,
+            'severity': self.severity,
+            'enabled': self.enabled,
+            'created_by': self.created_by,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
+
+
+class AlertRuleState(db.Model):
+    """What a rule remembers about one (location, organization): its streak, recent values, and whether it is raised.
+
+    Written in the same transaction as the readings that advanced it, so a
+    rolled-back write leaves it untouched and every worker sees the same
+    history. `signature` is the rule's shape when the state was saved;
+    state saved under a different shape is ignored.
+    """
+    __tablename__ = 'alert_rule_state'
+
+    rule_id = db.Column(db.Integer, db.ForeignKey('alert_rule.id', ondelete='CASCADE'), primary_key=True)
+    location_name = db.Column(db.String(255), primary_key=True)
+    organization_id = db.Column(db.Integer, primary_key=True)
+    signature = db.Column(db.String(100), nullable=False)
+    active = db.Column(db.Boolean, nullable=False, default=False)
+    last_value = db.Column(db.Float)
+    last_timestamp = db.Column(db.DateTime)
+    streak = db.Column(db.Integer, nullable=False, default=0)
+    # JSON list of the last `window` values (rolling_mean rules)
+    recent_values = db.Column(db.Text)
+
+    KEY = ('rule_id', 'location_name', 'organization_id')
+
+    @classmethod
+    def load(cls, location_names, organization_ids):
+        """Saved states (rows) at these locations for these organizations, locked until the caller's transaction ends"""
+        table = cls.__table__
+        return db.session.execute(
+            select(table)
+            .where(table.c.location_name.in_(location_names), table.c.organization_id.in_(organization_ids))
+            .order_by(*(table.c[name] for name in cls.KEY))  # same lock order in every transaction
+            .with_for_update()
+        ).all()
+
+    @classmethod
+    def save(cls, rows):
+        """Insert or replace states given as column dicts, in the caller's transaction"""
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            statement = dialect_insert(cls.__table__)
+            updates = {column.name: statement.excluded[column.name] for column in cls.__table__.columns
+                       if column.name not in cls.KEY}
+            db.session.execute(statement.on_conflict_do_update(index_elements=list(cls.KEY), set_=updates), rows)
+        else:
+            table = cls.__table__
+            db.session.execute(
+                delete(table).where(*(table.c[name] == bindparam(f'key_{name}') for name in cls.KEY)),
+                [{f'key_{name}': row[name] for name in cls.KEY} for row in rows]
+            )
+            db.session.execute(insert(table), rows)
+
+
+class Alert(TenantScoped, db.Model):
+    """A rule that started matching at a location; raised once until the condition clears"""
+    __tablename__ = 'alert'
+
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('alert_rule.id', ondelete='CASCADE'), nullable=False)
+    reading_id = db.Column(db.Integer)
+    location_name = db.Column(db.String(255), nullable=False)
+    parameter = db.Column(db.String(30), nullable=False)
+    value = db.Column(db.Float)
+    severity = db.Column(db.String(20), nullable=False)
+    message = db.Column(db.String(500), nullable=False)
+    # Visibility follows the reading that triggered the alert
+    user_id = db.Column(db.Integer, nullable=False)
+    is_public = db.Column(db.Boolean, default=True)
+    triggered_at = db.Column(db.DateTime, nullable=False)
+    acknowledged_at = db.Column(db.DateTime)
+    acknowledged_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+
+    __table_args__ = (
+        db.Index('ix_alert_triggered', triggered_at.desc(), id.desc()),
+        db.Index('ix_alert_organization_triggered', 'organization_id', triggered_at.desc()),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'rule_id': self.rule_id,
+            'reading_id': self.reading_id,
+            'location_name': self.location_name,
+            'parameter': self.parameter,
+            'value': self.value,
+            'severity': self.severity,
+            'message': self.message,
+            'user_id': self.user_id,
+            'is_public': self.is_public,
+            'organization_id': self.organization_id,
+            'triggered_at': self.triggered_at.strftime('%Y-%m-%d %H:%M:%S') if self.triggered_at else None,
+            'acknowledged_at': self.acknowledged_at.strftime('%Y-%m-%d %H:%M:%S') if self.acknowledged_at else None,
+            'acknowledged_by': self.acknowledged_by
+        }
@@ -0,0 +1,94 @@
+import json
+from app.database.connection import db
+from datetime import datetime
+
+JOB_RUN_STATUSES = ('queued', 'running', 'succeeded', 'failed')
+FINISHED_STATUSES = ('succeeded', 'failed')
+
+# How a run was requested
+JOB_TRIGGERS = ('schedule', 'manual')
+
+
+def _format(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else None
+
+
+class Job(db.Model):
+    """Schedule state of a background job registered in app.services.jobs.
+
+    The schedule comes from code/JOB_SCHEDULES and is synced on start;
+    enabled is set by admins. running_run_id doubles as the job's lock:
+    a worker may only start a run after setting it from NULL.
+    """
+    __tablename__ = 'job'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False, unique=True)
+    # Cron expression (UTC); NULL means on demand only
+    schedule = db.Column(db.String(100))
+    enabled = db.Column(db.Boolean, nullable=False, default=True)
+    next_run_at = db.Column(db.DateTime)
+    last_run_at = db.Column(db.DateTime)
+    running_run_id = db.Column(db.Integer)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'schedule': self.schedule,
+            'enabled': self.enabled,
+            'next_run_at': _format(self.next_run_at),
+            'last_run_at': _format(self.last_run_at),
+            'running_run_id': self.running_run_id
+        }
+
+
+class JobRun(db.Model):
+    """One execution of a job: queued, claimed by a worker, then finished with a result or an error"""
+    __tablename__ = 'job_run'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_name = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    trigger = db.Column(db.String(20), nullable=False, default='manual')
+    # Keyword arguments for the job function and what it returned, as JSON
+    params = db.Column(db.Text)
+    result = db.Column(db.Text)
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    # host:pid of the worker that ran it
+    worker = db.Column(db.String(100))
+    queued_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    # Refreshed by the worker's scheduler while the run is going; a run whose
+    # heartbeat stops is reaped, one that is merely slow is not
+    heartbeat_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+
+    __table_args__ = (
+        # Claiming queued runs and reaping stale running ones
+        db.Index('ix_job_run_status', status, id),
+        # Latest snapshot of a job, and per-job history
+        db.Index('ix_job_run_job_finished', job_name, status, finished_at.desc()),
+    )
+
+    def to_dict(self, with_result=False):
+        data = {
+            'id': self.id,
+            'job': self.job_name,
+            'status': self.status,
+            'trigger': self.trigger,
+            'params': json.loads(self.params) if self.params else {},
+            'error': self.error,
+            'requested_by': self.requested_by,
+            'worker': self.worker,
+            'queued_at': _format(self.queued_at),
+            'started_at': _format(self.started_at),
+            'heartbeat_at': _format(self.heartbeat_at),
+            'finished_at': _format(self.finished_at),
+            'duration_ms': round((self.finished_at - self.started_at).total_seconds() * 1000, 1)
+            if self.finished_at and self.started_at else None
+        }
+        if with_result:
+            data['result'] = json.loads(self.result) if self.result is not None else None
+        return data
\ No newline at end of file
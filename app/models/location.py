@@ -0,0 +1,119 @@
+import threading
+import time
+from app.database.connection import db
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+
+
+def normalize_location_name(name):
+    """Key used to treat spelling variants ('Lake  Victoria ', 'lake victoria') as one site"""
+    return ' '.join(str(name).split()).casefold()
+
+
+class Location(db.Model):
+    """A monitoring site. Readings reference it by location_id and keep its canonical name."""
+    __tablename__ = 'location'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(255), nullable=False)
+    normalized_name = db.Column(db.String(255), nullable=False, unique=True)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # normalized name -> id, per process. Names are read from the rows on
+    # every resolve, so a rename applies at once in every worker; the cache
+    # only saves the get-or-create. It is dropped every CACHE_SECONDS.
+    CACHE_SECONDS = 300
+    _resolved = {}
+    _resolved_at = time.monotonic()
+    _resolved_lock = threading.Lock()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'latitude': self.latitude,
+            'longitude': self.longitude
+        }
+
+    @classmethod
+    def resolve(cls, names):
+        """Map location names to (location id, canonical name), creating unknown locations.
+
+        Cached ids are checked against their rows (one primary key lookup for
+        all of them): a location renamed since no longer answers to its old
+        spelling. Runs in the caller's transaction.
+        """
+        if time.monotonic() - cls._resolved_at > cls.CACHE_SECONDS:
+            cls.forget_cached()
+        keys = {name: normalize_location_name(name) for name in names if name is not None}
+        cached = {}
+        for key in set(keys.values()):
+            location_id = cls._resolved.get(key)
+            if location_id is not None:
+                cached[key] = location_id
+        found = {}
+        if cached:
+            rows = db.session.execute(
+                select(cls.id, cls.name, cls.normalized_name).where(cls.id.in_(set(cached.values())))
+            ).all()
+            by_id = {location_id: (name, key) for location_id, name, key in rows}
+            for key, location_id in cached.items():
+                row = by_id.get(location_id)
+                if row is not None and row[1] == key:
+                    found[key] = (location_id, row[0])
+        missing = {}
+        for name, key in keys.items():
+            if key not in found:
+                missing.setdefault(key, name)
+        if missing:
+            created = cls._get_or_create(missing)
+            found.update(created)
+            with cls._resolved_lock:
+                cls._resolved.update((key, location_id) for key, (location_id, _) in created.items())
+        return {name: found[key] for name, key in keys.items()}
+
+    @classmethod
+    def link_rows(cls, rows):
+        """Set location_id on reading row dicts and normalize location_name to the canonical spelling"""
+        resolved = cls.resolve({row['location_name'] for row in rows})
+        for row in rows:
+            row['location_id'], row['location_name'] = resolved[row['location_name']]
+
+    @classmethod
+    def forget_cached(cls):
+        """Drop the name cache (after renaming or merging locations)"""
+        with cls._resolved_lock:
+            cls._resolved.clear()
+            cls._resolved_at = time.monotonic()
+
+    @classmethod
+    def _get_or_create(cls, names_by_key):
+        """{normalized name: first spelling seen} -> {normalized name: (id, canonical name)}"""
+        keys = list(names_by_key)
+        values = [{'name': ' '.join(names_by_key[key].split()), 'normalized_name': key} for key in keys]
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            db.session.execute(dialect_insert(cls).on_conflict_do_nothing(index_elements=['normalized_name']), values)
+        else:
+            existing = set(db.session.execute(
+                select(cls.normalized_name).where(cls.normalized_name.in_(keys))
+            ).scalars())
+            for row in values:
+                if row['normalized_name'] in existing:
+                    continue
+                try:
+                    with db.session.begin_nested():
+                        db.session.execute(insert(cls).values(**row))
+                except IntegrityError:
+                    pass  # created concurrently
+        rows = db.session.execute(
+            select(cls.normalized_name, cls.id, cls.name).where(cls.normalized_name.in_(keys))
+        ).all()
+        return {key: (location_id, name) for key, location_id, name in rows}
\ No newline at end of file
@@ -0,0 +1,90 @@
+from app.database.connection import db
+from flask import current_app
+from sqlalchemy import select, insert
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime
+
+
+def normalize_organization_name(name):
+    """Key used to treat spelling variants ('Acme  Water ', 'acme water') as one organization"""
+    return ' '.join(str(name).split()).casefold()
+
+
+class TenantScoped:
+    """Mixin for models whose rows belong to one organization.
+
+    ORM selects of these models are limited to the current request's
+    organization by app.services.tenancy. Rows keep the organization they
+    were written under (the submitter's at the time) if the user moves;
+    rows from before organizations existed are NULL until 'flask
+    upgrade-db' stamps them.
+    """
+    organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'))
+
+
+class Organization(db.Model):
+    """A tenant: readings, their rollups, chunks and alerts belong to the submitter's organization"""
+    __tablename__ = 'organization'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    normalized_name = db.Column(db.String(100), nullable=False, unique=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Id of the DEFAULT_ORGANIZATION, per process (ids never change)
+    _default_id = None
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S') if self.created_at else None
+        }
+
+    @classmethod
+    def resolve(cls, name):
+        """The organization called `name` (blank: DEFAULT_ORGANIZATION), created if it doesn't exist.
+
+        Runs in the caller's transaction. A new organization gets its own
+        readings partition when READINGS_PARTITIONING is 'organization'.
+        """
+        name = ' '.join(str(name or '').split()) or current_app.config['DEFAULT_ORGANIZATION']
+        key = normalize_organization_name(name)
+        organization = cls.query.filter_by(normalized_name=key).first()
+        if organization is not None:
+            return organization
+
+        dialect = db.engine.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            if dialect == 'postgresql':
+                from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            created = db.session.execute(
+                dialect_insert(cls).values(name=name, normalized_name=key, created_at=datetime.utcnow())
+                .on_conflict_do_nothing(index_elements=['normalized_name'])
+            ).rowcount
+        else:
+            try:
+                with db.session.begin_nested():
+                    db.session.execute(insert(cls).values(name=name, normalized_name=key, created_at=datetime.utcnow()))
+                created = 1
+            except IntegrityError:
+                created = 0  # created concurrently
+        organization = db.session.execute(select(cls).where(cls.normalized_name == key)).scalar_one()
+        if created:
+            from app.database.migrations import create_reading_partition
+            create_reading_partition(organization.id)
+        return organization
+
+    @classmethod
+    def default_id(cls):
+        """Id of the organization users without one belong to, created (and committed) on first use"""
+        if cls._default_id is None:
+            cls._default_id = cls.resolve(None).id
+            db.session.commit()
+        return cls._default_id
+
+    @classmethod
+    def forget_cached(cls):
+        cls._default_id = None
\ No newline at end of file
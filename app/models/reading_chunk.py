@@ -0,0 +1,265 @@
+from app.database.connection import db
+from app.models.organization import TenantScoped
+from app.services import scoring
+from app.services.timeseries import encode_columns, decode_columns
+from sqlalchemy import select, or_
+from datetime import datetime, timedelta
+import numpy as np
+
+# Float parameters stored in every chunk, Gorilla XOR encoded
+CHUNK_PARAMETERS = ('ph_level', 'turbidity_ntu', 'dissolved_oxygen', 'temperature_c', 'conductivity_us')
+EPOCH = datetime(1970, 1, 1)
+
+
+def _micros(timestamp):
+    return (timestamp - EPOCH) // timedelta(microseconds=1)
+
+
+class ReadingChunk(TenantScoped, db.Model):
+    """Compacted readings of one series (location, author, visibility, organization) over a time range.
+
+    Readings older than READINGS_HOT_DAYS are moved here from water_quality
+    by app.services.retention. status and total_dissolved_solids are not
+    stored: they are derived again when a chunk is decoded (TDS is kept only
+    when it was measured rather than derived). The summary columns let the
+    dashboard statistics count cold readings without decoding them.
+    """
+    __tablename__ = 'reading_chunk'
+
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'))
+    location_name = db.Column(db.String(255), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    is_public = db.Column(db.Boolean)
+    start_time = db.Column(db.DateTime, nullable=False)
+    end_time = db.Column(db.DateTime, nullable=False)
+    min_reading_id = db.Column(db.Integer, nullable=False)
+    max_reading_id = db.Column(db.Integer, nullable=False)
+    reading_count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Summary of the chunk's readings (counts are of non-null values)
+    status_excellent = db.Column(db.Integer, nullable=False, default=0)
+    status_good = db.Column(db.Integer, nullable=False, default=0)
+    status_fair = db.Column(db.Integer, nullable=False, default=0)
+    status_poor = db.Column(db.Integer, nullable=False, default=0)
+
+    ph_level_count = db.Column(db.Integer, nullable=False, default=0)
+    ph_level_sum = db.Column(db.Float, nullable=False, default=0)
+    ph_level_min = db.Column(db.Float)
+    ph_level_max = db.Column(db.Float)
+
+    turbidity_ntu_count = db.Column(db.Integer, nullable=False, default=0)
+    turbidity_ntu_sum = db.Column(db.Float, nullable=False, default=0)
+    turbidity_ntu_min = db.Column(db.Float)
+    turbidity_ntu_max = db.Column(db.Float)
+
+    dissolved_oxygen_count = db.Column(db.Integer, nullable=False, default=0)
+    dissolved_oxygen_sum = db.Column(db.Float, nullable=False, default=0)
+    dissolved_oxygen_min = db.Column(db.Float)
+    dissolved_oxygen_max = db.Column(db.Float)
+
+    temperature_c_count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_c_sum = db.Column(db.Float, nullable=False, default=0)
+    temperature_c_min = db.Column(db.Float)
+    temperature_c_max = db.Column(db.Float)
+
+    conductivity_us_count = db.Column(db.Integer, nullable=False, default=0)
+    conductivity_us_sum = db.Column(db.Float, nullable=False, default=0)
+    conductivity_us_min = db.Column(db.Float)
+    conductivity_us_max = db.Column(db.Float)
+
+    __table_args__ = (
+        # A user's history, newest first
+        db.Index('ix_reading_chunk_user_end', user_id, end_time),
+        # Public history and the rollup's per-location refresh
+        db.Index('ix_reading_chunk_location_end', location_name, end_time),
+        db.Index('ix_reading_chunk_end', end_time),
+        # Tenant-scoped history (app.services.tenancy)
+        db.Index('ix_reading_chunk_organization_end', 'organization_id', end_time),
+    )
+
+    @classmethod
+    def from_readings(cls, readings):
+        """Build a chunk from reading dicts of one series, in (timestamp, id) order"""
+        first = readings[0]
+        timestamps = [reading['timestamp'] for reading in readings]
+        columns = {
+            'id': [reading['id'] for reading in readings],
+            'timestamp': [_micros(timestamp) for timestamp in timestamps]
+        }
+        codecs = {'id': 'dod', 'timestamp': 'dod'}
+        values = {}
+        for parameter in CHUNK_PARAMETERS:
+            values[parameter] = scoring.as_column([reading[parameter] for reading in readings])
+            columns[parameter] = values[parameter]
+            codecs[parameter] = 'xor'
+
+        # TDS only when some reading's value isn't the one derived from conductivity
+        tds = scoring.as_column([reading['total_dissolved_solids'] for reading in readings])
+        derived = scoring.tds_batch(values['conductivity_us'])
+        if not np.array_equal(tds, derived, equal_nan=True):
+            columns['total_dissolved_solids'] = tds
+            codecs['total_dissolved_solids'] = 'xor'
+        client_ids = [reading.get('client_reading_id') for reading in readings]
+        if any(client_id is not None for client_id in client_ids):
+            columns['client_reading_id'] = client_ids
+            codecs['client_reading_id'] = 'json'
+
+        chunk = cls(
+            location_id=first.get('location_id'),
+            location_name=first['location_name'],
+            user_id=first['user_id'],
+            is_public=first['is_public'],
+            organization_id=first.get('organization_id'),
+            start_time=min(timestamps),
+            end_time=max(timestamps),
+            min_reading_id=min(columns['id']),
+            max_reading_id=max(columns['id']),
+            reading_count=len(readings),
+            data=encode_columns(columns, codecs)
+        )
+        chunk._summarize(values)
+        return chunk
+
+    def _summarize(self, values):
+        """Fill the summary columns from the parameter arrays"""
+        codes = scoring.score_batch(values['ph_level'], values['dissolved_oxygen'], values['turbidity_ntu'])
+        for status, count in zip(scoring.STATUS_CODES, np.bincount(codes, minlength=len(scoring.STATUS_CODES))):
+            setattr(self, f'status_{status}', int(count))
+        for parameter in CHUNK_PARAMETERS:
+            present = values[parameter][~np.isnan(values[parameter])]
+            setattr(self, f'{parameter}_count', int(present.size))
+            setattr(self, f'{parameter}_sum', float(present.sum()))
+            setattr(self, f'{parameter}_min', float(present.min()) if present.size else None)
+            setattr(self, f'{parameter}_max', float(present.max()) if present.size else None)
+
+    def rederive_tds(self, previous_thresholds):
+        """Re-derive stored TDS that is missing or was derived under `previous_thresholds`; True if the chunk changed
+
+        Only chunks with a measured TDS somewhere store the column, derived
+        values included, so those go stale when the TDS factor changes.
+        """
+        columns = decode_columns(self.data)
+        if 'total_dissolved_solids' not in columns:
+            return False
+        tds = columns['total_dissolved_solids'].copy()
+        derived = scoring.tds_batch(columns['conductivity_us'])
+        # Derived under the previous factor, or missing although it can be derived
+        stale = scoring.derived_tds_mask(tds, columns['conductivity_us'], previous_thresholds)
+        stale |= np.isnan(tds) & ~np.isnan(derived)
+        if not (stale & (tds != derived)).any():
+            return False
+        tds[stale] = derived[stale]
+        if np.array_equal(tds, derived, equal_nan=True):
+            del columns['total_dissolved_solids']
+        else:
+            columns['total_dissolved_solids'] = tds
+        codecs = {
+            name: 'dod' if name in ('id', 'timestamp') else 'json' if name == 'client_reading_id' else 'xor'
+            for name in columns
+        }
+        self.data = encode_columns(columns, codecs)
+        return True
+
+    def columns(self):
+        """The chunk's columns as NumPy arrays, with status/TDS derived where not stored"""
+        columns = decode_columns(self.data)
+        if 'total_dissolved_solids' not in columns:
+            columns['total_dissolved_solids'] = scoring.tds_batch(columns['conductivity_us'])
+        columns['status'] = scoring.score_batch(columns['ph_level'], columns['dissolved_oxygen'], columns['turbidity_ntu'])
+        return columns
+
+    def readings(self, since=None, until=None, before=None, after=None, last=None):
+        """Decoded readings as dicts with the WaterQuality column names, in (timestamp, id) order.
+
+        since/until bound the timestamp (inclusive), before/after are
+        exclusive (timestamp, id) keyset bounds and last keeps only the
+        newest matches; filtering happens on the arrays, so only the
+        readings returned are turned into dicts.
+        """
+        columns = self.columns()
+        stamps, ids = columns['timestamp'], columns['id']
+        keep = np.ones(self.reading_count, dtype=bool)
+        if since is not None:
+            keep &= stamps >= _micros(since)
+        if until is not None:
+            keep &= stamps <= _micros(until)
+        if before is not None:
+            keep &= (stamps < _micros(before[0])) | ((stamps == _micros(before[0])) & (ids < before[1]))
+        if after is not None:
+            keep &= (stamps > _micros(after[0])) | ((stamps == _micros(after[0])) & (ids > after[1]))
+        selected = np.flatnonzero(keep)
+        if last is not None:
+            selected = selected[max(0, len(selected) - last):]
+
+        timestamps = stamps[selected].astype('datetime64[us]').astype(object)
+        statuses = scoring.status_names(columns['status'][selected])
+        client_ids = columns.get('client_reading_id')
+        values = {
+            name: scoring.nan_to_none(columns[name][selected])
+            for name in CHUNK_PARAMETERS + ('total_dissolved_solids',)
+        }
+        readings = []
+        for position, (index, reading_id) in enumerate(zip(selected.tolist(), ids[selected].tolist())):
+            reading = {
+                'id': reading_id,
+                'location_name': self.location_name,
+                'location_id': self.location_id,
+                'timestamp': timestamps[position],
+                'user_id': self.user_id,
+                'is_public': self.is_public,
+                'organization_id': self.organization_id,
+                'status': statuses[position],
+                'client_reading_id': client_ids[index] if client_ids else None
+            }
+            for name, column in values.items():
+                reading[name] = column[position]
+            readings.append(reading)
+        return readings
+
+    @staticmethod
+    def visible_to(user):
+        """Criterion matching the chunks a user may read, like the readings visibility filter"""
+        if user.can_view_all_data():
+            return db.true()
+        return or_(ReadingChunk.user_id == user.id, ReadingChunk.is_public == True)
+
+    @classmethod
+    def iter_readings(cls, *criteria, since=None, until=None, batch_size=100):
+        """Yield decoded readings (in chunk order) from chunks matching criteria, within [since, until]"""
+        query = select(cls).where(*criteria).order_by(cls.id)
+        if since:
+            query = query.where(cls.end_time >= since)
+        if until:
+            query = query.where(cls.start_time <= until)
+        for chunk in db.session.execute(query.execution_options(yield_per=batch_size)).scalars():
+            yield from chunk.readings(since, until)
+
+    @classmethod
+    def newest_readings(cls, *criteria, limit, since=None, until=None, before=None, after=None):
+        """Up to `limit` decoded readings, newest (timestamp, id) first.
+
+        before/after are exclusive (timestamp, id) keyset bounds. Chunks are
+        decoded newest first and the scan stops as soon as no older chunk
+        can contribute to the result.
+        """
+        query = select(cls).where(*criteria).order_by(cls.end_time.desc())
+        if since:
+            query = query.where(cls.end_time >= since)
+        if until:
+            query = query.where(cls.start_time <= until)
+        if before:
+            query = query.where(cls.start_time <= before[0])
+        if after:
+            query = query.where(cls.end_time >= after[0])
+
+        found = []
+        for chunk in db.session.execute(query.execution_options(yield_per=20)).scalars():
+            if len(found) >= limit and chunk.end_time < found[limit - 1]['timestamp']:
+                break
+            found.extend(chunk.readings(since, until, before, after, last=limit))
+            found.sort(key=lambda reading: (reading['timestamp'], reading['id']), reverse=True)
+            del found[limit:]
+        return found
\ No newline at end of file
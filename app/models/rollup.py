@@ -0,0 +1,254 @@
+from app.database.connection import db
+from app.models.water_quality import WaterQuality
+from app.models.organization import TenantScoped
+from app.services.tenancy import unscoped
+from sqlalchemy import func, delete, insert, select
+from datetime import datetime, time, timedelta
+
+# Parameters aggregated per bucket. Each gets <name>_count/_sum/_sumsq/_min/_max
+# columns; the count is of non-null values so averages match SQL AVG().
+ROLLUP_PARAMETERS = ('ph_level', 'dissolved_oxygen', 'turbidity_ntu', 'temperature_c', 'conductivity_us')
+
+
+class DailyLocationRollup(TenantScoped, db.Model):
+    """Per day, per location, per visibility, per organization aggregates of WaterQuality readings.
+
+    Kept up to date incrementally by the water routes so the trend and
+    location analytics scale with the number of days/locations instead of
+    the number of readings. `flask rebuild-rollups` recomputes it from scratch.
+    """
+    __tablename__ = 'daily_location_rollup'
+
+    date = db.Column(db.Date, primary_key=True)
+    location_name = db.Column(db.String(255), primary_key=True)
+    is_public = db.Column(db.Boolean, primary_key=True)
+    organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'), primary_key=True)
+
+    reading_count = db.Column(db.Integer, nullable=False, default=0)
+    last_reading = db.Column(db.DateTime)
+
+    ph_level_count = db.Column(db.Integer, nullable=False, default=0)
+    ph_level_sum = db.Column(db.Float, nullable=False, default=0)
+    ph_level_sumsq = db.Column(db.Float, nullable=False, default=0)
+    ph_level_min = db.Column(db.Float)
+    ph_level_max = db.Column(db.Float)
+
+    dissolved_oxygen_count = db.Column(db.Integer, nullable=False, default=0)
+    dissolved_oxygen_sum = db.Column(db.Float, nullable=False, default=0)
+    dissolved_oxygen_sumsq = db.Column(db.Float, nullable=False, default=0)
+    dissolved_oxygen_min = db.Column(db.Float)
+    dissolved_oxygen_max = db.Column(db.Float)
+
+    turbidity_ntu_count = db.Column(db.Integer, nullable=False, default=0)
+    turbidity_ntu_sum = db.Column(db.Float, nullable=False, default=0)
+    turbidity_ntu_sumsq = db.Column(db.Float, nullable=False, default=0)
+    turbidity_ntu_min = db.Column(db.Float)
+    turbidity_ntu_max = db.Column(db.Float)
+
+    temperature_c_count = db.Column(db.Integer, nullable=False, default=0)
+    temperature_c_sum = db.Column(db.Float, nullable=False, default=0)
+    temperature_c_sumsq = db.Column(db.Float, nullable=False, default=0)
+    temperature_c_min = db.Column(db.Float)
+    temperature_c_max = db.Column(db.Float)
+
+    conductivity_us_count = db.Column(db.Integer, nullable=False, default=0)
+    conductivity_us_sum = db.Column(db.Float, nullable=False, default=0)
+    conductivity_us_sumsq = db.Column(db.Float, nullable=False, default=0)
+    conductivity_us_min = db.Column(db.Float)
+    conductivity_us_max = db.Column(db.Float)
+
+    __table_args__ = (
+        # Tenant-scoped trends and location insights
+        db.Index('ix_daily_location_rollup_organization', organization_id, date),
+    )
+
+    @staticmethod
+    def bucket_key(timestamp, location_name, is_public, organization_id):
+        """Rollup key for a reading (NULL visibility counts as private)"""
+        return (timestamp.date(), location_name, bool(is_public), organization_id)
+
+    @classmethod
+    def add_readings(cls, readings):
+        """Fold newly inserted readings (dicts or WaterQuality objects) into the rollup.
+
+        Runs in the caller's transaction; the caller commits.
+        """
+        deltas = {}
+        for reading in readings:
+            get = reading.get if isinstance(reading, dict) else (lambda name, r=reading: getattr(r, name))
+            timestamp = get('timestamp')
+            key = cls.bucket_key(timestamp, get('location_name'), get('is_public'), get('organization_id'))
+            delta = deltas.get(key)
+            if delta is None:
+                delta = deltas[key] = cls._empty_delta(key)
+
+            delta['reading_count'] += 1
+            delta['last_reading'] = max(delta['last_reading'] or timestamp, timestamp)
+            for parameter in ROLLUP_PARAMETERS:
+                value = get(parameter)
+                if value is None:
+                    continue
+                delta[f'{parameter}_count'] += 1
+                delta[f'{parameter}_sum'] += value
+                delta[f'{parameter}_sumsq'] += value * value
+                current_min = delta[f'{parameter}_min']
+                current_max = delta[f'{parameter}_max']
+                delta[f'{parameter}_min'] = value if current_min is None else min(current_min, value)
+                delta[f'{parameter}_max'] = value if current_max is None else max(current_max, value)
+
+        if deltas:
+            cls._upsert(list(deltas.values()))
+
+    @classmethod
+    def remove_readings(cls, readings):
+        """Refresh the buckets of readings that were just deleted (after flush).
+
+        Min/max can't be decremented, so affected buckets are recomputed from
+        the remaining readings for that day/location/visibility/organization only.
+        """
+        keys = {cls.bucket_key(r.timestamp, r.location_name, r.is_public, r.organization_id) for r in readings if r.timestamp}
+        for key in keys:
+            cls.refresh_bucket(*key)
+
+    @classmethod
+    def refresh_bucket(cls, date, location_name, is_public, organization_id):
+        """Recompute a single bucket from WaterQuality and any compacted readings of that day"""
+        from app.models.reading_chunk import ReadingChunk
+        day_start = datetime.combine(date, time.min)
+        source = select(*cls._aggregate_columns())\
+            .where(WaterQuality.timestamp >= day_start)\
+            .where(WaterQuality.timestamp < day_start + timedelta(days=1))\
+            .where(WaterQuality.location_name == location_name)\
+            .where(func.coalesce(WaterQuality.is_public, False) == is_public)\
+            .where(WaterQuality.organization_id == organization_id)
+
+        with unscoped():
+            row = db.session.execute(source).one()._mapping
+            db.session.execute(delete(cls).where(
+                cls.date == date, cls.location_name == location_name, cls.is_public == is_public,
+                cls.organization_id == organization_id
+            ))
+            if row['reading_count']:
+                values = dict(row)
+                values.update(date=date, location_name=location_name, is_public=is_public, organization_id=organization_id)
+                db.session.execute(insert(cls).values(**values))
+            cls.add_readings(list(ReadingChunk.iter_readings(
+                ReadingChunk.location_name == location_name,
+                func.coalesce(ReadingChunk.is_public, False) == is_public,
+                ReadingChunk.organization_id == organization_id,
+                since=day_start, until=day_start + timedelta(days=1) - timedelta(microseconds=1)
+            )))
+
+    @classmethod
+    def rebuild(cls):
+        """Recompute the rollup from WaterQuality in one INSERT ... SELECT, then fold in compacted readings.
+
+        Days before the oldest retained reading are left alone: once the
+        retention policy has purged their readings the rollup is all that
+        is left of them.
+        """
+        from app.models.reading_chunk import ReadingChunk
+        with unscoped():
+            oldest = [
+                db.session.query(func.min(WaterQuality.timestamp)).scalar(),
+                db.session.query(func.min(ReadingChunk.start_time)).scalar()
+            ]
+            oldest = min((timestamp for timestamp in oldest if timestamp), default=None)
+            day = func.date(WaterQuality.timestamp)
+            visibility = func.coalesce(WaterQuality.is_public, False)
+            columns = cls._aggregate_columns()
+            source = select(day, WaterQuality.location_name, visibility, WaterQuality.organization_id, *columns)\
+                .where(WaterQuality.timestamp.isnot(None))\
+                .group_by(day, WaterQuality.location_name, visibility, WaterQuality.organization_id)
+
+            target_columns = ['date', 'location_name', 'is_public', 'organization_id'] + [column.name for column in columns]
+            if oldest is not None:
+                db.session.execute(delete(cls).where(cls.date >= oldest.date()))
+            db.session.execute(insert(cls).from_select(target_columns, source))
+            batch = []
+            for reading in ReadingChunk.iter_readings():
+                batch.append(reading)
+                if len(batch) >= 10000:
+                    cls.add_readings(batch)
+                    batch = []
+            cls.add_readings(batch)
+            db.session.commit()
+            return db.session.query(func.count()).select_from(cls).scalar()
+
+    @staticmethod
+    def _aggregate_columns():
+        """Aggregates over WaterQuality labelled with the matching rollup column names"""
+        columns = [
+            func.count(WaterQuality.id).label('reading_count'),
+            func.max(WaterQuality.timestamp).label('last_reading')
+        ]
+        for parameter in ROLLUP_PARAMETERS:
+            column = getattr(WaterQuality, parameter)
+            columns.extend([
+                func.count(column).label(f'{parameter}_count'),
+                func.coalesce(func.sum(column), 0).label(f'{parameter}_sum'),
+                func.coalesce(func.sum(column * column), 0).label(f'{parameter}_sumsq'),
+                func.min(column).label(f'{parameter}_min'),
+                func.max(column).label(f'{parameter}_max')
+            ])
+        return columns
+
+    @staticmethod
+    def _empty_delta(key):
+        date, location_name, is_public, organization_id = key
+        delta = {
+            'date': date,
+            'location_name': location_name,
+            'is_public': is_public,
+            'organization_id': organization_id,
+            'reading_count': 0,
+            'last_reading': None
+        }
+        for parameter in ROLLUP_PARAMETERS:
+            delta.update({
+                f'{parameter}_count': 0,
+                f'{parameter}_sum': 0.0,
+                f'{parameter}_sumsq': 0.0,
+                f'{parameter}_min': None,
+                f'{parameter}_max': None
+            })
+        return delta
+
+    @classmethod
+    def _upsert(cls, deltas):
+        dialect = db.engine.dialect.name
+        if dialect == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+            least, greatest = func.least, func.greatest
+        elif dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+            # SQLite's two-argument min()/max() are its LEAST/GREATEST
+            least, greatest = func.min, func.max
+        else:
+            # No portable upsert; recompute the touched buckets instead
+            for delta in deltas:
+                cls.refresh_bucket(delta['date'], delta['location_name'], delta['is_public'], delta['organization_id'])
+            return
+
+        statement = dialect_insert(cls)
+        table, new = cls.__table__.c, statement.excluded
+
+        def pick(combine, name):
+            # NULL-safe: either side may be NULL when a bucket has no values yet
+            return combine(func.coalesce(table[name], new[name]), func.coalesce(new[name], table[name]))
+
+        updates = {
+            'reading_count': table.reading_count + new.reading_count,
+            'last_reading': pick(greatest, 'last_reading')
+        }
+        for parameter in ROLLUP_PARAMETERS:
+            for suffix in ('count', 'sum', 'sumsq'):
+                name = f'{parameter}_{suffix}'
+                updates[name] = table[name] + new[name]
+            updates[f'{parameter}_min'] = pick(least, f'{parameter}_min')
+            updates[f'{parameter}_max'] = pick(greatest, f'{parameter}_max')
+
+        db.session.execute(
+            statement.on_conflict_do_update(index_elements=['date', 'location_name', 'is_public', 'organization_id'], set_=updates),
+            deltas
+        )
@@ -1,10 +1,10 @@
-from app.database.connection import db
-from flask_bcrypt import Bcrypt
+from app.database.connection import db, invalidate_cached_users, RoutingSession
+from sqlalchemy import event
+from sqlalchemy.orm import object_session
+from app.services import passwords
 from flask_login import UserMixin
 from datetime import datetime
 
-bcrypt = Bcrypt()
-
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
@@ -13,6 +13,9 @@ class User(UserMixin, db.Model):
     telephone = db.Column(db.String(20), nullable=False)
     password = db.Column(db.String(255), nullable=False)
     organization = db.Column(db.String(100))
+    # Tenant the user's readings belong to (app.models.organization), set by an
+    # admin; organization keeps its name, or the one asked for at registration
+    organization_id = db.Column(db.Integer, db.ForeignKey('organization.id'), index=True)
     role = db.Column(db.String(50), default='community')  # ✅ Already have role field!
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -20,10 +23,14 @@ class User(UserMixin, db.Model):
     water_readings = db.relationship('WaterQuality', backref='author', lazy=True)
     
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password = passwords.hash_password(password)
     
     def check_password(self, password):
-        return bcrypt.check_password_hash(self.password, password)
+        return passwords.check_password(password, self.password)
+    
+    def password_needs_rehash(self):
+        """True if the stored hash was made with a different BCRYPT_LOG_ROUNDS"""
+        return passwords.needs_rehash(self.password)
     
     # ✅ ADD THESE NEW ROLE-BASED METHODS:
     def has_role(self, role_name):
@@ -58,6 +65,29 @@ class User(UserMixin, db.Model):
             'name': self.name,
             'email': self.email,
             'organization': self.organization,
+            'organization_id': self.organization_id,
             'role': self.role,
             'role_display': self.get_role_display_name()  # ✅ Added role display
-        }
\ No newline at end of file
+        }
+
+
+@event.listens_for(User, 'after_update')
+@event.listens_for(User, 'after_delete')
+def _note_changed_user(mapper, connection, target):
+    """Remember users changed in this transaction; they leave the loader cache once it commits"""
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('changed_users', set()).add(target.id)
+
+
+@event.listens_for(RoutingSession, 'after_commit')
+def _invalidate_cached_users(session):
+    """Role, organization and password changes must not be served from any worker's loader cache"""
+    if session.info.pop('changed_users', None):
+        invalidate_cached_users()
+
+
+@event.listens_for(RoutingSession, 'after_soft_rollback')
+def _forget_changed_users(session, previous_transaction):
+    if previous_transaction.parent is None:
+        session.info.pop('changed_users', None)
\ No newline at end of file
@@ -1,9 +1,22 @@
-from app.database.connection import db
+from app.database.connection import db, insert_rows
+from app.models.organization import TenantScoped
+from app.services import scoring
+from app.services.serialization import format_timestamp
 from datetime import datetime
 
-class WaterQuality(db.Model):
+# Bootstrap color class for each status
+STATUS_COLORS = {
+    'excellent': 'success',
+    'good': 'info', 
+    'fair': 'warning',
+    'poor': 'danger'
+}
+
+class WaterQuality(TenantScoped, db.Model):
     id = db.Column(db.Integer, primary_key=True)
     location_name = db.Column(db.String(255), nullable=False)
+    # Normalized site (app.models.location); location_name keeps its canonical name
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'), index=True)
     ph_level = db.Column(db.Float)
     turbidity_ntu = db.Column(db.Float)
     dissolved_oxygen = db.Column(db.Float)
@@ -19,16 +32,43 @@ class WaterQuality(db.Model):
     status = db.Column(db.String(20), default='good')  # excellent, good, fair, poor
     is_public = db.Column(db.Boolean, default=True)  # Whether reading is publicly visible
     
+    # Optional sensor/client supplied ID; makes retried uploads idempotent per user
+    client_reading_id = db.Column(db.String(64))
+    
+    # Indexes for the hot query paths. Existing databases pick these up via
+    # app.database.migrations (db.create_all() only indexes new tables).
+    __table_args__ = (
+        # /api/water/readings: per-user history, newest first, keyset on (timestamp, id)
+        db.Index('ix_water_quality_user_timestamp', user_id, timestamp.desc(), id.desc()),
+        # /api/water/public-readings and community-scoped analytics
+        db.Index(
+            'ix_water_quality_public_timestamp', timestamp,
+            sqlite_where=is_public == db.true(),
+            postgresql_where=is_public == db.true()
+        ),
+        # quality_distribution and status-filtered statistics; is_public/user_id
+        # make the community-scoped counts index-only
+        db.Index('ix_water_quality_status', status, is_public, user_id),
+        # Idempotent ingestion (NULLs never collide, so readings without an ID are unaffected)
+        db.Index('ix_water_quality_client_reading', user_id, client_reading_id, unique=True),
+        # Tenant-scoped reads (app.services.tenancy): time windows and exports,
+        # status counts, and the per-location series probe
+        db.Index('ix_water_quality_organization_timestamp', 'organization_id', timestamp),
+        db.Index('ix_water_quality_organization_status', 'organization_id', status, is_public, user_id),
+        db.Index('ix_water_quality_organization_location', 'organization_id', location_id, id),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
             'location_name': self.location_name,
+            'location_id': self.location_id,
             'ph_level': self.ph_level,
             'turbidity_ntu': self.turbidity_ntu,
             'dissolved_oxygen': self.dissolved_oxygen,
             'temperature_c': self.temperature_c,
             'conductivity_us': self.conductivity_us,
-            'timestamp': self.timestamp.strftime('%Y-%m-%d %H:%M:%S') if self.timestamp else None,
+            'timestamp': format_timestamp(self.timestamp),
             'user_id': self.user_id,
             # ✅ ADD NEW FIELDS TO DICT:
             'total_dissolved_solids': self.total_dissolved_solids,
@@ -40,45 +80,22 @@ class WaterQuality(db.Model):
     # ✅ ADD THESE NEW METHODS FOR ANALYTICS:
     def calculate_status(self):
         """Calculate water quality status based on parameters"""
-        score = 0
-        
-        # pH scoring (ideal: 6.5-8.5)
-        if 6.5 <= self.ph_level <= 8.5:
-            score += 2
-        elif 6.0 <= self.ph_level <= 9.0:
-            score += 1
-            
-        # Dissolved Oxygen scoring (ideal: >5 mg/L)
-        if self.dissolved_oxygen >= 5:
-            score += 2
-        elif self.dissolved_oxygen >= 3:
-            score += 1
-            
-        # Turbidity scoring (ideal: <5 NTU)
-        if self.turbidity_ntu <= 5:
-            score += 2
-        elif self.turbidity_ntu <= 10:
-            score += 1
-            
-        # Determine status
-        if score >= 5:
-            return 'excellent'
-        elif score >= 3:
-            return 'good'
-        elif score >= 1:
-            return 'fair'
-        else:
-            return 'poor'
+        return WaterQuality.status_for(self.ph_level, self.dissolved_oxygen, self.turbidity_ntu)
+
+    @staticmethod
+    def status_for(ph_level, dissolved_oxygen, turbidity_ntu):
+        """Calculate status from raw parameter values (missing values score 0)"""
+        # Thresholds are configurable; see app.services.scoring
+        return scoring.score_status(ph_level, dissolved_oxygen, turbidity_ntu)
 
     def get_status_color(self):
         """Get Bootstrap color class for status"""
-        colors = {
-            'excellent': 'success',
-            'good': 'info', 
-            'fair': 'warning',
-            'poor': 'danger'
-        }
-        return colors.get(self.status, 'secondary')
+        return WaterQuality.color_for(self.status)
+
+    @staticmethod
+    def color_for(status):
+        """Get Bootstrap color class for a raw status value"""
+        return STATUS_COLORS.get(status, 'secondary')
 
     def get_status_display_name(self):
         """Get human-readable status name"""
@@ -92,10 +109,12 @@ class WaterQuality(db.Model):
 
     def calculate_tds(self):
         """Calculate Total Dissolved Solids from conductivity"""
-        # Approximate conversion: TDS (ppm) = Conductivity (μS/cm) × 0.64
-        if self.conductivity_us:
-            return round(self.conductivity_us * 0.64, 2)
-        return None
+        return WaterQuality.tds_for(self.conductivity_us)
+
+    @staticmethod
+    def tds_for(conductivity_us):
+        """Calculate TDS (ppm) from a raw conductivity value"""
+        return scoring.tds_for(conductivity_us)
 
     def before_save(self):
         """Calculate derived values before saving"""
@@ -106,6 +125,11 @@ class WaterQuality(db.Model):
         if not self.total_dissolved_solids and self.conductivity_us:
             self.total_dissolved_solids = self.calculate_tds()
 
+    @staticmethod
+    def insert_rows(rows, with_ids=False):
+        """executemany insert of row dicts; see app.database.connection.insert_rows"""
+        insert_rows(WaterQuality, rows, with_ids)
+
     @staticmethod
     def create_table():
         """This method is no longer needed with SQLAlchemy, but we keep it for compatibility"""
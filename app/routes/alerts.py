@@ -0,0 +1,154 @@
+from datetime import datetime
+from flask import jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import or_
+from app.database.connection import db
+from app.models.alert import Alert, AlertRule, AlertRuleState
+from app.models.organization import Organization
+from app.services.alerts import get_engine
+from app.services.tenancy import current_tenant, unscoped
+
+# organization_id is only taken from admins; everyone else's rules belong to their organization
+RULE_FIELDS = ('name', 'parameter', 'kind', 'operator', 'threshold', 'window',
+               'location_name', 'organization_id', 'severity', 'enabled')
+
+
+def _apply_rule_fields(rule, data):
+    for field in RULE_FIELDS:
+        if field not in data:
+            continue
+        value = data[field]
+        if field == 'threshold':
+            value = float(value) if value is not None else None
+        elif field == 'window':
+            value = int(value)
+        elif field == 'location_name':
+            value = value or None
+        elif field == 'organization_id':
+            if not current_user.is_admin():
+                continue
+            if value is not None and (isinstance(value, bool) or not isinstance(value, int)):
+                raise ValueError('organization_id must be an integer or null')
+            if value is not None and db.session.get(Organization, value) is None:
+                raise ValueError('Organization not found')
+        elif field == 'enabled':
+            value = bool(value)
+        setattr(rule, field, value)
+    rule.validate()
+
+
+def _get_rule(rule_id):
+    """The rule if the current user may change it: admins any, others their organization's"""
+    rule = db.session.get(AlertRule, rule_id)
+    tenant = current_tenant()
+    if rule is None or (tenant is not None and rule.organization_id != tenant):
+        return None
+    return rule
+
+
+def init_alert_routes(app):
+    @app.route('/api/alerts/rules', methods=['GET'])
+    @login_required
+    def list_alert_rules():
+        """Alert rules (researchers, government and admins): the organization's own and those for every organization"""
+        if not current_user.can_view_all_data():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        tenant = current_tenant()
+        with unscoped():
+            query = AlertRule.query
+            if tenant is not None:
+                query = query.filter(or_(AlertRule.organization_id == tenant, AlertRule.organization_id.is_(None)))
+            rules = query.order_by(AlertRule.id).all()
+        return jsonify({'rules': [rule.to_dict() for rule in rules], 'count': len(rules)})
+
+    @app.route('/api/alerts/rules', methods=['POST'])
+    @login_required
+    def create_alert_rule():
+        """Create a rule (government and admins) for the creator's organization; admins may pick any or none"""
+        if not current_user.can_edit_all_data():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        try:
+            rule = AlertRule(kind='threshold', window=1, severity='warning', enabled=True, created_by=current_user.id,
+                             organization_id=current_tenant())
+            _apply_rule_fields(rule, request.json or {})
+            db.session.add(rule)
+            db.session.commit()
+            get_engine().invalidate()
+            return jsonify({'message': 'Alert rule created', 'rule': rule.to_dict()}), 201
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/alerts/rules/<int:rule_id>', methods=['PUT'])
+    @login_required
+    def update_alert_rule(rule_id):
+        if not current_user.can_edit_all_data():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        rule = _get_rule(rule_id)
+        if not rule:
+            return jsonify({'error': 'Rule not found'}), 404
+        try:
+            _apply_rule_fields(rule, request.json or {})
+            db.session.commit()
+            get_engine().invalidate()
+            return jsonify({'message': 'Alert rule updated', 'rule': rule.to_dict()})
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/alerts/rules/<int:rule_id>', methods=['DELETE'])
+    @login_required
+    def delete_alert_rule(rule_id):
+        if not current_user.can_edit_all_data():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        rule = _get_rule(rule_id)
+        if not rule:
+            return jsonify({'error': 'Rule not found'}), 404
+        Alert.query.filter_by(rule_id=rule_id).delete()
+        AlertRuleState.query.filter_by(rule_id=rule_id).delete()
+        db.session.delete(rule)
+        db.session.commit()
+        get_engine().invalidate()
+        return jsonify({'message': 'Alert rule deleted', 'deleted_id': rule_id})
+
+    @app.route('/api/alerts', methods=['GET'])
+    @login_required
+    def list_alerts():
+        """Recent alerts, newest first, with the same visibility as readings.
+
+        Query params: limit (default 100, max 1000), before_id (paging),
+        location, unacknowledged=true.
+        """
+        try:
+            limit = min(int(request.args.get('limit', 100)), 1000)
+            query = Alert.query
+            if not current_user.can_view_all_data():
+                query = query.filter(or_(Alert.user_id == current_user.id, Alert.is_public == True))
+            if request.args.get('location'):
+                query = query.filter(Alert.location_name == request.args['location'])
+            if request.args.get('unacknowledged', '').lower() in ('1', 'true', 'yes'):
+                query = query.filter(Alert.acknowledged_at.is_(None))
+            if request.args.get('before_id'):
+                query = query.filter(Alert.id < int(request.args['before_id']))
+            alerts = query.order_by(Alert.id.desc()).limit(limit).all()
+            return jsonify({
+                'alerts': [alert.to_dict() for alert in alerts],
+                'count': len(alerts),
+                'next_before_id': alerts[-1].id if len(alerts) == limit else None
+            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/alerts/<int:alert_id>/acknowledge', methods=['POST'])
+    @login_required
+    def acknowledge_alert(alert_id):
+        if not current_user.can_edit_all_data():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        alert = db.session.get(Alert, alert_id)
+        if not alert:
+            return jsonify({'error': 'Alert not found'}), 404
+        if alert.acknowledged_at is None:
+            alert.acknowledged_at = datetime.utcnow()
+            alert.acknowledged_by = current_user.id
+            db.session.commit()
+        return jsonify({'message': 'Alert acknowledged', 'alert': alert.to_dict()})
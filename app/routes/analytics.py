@@ -1,13 +1,241 @@
-from flask import Blueprint, render_template, jsonify, request
+from flask import Blueprint, render_template, jsonify, request, current_app
 from flask_login import login_required, current_user
+from app.database.connection import db, use_read_replica
 from app.models.water_quality import WaterQuality
 from app.models.user import User
+from app.models.rollup import DailyLocationRollup
+from app.models.reading_chunk import ReadingChunk
+from app.models.location import Location, normalize_location_name
 from app.middleware.auth import role_required, researcher_required, admin_required
-from sqlalchemy import func, extract
-from datetime import datetime, timedelta
+from app.middleware.cache import cached_response, get_cache
+from app.services.downsampling import lttb_indices
+from app.services.geo import get_location_index
+from app.services import series as series_stats
+from app.services.jobs import latest_snapshot, register_job
+from app.services.scoring import nan_to_none
+from app.services.tenancy import current_tenant
+from sqlalchemy import func, extract, case
+import numpy as np
+import logging
+import re
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
 
 analytics_bp = Blueprint('analytics', __name__)
 
+logger = logging.getLogger(__name__)
+
+# Analytics only read, so they can run on the read replica when one is configured
+analytics_bp.before_request(use_read_replica)
+
+# Status values produced by WaterQuality.calculate_status, best first
+STATUSES = ('excellent', 'good', 'fair', 'poor')
+
+# Measured parameters summarised by the statistics endpoint
+PARAMETERS = ('ph_level', 'dissolved_oxygen', 'turbidity_ntu', 'temperature_c', 'conductivity_us')
+
+# Bucket sizes supported by the trends endpoint
+TREND_BUCKETS = ('hour', 'day', 'week', 'month')
+
+# Trend chart series: (parameter, response key, value used for days without data)
+TREND_SERIES = (
+    ('ph_level', 'ph_values', 7.0),
+    ('dissolved_oxygen', 'do_values', 8.0),
+    ('turbidity_ntu', 'turbidity_values', 5.0),
+)
+
+# Anomaly detectors offered by /api/location/<name>/anomalies
+ANOMALY_METHODS = ('zscore', 'ewma', 'seasonal')
+
+# Most anomalies returned per request
+MAX_ANOMALIES = 1000
+
+# Rolling window lengths: <n>m, <n>h or <n>d
+WINDOW_UNITS = {'m': 60 * 10 ** 6, 'h': series_stats.MICROS_PER_HOUR, 'd': series_stats.MICROS_PER_DAY}
+
+def _parse_window_bound(value, end_of_day=False):
+    """Parse an ISO date/date-time into naive UTC; a bare end date covers that whole day"""
+    if not value:
+        return None
+    bound = datetime.fromisoformat(value)
+    if bound.tzinfo is not None:
+        bound = bound.astimezone(timezone.utc).replace(tzinfo=None)
+    if end_of_day and len(value) == 10:
+        bound = bound.replace(hour=23, minute=59, second=59, microsecond=999999)
+    return bound
+
+def _iso_label(value):
+    # SQLite returns func.date()/strftime() results as strings, PostgreSQL as date/datetime objects
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+def _accumulate_totals(totals, rows):
+    """Add (label, reading_count, <parameter>_sum, <parameter>_count, ...) rows into totals by ISO label"""
+    for row in rows:
+        bucket = totals.setdefault(_iso_label(row.label), defaultdict(float))
+        bucket['reading_count'] += row.reading_count or 0
+        for parameter, _, _ in TREND_SERIES:
+            bucket[f'{parameter}_sum'] += getattr(row, f'{parameter}_sum') or 0
+            bucket[f'{parameter}_count'] += getattr(row, f'{parameter}_count') or 0
+
+def _reading_sum_columns():
+    """count/sum/non-null count aggregates over WaterQuality for the trend series"""
+    return [func.count(WaterQuality.id).label('reading_count')] + [
+        column for parameter, _, _ in TREND_SERIES for column in (
+            func.sum(getattr(WaterQuality, parameter)).label(f'{parameter}_sum'),
+            func.count(getattr(WaterQuality, parameter)).label(f'{parameter}_count')
+        )
+    ]
+
+def _daily_totals(start, end):
+    """Per-day totals for the current user's visibility, mostly from the rollup"""
+    totals = {}
+    
+    # Whole days per location come pre-aggregated from the rollup table
+    rollup_query = DailyLocationRollup.query.with_entities(
+        DailyLocationRollup.date.label('label'),
+        func.sum(DailyLocationRollup.reading_count).label('reading_count'),
+        *[func.sum(getattr(DailyLocationRollup, f'{parameter}_{stat}')).label(f'{parameter}_{stat}')
+          for parameter, _, _ in TREND_SERIES for stat in ('sum', 'count')]
+    )
+    if not current_user.can_view_all_data():
+        rollup_query = rollup_query.filter(DailyLocationRollup.is_public == True)
+    if start:
+        rollup_query = rollup_query.filter(DailyLocationRollup.date >= start.date())
+    if end:
+        rollup_query = rollup_query.filter(DailyLocationRollup.date <= end.date())
+    _accumulate_totals(totals, rollup_query.group_by(DailyLocationRollup.date).all())
+    
+    if not current_user.can_view_all_data():
+        # The user's own private readings are not in the public buckets
+        day = func.date(WaterQuality.timestamp)
+        private_query = WaterQuality.query.with_entities(day.label('label'), *_reading_sum_columns()).filter(
+            WaterQuality.user_id == current_user.id,
+            WaterQuality.is_public.isnot(True),
+            WaterQuality.timestamp.isnot(None)
+        )
+        if start:
+            private_query = private_query.filter(WaterQuality.timestamp >= datetime.combine(start.date(), datetime.min.time()))
+        if end:
+            private_query = private_query.filter(WaterQuality.timestamp < datetime.combine(end.date() + timedelta(days=1), datetime.min.time()))
+        _accumulate_totals(totals, private_query.group_by(day).all())
+        window_start = datetime.combine(start.date(), datetime.min.time()) if start else None
+        window_end = datetime.combine(end.date(), datetime.max.time()) if end else None
+        _accumulate_readings(totals, _cold_readings(
+            ReadingChunk.user_id == current_user.id, ReadingChunk.is_public.isnot(True), start=window_start, end=window_end
+        ), lambda timestamp: timestamp.date().isoformat())
+    
+    return totals
+
+def _hourly_totals(start, end):
+    """Per-hour totals straight from the readings table for a bounded window"""
+    if db.engine.dialect.name == 'postgresql':
+        hour = func.date_trunc('hour', WaterQuality.timestamp)
+    else:
+        hour = func.strftime('%Y-%m-%dT%H:00:00', WaterQuality.timestamp)
+    
+    query = WaterQuality.query.with_entities(hour.label('label'), *_reading_sum_columns())\
+        .filter(WaterQuality.timestamp >= start, WaterQuality.timestamp <= end)
+    if not current_user.can_view_all_data():
+        query = query.filter(
+            (WaterQuality.user_id == current_user.id) | 
+            (WaterQuality.is_public == True)
+        )
+    
+    totals = {}
+    _accumulate_totals(totals, query.group_by(hour).all())
+    _accumulate_readings(totals, _cold_readings(start=start, end=end),
+                         lambda timestamp: timestamp.strftime('%Y-%m-%dT%H:00:00'))
+    return totals
+
+def _regroup_daily_totals(daily, bucket):
+    """Merge per-day totals into week (starting Monday) or month buckets"""
+    totals = {}
+    for label, day_totals in daily.items():
+        day = date.fromisoformat(label)
+        if bucket == 'week':
+            start = day - timedelta(days=day.weekday())
+        else:
+            start = day.replace(day=1)
+        merged = totals.setdefault(start.isoformat(), defaultdict(float))
+        for key, value in day_totals.items():
+            merged[key] += value
+    return totals
+
+def _visible_chunks():
+    return ReadingChunk.query.filter(ReadingChunk.visible_to(current_user))
+
+def _cold_summary():
+    """Statistics-card aggregates over the compacted readings the user can see"""
+    columns = [func.coalesce(func.sum(ReadingChunk.reading_count), 0).label('total_readings')]
+    columns += [func.sum(getattr(ReadingChunk, f'status_{status}')).label(f'status_{status}') for status in STATUSES]
+    for parameter in PARAMETERS:
+        columns.extend([
+            func.min(getattr(ReadingChunk, f'{parameter}_min')).label(f'{parameter}_min'),
+            func.max(getattr(ReadingChunk, f'{parameter}_max')).label(f'{parameter}_max'),
+            func.sum(getattr(ReadingChunk, f'{parameter}_sum')).label(f'{parameter}_sum'),
+            func.sum(getattr(ReadingChunk, f'{parameter}_count')).label(f'{parameter}_count')
+        ])
+    return dict(_visible_chunks().with_entities(*columns).one()._mapping)
+
+def _active_locations(base_query):
+    """Distinct locations across both tiers"""
+    hot = base_query.with_entities(WaterQuality.location_id)
+    cold = _visible_chunks().with_entities(ReadingChunk.location_id)
+    return db.session.query(func.count()).select_from(hot.union(cold).subquery()).scalar()
+
+def _cold_readings(*criteria, start=None, end=None):
+    """Decoded compacted readings visible to the user within [start, end]"""
+    return ReadingChunk.iter_readings(ReadingChunk.visible_to(current_user), *criteria, since=start, until=end)
+
+def _accumulate_readings(totals, readings, label):
+    """Add decoded readings into totals under label(timestamp), like _accumulate_totals"""
+    for reading in readings:
+        bucket = totals.setdefault(label(reading['timestamp']), defaultdict(float))
+        bucket['reading_count'] += 1
+        for parameter, _, _ in TREND_SERIES:
+            if reading[parameter] is not None:
+                bucket[f'{parameter}_sum'] += reading[parameter]
+                bucket[f'{parameter}_count'] += 1
+
+def _parse_window(value):
+    """'30m', '24h', '7d' -> microseconds"""
+    match = re.fullmatch(r'(\d+)([mhd])', value or '')
+    if not match or int(match.group(1)) == 0:
+        raise ValueError('window must look like 30m, 24h or 7d')
+    return int(match.group(1)) * WINDOW_UNITS[match.group(2)]
+
+def _location_series(name):
+    """(location, its cached series, mask of the readings this request covers, parameters)"""
+    location = Location.query.filter_by(normalized_name=normalize_location_name(name)).first()
+    if not location:
+        raise LookupError(f'Location {name} not found')
+    parameters = request.args.get('parameters')
+    parameters = parameters.split(',') if parameters else list(series_stats.SERIES_PARAMETERS)
+    unknown = [parameter for parameter in parameters if parameter not in series_stats.SERIES_PARAMETERS]
+    if unknown:
+        raise ValueError(f"Unknown parameters: {', '.join(unknown)}")
+    start = _parse_window_bound(request.args.get('start'))
+    end = _parse_window_bound(request.args.get('end'), end_of_day=True)
+    series = series_stats.get_series_cache().get(location.id, location.name)
+    keep = series.mask(
+        current_user,
+        np.datetime64(start, 'us').astype(np.int64) if start else None,
+        np.datetime64(end, 'us').astype(np.int64) if end else None,
+        current_tenant()
+    )
+    return location, series, keep, parameters
+
+def _isoformat(micros):
+    return [timestamp.isoformat() for timestamp in micros.astype('datetime64[us]').astype(object)]
+
+def _baseline(timestamps, values, period, buckets):
+    _, mean, std, count = series_stats.seasonal_profile(timestamps, values, period, buckets)
+    return {'mean': nan_to_none(mean), 'std': nan_to_none(std), 'count': count.tolist()}
+
+def _as_float(value):
+    """Convert an aggregate result (possibly Decimal or None) to float or None"""
+    return float(value) if value is not None else None
+
 @analytics_bp.route('/dashboard')
 @login_required
 def analytics_dashboard():
@@ -16,6 +244,7 @@ def analytics_dashboard():
 
 @analytics_bp.route('/api/statistics')
 @login_required
+@cached_response
 def statistics():
     """Get basic statistics for dashboard cards"""
     try:
@@ -28,135 +257,120 @@ def statistics():
                 (WaterQuality.is_public == True)
             )
         
-        total_readings = base_query.count()
-        excellent_readings = base_query.filter_by(status='excellent').count()
-        avg_ph = base_query.with_entities(func.avg(WaterQuality.ph_level)).scalar() or 0
-        active_locations = base_query.with_entities(WaterQuality.location_name).distinct().count()
+        # Every card comes from one aggregate query (one scan) using conditional aggregation
+        columns = [
+            func.count(WaterQuality.id).label('total_readings'),
+            func.count(func.distinct(WaterQuality.location_id)).label('active_locations')
+        ]
+        for status in STATUSES:
+            columns.append(func.sum(case((WaterQuality.status == status, 1), else_=0)).label(f'status_{status}'))
+        for parameter in PARAMETERS:
+            column = getattr(WaterQuality, parameter)
+            columns.extend([
+                func.min(column).label(f'{parameter}_min'),
+                func.max(column).label(f'{parameter}_max'),
+                func.sum(column).label(f'{parameter}_sum'),
+                func.count(column).label(f'{parameter}_count')
+            ])
+        
+        row = dict(base_query.with_entities(*columns).one()._mapping)
+        
+        # Compacted readings are counted from their chunks' summary columns
+        cold = _cold_summary()
+        if cold['total_readings']:
+            row['active_locations'] = _active_locations(base_query)
+            for key, value in cold.items():
+                if key.endswith('_min'):
+                    row[key] = min((v for v in (row[key], value) if v is not None), default=None)
+                elif key.endswith('_max'):
+                    row[key] = max((v for v in (row[key], value) if v is not None), default=None)
+                else:
+                    row[key] = (row[key] or 0) + (value or 0)
+        
+        status_counts = {status: int(row[f'status_{status}'] or 0) for status in STATUSES}
+        parameters = {
+            parameter: {
+                'min': _as_float(row[f'{parameter}_min']),
+                'max': _as_float(row[f'{parameter}_max']),
+                'avg': float(row[f'{parameter}_sum']) / row[f'{parameter}_count'] if row[f'{parameter}_count'] else None
+            }
+            for parameter in PARAMETERS
+        }
         
         return jsonify({
-            'total_readings': total_readings,
-            'excellent_readings': excellent_readings,
-            'avg_ph': float(avg_ph),
-            'active_locations': active_locations
+            'total_readings': row['total_readings'],
+            'excellent_readings': status_counts['excellent'],
+            'avg_ph': parameters['ph_level']['avg'] or 0.0,
+            'active_locations': row['active_locations'],
+            'status_counts': status_counts,
+            'parameters': parameters
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/api/water-quality-trends')
 @login_required
+@cached_response
 def water_quality_trends():
-    """Get trend data for charts (last 30 days)"""
+    """Get trend data for charts.
+    
+    Query parameters:
+        start, end - ISO dates/date-times bounding the window (inclusive)
+        bucket     - hour, day (default), week or month
+        max_points - downsample to at most this many points with LTTB
+                     (default and cap: TRENDS_MAX_POINTS)
+    
+    Day/week/month buckets are built from the daily rollup; hourly buckets
+    query readings directly and default to the last 7 days.
+    """
     try:
-        print("📈 Trends API called...")
+        cap = current_app.config['TRENDS_MAX_POINTS']
+        try:
+            bucket = request.args.get('bucket', 'day')
+            if bucket not in TREND_BUCKETS:
+                raise ValueError(f"bucket must be one of: {', '.join(TREND_BUCKETS)}")
+            start = _parse_window_bound(request.args.get('start'))
+            end = _parse_window_bound(request.args.get('end'), end_of_day=True)
+            max_points = min(int(request.args.get('max_points', cap)), cap)
+            if max_points < 3:
+                raise ValueError('max_points must be at least 3')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        # Base query with role-based filtering
-        if current_user.can_view_all_data():
-            query = WaterQuality.query
-            print("   🔓 Using all data (researcher access)")
+        if bucket == 'hour':
+            end = end or datetime.utcnow()
+            start = start or end - timedelta(days=7)
+            totals = _hourly_totals(start, end)
         else:
-            query = WaterQuality.query.filter(
-                (WaterQuality.user_id == current_user.id) | 
-                (WaterQuality.is_public == True)
-            )
-            print("   🔒 Using filtered data (community access)")
-        
-        # Get all readings count first
-        total_readings = query.count()
-        print(f"   📊 Total readings available: {total_readings}")
-        
-        # If no data at all, return empty structure
-        if total_readings == 0:
-            print("   ⚠️  No data found, returning empty structure")
-            return jsonify({
-                'dates': [],
-                'ph_values': [],
-                'do_values': [], 
-                'turbidity_values': [],
-                'reading_counts': []
-            })
-        
-        # Remove date filter temporarily to get all data for testing
-        trends_data = query\
-            .with_entities(
-                func.date(WaterQuality.timestamp).label('date'),
-                func.avg(WaterQuality.ph_level).label('avg_ph'),
-                func.avg(WaterQuality.dissolved_oxygen).label('avg_do'),
-                func.avg(WaterQuality.turbidity_ntu).label('avg_turbidity'),
-                func.count(WaterQuality.id).label('reading_count')
-            )\
-            .group_by(func.date(WaterQuality.timestamp))\
-            .order_by('date')\
-            .all()
-        
-        print(f"   📈 Trend data points found: {len(trends_data)}")
-        
-        # If no trend data after grouping, create sample data from existing readings
-        if not trends_data:
-            print("   ⚠️  No trend data after grouping, creating from individual readings")
-            # Get individual readings to create trend data
-            individual_readings = query.order_by(WaterQuality.timestamp).all()
-            
-            dates = []
-            ph_values = []
-            do_values = []
-            turbidity_values = []
-            reading_counts = []
-            
-            for reading in individual_readings:
-                dates.append(reading.timestamp.date().isoformat() if reading.timestamp else datetime.utcnow().date().isoformat())
-                ph_values.append(float(reading.ph_level or 7.0))
-                do_values.append(float(reading.dissolved_oxygen or 8.0))
-                turbidity_values.append(float(reading.turbidity_ntu or 5.0))
-                reading_counts.append(1)
-            
-            return jsonify({
-                'dates': dates,
-                'ph_values': ph_values,
-                'do_values': do_values,
-                'turbidity_values': turbidity_values,
-                'reading_counts': reading_counts
-            })
-        
-        # Process the grouped trend data - FIXED DATE HANDLING
-        dates = []
-        ph_values = []
-        do_values = []
-        turbidity_values = []
-        reading_counts = []
-        
-        for row in trends_data:
-            # FIX: Proper date handling - check if it's a date object or string
-            if row.date and hasattr(row.date, 'isoformat'):
-                # It's a date object
-                dates.append(row.date.isoformat())
-            elif row.date:
-                # It's already a string
-                dates.append(str(row.date))
-            else:
-                # No date, use current date
-                dates.append(datetime.utcnow().date().isoformat())
-            
-            ph_values.append(float(row.avg_ph or 7.0))  # Default to neutral pH if null
-            do_values.append(float(row.avg_do or 8.0))  # Default to good DO if null
-            turbidity_values.append(float(row.avg_turbidity or 5.0))  # Default to good turbidity if null
-            reading_counts.append(row.reading_count or 1)
+            totals = _daily_totals(start, end)
+            if bucket != 'day':
+                totals = _regroup_daily_totals(totals, bucket)
         
+        labels = sorted(totals)
         response_data = {
-            'dates': dates,
-            'ph_values': ph_values,
-            'do_values': do_values,
-            'turbidity_values': turbidity_values,
-            'reading_counts': reading_counts
+            'bucket': bucket,
+            'dates': labels,
+            'reading_counts': [int(totals[label]['reading_count']) for label in labels]
         }
+        for parameter, key, default in TREND_SERIES:
+            response_data[key] = [
+                totals[label][f'{parameter}_sum'] / totals[label][f'{parameter}_count']
+                if totals[label][f'{parameter}_count'] else default
+                for label in labels
+            ]
+        
+        response_data['downsampled'] = len(labels) > max_points
+        if response_data['downsampled']:
+            x = [datetime.fromisoformat(label).timestamp() for label in labels]
+            series = [response_data[key] for _, key, _ in TREND_SERIES]
+            keep = lttb_indices(x, series, max_points)
+            for key in ('dates', 'reading_counts') + tuple(key for _, key, _ in TREND_SERIES):
+                response_data[key] = [response_data[key][index] for index in keep]
         
-        print(f"   ✅ Sending {len(dates)} data points")
-        print(f"   📅 Sample dates: {dates[:3] if dates else 'None'}")
         return jsonify(response_data)
         
     except Exception as e:
-        print(f"❌ Error in trends API: {str(e)}")
-        import traceback
-        traceback.print_exc()
+        logger.exception('Trends query failed')
         return jsonify({
             'error': str(e),
             'dates': [],
@@ -168,6 +382,7 @@ def water_quality_trends():
 
 @analytics_bp.route('/api/quality-distribution')
 @login_required
+@cached_response
 def quality_distribution():
     """Get data for quality distribution pie chart"""
     try:
@@ -183,9 +398,16 @@ def quality_distribution():
             WaterQuality.status,
             func.count(WaterQuality.id).label('count')
         ).group_by(WaterQuality.status).all()
+        counts = {row.status: row.count for row in distribution}
+        cold = _visible_chunks().with_entities(
+            *[func.sum(getattr(ReadingChunk, f'status_{status}')).label(status) for status in STATUSES]
+        ).one()._mapping
+        for status in STATUSES:
+            if cold[status]:
+                counts[status] = counts.get(status, 0) + int(cold[status])
         
         # If no data, create default structure
-        if not distribution:
+        if not counts:
             return jsonify({
                 'labels': ['No Data'],
                 'data': [1],
@@ -193,55 +415,266 @@ def quality_distribution():
             })
         
         return jsonify({
-            'labels': [row.status.title() if row.status else 'Unknown' for row in distribution],
-            'data': [row.count for row in distribution],
+            'labels': [status.title() if status else 'Unknown' for status in counts],
+            'data': list(counts.values()),
             'colors': ['#28a745', '#20c997', '#ffc107', '#dc3545', '#6c757d']
         })
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def _location_insight_rows(*group_by):
+    """Each location's daily buckets merged (per extra group_by column too), as visible to the request"""
+    rollup = DailyLocationRollup
+    return rollup.query.with_entities(
+        *group_by,
+        rollup.location_name,
+        func.sum(rollup.reading_count).label('reading_count'),
+        func.max(rollup.last_reading).label('last_reading'),
+        *[func.sum(getattr(rollup, f'{parameter}_{stat}')).label(f'{parameter}_{stat}')
+          for parameter, _, _ in TREND_SERIES for stat in ('sum', 'count')]
+    ).group_by(*group_by, rollup.location_name).all()
+
+def _location_insights(locations_data, sites):
+    """/api/location-insights entries from _location_insight_rows(); sites maps names to get_location_index() sites"""
+    # Averages are sum / non-null count
+    def average(row, parameter):
+        count = getattr(row, f'{parameter}_count')
+        return float(getattr(row, f'{parameter}_sum') / count) if count else 0.0
+    
+    no_site = {'id': None, 'latitude': None, 'longitude': None}
+    insights = []
+    for row in locations_data:
+        site = sites.get(row.location_name, no_site)
+        insights.append({
+            'location': row.location_name,
+            'location_id': site['id'],
+            'latitude': site['latitude'],
+            'longitude': site['longitude'],
+            'avg_ph': average(row, 'ph_level'),
+            'avg_do': average(row, 'dissolved_oxygen'),
+            'avg_turbidity': average(row, 'turbidity_ntu'),
+            'reading_count': int(row.reading_count),
+            'last_reading': row.last_reading.isoformat() if row.last_reading else None
+        })
+    return insights
+
+def _site_index():
+    """Site ids and coordinates for map views, by name"""
+    return {site['name']: site for site in get_location_index().locations}
+
+@register_job('location_insights', schedule='*/5 * * * *', snapshot=True)
+def compute_location_insights():
+    """Per-location averages and latest reading as served by /api/location-insights,
+    across every organization ('all') and per organization id ('organizations')"""
+    sites = _site_index()
+    by_organization = defaultdict(list)
+    for row in _location_insight_rows(DailyLocationRollup.organization_id):
+        by_organization[str(row.organization_id)].append(row)
+    return {
+        'all': _location_insights(_location_insight_rows(), sites),
+        'organizations': {
+            organization_id: _location_insights(rows, sites) for organization_id, rows in by_organization.items()
+        }
+    }
+
+@register_job('user_statistics', schedule='*/5 * * * *', snapshot=True)
+def compute_user_statistics():
+    """User counts and average account age per role, as served by /api/user-statistics"""
+    user_stats = User.query.with_entities(
+        User.role,
+        func.count(User.id).label('user_count'),
+        func.avg(func.extract('epoch', func.now() - User.created_at) / 86400).label('avg_days_since_join')
+    ).group_by(User.role).all()
+    
+    return [{
+        'role': row.role,
+        'user_count': row.user_count,
+        'avg_days_since_join': float(row.avg_days_since_join or 0)
+    } for row in user_stats]
+
 @analytics_bp.route('/api/location-insights')
 @login_required
 @researcher_required
+@cached_response
 def location_insights():
-    """Get detailed location insights (researcher+ only)"""
+    """Get detailed location insights (researcher+ only), from the job snapshot when it is fresh"""
     try:
-        locations_data = WaterQuality.query.with_entities(
-            WaterQuality.location_name,
-            func.avg(WaterQuality.ph_level).label('avg_ph'),
-            func.avg(WaterQuality.dissolved_oxygen).label('avg_do'),
-            func.avg(WaterQuality.turbidity_ntu).label('avg_turbidity'),
-            func.count(WaterQuality.id).label('reading_count'),
-            func.max(WaterQuality.timestamp).label('last_reading')
-        ).group_by(WaterQuality.location_name).all()
-        
-        return jsonify([{
-            'location': row.location_name,
-            'avg_ph': float(row.avg_ph or 0),
-            'avg_do': float(row.avg_do or 0),
-            'avg_turbidity': float(row.avg_turbidity or 0),
-            'reading_count': row.reading_count,
-            'last_reading': row.last_reading.isoformat() if row.last_reading else None
-        } for row in locations_data])
+        tenant = current_tenant()
+        snapshot = latest_snapshot('location_insights')
+        # Snapshots taken before organizations existed are plain lists; recompute instead
+        if isinstance(snapshot, dict):
+            insights = snapshot['all'] if tenant is None else snapshot['organizations'].get(str(tenant), [])
+        else:
+            insights = _location_insights(_location_insight_rows(), _site_index())
+        return jsonify(insights)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @analytics_bp.route('/api/user-statistics')
 @login_required
 @admin_required
+@cached_response
 def user_statistics():
-    """Get user statistics (admin only)"""
+    """Get user statistics (admin only), from the job snapshot when it is fresh"""
     try:
-        user_stats = User.query.with_entities(
-            User.role,
-            func.count(User.id).label('user_count'),
-            func.avg(func.extract('epoch', func.now() - User.created_at) / 86400).label('avg_days_since_join')
-        ).group_by(User.role).all()
+        snapshot = latest_snapshot('user_statistics')
+        return jsonify(snapshot if snapshot is not None else compute_user_statistics())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/api/location/<path:name>/stats')
+@login_required
+@cached_response
+def location_stats(name):
+    """Rolling statistics, percentiles and seasonal baselines for one location.
+    
+    Query parameters:
+        parameters - comma-separated subset of the measured parameters (default all)
+        start, end - ISO dates/date-times bounding the readings used (inclusive)
+        window     - rolling window, e.g. 30m, 24h (default) or 7d
+        max_points - rolling series points returned (default and cap: TRENDS_MAX_POINTS)
+    
+    Computed with NumPy over the location's cached series (both tiers),
+    limited to the readings the current user may see. Baselines are by UTC
+    hour of day and weekday (Monday first).
+    """
+    try:
+        cap = current_app.config['TRENDS_MAX_POINTS']
+        window = _parse_window(request.args.get('window', '24h'))
+        max_points = min(int(request.args.get('max_points', cap)), cap)
+        if max_points < 3:
+            raise ValueError('max_points must be at least 3')
+        location, series, keep, parameters = _location_series(name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    try:
+        results = {}
+        for parameter in parameters:
+            _, timestamps, values = series.column(parameter, keep)
+            if not values.size:
+                results[parameter] = {'count': 0}
+                continue
+            mean, std, _ = series_stats.rolling_stats(timestamps, values, window)
+            # The rolling series is already smooth, so evenly spaced points are enough
+            points = np.unique(np.linspace(0, values.size - 1, min(max_points, values.size)).astype(np.int64))
+            results[parameter] = {
+                'count': int(values.size),
+                'mean': float(values.mean()),
+                'std': float(values.std(ddof=1)) if values.size > 1 else None,
+                'min': float(values.min()),
+                'max': float(values.max()),
+                'first_reading': _isoformat(timestamps[:1])[0],
+                'last_reading': _isoformat(timestamps[-1:])[0],
+                'percentiles': series_stats.percentiles(values),
+                'rolling': {
+                    'timestamps': _isoformat(timestamps[points]),
+                    'mean': nan_to_none(mean[points]),
+                    'std': nan_to_none(std[points])
+                },
+                'baseline': {
+                    'hour_of_day': _baseline(timestamps, values, 'hour_of_day', 24),
+                    'day_of_week': _baseline(timestamps, values, 'day_of_week', 7)
+                }
+            }
+        return jsonify({
+            'location': location.name,
+            'location_id': location.id,
+            'window': request.args.get('window', '24h'),
+            'readings': int(keep.sum()),
+            'parameters': results
+        })
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/api/location/<path:name>/anomalies')
+@login_required
+@cached_response
+def location_anomalies(name):
+    """Readings at one location that stand out, newest first.
+    
+    Query parameters:
+        method     - zscore (default): against the rolling window before each reading
+                     ewma: against an exponentially weighted forecast and variance
+                     seasonal: against the readings at the same UTC hour of day
+        threshold  - |score| above which a reading is flagged (default 3)
+        window     - zscore window, e.g. 24h (default) or 7d
+        alpha      - ewma smoothing factor in (0, 1] (default 0.1)
+        parameters, start, end - as for /stats
+        limit      - anomalies returned (default 100, at most 1000)
+    """
+    try:
+        method = request.args.get('method', 'zscore')
+        if method not in ANOMALY_METHODS:
+            raise ValueError(f"method must be one of: {', '.join(ANOMALY_METHODS)}")
+        threshold = float(request.args.get('threshold', 3))
+        window = _parse_window(request.args.get('window', '24h'))
+        alpha = float(request.args.get('alpha', 0.1))
+        if not 0 < alpha <= 1:
+            raise ValueError('alpha must be in (0, 1]')
+        limit = min(int(request.args.get('limit', 100)), MAX_ANOMALIES)
+        location, series, keep, parameters = _location_series(name)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    
+    try:
+        found = []
+        checked = 0
+        for parameter in parameters:
+            ids, timestamps, values = series.column(parameter, keep)
+            checked += values.size
+            if method == 'zscore':
+                scores, expected, flagged = series_stats.zscore_anomalies(timestamps, values, window, threshold)
+            elif method == 'ewma':
+                scores, expected, flagged = series_stats.ewma_anomalies(values, alpha, threshold)
+            else:
+                scores, expected, flagged = series_stats.seasonal_anomalies(timestamps, values, threshold)
+            if flagged.any():
+                found.append((parameter, ids[flagged], timestamps[flagged], values[flagged], expected[flagged], scores[flagged]))
         
-        return jsonify([{
-            'role': row.role,
-            'user_count': row.user_count,
-            'avg_days_since_join': float(row.avg_days_since_join or 0)
-        } for row in user_stats])
+        total = sum(len(item[1]) for item in found)
+        anomalies = []
+        if found:
+            names = np.concatenate([np.full(len(item[1]), index) for index, item in enumerate(found)])
+            ids, timestamps, values, expected, scores = (np.concatenate([item[column] for item in found]) for column in range(1, 6))
+            newest = np.lexsort((ids, timestamps))[::-1][:limit]
+            for index, reading_id, timestamp, value, forecast, score in zip(
+                names[newest].tolist(), ids[newest].tolist(), _isoformat(timestamps[newest]),
+                values[newest].tolist(), expected[newest].tolist(), scores[newest].tolist()
+            ):
+                anomalies.append({
+                    'id': reading_id,
+                    'timestamp': timestamp,
+                    'parameter': found[index][0],
+                    'value': value,
+                    'expected': forecast,
+                    'score': score
+                })
+        return jsonify({
+            'location': location.name,
+            'location_id': location.id,
+            'method': method,
+            'threshold': threshold,
+            'checked': int(checked),
+            'count': int(total),
+            'anomalies': anomalies
+        })
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@analytics_bp.route('/api/cache-stats')
+@login_required
+@admin_required
+def cache_stats():
+    """Analytics response cache hit/miss counters for this worker (admin only)"""
+    cache = get_cache()
+    if cache is None:
+        stats = {'backend': None, 'hits': 0, 'misses': 0, 'hit_ratio': 0.0}
+    else:
+        stats = cache.stats()
+    stats['series'] = series_stats.get_series_cache().stats()
+    return jsonify(stats)
\ No newline at end of file
@@ -1,8 +1,20 @@
+import logging
 from flask import jsonify, request, session, render_template, redirect, url_for
 from app.database.connection import db
 from app.models.user import User
+from app.models.organization import Organization
+from app.middleware.cache import invalidate_analytics_cache
+from app.services.passwords import PasswordHasherBusy
 from flask_login import login_user, logout_user, login_required, current_user
 
+logger = logging.getLogger(__name__)
+
+def _hasher_busy_response(e):
+    response = jsonify({'error': str(e)})
+    response.status_code = 503
+    response.headers['Retry-After'] = str(e.retry_after)
+    return response
+
 def init_auth_routes(app):
     # ===== TEMPLATE ROUTES =====
     @app.route('/login')
@@ -33,59 +45,80 @@ def init_auth_routes(app):
     def api_register():
         try:
             data = request.json
-            print(f"📝 Registration attempt for: {data.get('email')}")
+            logger.debug('Registration attempt', extra={'email': data.get('email')})
             
             # Check if user already exists
             if User.query.filter_by(email=data.get('email')).first():
                 return jsonify({'error': 'Email already registered'}), 400
             
+            # New users start in the default organization. The organization they
+            # name is only a request: an admin moves them into it
+            # (PUT /api/users/<id>/organization), so nobody can join a tenant,
+            # or create one, by typing its name
+            organization = ' '.join(str(data.get('organization') or '').split())
+            
             # Create new user
             user = User(
                 name=data.get('name'),
                 email=data.get('email'),
                 address=data.get('address'),
                 telephone=data.get('telephone'),
-                organization=data.get('organization', ''),
+                organization=organization[:100],
+                organization_id=Organization.default_id(),
                 role=data.get('role', 'community')
             )
             user.set_password(data.get('password'))
             
             db.session.add(user)
             db.session.commit()
+            invalidate_analytics_cache()  # user-statistics counts users
             
-            print(f"✅ User registered: {user.email}")
+            logger.info('User registered', extra={'email': user.email, 'role': user.role})
             return jsonify({
                 'message': 'User registered successfully!',
                 'user': user.to_dict()
             }), 201
             
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            logger.warning('Registration shed, password hashing at capacity', extra={'email': data.get('email')})
+            return _hasher_busy_response(e)
         except Exception as e:
             db.session.rollback()
-            print(f"❌ Registration error: {e}")
+            logger.warning('Registration failed: %s', e)
             return jsonify({'error': str(e)}), 400
     
     @app.route('/api/auth/login', methods=['POST'])
     def api_login():
         try:
             data = request.json
-            print(f"🔐 Login attempt for: {data.get('email')}")
+            logger.debug('Login attempt', extra={'email': data.get('email')})
             
             user = User.query.filter_by(email=data.get('email')).first()
             
             if user and user.check_password(data.get('password')):
+                if user.password_needs_rehash():
+                    # Upgrade hashes made at an older BCRYPT_LOG_ROUNDS
+                    user.set_password(data.get('password'))
+                    db.session.commit()
+                    logger.info('Password rehashed', extra={'email': user.email})
                 login_user(user)
                 session['user_id'] = user.id
-                print(f"✅ Login successful: {user.email}")
+                logger.info('Login successful', extra={'email': user.email})
                 return jsonify({
                     'message': 'Login successful!',
                     'user': user.to_dict()
                 })
             else:
-                print(f"❌ Login failed: {data.get('email')}")
+                logger.info('Login failed', extra={'email': data.get('email')})
                 return jsonify({'error': 'Invalid email or password'}), 401
                 
+        except PasswordHasherBusy as e:
+            db.session.rollback()
+            logger.warning('Login shed, password hashing at capacity', extra={'email': data.get('email')})
+            return _hasher_busy_response(e)
         except Exception as e:
-            print(f"❌ Login error: {e}")
+            logger.warning('Login error: %s', e)
             return jsonify({'error': str(e)}), 400
     
     @app.route('/api/auth/logout', methods=['POST'])
@@ -93,7 +126,7 @@ def init_auth_routes(app):
     def api_logout():
         logout_user()
         session.pop('user_id', None)
-        print("✅ User logged out")
+        logger.debug('User logged out')
         return jsonify({'message': 'Logout successful!'})
     
     @app.route('/api/auth/me', methods=['GET'])
@@ -0,0 +1,86 @@
+from flask import jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import func, select
+from app.database.connection import db
+from app.middleware.auth import admin_required
+from app.models.job import JobRun
+from app.services.jobs import JOBS, enqueue_job, get_scheduler, sync_jobs
+
+# Most runs /api/jobs/<name>/runs returns
+MAX_RUNS = 100
+
+
+def init_job_routes(app):
+    @app.route('/api/jobs', methods=['GET'])
+    @login_required
+    @admin_required
+    def list_jobs():
+        """Registered jobs with their schedule, next run and latest run (admin only)"""
+        jobs = sync_jobs()
+        latest = {}
+        for run in db.session.execute(
+            select(JobRun).where(JobRun.id.in_(
+                select(func.max(JobRun.id)).group_by(JobRun.job_name).scalar_subquery()
+            ))
+        ).scalars():
+            latest[run.job_name] = run.to_dict()
+        result = [
+            {**definition.to_dict(), **jobs[name].to_dict(), 'last_run': latest.get(name)}
+            for name, definition in sorted(JOBS.items())
+        ]
+        return jsonify({'jobs': result, 'count': len(result), 'scheduler': get_scheduler().stats()})
+
+    @app.route('/api/jobs/<name>', methods=['PUT'])
+    @login_required
+    @admin_required
+    def update_job(name):
+        """Enable or disable a job's schedule; manual runs are always allowed"""
+        if name not in JOBS:
+            return jsonify({'error': 'Job not found'}), 404
+        data = request.json or {}
+        if not isinstance(data.get('enabled'), bool):
+            return jsonify({'error': 'enabled must be true or false'}), 400
+        job = sync_jobs()[name]
+        job.enabled = data['enabled']
+        db.session.commit()
+        return jsonify({'message': 'Job updated', 'job': {**JOBS[name].to_dict(), **job.to_dict()}})
+
+    @app.route('/api/jobs/<name>/runs', methods=['GET'])
+    @login_required
+    @admin_required
+    def list_job_runs(name):
+        """A job's runs, newest first (?limit=, default 20)"""
+        if name not in JOBS:
+            return jsonify({'error': 'Job not found'}), 404
+        try:
+            limit = min(max(int(request.args.get('limit', 20)), 1), MAX_RUNS)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        runs = JobRun.query.filter(JobRun.job_name == name).order_by(JobRun.id.desc()).limit(limit).all()
+        return jsonify({'runs': [run.to_dict() for run in runs], 'count': len(runs)})
+
+    @app.route('/api/jobs/<name>/runs', methods=['POST'])
+    @login_required
+    @admin_required
+    def trigger_job(name):
+        """Queue a run now; the body may carry {"params": {...}} for the job function"""
+        if name not in JOBS:
+            return jsonify({'error': 'Job not found'}), 404
+        params = (request.json or {}).get('params') if request.data else None
+        if params is not None and not isinstance(params, dict):
+            return jsonify({'error': 'params must be an object'}), 400
+        try:
+            run = enqueue_job(name, params, requested_by=current_user.id)
+        except TypeError as e:
+            return jsonify({'error': f'Invalid params: {e}'}), 400
+        return jsonify({'message': 'Job queued', 'run': run.to_dict()}), 202
+
+    @app.route('/api/jobs/runs/<int:run_id>', methods=['GET'])
+    @login_required
+    @admin_required
+    def get_job_run(run_id):
+        """One run, including its result"""
+        run = db.session.get(JobRun, run_id)
+        if run is None:
+            return jsonify({'error': 'Run not found'}), 404
+        return jsonify(run.to_dict(with_result=True))
\ No newline at end of file
@@ -0,0 +1,156 @@
+from flask import jsonify, request
+from flask_login import login_required, current_user
+from sqlalchemy import exists, or_, select
+from app.database.connection import db
+from app.models.location import Location, normalize_location_name
+from app.models.water_quality import WaterQuality
+from app.models.rollup import DailyLocationRollup
+from app.models.alert import AlertRule, AlertRuleState
+from app.models.reading_chunk import ReadingChunk
+from app.middleware.cache import invalidate_analytics_cache
+from app.services.alerts import get_engine
+from app.services.geo import get_location_index, invalidate_location_index
+from app.services.series import get_series_cache
+from app.services.tenancy import current_tenant, unscoped
+
+# Most sites /api/locations/nearest returns
+MAX_NEAREST = 100
+
+
+def _parse_bbox(value):
+    """'minLon,minLat,maxLon,maxLat' -> floats (minLon > maxLon crosses the antimeridian)"""
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(part) for part in value.split(','))
+    except ValueError:
+        raise ValueError('bbox must be minLon,minLat,maxLon,maxLat')
+    if not (-180 <= min_lon <= 180 and -180 <= max_lon <= 180 and -90 <= min_lat <= max_lat <= 90):
+        raise ValueError('bbox is out of range')
+    return min_lon, min_lat, max_lon, max_lat
+
+
+def _parse_coordinate(value, name, limit):
+    if value in (None, ''):
+        return None
+    value = float(value)
+    if not -limit <= value <= limit:
+        raise ValueError(f'{name} must be between -{limit} and {limit}')
+    return value
+
+
+def _shared_with_other_organizations(location, tenant):
+    """Whether another organization has readings (either tier) or rules at the location"""
+    def others(model):
+        return or_(model.organization_id != tenant, model.organization_id.is_(None))
+    with unscoped():
+        return db.session.execute(select(
+            exists().where(WaterQuality.location_id == location.id, others(WaterQuality))
+            | exists().where(ReadingChunk.location_name == location.name, others(ReadingChunk))
+            | exists().where(AlertRule.location_name == location.name, AlertRule.organization_id != tenant)
+        )).scalar()
+
+
+def _rename_location(location, name):
+    """Give a location a new canonical name, relabelling its readings (both tiers), rollup buckets, rules and rule state"""
+    name = ' '.join(str(name).split())
+    if not name:
+        raise ValueError('name is required')
+    key = normalize_location_name(name)
+    if key != location.normalized_name and Location.query.filter_by(normalized_name=key).first():
+        raise LookupError(f'A location named {name} already exists')
+    old_name = location.name
+    location.name = name
+    location.normalized_name = key
+    if name != old_name:
+        WaterQuality.query.filter_by(location_id=location.id).update({'location_name': name})
+        DailyLocationRollup.query.filter_by(location_name=old_name).update({'location_name': name})
+        ReadingChunk.query.filter_by(location_name=old_name).update({'location_name': name})
+        AlertRule.query.filter_by(location_name=old_name).update({'location_name': name})
+        AlertRuleState.query.filter_by(location_name=old_name).update({'location_name': name})
+    return name != old_name
+
+
+def init_location_routes(app):
+    @app.route('/api/locations', methods=['GET'])
+    @login_required
+    def list_locations():
+        """Monitoring sites, for map views.
+
+        Query params: bbox=minLon,minLat,maxLon,maxLat returns the sites with
+        coordinates inside the box; without it every site is returned.
+        """
+        try:
+            index = get_location_index()
+            if request.args.get('bbox'):
+                locations = index.bbox(*_parse_bbox(request.args['bbox']))
+            else:
+                locations = index.locations
+            return jsonify({'locations': locations, 'count': len(locations)})
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/locations/nearest', methods=['GET'])
+    @login_required
+    def nearest_locations():
+        """The n (default 10) sites closest to lat/lon, with distance_km"""
+        try:
+            latitude = _parse_coordinate(request.args.get('lat'), 'lat', 90)
+            longitude = _parse_coordinate(request.args.get('lon'), 'lon', 180)
+            if latitude is None or longitude is None:
+                raise ValueError('lat and lon are required')
+            n = min(int(request.args.get('n', 10)), MAX_NEAREST)
+            nearest = get_location_index().nearest(latitude, longitude, n)
+            return jsonify({
+                'locations': [{**location, 'distance_km': round(distance, 3)} for distance, location in nearest],
+                'count': len(nearest)
+            })
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+    @app.route('/api/locations/<int:location_id>', methods=['GET'])
+    @login_required
+    def get_location(location_id):
+        location = db.session.get(Location, location_id)
+        if not location:
+            return jsonify({'error': 'Location not found'}), 404
+        return jsonify(location.to_dict())
+
+    @app.route('/api/locations/<int:location_id>', methods=['PUT'])
+    @login_required
+    def update_location(location_id):
+        """Set a site's coordinates and/or canonical name (government and admins).
+
+        Sites are shared by every organization, so outside admins only a site
+        no other organization has readings or rules at can be changed.
+        """
+        if not current_user.can_edit_all_data():
+            return jsonify({'error': 'Insufficient permissions'}), 403
+        location = db.session.get(Location, location_id)
+        if not location:
+            return jsonify({'error': 'Location not found'}), 404
+        tenant = current_tenant()
+        if tenant is not None and _shared_with_other_organizations(location, tenant):
+            return jsonify({'error': 'Location is used by other organizations; ask an admin to change it'}), 403
+        data = request.json or {}
+        try:
+            if 'latitude' in data or 'longitude' in data:
+                latitude = _parse_coordinate(data.get('latitude', location.latitude), 'latitude', 90)
+                longitude = _parse_coordinate(data.get('longitude', location.longitude), 'longitude', 180)
+                if (latitude is None) != (longitude is None):
+                    raise ValueError('latitude and longitude must be set together')
+                location.latitude, location.longitude = latitude, longitude
+            renamed = 'name' in data and _rename_location(location, data['name'])
+            db.session.commit()
+        except (TypeError, ValueError) as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        except LookupError as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 409
+
+        invalidate_location_index()
+        if renamed:
+            Location.forget_cached()
+            get_engine().invalidate()
+            invalidate_analytics_cache()
+            get_series_cache().invalidate([location.id])
+        return jsonify({'message': 'Location updated', 'location': location.to_dict()})
\ No newline at end of file
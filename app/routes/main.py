@@ -1,7 +1,57 @@
-from flask import jsonify
+import hmac
+from flask import jsonify, request, current_app, Response
+from sqlalchemy import text
 from app.database.connection import db
+from app.database.pool import pool_stats, TimedQueuePool
+from app.middleware.cache import get_cache
+from app.middleware.metrics import get_metrics
+from app.middleware.rate_limit import get_rate_limiter, get_admission
 from flask_login import current_user
 
+
+def _metric_families():
+    """(gauges, counters) for /metrics beyond the request metrics: pools, log queue, analytics cache, jobs, limits"""
+    pools = {name or 'default': engine.pool for name, engine in db.engines.items()}
+    timed = {name: pool for name, pool in pools.items() if isinstance(pool, TimedQueuePool)}
+    gauges = [
+        ('db_pool_checked_out', 'Connections checked out of the pool',
+         [({'bind': name}, pool.checkedout()) for name, pool in timed.items()]),
+    ]
+    counters = [
+        ('db_pool_checkouts_total', 'Connection checkouts',
+         [({'bind': name}, pool.checkouts) for name, pool in timed.items()]),
+        ('db_pool_checkout_wait_seconds_total', 'Time spent waiting for a pooled connection',
+         [({'bind': name}, pool.total_wait) for name, pool in timed.items()]),
+        ('db_pool_timeouts_total', 'Checkouts that timed out waiting for a connection',
+         [({'bind': name}, pool.timeouts) for name, pool in timed.items()]),
+    ]
+    log_handler = current_app.extensions.get('log_handler')
+    if log_handler is not None:
+        counters.append(('log_records_dropped_total', 'Log records dropped because the log queue was full',
+                         [({}, log_handler.dropped)]))
+    cache = get_cache()
+    if cache is not None:
+        counters.append(('analytics_cache_hits_total', 'Analytics responses served from the cache', [({}, cache.hits)]))
+        counters.append(('analytics_cache_misses_total', 'Analytics responses computed', [({}, cache.misses)]))
+    scheduler = current_app.extensions.get('jobs')
+    if scheduler is not None:
+        gauges.append(('jobs_running', 'Job runs executing in this process', [({}, scheduler.active)]))
+        counters.append(('job_runs_total', 'Job runs finished in this process, by outcome',
+                         [({'status': status}, scheduler.metrics[status]) for status in ('succeeded', 'failed')]))
+    limiter = get_rate_limiter()
+    if limiter is not None:
+        counters.append(('rate_limited_requests_total', 'Requests answered 429 by the rate limiter, by endpoint',
+                         [({'endpoint': endpoint}, count) for endpoint, count in sorted(limiter.limited.items())]))
+        counters.append(('rate_limit_errors_total', 'Rate limit checks that failed (the request was let through)',
+                         [({}, limiter.errors)]))
+    admission = get_admission()
+    if admission is not None:
+        gauges.append(('admission_in_flight', 'Requests holding an admission slot in this worker',
+                       [({}, admission.in_flight)]))
+        counters.append(('admission_rejected_total', 'Requests shed with 503 because every admission slot was busy',
+                         [({}, admission.rejected)]))
+    return gauges, counters
+
 def init_main_routes(app):
     @app.route('/')
     def hello_sdg():
@@ -17,7 +67,7 @@ def init_main_routes(app):
     def health_check():
         try:
             # Test database connection with SQLAlchemy
-            db.session.execute('SELECT 1')
+            db.session.execute(text('SELECT 1'))
             auth_status = current_user.is_authenticated if hasattr(current_user, 'is_authenticated') else False
             
             return jsonify({
@@ -25,6 +75,7 @@ def init_main_routes(app):
                 'database': 'connected',
                 'authentication': 'active',
                 'user_authenticated': auth_status,
+                'pool': pool_stats(db.engines),
                 'message': 'Water quality monitoring system operational! ✅'
             })
         except Exception as e:
@@ -34,11 +85,20 @@ def init_main_routes(app):
                 'error': str(e)
             }), 500
     
+    @app.route('/metrics')
+    def metrics():
+        """Request timing, pool and cache counters for this worker, in Prometheus text format"""
+        token = current_app.config['METRICS_TOKEN']
+        if token and not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}'):
+            return jsonify({'error': 'Unauthorized'}), 401
+        gauges, counters = _metric_families()
+        return Response(get_metrics().render(gauges, counters), mimetype='text/plain; version=0.0.4')
+    
     @app.route('/api/test-db')
     def test_database():
         """Test database connection"""
         try:
-            db.session.execute('SELECT 1')
+            db.session.execute(text('SELECT 1'))
             return jsonify({
                 'status': 'success',
                 'message': 'Database connection working!'
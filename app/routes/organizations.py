@@ -0,0 +1,78 @@
+from flask import current_app, jsonify, request
+from flask_login import login_required
+from sqlalchemy import func, select
+from app.database.connection import db
+from app.middleware.auth import admin_required
+from app.middleware.cache import invalidate_analytics_cache
+from app.models.organization import Organization, normalize_organization_name
+from app.models.user import User
+
+
+def init_organization_routes(app):
+    @app.route('/api/organizations', methods=['GET'])
+    @login_required
+    @admin_required
+    def list_organizations():
+        """Organizations (tenants) with their user counts, and users waiting to be moved into one (admin only)
+
+        Registration puts everyone in the default organization; `requests`
+        lists the users there who named another organization when they
+        registered.
+        """
+        counts = dict(db.session.execute(
+            select(User.organization_id, func.count()).group_by(User.organization_id)
+        ).all())
+        organizations = [
+            {**organization.to_dict(), 'user_count': counts.get(organization.id, 0)}
+            for organization in Organization.query.order_by(Organization.name).all()
+        ]
+        requests = [
+            {'user_id': user_id, 'name': name, 'email': email, 'organization': organization}
+            for user_id, name, email, organization in db.session.execute(
+                select(User.id, User.name, User.email, User.organization)
+                .where(User.organization_id == Organization.default_id(), User.organization != '',
+                       User.organization != current_app.config['DEFAULT_ORGANIZATION'])
+                .order_by(User.id)
+            )
+        ]
+        return jsonify({'organizations': organizations, 'count': len(organizations), 'requests': requests})
+
+    @app.route('/api/organizations', methods=['POST'])
+    @login_required
+    @admin_required
+    def create_organization():
+        """Create an organization ({"name": ...}); 409 if one with that name exists"""
+        name = ' '.join(str((request.json or {}).get('name') or '').split())
+        if not name:
+            return jsonify({'error': 'name is required'}), 400
+        if len(name) > 100:
+            return jsonify({'error': 'name must be at most 100 characters'}), 400
+        if Organization.query.filter_by(normalized_name=normalize_organization_name(name)).first():
+            return jsonify({'error': f'An organization named {name} already exists'}), 409
+        organization = Organization.resolve(name)
+        db.session.commit()
+        return jsonify({'message': 'Organization created', 'organization': organization.to_dict()}), 201
+
+    @app.route('/api/users/<int:user_id>/organization', methods=['PUT'])
+    @login_required
+    @admin_required
+    def move_user(user_id):
+        """Move a user to another organization ({"organization_id": ...}).
+
+        Readings stay with the organization they were submitted under; only
+        the user's new readings, and what they can see, change.
+        """
+        user = db.session.get(User, user_id)
+        if user is None:
+            return jsonify({'error': 'User not found'}), 404
+        organization_id = (request.json or {}).get('organization_id')
+        if isinstance(organization_id, bool) or not isinstance(organization_id, int):
+            return jsonify({'error': 'organization_id must be an integer'}), 400
+        organization = db.session.get(Organization, organization_id)
+        if organization is None:
+            return jsonify({'error': 'Organization not found'}), 404
+        user.organization_id = organization.id
+        user.organization = organization.name
+        db.session.commit()
+        invalidate_analytics_cache()
+        return jsonify({'message': 'User moved', 'user': user.to_dict()})
\ No newline at end of file
@@ -1,15 +1,351 @@
-from flask import jsonify, request
-from app.database.connection import db
+import base64
+import csv
+import importlib.util
+import io
+import json
+import uuid
+from itertools import chain
+from types import SimpleNamespace
+from datetime import datetime, timezone
+from flask import jsonify, request, current_app, Response, stream_with_context
+from sqlalchemy import select
+from app.database.connection import db, use_read_replica
 from app.models.water_quality import WaterQuality
+from app.models.location import Location
+from app.models.reading_chunk import ReadingChunk
+from app.models.rollup import DailyLocationRollup
+from app.middleware.auth import admin_required
+from app.middleware.cache import invalidate_analytics_cache
+from app.services.series import invalidate_series
+from app.services.serialization import SHAPES, RowSerializer, format_timestamp
+from app.services import scoring
+from app.services.ingest import existing_client_ids, get_ingestor
+from app.services.retention import delete_cold_reading, retention_stats
+from app.services.events import BrokerFull, RESYNC, get_broker, own_predicate, publish_readings, \
+    publish_reading_deleted, visibility_predicate
+from app.services.alerts import evaluate_readings, notify_alerts, reading_ids_needed
+from app.services.tenancy import current_tenant, organization_of, unscoped
 from flask_login import login_required, current_user
 
+# Numeric parameters accepted on a reading
+READING_FIELDS = ('ph_level', 'turbidity_ntu', 'dissolved_oxygen', 'temperature_c', 'conductivity_us')
+
+NDJSON_MIMETYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonlines')
+CSV_MIMETYPES = ('text/csv', 'application/csv')
+
+# Fields a client may request with ?fields= on /api/water/readings, in to_dict() order
+READING_OUTPUT_FIELDS = (
+    'id', 'location_name', 'location_id', 'ph_level', 'turbidity_ntu', 'dissolved_oxygen',
+    'temperature_c', 'conductivity_us', 'timestamp', 'user_id',
+    'total_dissolved_solids', 'status', 'is_public', 'status_color'
+)
+
+
+def _parse_bulk_body():
+    """Split a JSON array, NDJSON or CSV request body into raw reading rows"""
+    mimetype = request.mimetype
+    
+    if mimetype in NDJSON_MIMETYPES:
+        rows = []
+        for line in request.get_data(as_text=True).splitlines():
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except ValueError as e:
+                # Keep the slot so the row number in the error report stays correct
+                rows.append(e)
+        return rows
+    
+    if mimetype in CSV_MIMETYPES:
+        return list(csv.DictReader(io.StringIO(request.get_data(as_text=True))))
+    
+    data = request.get_json()
+    if isinstance(data, dict):
+        data = data.get('readings')
+    if not isinstance(data, list):
+        raise ValueError('Expected a JSON array of readings')
+    return data
+
+
+def _parse_float(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, bool):
+        raise ValueError('must be a number')
+    return float(value)
+
+
+def _parse_bool(value):
+    if isinstance(value, bool):
+        return value
+    if isinstance(value, str) and value.strip().lower() in ('true', '1', 'yes'):
+        return True
+    if isinstance(value, str) and value.strip().lower() in ('false', '0', 'no'):
+        return False
+    raise ValueError('must be a boolean')
+
+
+def _parse_timestamp(value):
+    timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        # Stored timestamps are naive UTC
+        timestamp = timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+    return timestamp
+
+
+def _parse_client_reading_id(value):
+    if value is None or value == '':
+        return None
+    value = str(value).strip()
+    if len(value) > 64:
+        raise ValueError('client_reading_id must be at most 64 characters')
+    return value
+
+
+def _encode_cursor(timestamp, reading_id):
+    payload = json.dumps([timestamp.isoformat() if timestamp else None, reading_id])
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _decode_cursor(cursor):
+    """Decode an opaque cursor back into (timestamp, id), or raise ValueError"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, reading_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (datetime.fromisoformat(timestamp) if timestamp else None), int(reading_id)
+    except Exception:
+        raise ValueError('Invalid cursor')
+
+
+def _parse_fields(value):
+    """Parse ?fields=a,b,c into an ordered tuple of output fields"""
+    if not value:
+        return READING_OUTPUT_FIELDS
+    requested = [field.strip() for field in value.split(',') if field.strip()]
+    unknown = [field for field in requested if field not in READING_OUTPUT_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return tuple(field for field in READING_OUTPUT_FIELDS if field in requested)
+
+
+def _projection_columns(fields):
+    """Names of the columns to select for the requested fields (id/timestamp are always needed for the cursor)"""
+    names = {'id', 'timestamp'}
+    names.update(field for field in fields if field != 'status_color')
+    if 'status_color' in fields:
+        names.add('status')
+    return [name for name in READING_OUTPUT_FIELDS if name in names]
+
+
+def _merge_newest(hot_rows, cold_readings, limit, columns):
+    """Newest-first (timestamp, id) merge of projected hot rows and decoded cold reading dicts, as row tuples"""
+    if not cold_readings:
+        return hot_rows
+    rows = list(hot_rows) + [tuple(reading[name] for name in columns) for reading in cold_readings]
+    timestamp, reading_id = columns.index('timestamp'), columns.index('id')
+    rows.sort(key=lambda row: (row[timestamp], row[reading_id]), reverse=True)
+    return rows[:limit]
+
+
+# Columns written by /api/water/export, in order
+EXPORT_FIELDS = tuple(field for field in READING_OUTPUT_FIELDS if field != 'status_color')
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+
+
+def _export_rows(statement, chunk_size):
+    """Yield lists of row tuples from a server-side cursor, chunk_size rows at a time"""
+    result = db.session.execute(statement.execution_options(yield_per=chunk_size))
+    for partition in result.partitions():
+        yield partition
+
+
+def _export_cold_rows(criteria, since, until, chunk_size):
+    """Compacted readings as export row tuples, in lists of up to chunk_size rows"""
+    rows = []
+    for reading in ReadingChunk.iter_readings(*criteria, since=since, until=until):
+        rows.append(tuple(reading[field] for field in EXPORT_FIELDS))
+        if len(rows) >= chunk_size:
+            yield rows
+            rows = []
+    if rows:
+        yield rows
+
+
+def _format_export_value(field, value):
+    if field == 'timestamp':
+        return format_timestamp(value)
+    return value
+
+
+def _stream_csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_FIELDS)
+    yield buffer.getvalue()
+    for rows in chunks:
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(
+            [_format_export_value(field, value) for field, value in zip(EXPORT_FIELDS, row)]
+            for row in rows
+        )
+        yield buffer.getvalue()
+
+
+def _stream_ndjson(chunks):
+    for rows in chunks:
+        yield ''.join(
+            json.dumps({field: _format_export_value(field, value) for field, value in zip(EXPORT_FIELDS, row)}) + '\n'
+            for row in rows
+        )
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object whose contents are drained after every row group"""
+    def __init__(self):
+        self.chunks = []
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _stream_parquet(chunks):
+    """One Parquet row group per chunk, flushed to the client as it is written"""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    
+    schema = pa.schema([
+        ('id', pa.int64()), ('location_name', pa.string()), ('location_id', pa.int64()), ('ph_level', pa.float64()),
+        ('turbidity_ntu', pa.float64()), ('dissolved_oxygen', pa.float64()),
+        ('temperature_c', pa.float64()), ('conductivity_us', pa.float64()),
+        ('timestamp', pa.timestamp('us')), ('user_id', pa.int64()),
+        ('total_dissolved_solids', pa.float64()), ('status', pa.string()), ('is_public', pa.bool_()),
+    ])
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    for rows in chunks:
+        columns = list(zip(*rows))
+        writer.write_table(pa.Table.from_arrays(
+            [pa.array(column, type=schema.field(i).type) for i, column in enumerate(columns)],
+            schema=schema
+        ))
+        yield sink.drain()
+    writer.close()
+    yield sink.drain()
+
+
+def _validate_bulk_row(raw, user_id, organization_id):
+    """Turn one raw row into column values for WaterQuality, or raise ValueError"""
+    if isinstance(raw, ValueError):
+        raise ValueError(f'Invalid JSON: {raw}')
+    if not isinstance(raw, dict):
+        raise ValueError('Reading must be an object')
+    
+    location_name = str(raw.get('location_name') or '').strip()
+    if not location_name:
+        raise ValueError('location_name is required')
+    
+    row = {'location_name': location_name, 'user_id': user_id, 'organization_id': organization_id}
+    for field in READING_FIELDS:
+        try:
+            row[field] = _parse_float(raw.get(field))
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a number')
+    
+    timestamp = raw.get('timestamp')
+    try:
+        row['timestamp'] = _parse_timestamp(timestamp) if timestamp else datetime.utcnow()
+    except (TypeError, ValueError):
+        raise ValueError('timestamp must be an ISO 8601 date/time')
+    
+    is_public = raw.get('is_public')
+    try:
+        row['is_public'] = True if is_public in (None, '') else _parse_bool(is_public)
+    except ValueError:
+        raise ValueError('is_public must be a boolean')
+    
+    row['client_reading_id'] = _parse_client_reading_id(raw.get('client_reading_id'))
+    return row
+
+
+def _drop_duplicate_rows(rows):
+    """Rows whose client_reading_id is neither stored already nor repeated earlier in the batch"""
+    seen = existing_client_ids(rows)
+    unique_rows = []
+    for row in rows:
+        key = (row['user_id'], row['client_reading_id'])
+        if row['client_reading_id'] is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        unique_rows.append(row)
+    return unique_rows
+
+
+def _score_rows(rows):
+    """Set status and total_dissolved_solids on validated rows, scoring the whole batch at once"""
+    codes = scoring.score_batch(
+        [row['ph_level'] for row in rows],
+        [row['dissolved_oxygen'] for row in rows],
+        [row['turbidity_ntu'] for row in rows]
+    )
+    tds = scoring.nan_to_none(scoring.tds_batch([row['conductivity_us'] for row in rows]))
+    for row, status, row_tds in zip(rows, scoring.status_names(codes), tds):
+        row['status'] = status
+        row['total_dissolved_solids'] = row_tds
+
+
 def init_water_routes(app):
     @app.route('/api/water/reading', methods=['POST'])
     @login_required
     def add_water_reading():
-        """Add a new water quality reading"""
+        """Add a new water quality reading.
+        
+        An optional client_reading_id makes retries safe: a reading already
+        recorded under that ID for this user is not stored twice. In
+        write-behind mode (INGEST_MODE) the reading is validated, journaled
+        and acknowledged with 202; it is stored by the flush worker shortly after.
+        """
         try:
             data = request.json
+            ingestor = get_ingestor()
+            if ingestor is not None:
+                row = _validate_bulk_row(data, current_user.id, organization_of(current_user))
+                row['client_reading_id'] = row['client_reading_id'] or uuid.uuid4().hex
+                row['status'] = WaterQuality.status_for(row['ph_level'], row['dissolved_oxygen'], row['turbidity_ntu'])
+                row['total_dissolved_solids'] = WaterQuality.tds_for(row['conductivity_us'])
+                queued = ingestor.enqueue(row)
+                return jsonify({
+                    'message': 'Water quality reading accepted!' if queued else 'Water quality reading already queued',
+                    'client_reading_id': row['client_reading_id'],
+                    'duplicate': not queued
+                }), 202
+            
+            client_reading_id = _parse_client_reading_id(data.get('client_reading_id'))
+            if client_reading_id is not None:
+                existing = WaterQuality.query.filter_by(user_id=current_user.id, client_reading_id=client_reading_id).first()
+                if existing:
+                    return jsonify({
+                        'message': 'Water quality reading already recorded',
+                        'reading_id': existing.id,
+                        'duplicate': True
+                    })
+            
             reading = WaterQuality(
                 location_name=data.get('location_name'),
                 ph_level=data.get('ph_level'),
@@ -17,11 +353,23 @@ def init_water_routes(app):
                 dissolved_oxygen=data.get('dissolved_oxygen'),
                 temperature_c=data.get('temperature_c'),
                 conductivity_us=data.get('conductivity_us'),
-                user_id=current_user.id  # Link to current user
+                user_id=current_user.id,  # Link to current user
+                organization_id=organization_of(current_user),
+                client_reading_id=client_reading_id
             )
+            reading.before_save()  # Derive status and TDS
+            if reading.location_name:
+                reading.location_id, reading.location_name = Location.resolve([reading.location_name])[reading.location_name]
             
             db.session.add(reading)
+            db.session.flush()  # Assigns the default timestamp
+            DailyLocationRollup.add_readings([reading])
+            alerts = evaluate_readings([reading])
             db.session.commit()
+            invalidate_analytics_cache()
+            invalidate_series([reading])
+            publish_readings([reading])
+            notify_alerts(alerts)
             
             return jsonify({
                 'message': 'Water quality reading added successfully!',
@@ -32,28 +380,271 @@ def init_water_routes(app):
             db.session.rollback()
             return jsonify({'error': str(e)}), 400
     
+    @app.route('/api/water/readings/bulk', methods=['POST'])
+    @login_required
+    def add_water_readings_bulk():
+        """Add many water quality readings in a single transaction.
+        
+        Accepts a JSON array (or {"readings": [...]}), NDJSON or CSV body.
+        Invalid rows are reported back by index and skipped; the valid rows
+        are written with one executemany insert. Rows whose client_reading_id
+        was already recorded are skipped and counted as duplicates.
+        """
+        try:
+            raw_rows = _parse_bulk_body()
+        except Exception as e:
+            return jsonify({'error': f'Could not parse request body: {str(e)}'}), 400
+        
+        max_rows = current_app.config['BULK_INGEST_MAX_ROWS']
+        if len(raw_rows) > max_rows:
+            return jsonify({'error': f'Too many readings in one request (max {max_rows})'}), 413
+        
+        rows = []
+        errors = []
+        organization_id = organization_of(current_user)
+        for index, raw in enumerate(raw_rows):
+            try:
+                rows.append(_validate_bulk_row(raw, current_user.id, organization_id))
+            except ValueError as e:
+                errors.append({'row': index, 'error': str(e)})
+        
+        try:
+            valid_count = len(rows)
+            rows = _drop_duplicate_rows(rows) if rows else rows
+            if rows:
+                _score_rows(rows)
+                Location.link_rows(rows)
+                WaterQuality.insert_rows(rows, with_ids=reading_ids_needed())
+                DailyLocationRollup.add_readings(rows)
+                alerts = evaluate_readings(rows)
+                db.session.commit()
+                invalidate_analytics_cache()
+                invalidate_series(rows)
+                publish_readings(rows)
+                notify_alerts(alerts)
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({'error': str(e)}), 400
+        
+        return jsonify({
+            'message': f'{len(rows)} water quality readings added successfully!',
+            'inserted': len(rows),
+            'duplicates': valid_count - len(rows),
+            'rejected': len(errors),
+            'errors': errors
+        }), 201 if valid_count or not errors else 400
+    
     @app.route('/api/water/readings', methods=['GET'])
     @login_required
     def get_water_readings():
-        """Get all water quality readings for current user"""
+        """Get a page of water quality readings for current user, newest first.
+        
+        Query parameters:
+            limit   - page size (default READINGS_PAGE_SIZE, capped at READINGS_MAX_PAGE_SIZE)
+            cursor  - opaque next_cursor value from the previous page
+            fields  - comma-separated subset of reading fields to return
+            shape   - 'rows' (default, a list of readings) or 'columns'
+                      ({field: [values]}, for charts)
+            since, until - ISO 8601 bounds on timestamp (inclusive)
+            location - exact location_name match
+        """
         try:
-            readings = WaterQuality.query.filter_by(user_id=current_user.id).order_by(WaterQuality.timestamp.desc()).all()
-            result = [reading.to_dict() for reading in readings]
+            page_size = current_app.config['READINGS_PAGE_SIZE']
+            max_page_size = current_app.config['READINGS_MAX_PAGE_SIZE']
+            try:
+                limit = min(max(int(request.args.get('limit', page_size)), 1), max_page_size)
+                fields = _parse_fields(request.args.get('fields'))
+                shape = request.args.get('shape', 'rows')
+                if shape not in SHAPES:
+                    raise ValueError(f"shape must be one of: {', '.join(SHAPES)}")
+                since = _parse_timestamp(request.args['since']) if request.args.get('since') else None
+                until = _parse_timestamp(request.args['until']) if request.args.get('until') else None
+                cursor = _decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            columns = _projection_columns(fields)
+            query = db.session.query(*[getattr(WaterQuality, name) for name in columns])\
+                .filter(WaterQuality.user_id == current_user.id)
+            
+            if since:
+                query = query.filter(WaterQuality.timestamp >= since)
+            if until:
+                query = query.filter(WaterQuality.timestamp <= until)
+            if request.args.get('location'):
+                query = query.filter(WaterQuality.location_name == request.args['location'])
+            if cursor:
+                cursor_timestamp, cursor_id = cursor
+                query = query.filter(
+                    (WaterQuality.timestamp < cursor_timestamp) |
+                    ((WaterQuality.timestamp == cursor_timestamp) & (WaterQuality.id < cursor_id))
+                )
+            
+            # Fetch one extra row to know whether another page exists
+            rows = query.order_by(WaterQuality.timestamp.desc(), WaterQuality.id.desc())\
+                .limit(limit + 1)\
+                .all()
+            
+            # Compacted readings only matter if they are newer than the last hot row fetched
+            criteria = [ReadingChunk.user_id == current_user.id]
+            if request.args.get('location'):
+                criteria.append(ReadingChunk.location_name == request.args['location'])
+            cold = ReadingChunk.newest_readings(
+                *criteria, limit=limit + 1, since=since, until=until, before=cursor,
+                after=(rows[-1].timestamp, rows[-1].id) if len(rows) > limit else None
+            )
+            rows = _merge_newest(rows, cold, limit + 1, columns)
+            
+            next_cursor = None
+            if len(rows) > limit:
+                rows = rows[:limit]
+                last = rows[-1]
+                next_cursor = _encode_cursor(last[columns.index('timestamp')], last[columns.index('id')])
             
             return jsonify({
-                'readings': result,
-                'count': len(result)
+                'readings': RowSerializer(columns, fields).serialize(rows, shape),
+                'count': len(rows),
+                'next_cursor': next_cursor
             })
             
         except Exception as e:
             return jsonify({'error': str(e)}), 500
     
+    @app.route('/api/water/export', methods=['GET'])
+    @login_required
+    def export_water_readings():
+        """Stream readings as CSV, NDJSON or Parquet (?format=, default csv).
+        
+        Researchers and government export everything in their organization
+        (admins: every organization); other users get their own readings plus
+        their organization's public ones. Rows are read through a
+        server-side cursor, so memory stays flat regardless of export size.
+        Accepts the same since/until/location filters as /api/water/readings.
+        """
+        use_read_replica()
+        export_format = request.args.get('format', 'csv')
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({'error': f"format must be one of: {', '.join(EXPORT_FORMATS)}"}), 400
+        if export_format == 'parquet':
+            if importlib.util.find_spec('pyarrow') is None:
+                return jsonify({'error': 'Parquet export requires the pyarrow package'}), 501
+        
+        try:
+            since = _parse_timestamp(request.args['since']) if request.args.get('since') else None
+            until = _parse_timestamp(request.args['until']) if request.args.get('until') else None
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        statement = select(*[getattr(WaterQuality, field) for field in EXPORT_FIELDS])
+        if not current_user.can_view_all_data():
+            statement = statement.where(
+                (WaterQuality.user_id == current_user.id) | 
+                (WaterQuality.is_public == True)
+            )
+        if since:
+            statement = statement.where(WaterQuality.timestamp >= since)
+        if until:
+            statement = statement.where(WaterQuality.timestamp <= until)
+        if request.args.get('location'):
+            statement = statement.where(WaterQuality.location_name == request.args['location'])
+        # Primary-key order streams straight off the table; ordering by timestamp would sort everything first
+        statement = statement.order_by(WaterQuality.id)
+        
+        # Compacted (older) readings first, then the hot table
+        cold_criteria = [ReadingChunk.visible_to(current_user)]
+        if request.args.get('location'):
+            cold_criteria.append(ReadingChunk.location_name == request.args['location'])
+        chunk_size = current_app.config['EXPORT_CHUNK_SIZE']
+        chunks = chain(_export_cold_rows(cold_criteria, since, until, chunk_size), _export_rows(statement, chunk_size))
+        stream = {'csv': _stream_csv, 'ndjson': _stream_ndjson, 'parquet': _stream_parquet}[export_format]
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        
+        return Response(
+            stream_with_context(stream(chunks)),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=water_readings.{extension}'}
+        )
+    
+    @app.route('/api/water/stream', methods=['GET'])
+    @login_required
+    def stream_readings():
+        """Server-Sent Events feed of new and deleted readings.
+        
+        ?scope=visible (default) follows the same visibility rules as the REST
+        API; ?scope=own only the current user's readings. Events: 'reading'
+        (to_dict() shape), 'reading_deleted' ({"id"}) and 'resync' when the
+        client fell behind and should refetch. Reconnects resume from
+        Last-Event-ID while the event is still in the replay buffer. 404
+        unless LIVE_FEED_ENABLED.
+        """
+        if not current_app.config['LIVE_FEED_ENABLED']:
+            return jsonify({'error': 'The live feed is not enabled'}), 404
+        scope = request.args.get('scope', 'visible')
+        if scope == 'own':
+            predicate = own_predicate(current_user.id)
+        elif scope == 'visible':
+            predicate = visibility_predicate(current_user.id, current_user.can_view_all_data(), current_tenant())
+        else:
+            return jsonify({'error': "scope must be 'visible' or 'own'"}), 400
+        
+        last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+        try:
+            last_event_id = int(last_event_id) if last_event_id else None
+        except ValueError:
+            last_event_id = None
+        
+        broker = get_broker()
+        try:
+            subscriber = broker.subscribe(predicate, last_event_id)
+        except BrokerFull as e:
+            response = jsonify({'error': str(e)})
+            response.status_code = 503
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        
+        heartbeat = current_app.config['SSE_HEARTBEAT_SECONDS']
+        retry_ms = current_app.config['SSE_RETRY_AFTER'] * 1000
+        
+        # The generator runs after the request context (and its DB session) is
+        # gone, so a stream holds no pooled connection while it waits
+        def generate():
+            try:
+                yield f'retry: {retry_ms}\n\n'
+                while True:
+                    event = subscriber.next_event(heartbeat)
+                    if event is None:
+                        yield ': keepalive\n\n'
+                    elif event is RESYNC:
+                        yield 'event: resync\ndata: {}\n\n'
+                        return
+                    else:
+                        yield event.frame
+            finally:
+                broker.unsubscribe(subscriber)
+        
+        return Response(generate(), mimetype='text/event-stream', headers={
+            'Cache-Control': 'no-cache',
+            # Stop nginx-style proxies from buffering the stream
+            'X-Accel-Buffering': 'no'
+        })
+    
     @app.route('/api/water/public-readings', methods=['GET'])
     def get_public_readings():
-        """Get public water quality readings (no authentication required)"""
+        """Get public water quality readings (no authentication required), from every organization"""
         try:
-            readings = WaterQuality.query.order_by(WaterQuality.timestamp.desc()).limit(10).all()
-            result = [reading.to_dict() for reading in readings]
+            columns = _projection_columns(READING_OUTPUT_FIELDS)
+            with unscoped():
+                rows = db.session.query(*[getattr(WaterQuality, name) for name in columns])\
+                    .filter(WaterQuality.is_public == True)\
+                    .order_by(WaterQuality.timestamp.desc())\
+                    .limit(10)\
+                    .all()
+                if len(rows) < 10:
+                    # Not enough recent readings; top up from the compacted tier
+                    cold = ReadingChunk.newest_readings(ReadingChunk.is_public == True, limit=10 - len(rows),
+                                                        before=(rows[-1].timestamp, rows[-1].id) if rows else None)
+                    rows += [tuple(reading[name] for name in columns) for reading in cold]
+            result = RowSerializer(columns, READING_OUTPUT_FIELDS).rows(rows)
             
             return jsonify({
                 'readings': result,
@@ -72,7 +663,20 @@ def init_water_routes(app):
             # Find the reading
             reading = WaterQuality.query.get(reading_id)
             if not reading:
-                return jsonify({'error': 'Reading not found'}), 404
+                # Possibly compacted; only the author's chunks are searched
+                deleted = delete_cold_reading(reading_id, current_user.id)
+                if not deleted:
+                    return jsonify({'error': 'Reading not found'}), 404
+                deleted = SimpleNamespace(**deleted)
+                DailyLocationRollup.remove_readings([deleted])
+                db.session.commit()
+                invalidate_analytics_cache()
+                invalidate_series([deleted])
+                publish_reading_deleted(deleted)
+                return jsonify({
+                    'message': 'Water reading deleted successfully!',
+                    'deleted_id': reading_id
+                })
             
             # Check if the reading belongs to the current user
             if reading.user_id != current_user.id:
@@ -80,7 +684,12 @@ def init_water_routes(app):
             
             # Delete the reading
             db.session.delete(reading)
+            db.session.flush()
+            DailyLocationRollup.remove_readings([reading])
             db.session.commit()
+            invalidate_analytics_cache()
+            invalidate_series([reading])
+            publish_reading_deleted(reading)
             
             return jsonify({
                 'message': 'Water reading deleted successfully!',
@@ -90,3 +699,31 @@ def init_water_routes(app):
         except Exception as e:
             db.session.rollback()
             return jsonify({'error': f'Failed to delete reading: {str(e)}'}), 400
+
+    @app.route('/api/water/ingest-stats', methods=['GET'])
+    @login_required
+    @admin_required
+    def ingest_stats():
+        """Write-behind queue depth, flush latency and replay counters for this worker (admin only)"""
+        ingestor = get_ingestor()
+        if ingestor is None:
+            return jsonify({'mode': current_app.config['INGEST_MODE']})
+        return jsonify({'mode': current_app.config['INGEST_MODE'], **ingestor.stats()})
+    
+    @app.route('/api/water/retention-stats', methods=['GET'])
+    @login_required
+    @admin_required
+    def get_retention_stats():
+        """Hot/cold tier sizes and the compressed bytes per compacted reading (admin only)"""
+        return jsonify({
+            'hot_days': current_app.config['READINGS_HOT_DAYS'],
+            'retention_days': current_app.config['READINGS_RETENTION_DAYS'],
+            **retention_stats()
+        })
+    
+    @app.route('/api/water/stream-stats', methods=['GET'])
+    @login_required
+    @admin_required
+    def stream_stats():
+        """Live feed subscriber and event counters for this worker (admin only)"""
+        return jsonify(get_broker().stats())
\ No newline at end of file
@@ -0,0 +1,379 @@
+import importlib
+import json
+import logging
+import operator
+import threading
+import time
+import urllib.request
+from collections import deque
+from itertools import chain
+from flask import current_app
+from app.database.connection import insert_rows
+from app.services.tenancy import fill_organization_ids
+
+logger = logging.getLogger(__name__)
+
+OPERATORS = {'>': operator.gt, '>=': operator.ge, '<': operator.lt, '<=': operator.le}
+
+# Label and unit used in alert messages
+PARAMETER_DISPLAY = {
+    'ph_level': ('pH', ''),
+    'turbidity_ntu': ('Turbidity', ' NTU'),
+    'dissolved_oxygen': ('Dissolved oxygen', ' mg/L'),
+    'temperature_c': ('Temperature', '°C'),
+    'conductivity_us': ('Conductivity', ' μS/cm')
+}
+
+
+class RuleState:
+    """Everything a rule remembers about one location: O(1), or O(window) for rolling means"""
+    __slots__ = ('signature', 'active', 'last_value', 'last_timestamp', 'streak', 'values', 'total')
+
+    def __init__(self, signature):
+        self.signature = signature
+        self.active = False
+        self.last_value = None
+        self.last_timestamp = None
+        self.streak = 0
+        self.values = None
+        self.total = 0.0
+
+
+class CompiledRule:
+    """An AlertRule turned into plain attributes and a comparison function, built once per load"""
+    __slots__ = ('id', 'name', 'parameter', 'kind', 'operator', 'compare', 'threshold', 'window',
+                 'location_name', 'organization_id', 'severity', 'signature')
+
+    def __init__(self, rule):
+        self.id = rule.id
+        self.name = rule.name
+        self.parameter = rule.parameter
+        self.kind = rule.kind
+        self.operator = rule.operator
+        self.compare = OPERATORS[rule.operator]
+        self.threshold = rule.threshold
+        self.window = max(1, rule.window or 1)
+        self.location_name = rule.location_name
+        self.organization_id = rule.organization_id
+        self.severity = rule.severity
+        # Saved state only applies while the rule means the same thing
+        self.signature = f'{rule.parameter}:{rule.kind}:{rule.operator}:{rule.threshold!r}:{self.window}'
+
+    def step(self, state, value, timestamp):
+        """Fold one reading into the state; returns (matched, observed value)"""
+        observed = value
+        if self.kind == 'threshold':
+            matched = self.compare(value, self.threshold)
+        elif self.kind == 'rate_of_change':
+            matched = False
+            if state.last_timestamp is not None and timestamp > state.last_timestamp:
+                hours = (timestamp - state.last_timestamp).total_seconds() / 3600
+                observed = (value - state.last_value) / hours
+                matched = self.compare(observed, self.threshold)
+        elif self.kind == 'consecutive':
+            state.streak = state.streak + 1 if self.compare(value, self.threshold) else 0
+            matched = state.streak >= self.window
+        else:  # rolling_mean
+            if state.values is None:
+                state.values = deque(maxlen=self.window)
+            if len(state.values) == self.window:
+                state.total -= state.values[0]
+            state.values.append(value)
+            state.total += value
+            observed = state.total / len(state.values)
+            matched = len(state.values) == self.window and self.compare(observed, self.threshold)
+        state.last_value = value
+        state.last_timestamp = timestamp
+        return matched, observed
+
+    def describe(self, location_name, observed):
+        label, unit = PARAMETER_DISPLAY[self.parameter]
+        if self.kind == 'rate_of_change':
+            what = f'{label} changing at {observed:.2f}{unit}/h'
+            limit = f'{self.threshold}{unit}/h'
+        elif self.kind == 'consecutive':
+            what = f'{label} {self.operator} {self.threshold}{unit} for {self.window} readings in a row'
+            return f'{self.name}: {what} at {location_name} (latest {observed:.2f}{unit})'
+        elif self.kind == 'rolling_mean':
+            what = f'{label} averaging {observed:.2f}{unit} over {self.window} readings'
+            limit = f'{self.threshold}{unit}'
+        else:
+            what = f'{label} {observed:.2f}{unit}'
+            limit = f'{self.threshold}{unit}'
+        return f'{self.name}: {what} at {location_name} ({self.operator} {limit})'
+
+
+class AlertEngine:
+    """Evaluates readings against the enabled rules as they are stored.
+
+    Rules are compiled once and indexed by location, so a reading is only
+    checked against the rules for its location plus the site-wide ones, and
+    a rule that belongs to an organization only matches that organization's
+    readings. Each (rule, location, organization) keeps a small RuleState,
+    so no history is queried: the states a batch touches are read (and
+    locked) from alert_rule_state and written back in the batch's own
+    transaction. A rolled-back write therefore never advances a streak, and
+    every worker continues the same one.
+    An alert is raised when a rule starts matching and not again until it
+    has stopped matching. Rules reload every ALERT_RULES_TTL seconds, or
+    immediately after local edits.
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._rules_by_location = {}
+        self._global_rules = []
+        self._rules_by_id = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._loaded_at = None
+
+    def _ensure_loaded(self):
+        if self._loaded_at is not None and time.monotonic() - self._loaded_at < self.ttl:
+            return
+        from app.models.alert import AlertRule
+        from app.services.tenancy import unscoped
+        with unscoped():  # every organization's rules, whoever's request triggers the reload
+            rules = [CompiledRule(rule) for rule in AlertRule.query.filter_by(enabled=True).all()]
+        self.load(rules)
+
+    def load(self, rules):
+        by_location, global_rules = {}, []
+        for rule in rules:
+            if rule.location_name:
+                by_location.setdefault(rule.location_name, []).append(rule)
+            else:
+                global_rules.append(rule)
+        with self._lock:
+            self._rules_by_location = by_location
+            self._global_rules = global_rules
+            self._rules_by_id = {rule.id: rule for rule in rules}
+            self._loaded_at = time.monotonic()
+
+    def has_rules(self):
+        self._ensure_loaded()
+        return bool(self._global_rules or self._rules_by_location)
+
+    def rule_count(self):
+        return len(self._global_rules) + sum(len(rules) for rules in self._rules_by_location.values())
+
+    def evaluate(self, readings):
+        """New alerts (as Alert column dicts) for readings given as dicts or WaterQuality objects"""
+        if not self.has_rules():
+            return []
+        readings = [
+            reading if isinstance(reading, dict) else {name: getattr(reading, name) for name in _READING_ATTRIBUTES}
+            for reading in readings
+        ]
+        fill_organization_ids(readings)
+        readings.sort(key=lambda reading: reading['timestamp'])
+        with self._lock:
+            rules_by_id = self._rules_by_id
+        alerts, states = self.evaluate_rows(readings, self._load_states(readings, rules_by_id))
+        if states:
+            self._save_states(states)
+        return alerts
+
+    @staticmethod
+    def _load_states(readings, rules_by_id):
+        """Saved RuleStates for the readings' locations and organizations, by (rule id, location, organization)"""
+        from app.models.alert import AlertRuleState
+        states = {}
+        rows = AlertRuleState.load(
+            {reading['location_name'] for reading in readings}, {reading['organization_id'] for reading in readings}
+        )
+        for row in rows:
+            rule = rules_by_id.get(row.rule_id)
+            if rule is None or row.signature != rule.signature:
+                continue  # the rule was disabled or changed since; start over
+            state = RuleState(row.signature)
+            state.active = row.active
+            state.last_value = row.last_value
+            state.last_timestamp = row.last_timestamp
+            state.streak = row.streak
+            if row.recent_values is not None:
+                state.values = deque(json.loads(row.recent_values), maxlen=rule.window)
+                state.total = sum(state.values)
+            states[(row.rule_id, row.location_name, row.organization_id)] = state
+        return states
+
+    @staticmethod
+    def _save_states(states):
+        from app.models.alert import AlertRuleState
+        AlertRuleState.save([{
+            'rule_id': rule_id,
+            'location_name': location_name,
+            'organization_id': organization_id,
+            'signature': state.signature,
+            'active': state.active,
+            'last_value': state.last_value,
+            'last_timestamp': state.last_timestamp,
+            'streak': state.streak,
+            'recent_values': json.dumps(list(state.values)) if state.values is not None else None
+        } for (rule_id, location_name, organization_id), state in states.items()])
+
+    def evaluate_rows(self, readings, saved):
+        """evaluate() for row dicts already in timestamp order, continuing from the `saved` states.
+
+        Returns (alerts, the states the readings advanced, by key).
+        """
+        alerts = []
+        states = {}
+        no_rules = ()
+        with self._lock:
+            rules_by_location, global_rules = self._rules_by_location, self._global_rules
+        for reading in readings:
+            location_name = reading['location_name']
+            timestamp = reading['timestamp']
+            for rule in chain(rules_by_location.get(location_name, no_rules), global_rules):
+                value = reading.get(rule.parameter)
+                if value is None:
+                    continue
+                if rule.organization_id is not None and reading['organization_id'] != rule.organization_id:
+                    continue
+                # Organizations sharing a site don't share rule state
+                key = (rule.id, location_name, reading['organization_id'])
+                state = states.get(key)
+                if state is None:
+                    state = states[key] = saved.get(key) or RuleState(rule.signature)
+                if state.last_timestamp is not None and timestamp < state.last_timestamp:
+                    continue  # late arrival; the state has already moved past it
+                matched, observed = rule.step(state, value, timestamp)
+                if matched and not state.active:
+                    alerts.append({
+                        'rule_id': rule.id,
+                        'reading_id': reading.get('id'),
+                        'location_name': location_name,
+                        'parameter': rule.parameter,
+                        'value': value,
+                        'severity': rule.severity,
+                        'message': rule.describe(location_name, observed),
+                        'user_id': reading['user_id'],
+                        'is_public': reading.get('is_public'),
+                        'organization_id': reading.get('organization_id'),
+                        'triggered_at': timestamp
+                    })
+                state.active = matched
+        return alerts, states
+
+
+_READING_ATTRIBUTES = (
+    'id', 'location_name', 'timestamp', 'user_id', 'is_public', 'organization_id',
+    'ph_level', 'turbidity_ntu', 'dissolved_oxygen', 'temperature_c', 'conductivity_us'
+)
+
+
+class LogNotifier:
+    def __init__(self, config):
+        pass
+
+    def notify(self, alerts):
+        for alert in alerts:
+            logger.warning(alert['message'], extra={'severity': alert['severity'], 'rule_id': alert['rule_id']})
+
+
+class StreamNotifier:
+    """Pushes 'alert' events to the live feed, with the same visibility as the reading"""
+    def __init__(self, config):
+        pass
+
+    def notify(self, alerts):
+        from app.services.events import get_broker
+        broker = get_broker()
+        for alert in alerts:
+            broker.publish('alert', alert, alert['user_id'], alert['is_public'], alert['organization_id'])
+
+
+class WebhookNotifier:
+    """POSTs each batch of alerts as JSON to ALERT_WEBHOOK_URL from a background thread"""
+    def __init__(self, config):
+        self.url = config.get('ALERT_WEBHOOK_URL')
+        if not self.url:
+            raise RuntimeError("The 'webhook' alert notifier requires ALERT_WEBHOOK_URL")
+
+    def notify(self, alerts):
+        threading.Thread(target=self._post, args=(alerts,), daemon=True).start()
+
+    def _post(self, alerts):
+        request = urllib.request.Request(
+            self.url, data=json.dumps({'alerts': alerts}).encode('utf-8'),
+            headers={'Content-Type': 'application/json'}, method='POST'
+        )
+        try:
+            urllib.request.urlopen(request, timeout=10).close()
+        except Exception as e:
+            logger.warning('Alert webhook failed: %s', e)
+
+
+# Names usable in ALERT_NOTIFIERS; anything else is imported as 'package.module:ClassName'
+NOTIFIERS = {'log': LogNotifier, 'stream': StreamNotifier, 'webhook': WebhookNotifier}
+
+
+def _load_notifier(name, config):
+    notifier_class = NOTIFIERS.get(name)
+    if notifier_class is None:
+        module_name, _, class_name = name.partition(':')
+        notifier_class = getattr(importlib.import_module(module_name), class_name)
+    return notifier_class(config)
+
+
+def init_alerts(app):
+    app.extensions['alert_engine'] = AlertEngine(app.config['ALERT_RULES_TTL'])
+    names = [name.strip() for name in app.config['ALERT_NOTIFIERS'].split(',') if name.strip()]
+    app.extensions['alert_notifiers'] = [_load_notifier(name, app.config) for name in names]
+
+
+def get_engine():
+    return current_app.extensions['alert_engine']
+
+
+def reading_ids_needed():
+    """Whether newly inserted rows need their ids (live feed listeners or alert rules)"""
+    from app.services.events import get_broker
+    return get_broker().has_subscribers() or get_engine().has_rules()
+
+
+def evaluate_readings(readings):
+    """Evaluate readings inserted in the current transaction and add any alerts to it.
+
+    Call after the readings are flushed and before commit; pass the result
+    (alert column dicts) to notify_alerts() once committed.
+    """
+    from app.models.alert import Alert
+    alerts = get_engine().evaluate(readings)
+    if alerts:
+        insert_rows(Alert, alerts, with_ids=True)
+    return alerts
+
+
+def _alert_payload(values):
+    """Alert.to_dict() shape for an inserted alert row"""
+    triggered_at = values['triggered_at']
+    return {
+        'id': values.get('id'),
+        'rule_id': values['rule_id'],
+        'reading_id': values['reading_id'],
+        'location_name': values['location_name'],
+        'parameter': values['parameter'],
+        'value': values['value'],
+        'severity': values['severity'],
+        'message': values['message'],
+        'user_id': values['user_id'],
+        'is_public': values['is_public'],
+        'organization_id': values.get('organization_id'),
+        'triggered_at': triggered_at.strftime('%Y-%m-%d %H:%M:%S') if triggered_at else None,
+        'acknowledged_at': None,
+        'acknowledged_by': None
+    }
+
+
+def notify_alerts(alerts):
+    if not alerts:
+        return
+    payload = [_alert_payload(values) for values in alerts]
+    for notifier in current_app.extensions['alert_notifiers']:
+        try:
+            notifier.notify(payload)
+        except Exception:
+            logger.exception('Alert notifier %s failed', type(notifier).__name__)
\ No newline at end of file
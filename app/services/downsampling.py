@@ -0,0 +1,54 @@
+def lttb_indices(x, series, threshold):
+    """Pick `threshold` indices that preserve the visual shape of one or more series.
+
+    Largest-Triangle-Three-Buckets (Steinarsson, 2013) generalised to several
+    series sharing one x axis: a candidate's score is the sum of its triangle
+    areas across series, each series normalised by its value range so no
+    parameter dominates because of its units. First and last points are
+    always kept. Returns the sorted list of selected indices.
+    """
+    n = len(x)
+    if threshold >= n or n <= 2:
+        return list(range(n))
+    if threshold < 3:
+        raise ValueError('threshold must be at least 3')
+
+    scales = []
+    for values in series:
+        span = max(values) - min(values)
+        scales.append(1.0 / span if span else 0.0)
+
+    selected = [0]
+    previous = 0
+    bucket_size = (n - 2) / (threshold - 2)
+
+    for bucket in range(threshold - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+
+        # Average point of the next bucket is the third triangle vertex
+        next_start = end
+        next_end = min(int((bucket + 2) * bucket_size) + 1, n)
+        if next_start >= n - 1 or next_end <= next_start:
+            next_start, next_end = n - 1, n
+        next_count = next_end - next_start
+        avg_x = sum(x[next_start:next_end]) / next_count
+        avg_y = [sum(values[next_start:next_end]) / next_count for values in series]
+
+        best_index = start
+        best_area = -1.0
+        px = x[previous]
+        for index in range(start, end):
+            area = 0.0
+            for values, scale, ay in zip(series, scales, avg_y):
+                py = values[previous]
+                area += abs((px - avg_x) * (values[index] - py) - (px - x[index]) * (ay - py)) * scale
+            if area > best_area:
+                best_area = area
+                best_index = index
+
+        selected.append(best_index)
+        previous = best_index
+
+    selected.append(n - 1)
+    return selected
@@ -0,0 +1,380 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from flask import current_app
+from app.services.serialization import format_timestamp
+
+logger = logging.getLogger(__name__)
+
+
+class BrokerFull(Exception):
+    """Raised when a worker already holds SSE_MAX_CLIENTS live streams"""
+    def __init__(self, retry_after):
+        super().__init__('Too many live streams, retry shortly')
+        self.retry_after = retry_after
+
+
+# Returned by Subscriber.next_event() when the client fell behind and must refetch
+RESYNC = object()
+
+
+class Event:
+    """A published event, serialized once as an SSE frame and shared by all subscribers"""
+    __slots__ = ('seq', 'type', 'user_id', 'is_public', 'organization_id', 'frame')
+
+    def __init__(self, seq, event_type, user_id, is_public, organization_id, data):
+        self.seq = seq
+        self.type = event_type
+        self.user_id = user_id
+        self.is_public = is_public
+        self.organization_id = organization_id
+        # data arrives as JSON text from the event log
+        self.frame = f'id: {seq}\nevent: {event_type}\ndata: {data}\n\n'
+
+
+class Subscriber:
+    """One live stream: a bounded queue filled by publishers and drained by the response generator.
+
+    Publishing never waits on a client. If a slow client lets `max_queued`
+    events pile up, its queue is dropped and the client is told to resync
+    (refetch over the REST API) instead of holding memory or stalling others.
+    Events up to `after` (where the stream started or resumed) are ignored.
+    """
+    def __init__(self, predicate, max_queued):
+        self.predicate = predicate
+        self.max_queued = max_queued
+        self.after = 0
+        self.overflowed = False
+        self._events = deque()
+        self._ready = threading.Condition()
+
+    def offer(self, event):
+        if event.seq <= self.after:
+            return
+        if event.type == RESYNC_MARKER:
+            with self._ready:
+                self.overflowed = True
+                self._events.clear()
+                self._ready.notify()
+            return
+        if not self.predicate(event):
+            return
+        with self._ready:
+            if self.overflowed:
+                return
+            if len(self._events) >= self.max_queued:
+                self.overflowed = True
+                self._events.clear()
+            else:
+                self._events.append(event)
+            self._ready.notify()
+
+    def next_event(self, timeout):
+        """Next event, RESYNC, or None if nothing arrived within `timeout` seconds"""
+        with self._ready:
+            self._ready.wait_for(lambda: self._events or self.overflowed, timeout)
+            if self.overflowed:
+                return RESYNC
+            return self._events.popleft() if self._events else None
+
+
+# Event log entry standing for changes that were not published (nobody was listening)
+RESYNC_MARKER = 'resync'
+
+EVENT_LOG_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS event (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        type TEXT NOT NULL,
+        user_id INTEGER,
+        is_public INTEGER,
+        organization_id INTEGER,
+        data TEXT NOT NULL
+    )""",
+    """CREATE TABLE IF NOT EXISTS listener (
+        pid INTEGER PRIMARY KEY,
+        expires_at REAL NOT NULL
+    )""",
+)
+
+
+class EventLog:
+    """The last `keep` live feed events in an SQLite file shared by the workers on this host.
+
+    seq is the SSE event id, so it is the same whichever worker a stream
+    is attached to. Workers with open streams register as listeners so
+    publishers on any worker know whether events are wanted.
+    """
+    def __init__(self, path, keep):
+        self.path = path
+        self.keep = keep
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        for statement in EVENT_LOG_SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # Losing recent events in a crash only makes clients resync
+            connection.execute('PRAGMA synchronous=OFF')
+            self._local.connection = connection
+        return connection
+
+    def append(self, events):
+        """Store (type, user_id, is_public, organization_id, data) tuples in order, dropping old events"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            cursor = connection.executemany(
+                'INSERT INTO event (type, user_id, is_public, organization_id, data) VALUES (?, ?, ?, ?, ?)', events
+            )
+            connection.execute(
+                'DELETE FROM event WHERE seq <= (SELECT MAX(seq) FROM event) - ?', (self.keep,)
+            )
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return cursor.rowcount
+
+    def mark_unpublished(self):
+        """Append a resync marker unless the newest event already is one"""
+        self._connection().execute(
+            'INSERT INTO event (type, data) SELECT ?, ? '
+            'WHERE (SELECT type FROM event ORDER BY seq DESC LIMIT 1) IS NOT ?',
+            (RESYNC_MARKER, '{}', RESYNC_MARKER)
+        )
+
+    def last_seq(self):
+        return self._connection().execute('SELECT COALESCE(MAX(seq), 0) FROM event').fetchone()[0]
+
+    def read(self, after, until=None, limit=None):
+        """Events with after < seq (<= until), oldest first"""
+        rows = self._connection().execute(
+            'SELECT seq, type, user_id, is_public, organization_id, data FROM event '
+            'WHERE seq > ? AND seq <= ? ORDER BY seq LIMIT ?',
+            (after, until if until is not None else 2 ** 62, limit if limit is not None else -1)
+        )
+        return [Event(seq, event_type, user_id, is_public, organization_id, data)
+                for seq, event_type, user_id, is_public, organization_id, data in rows]
+
+    def touch_listener(self, ttl):
+        self._connection().execute(
+            'INSERT OR REPLACE INTO listener (pid, expires_at) VALUES (?, ?)', (os.getpid(), time.time() + ttl)
+        )
+
+    def remove_listener(self):
+        self._connection().execute('DELETE FROM listener WHERE pid = ?', (os.getpid(),))
+
+    def has_listeners(self):
+        return self._connection().execute(
+            'SELECT 1 FROM listener WHERE expires_at > ? LIMIT 1', (time.time(),)
+        ).fetchone() is not None
+
+
+class EventBroker:
+    """Pub/sub for the live feed, across the workers on this host.
+
+    publish() appends to the shared EventLog; every worker with open streams
+    polls it each `poll_interval` seconds and hands new events to its own
+    subscribers. A stream therefore sees changes made through any worker,
+    and a reconnecting EventSource resumes from its Last-Event-ID on
+    whichever worker it lands, while the event is among the log's last ones.
+    Without a log (LIVE_FEED_ENABLED off) nothing is published.
+    """
+    def __init__(self, log, max_subscribers, max_queued, poll_interval, retry_after):
+        self.log = log
+        self.max_subscribers = max_subscribers
+        self.max_queued = max_queued
+        self.poll_interval = poll_interval
+        self.retry_after = retry_after
+        # A listener entry outlives a few slow polls, and a dead worker's expires
+        self.listener_ttl = max(10.0, poll_interval * 10)
+        self._subscribers = set()
+        self._cursor = 0
+        self._lock = threading.Lock()
+        self._active = threading.Condition(self._lock)
+        self._poller = None
+        self._poller_pid = None
+        self.published = 0
+        self.dropped_subscribers = 0
+
+    def subscribe(self, predicate, last_event_id=None):
+        subscriber = Subscriber(predicate, self.max_queued)
+        with self._lock:
+            if len(self._subscribers) >= self.max_subscribers:
+                raise BrokerFull(self.retry_after)
+            if not self._subscribers:
+                # The poller was idle: start from the log's current end
+                self._cursor = self.log.last_seq()
+                self.log.touch_listener(self.listener_ttl)
+            subscriber.after = self._cursor if last_event_id is None else last_event_id
+            if last_event_id is not None and last_event_id < self._cursor:
+                missed = self.log.read(last_event_id, until=self._cursor)
+                if not missed or missed[0].seq != last_event_id + 1:
+                    # Older than the log keeps: the client has to refetch
+                    subscriber.overflowed = True
+                for event in missed:
+                    subscriber.offer(event)
+            elif last_event_id is not None and last_event_id > self.log.last_seq():
+                # From before the log was reset
+                subscriber.overflowed = True
+            self._subscribers.add(subscriber)
+            self._active.notify()
+            self._ensure_polling()
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+            if subscriber.overflowed:
+                self.dropped_subscribers += 1
+
+    def _ensure_polling(self):
+        # Threads don't survive a fork
+        if self._poller_pid == os.getpid() and self._poller.is_alive():
+            return
+        self._poller = threading.Thread(target=self._poll, name='live-feed-poll', daemon=True)
+        self._poller_pid = os.getpid()
+        self._poller.start()
+
+    def _poll(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    self.log.remove_listener()
+                    while not self._subscribers:
+                        self._active.wait()
+                cursor = self._cursor
+            try:
+                self.log.touch_listener(self.listener_ttl)
+                events = self.log.read(cursor, limit=self.max_queued)
+            except sqlite3.Error:
+                logger.exception('Live feed poll failed')
+                events = []
+            with self._lock:
+                events = [event for event in events if event.seq > self._cursor]
+                if events:
+                    self._cursor = events[-1].seq
+                subscribers = list(self._subscribers)
+            for event in events:
+                for subscriber in subscribers:
+                    subscriber.offer(event)
+            if len(events) < self.max_queued:
+                time.sleep(self.poll_interval)
+
+    def publish(self, event_type, data, user_id, is_public, organization_id=None):
+        self.publish_all([(event_type, data, user_id, is_public, organization_id)])
+
+    def publish_all(self, events):
+        """Publish (event_type, data, user_id, is_public, organization_id) tuples in order"""
+        if self.log is None:
+            return
+        self.log.append([
+            (event_type, user_id, is_public, organization_id, json.dumps(data))
+            for event_type, data, user_id, is_public, organization_id in events
+        ])
+        self.published += len(events)
+
+    def has_subscribers(self):
+        """Whether a stream is open on any worker of this host"""
+        if self.log is None:
+            return False
+        return bool(self._subscribers) or self.log.has_listeners()
+
+    def skip(self):
+        """Record unpublished changes: reconnecting clients resync instead of resuming"""
+        if self.log is not None:
+            self.log.mark_unpublished()
+
+    def stats(self):
+        return {
+            'subscribers': len(self._subscribers),
+            'published': self.published,
+            'dropped_subscribers': self.dropped_subscribers,
+            'last_event_id': self._cursor
+        }
+
+
+def init_events(app):
+    log = None
+    if app.config['LIVE_FEED_ENABLED']:
+        log = EventLog(app.config['SSE_EVENT_LOG_PATH'], app.config['SSE_REPLAY_EVENTS'])
+    app.extensions['event_broker'] = EventBroker(
+        log,
+        max_subscribers=app.config['SSE_MAX_CLIENTS'],
+        max_queued=app.config['SSE_CLIENT_QUEUE_SIZE'],
+        poll_interval=app.config['SSE_POLL_INTERVAL'],
+        retry_after=app.config['SSE_RETRY_AFTER']
+    )
+
+
+def get_broker():
+    return current_app.extensions['event_broker']
+
+
+def visibility_predicate(user_id, view_all, organization_id=None):
+    """Same visibility as the REST API: everything, or the user's own plus public readings,
+    within organization_id unless it is None (unscoped)"""
+    if organization_id is None:
+        if view_all:
+            return lambda event: True
+        return lambda event: event.user_id == user_id or bool(event.is_public)
+    if view_all:
+        return lambda event: event.organization_id == organization_id
+    return lambda event: event.organization_id == organization_id and (event.user_id == user_id or bool(event.is_public))
+
+
+def own_predicate(user_id):
+    return lambda event: event.user_id == user_id
+
+
+def _reading_payload(reading):
+    """to_dict()-shaped payload for a WaterQuality object or an inserted row dict"""
+    if not isinstance(reading, dict):
+        return reading.to_dict()
+    from app.models.water_quality import WaterQuality
+    timestamp = reading.get('timestamp')
+    return {
+        'id': reading.get('id'),
+        'location_name': reading['location_name'],
+        'location_id': reading.get('location_id'),
+        'ph_level': reading.get('ph_level'),
+        'turbidity_ntu': reading.get('turbidity_ntu'),
+        'dissolved_oxygen': reading.get('dissolved_oxygen'),
+        'temperature_c': reading.get('temperature_c'),
+        'conductivity_us': reading.get('conductivity_us'),
+        'timestamp': format_timestamp(timestamp),
+        'user_id': reading['user_id'],
+        'total_dissolved_solids': reading.get('total_dissolved_solids'),
+        'status': reading.get('status'),
+        'is_public': reading.get('is_public'),
+        'status_color': WaterQuality.color_for(reading.get('status'))
+    }
+
+
+def publish_readings(readings):
+    """Push newly committed readings (objects or row dicts) to live streams"""
+    broker = get_broker()
+    if not broker.has_subscribers():
+        # Nobody is listening; don't serialize whole bulk uploads for nothing
+        broker.skip()
+        return
+    events = []
+    for reading in readings:
+        payload = _reading_payload(reading)
+        organization_id = reading.get('organization_id') if isinstance(reading, dict) else reading.organization_id
+        events.append(('reading', payload, payload['user_id'], payload['is_public'], organization_id))
+    broker.publish_all(events)
+
+
+def publish_reading_deleted(reading):
+    get_broker().publish('reading_deleted', {'id': reading.id}, reading.user_id, reading.is_public, reading.organization_id)
@@ -0,0 +1,174 @@
+import heapq
+import math
+import threading
+import time
+from operator import itemgetter
+from flask import current_app
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+class GridIndex:
+    """Located sites bucketed into cells of cell_degrees x cell_degrees.
+
+    A bounding box only looks at the cells it overlaps; nearest-N searches
+    rings of cells outwards from the query point and stops once nothing in
+    the unvisited cells can be closer than the N-th site found. Either query
+    falls back to a plain scan when that would touch fewer sites than cells.
+    """
+    def __init__(self, locations, cell_degrees):
+        self.cell_degrees = cell_degrees
+        self.rows = math.ceil(180 / cell_degrees)
+        self.columns = math.ceil(360 / cell_degrees)
+        self.locations = locations
+        self.located = [location for location in locations if location['latitude'] is not None]
+        self.cells = {}
+        for location in self.located:
+            self.cells.setdefault(self._cell(location['latitude'], location['longitude']), []).append(location)
+
+    def _row(self, latitude):
+        return min(self.rows - 1, int((latitude + 90) // self.cell_degrees))
+
+    def _column(self, longitude):
+        return int((longitude + 180) // self.cell_degrees) % self.columns
+
+    def _cell(self, latitude, longitude):
+        return self._row(latitude), self._column(longitude)
+
+    def bbox(self, min_lon, min_lat, max_lon, max_lat):
+        """Sites inside the box; min_lon > max_lon means the box crosses the antimeridian"""
+        rows = range(self._row(min_lat), self._row(max_lat) + 1)
+        first, last = self._column(min_lon), self._column(max_lon)
+        if min_lon <= max_lon and first <= last:
+            columns = range(first, last + 1)
+        else:
+            columns = [*range(first, self.columns), *range(0, last + 1)]
+
+        def inside(location):
+            latitude, longitude = location['latitude'], location['longitude']
+            if not min_lat <= latitude <= max_lat:
+                return False
+            if min_lon <= max_lon:
+                return min_lon <= longitude <= max_lon
+            return longitude >= min_lon or longitude <= max_lon
+
+        if len(rows) * len(columns) > len(self.located):
+            return [location for location in self.located if inside(location)]
+        found = []
+        for row in rows:
+            for column in columns:
+                found.extend(location for location in self.cells.get((row, column), ()) if inside(location))
+        return found
+
+    def nearest(self, latitude, longitude, n):
+        """Up to n (distance in km, site) pairs, closest first"""
+        if n <= 0 or not self.located:
+            return []
+
+        def distance(location):
+            return haversine_km(latitude, longitude, location['latitude'], location['longitude'])
+
+        center_row, center_column = self._cell(latitude, longitude)
+        best = []  # heap of (-distance, id, site): the n closest found so far
+        seen = set()
+        radius = 0
+        last_radius = max(self.rows, self.columns // 2)  # every cell has been visited by then
+        while radius == 0 or (2 * radius + 1) ** 2 <= 4 * len(self.cells):
+            for cell in self._ring(center_row, center_column, radius):
+                if cell in seen:
+                    continue
+                seen.add(cell)
+                for location in self.cells.get(cell, ()):
+                    entry = (-distance(location), location['id'], location)
+                    if len(best) < n:
+                        heapq.heappush(best, entry)
+                    elif entry[:2] > best[0][:2]:
+                        heapq.heapreplace(best, entry)
+            if radius >= last_radius:
+                break
+            if len(best) == n and -best[0][0] <= self._unvisited_km(latitude, longitude, center_row, center_column, radius):
+                break
+            radius += 1
+        else:
+            # Searching outwards would touch more cells than a scan touches sites
+            return heapq.nsmallest(n, ((distance(location), location) for location in self.located), key=itemgetter(0))
+        return sorted(((-negative, location) for negative, _, location in best), key=itemgetter(0))
+
+    def _ring(self, center_row, center_column, radius):
+        """Cells at Chebyshev distance `radius` (longitude wraps, latitude is clipped)"""
+        for row in range(max(0, center_row - radius), min(self.rows, center_row + radius + 1)):
+            if abs(row - center_row) == radius:
+                offsets = range(-radius, radius + 1)
+            else:
+                offsets = (-radius, radius)
+            for offset in offsets:
+                yield row, (center_column + offset) % self.columns
+
+    def _unvisited_km(self, latitude, longitude, center_row, center_column, radius):
+        """Lower bound on the distance from the point to any cell further than `radius` away"""
+        cell = self.cell_degrees
+        bounds = []
+        south = (center_row - radius) * cell - 90
+        north = (center_row + radius + 1) * cell - 90
+        if south > -90:
+            bounds.append((latitude - south) * KM_PER_DEGREE)
+        if north < 90:
+            bounds.append((north - latitude) * KM_PER_DEGREE)
+        if (2 * radius + 1) * cell < 360:
+            west = (center_column - radius) * cell - 180
+            east = (center_column + radius + 1) * cell - 180
+            degrees = min(90.0, longitude - west, east - longitude)
+            # Distance from the point to a meridian dlon away: sin(d) = cos(lat) * sin(dlon)
+            bounds.append(EARTH_RADIUS_KM * math.asin(math.cos(math.radians(latitude)) * math.sin(math.radians(degrees))))
+        return min(bounds) if bounds else float('inf')
+
+
+class LocationIndex:
+    """Per-process GridIndex over the Location table, rebuilt when older than `ttl` seconds"""
+    def __init__(self, cell_degrees, ttl):
+        self.cell_degrees = cell_degrees
+        self.ttl = ttl
+        self._index = None
+        self._built_at = None
+        self._lock = threading.Lock()
+
+    def invalidate(self):
+        self._built_at = None
+
+    def get(self):
+        if self._built_at is not None and time.monotonic() - self._built_at < self.ttl:
+            return self._index
+        with self._lock:
+            if self._built_at is None or time.monotonic() - self._built_at >= self.ttl:
+                self._index = GridIndex(self._load(), self.cell_degrees)
+                self._built_at = time.monotonic()
+        return self._index
+
+    @staticmethod
+    def _load():
+        from app.database.connection import db
+        from app.models.location import Location
+        from sqlalchemy import select
+        rows = db.session.execute(
+            select(Location.id, Location.name, Location.latitude, Location.longitude).order_by(Location.name)
+        ).all()
+        return [{'id': row.id, 'name': row.name, 'latitude': row.latitude, 'longitude': row.longitude} for row in rows]
+
+
+def init_geo(app):
+    app.extensions['location_index'] = LocationIndex(app.config['GEO_GRID_CELL_DEGREES'], app.config['GEO_INDEX_TTL'])
+
+
+def get_location_index():
+    return current_app.extensions['location_index'].get()
+
+
+def invalidate_location_index():
+    current_app.extensions['location_index'].invalidate()
\ No newline at end of file
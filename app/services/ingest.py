@@ -0,0 +1,397 @@
+import click
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from flask import current_app
+from sqlalchemy import select, tuple_
+from sqlalchemy.exc import DBAPIError, InterfaceError, OperationalError, TimeoutError as PoolTimeout
+from app.database.connection import db
+from app.services.events import publish_readings
+from app.services.alerts import evaluate_readings, notify_alerts, reading_ids_needed
+from app.services.tenancy import fill_organization_ids
+
+logger = logging.getLogger(__name__)
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process dev server only
+    fcntl = None
+
+JOURNAL_SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS journal (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        client_reading_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        received_at REAL NOT NULL,
+        UNIQUE (user_id, client_reading_id)
+    )""",
+    """CREATE TABLE IF NOT EXISTS dead_letter (
+        seq INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        client_reading_id TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        received_at REAL NOT NULL,
+        failed_at REAL NOT NULL,
+        error TEXT NOT NULL
+    )""",
+)
+
+
+def is_transient(error):
+    """True for database errors that say nothing about the rows: down, unreachable, locked, pool exhausted"""
+    return isinstance(error, (OperationalError, InterfaceError, PoolTimeout)) or (
+        isinstance(error, DBAPIError) and error.connection_invalidated
+    )
+
+
+def existing_client_ids(rows):
+    """(user_id, client_reading_id) pairs from `rows` that are already stored as readings"""
+    from app.models.water_quality import WaterQuality
+
+    keys = {(row['user_id'], row['client_reading_id']) for row in rows if row.get('client_reading_id')}
+    if not keys:
+        return set()
+    found = db.session.execute(
+        select(WaterQuality.user_id, WaterQuality.client_reading_id)
+        .where(tuple_(WaterQuality.user_id, WaterQuality.client_reading_id).in_(list(keys)))
+    ).all()
+    return {tuple(row) for row in found}
+
+
+def _encode_row(row):
+    return json.dumps({
+        key: value.isoformat() if isinstance(value, datetime) else value
+        for key, value in row.items()
+    })
+
+
+def _decode_row(payload):
+    row = json.loads(payload)
+    row['timestamp'] = datetime.fromisoformat(row['timestamp'])
+    return row
+
+
+class IngestJournal:
+    """Durable local queue of accepted-but-not-yet-stored readings (an SQLite file).
+
+    A reading is acknowledged once its INSERT here has been fsynced, so a
+    crash between acknowledgement and flush loses nothing: the rows are
+    replayed on the next start. (user_id, client_reading_id) is unique, so
+    a retried upload that is still queued is recognised as a duplicate.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        connection = self._connection()
+        for statement in JOURNAL_SCHEMA:
+            connection.execute(statement)
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            # FULL: every acknowledged reading is on disk before the 202 goes out
+            connection.execute('PRAGMA synchronous=FULL')
+            self._local.connection = connection
+        return connection
+
+    def append(self, row):
+        """Queue a validated reading; returns False if the same client ID is already queued"""
+        cursor = self._connection().execute(
+            'INSERT OR IGNORE INTO journal (user_id, client_reading_id, payload, received_at) VALUES (?, ?, ?, ?)',
+            (row['user_id'], row['client_reading_id'], _encode_row(row), time.time())
+        )
+        return cursor.rowcount == 1
+
+    def peek(self, limit):
+        """Oldest queued entries as (seq, row) in arrival order"""
+        return [
+            (seq, _decode_row(payload))
+            for seq, payload in self._connection().execute(
+                'SELECT seq, payload FROM journal ORDER BY seq LIMIT ?', (limit,)
+            )
+        ]
+
+    def remove(self, seqs):
+        self._connection().executemany('DELETE FROM journal WHERE seq = ?', [(seq,) for seq in seqs])
+
+    def dead_letter(self, seq, error):
+        """Move an entry that can never be stored out of the queue, keeping it for inspection"""
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT OR REPLACE INTO dead_letter (seq, user_id, client_reading_id, payload, received_at, failed_at, error) '
+                'SELECT seq, user_id, client_reading_id, payload, received_at, ?, ? FROM journal WHERE seq = ?',
+                (time.time(), error, seq)
+            )
+            connection.execute('DELETE FROM journal WHERE seq = ?', (seq,))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+
+    def requeue_dead_letters(self):
+        """Move every dead letter back to the end of the queue; returns how many were requeued
+
+        An entry whose client ID is queued again meanwhile is just dropped.
+        """
+        connection = self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            requeued = connection.execute(
+                'INSERT OR IGNORE INTO journal (user_id, client_reading_id, payload, received_at) '
+                'SELECT user_id, client_reading_id, payload, received_at FROM dead_letter ORDER BY seq'
+            ).rowcount
+            connection.execute('DELETE FROM dead_letter')
+            connection.execute('COMMIT')
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        return requeued
+
+    def depth(self):
+        """(queued entries, age in seconds of the oldest one or None)"""
+        count, oldest = self._connection().execute('SELECT COUNT(*), MIN(received_at) FROM journal').fetchone()
+        return count, (time.time() - oldest if oldest is not None else None)
+
+    def dead_letter_count(self):
+        return self._connection().execute('SELECT COUNT(*) FROM dead_letter').fetchone()[0]
+
+
+class WriteBehindIngestor:
+    """Acknowledges readings from the journal and stores them in batches on a background thread.
+
+    Each flush inserts up to `batch_size` readings in arrival order in one
+    transaction (plus the rollup update), then deletes them from the
+    journal. If the process dies between the commit and the delete, the
+    replayed rows are recognised by their client_reading_id and skipped,
+    so every reading is stored exactly once.
+
+    While the database is unavailable (see is_transient()) the batch stays
+    in the journal and flushes back off, up to `max_backoff` seconds apart.
+    Only a row the database rejects on its own is dead-lettered.
+    """
+    def __init__(self, app, journal, batch_size, interval, max_backoff):
+        self.app = app
+        self.journal = journal
+        self.batch_size = batch_size
+        self.interval = interval
+        self.max_backoff = max_backoff
+        self._wake = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._pending_hint = 0
+        self.metrics = {
+            'enqueued': 0,
+            'duplicates': 0,
+            'flushed': 0,
+            'skipped_existing': 0,
+            'flushes': 0,
+            'flush_ms_total': 0.0,
+            'flush_ms_max': 0.0,
+            'last_flush_ms': None,
+            'replayed_on_start': 0,
+            'retries': 0,
+            'dead_lettered': 0,
+            'errors': 0,
+            'last_error': None
+        }
+
+    def ensure_started(self):
+        """Start the flush thread in this process (threads don't survive a fork)"""
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            backlog, _ = self.journal.depth()
+            if backlog:
+                self.metrics['replayed_on_start'] += backlog
+                logger.info('Replaying queued readings', extra={'readings': backlog, 'journal': self.journal.path})
+            self._thread = threading.Thread(target=self._run, name='ingest-flush', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def enqueue(self, row):
+        """Durably queue a validated, scored reading; returns False for a duplicate client ID"""
+        self.ensure_started()
+        accepted = self.journal.append(row)
+        self.metrics['enqueued' if accepted else 'duplicates'] += 1
+        if accepted:
+            self._pending_hint += 1
+            if self._pending_hint >= self.batch_size:
+                self._wake.set()
+        return accepted
+
+    def _run(self):
+        backoff = 0
+        while True:
+            if backoff:
+                time.sleep(backoff)  # not woken early by uploads: the database is down
+            else:
+                self._wake.wait(self.interval)
+            self._wake.clear()
+            self._pending_hint = 0
+            try:
+                with self.app.app_context():
+                    # Keep going while full batches are waiting
+                    while self.flush() >= self.batch_size:
+                        pass
+                backoff = 0
+            except Exception as e:
+                self.metrics['errors'] += 1
+                self.metrics['last_error'] = str(e)
+                if is_transient(e):
+                    self.metrics['retries'] += 1
+                    backoff = min(max(backoff * 2, self.interval), self.max_backoff)
+                    logger.warning('Database unavailable, ingest flush retried in %.1fs: %s', backoff, e)
+                else:
+                    logger.exception('Ingest flush failed')
+
+    def flush(self):
+        """Store one batch from the journal (needs an app context); returns the batch size.
+
+        Raises a transient database error with the batch still queued.
+        """
+        with _FlushLock(self.journal.path):
+            entries = self.journal.peek(self.batch_size)
+            if not entries:
+                return 0
+            start = time.perf_counter()
+            try:
+                stored = self._store([row for _, row in entries])
+            except Exception as e:
+                db.session.rollback()
+                if is_transient(e):
+                    raise
+                self.metrics['errors'] += 1
+                self.metrics['last_error'] = str(e)
+                stored = self._store_individually(entries)
+            self.journal.remove([seq for seq, _ in entries])
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.metrics['flushes'] += 1
+            self.metrics['flushed'] += stored
+            self.metrics['skipped_existing'] += len(entries) - stored
+            self.metrics['flush_ms_total'] += elapsed_ms
+            self.metrics['flush_ms_max'] = max(self.metrics['flush_ms_max'], elapsed_ms)
+            self.metrics['last_flush_ms'] = elapsed_ms
+            return len(entries)
+
+    def _store(self, rows):
+        from app.models.water_quality import WaterQuality
+        from app.models.rollup import DailyLocationRollup
+        from app.models.location import Location
+        from app.middleware.cache import invalidate_analytics_cache
+        from app.services.series import invalidate_series
+
+        # Rows journaled before readings carried an organization
+        fill_organization_ids(rows)
+        existing = existing_client_ids(rows)
+        rows = [row for row in rows if (row['user_id'], row['client_reading_id']) not in existing]
+        alerts = []
+        if rows:
+            Location.link_rows(rows)
+            WaterQuality.insert_rows(rows, with_ids=reading_ids_needed())
+            DailyLocationRollup.add_readings(rows)
+            alerts = evaluate_readings(rows)
+        db.session.commit()
+        if rows:
+            invalidate_analytics_cache()
+            invalidate_series(rows)
+            publish_readings(rows)
+            notify_alerts(alerts)
+        return len(rows)
+
+    def _store_individually(self, entries):
+        """Fallback after a failed batch: isolate the rows that can't be stored
+
+        A transient error stops here: rows already stored are removed from
+        the journal and the rest stay queued for the retry.
+        """
+        stored = 0
+        for index, (seq, row) in enumerate(entries):
+            try:
+                stored += self._store([row])
+            except Exception as e:
+                db.session.rollback()
+                if is_transient(e):
+                    self.journal.remove([seq for seq, _ in entries[:index]])
+                    raise
+                # Rejected for what it contains (IntegrityError, DataError, a bad value)
+                self.journal.dead_letter(seq, str(e))
+                self.metrics['dead_lettered'] += 1
+                logger.error('Reading moved to dead letter: %s', e, extra={'client_reading_id': row['client_reading_id']})
+        return stored
+
+    def replay_dead_letters(self):
+        """Queue every dead letter again and store it (needs an app context); returns (requeued, dead letters left)"""
+        requeued = self.journal.requeue_dead_letters()
+        while self.flush() >= self.batch_size:
+            pass
+        return requeued, self.journal.dead_letter_count()
+
+    def stats(self):
+        depth, oldest_age = self.journal.depth()
+        flushes = self.metrics['flushes']
+        return {
+            **self.metrics,
+            'queue_depth': depth,
+            'oldest_queued_seconds': oldest_age,
+            'flush_ms_avg': self.metrics['flush_ms_total'] / flushes if flushes else None,
+            'dead_letters': self.journal.dead_letter_count()
+        }
+
+
+class _FlushLock:
+    """Cross-process lock so only one worker flushes a shared journal at a time"""
+    def __init__(self, journal_path):
+        self.path = journal_path + '.lock'
+        self._file = None
+
+    def __enter__(self):
+        if fcntl is not None:
+            self._file = open(self.path, 'a')
+            fcntl.flock(self._file, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+
+
+def init_ingest(app):
+    """Set up write-behind ingestion when INGEST_MODE is 'write-behind'"""
+    ingestor = None
+    if app.config['INGEST_MODE'] == 'write-behind':
+        journal = IngestJournal(app.config['INGEST_JOURNAL_PATH'])
+        ingestor = WriteBehindIngestor(
+            app, journal, app.config['INGEST_FLUSH_BATCH_SIZE'], app.config['INGEST_FLUSH_INTERVAL'],
+            app.config['INGEST_RETRY_MAX_SECONDS']
+        )
+        # Also replays a leftover journal without waiting for the first upload
+        app.before_request(ingestor.ensure_started)
+    app.extensions['ingestor'] = ingestor
+
+    @app.cli.command('replay-dead-letters')
+    def replay_dead_letters_command():
+        """Queue dead-lettered readings again and store them (after fixing what rejected them)"""
+        if ingestor is None:
+            raise click.ClickException("INGEST_MODE is not 'write-behind'")
+        requeued, left = ingestor.replay_dead_letters()
+        click.echo(f"✅ Replayed {requeued} dead-lettered readings, {left} rejected again")
+
+
+def get_ingestor():
+    return current_app.extensions.get('ingestor')
@@ -0,0 +1,517 @@
+"""Background jobs: cron-scheduled and on-demand analytics and maintenance work.
+
+Jobs are functions registered with @register_job. Their schedule state and
+every run are rows in the database (job, job_run), and those rows are also
+how workers coordinate, so no broker is needed:
+
+- a due job is enqueued by whichever scheduler moves its next_run_at
+  first (compare-and-set on the old value), and only if no run of it is
+  already queued
+- a queued run is started by whichever worker first sets the job's
+  running_run_id from NULL (one run per job at a time) and then moves
+  the run from 'queued' to 'running'
+- every poll, each process's scheduler refreshes the heartbeat of the
+  runs its threads are executing; a run whose heartbeat is older than
+  JOB_HEARTBEAT_TIMEOUT is marked failed, releasing the job, since its
+  process is gone. A slow run is never reaped while it is still going,
+  so a second copy of it can't start alongside
+
+JOBS_MODE 'in-process' runs the scheduler thread and JOB_WORKERS worker
+threads in every web worker; 'sidecar' leaves them to a separate
+'flask run-jobs' process so job CPU never competes with requests. Jobs
+registered with snapshot=True return a JSON payload that endpoints serve
+through latest_snapshot() instead of computing it per request.
+"""
+import inspect
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+from datetime import datetime, timedelta
+from flask import current_app
+from sqlalchemy import delete, func, select, update
+from sqlalchemy.exc import IntegrityError
+from app.database.connection import db
+from app.models.job import FINISHED_STATUSES, Job, JobRun
+
+logger = logging.getLogger(__name__)
+
+JOBS_MODES = ('in-process', 'sidecar')
+
+CRON_ALIASES = {
+    '@hourly': '0 * * * *',
+    '@daily': '0 0 * * *',
+    '@weekly': '0 0 * * 0',
+    '@monthly': '0 0 1 * *',
+    '@yearly': '0 0 1 1 *',
+}
+
+# (low, high) of minute, hour, day of month, month, day of week (0 and 7 are Sunday)
+CRON_FIELDS = ((0, 59), (0, 23), (1, 31), (1, 12), (0, 7))
+
+# Registered jobs by name
+JOBS = {}
+
+
+def _parse_cron_field(text, low, high):
+    values = set()
+    for part in text.split(','):
+        body, has_step, step = part.partition('/')
+        step = int(step) if has_step else 1
+        if body == '*':
+            start, end = low, high
+        elif '-' in body:
+            start, end = (int(value) for value in body.split('-', 1))
+        else:
+            start = int(body)
+            end = high if has_step else start  # '5/15' means 5-high/15
+        if step < 1 or not low <= start <= end <= high:
+            raise ValueError(part)
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Five-field cron expression (minute hour day-of-month month day-of-week), evaluated in UTC.
+
+    Supports *, lists, ranges, steps and the @hourly/@daily/@weekly/@monthly/
+    @yearly aliases. As in cron, when both day fields are restricted a day
+    matching either one fires.
+    """
+    def __init__(self, expression):
+        self.expression = expression
+        fields = CRON_ALIASES.get(expression.strip(), expression).split()
+        try:
+            if len(fields) != 5:
+                raise ValueError(expression)
+            self.minutes, self.hours, self.days, self.months, self.weekdays = (
+                _parse_cron_field(field, low, high) for field, (low, high) in zip(fields, CRON_FIELDS)
+            )
+        except ValueError:
+            raise ValueError(f'Invalid cron expression: {expression!r}')
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        self._any_day = fields[2] == '*'
+        self._any_weekday = fields[4] == '*'
+
+    def _day_matches(self, moment):
+        day = moment.day in self.days
+        weekday = (moment.weekday() + 1) % 7 in self.weekdays  # cron counts from Sunday
+        if self._any_day or self._any_weekday:
+            return day and weekday
+        return day or weekday
+
+    def next_after(self, moment):
+        """First matching minute strictly after `moment` (a naive UTC datetime)"""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        limit = candidate + timedelta(days=5 * 366)  # e.g. '0 0 30 2 *' never matches
+        while candidate < limit:
+            if candidate.month not in self.months:
+                candidate = (candidate.replace(day=1, hour=0, minute=0) + timedelta(days=32)).replace(day=1)
+            elif not self._day_matches(candidate):
+                candidate = candidate.replace(hour=0, minute=0) + timedelta(days=1)
+            elif candidate.hour not in self.hours:
+                candidate = candidate.replace(minute=0) + timedelta(hours=1)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(f'Cron expression never fires: {self.expression!r}')
+
+
+class JobDefinition:
+    __slots__ = ('name', 'function', 'description', 'schedule', 'snapshot')
+
+    def __init__(self, name, function, schedule, snapshot):
+        self.name = name
+        self.function = function
+        self.description = (function.__doc__ or '').strip().split('\n')[0]
+        self.schedule = schedule
+        self.snapshot = snapshot
+
+    def check_params(self, params):
+        """Raise TypeError unless params are valid keyword arguments for the job"""
+        inspect.signature(self.function).bind(**params)
+
+    def to_dict(self):
+        return {'name': self.name, 'description': self.description, 'snapshot': self.snapshot}
+
+
+def register_job(name, schedule=None, snapshot=False):
+    """Register the decorated function as job `name`, optionally on a default cron schedule.
+
+    The function runs in an app context with the run's params as keyword
+    arguments; what it returns (JSON-serializable, or None) is stored as
+    the run's result.
+    """
+    if schedule:
+        CronSchedule(schedule)  # a typo should fail at import, not at the first tick
+
+    def decorator(function):
+        JOBS[name] = JobDefinition(name, function, schedule, snapshot)
+        return function
+    return decorator
+
+
+def configured_schedule(name):
+    """JOB_SCHEDULES override for a job (None disables its schedule), else its default"""
+    overrides = current_app.config['JOB_SCHEDULES']
+    return overrides[name] if name in overrides else JOBS[name].schedule
+
+
+def sync_jobs():
+    """Create rows for newly registered jobs and apply schedule changes; returns {name: Job}"""
+    jobs = {job.name: job for job in Job.query.all()}
+    now = datetime.utcnow()
+    changed = False
+    for name in JOBS:
+        schedule = configured_schedule(name)
+        job = jobs.get(name)
+        if job is not None and job.schedule == schedule:
+            continue
+        if job is None:
+            job = jobs[name] = Job(name=name, enabled=True)
+            db.session.add(job)
+        job.schedule = schedule
+        job.next_run_at = CronSchedule(schedule).next_after(now) if schedule else None
+        changed = True
+    if changed:
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # Another worker synced at the same moment
+            db.session.rollback()
+            return {job.name: job for job in Job.query.all()}
+    return jobs
+
+
+def latest_snapshot(name):
+    """Result of the newest successful run of job `name`, if younger than ANALYTICS_SNAPSHOT_MAX_AGE"""
+    max_age = current_app.config['ANALYTICS_SNAPSHOT_MAX_AGE']
+    if not max_age:
+        return None
+    result = db.session.execute(
+        select(JobRun.result)
+        .where(JobRun.job_name == name, JobRun.status == 'succeeded',
+               JobRun.finished_at >= datetime.utcnow() - timedelta(seconds=max_age))
+        .order_by(JobRun.finished_at.desc())
+        .limit(1)
+    ).scalar()
+    return json.loads(result) if result is not None else None
+
+
+class JobScheduler:
+    """Enqueues due jobs and runs queued ones on a pool of `workers` threads (one process's share)"""
+    def __init__(self, app, workers, poll_interval, heartbeat_timeout, history):
+        self.app = app
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.history = history
+        self._wake = threading.Event()
+        self._runs = queue.Queue()
+        self._lock = threading.Lock()
+        self._active = 0
+        # Ids of the runs this process's worker threads are executing
+        self._running = set()
+        self._thread = None
+        self._thread_pid = None
+        self._start_lock = threading.Lock()
+        self._synced = False
+        self.metrics = {'scheduled': 0, 'started': 0, 'succeeded': 0, 'failed': 0, 'abandoned': 0, 'last_error': None}
+
+    def ensure_started(self):
+        """Start the scheduler and worker threads in this process (threads don't survive a fork)"""
+        if self._thread_pid == os.getpid() and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread_pid == os.getpid() and self._thread.is_alive():
+                return
+            self._active = 0
+            self._running = set()
+            self._runs = queue.Queue()
+            # Daemon threads: a worker exiting mid-job leaves the run to be reaped, not a hung shutdown
+            for index in range(self.workers):
+                threading.Thread(target=self._work, name=f'job-worker-{index}', daemon=True).start()
+            self._thread = threading.Thread(target=self._run, name='job-scheduler', daemon=True)
+            self._thread_pid = os.getpid()
+            self._thread.start()
+
+    def run_forever(self):
+        """Run the scheduler in the foreground (the sidecar process)"""
+        self.ensure_started()
+        while self._thread.is_alive():
+            self._thread.join(1)
+
+    @property
+    def active(self):
+        return self._active
+
+    def wake(self):
+        self._wake.set()
+
+    def _run(self):
+        while True:
+            try:
+                with self.app.app_context():
+                    self.tick()
+            except Exception as e:
+                self.metrics['last_error'] = str(e)
+                logger.exception('Job scheduling failed')
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+    def tick(self):
+        """One pass (needs an app context): heartbeat own runs, enqueue due jobs, reap dead runs, start queued ones"""
+        if not self._synced:
+            sync_jobs()
+            self._synced = True
+        self._heartbeat()
+        self._enqueue_due()
+        self._reap_stale()
+        self._start_queued()
+
+    def _enqueue_due(self):
+        now = datetime.utcnow()
+        due = db.session.execute(
+            select(Job.name, Job.schedule, Job.next_run_at)
+            .where(Job.enabled == True, Job.schedule.isnot(None), Job.next_run_at <= now)
+        ).all()
+        for name, schedule, next_run_at in due:
+            moved = db.session.execute(
+                update(Job).where(Job.name == name, Job.next_run_at == next_run_at)
+                .values(next_run_at=CronSchedule(schedule).next_after(now))
+            ).rowcount
+            # Missed slots collapse into one run, and a still-queued run isn't doubled
+            if moved and db.session.execute(
+                select(JobRun.id).where(JobRun.job_name == name, JobRun.status == 'queued').limit(1)
+            ).first() is None:
+                db.session.add(JobRun(job_name=name, trigger='schedule', status='queued'))
+                self.metrics['scheduled'] += 1
+            db.session.commit()
+
+    def _heartbeat(self):
+        with self._lock:
+            running = list(self._running)
+        if running:
+            db.session.execute(
+                update(JobRun).where(JobRun.id.in_(running), JobRun.status == 'running')
+                .values(heartbeat_at=datetime.utcnow())
+            )
+            db.session.commit()
+
+    def _reap_stale(self):
+        now = datetime.utcnow()
+        cutoff = now - timedelta(seconds=self.heartbeat_timeout)
+        # Runs claimed before heartbeat_at existed fall back to their start time
+        last_seen = func.coalesce(JobRun.heartbeat_at, JobRun.started_at)
+        stale = db.session.execute(
+            select(JobRun.id, JobRun.job_name).where(JobRun.status == 'running', last_seen < cutoff)
+        ).all()
+        for run_id, name in stale:
+            # Re-checked in the update, so a heartbeat that landed meanwhile keeps the run
+            reaped = db.session.execute(
+                update(JobRun).where(JobRun.id == run_id, JobRun.status == 'running', last_seen < cutoff)
+                .values(status='failed', finished_at=now,
+                        error=f'Abandoned: no heartbeat for {self.heartbeat_timeout}s, worker gone')
+            ).rowcount
+            if reaped:
+                db.session.execute(
+                    update(Job).where(Job.name == name, Job.running_run_id == run_id).values(running_run_id=None)
+                )
+                self.metrics['abandoned'] += 1
+                logger.warning('Job run abandoned', extra={'job': name, 'run_id': run_id})
+            db.session.commit()
+
+    def _start_queued(self):
+        free = self.workers - self._active
+        if free <= 0:
+            return
+        queued = db.session.execute(
+            select(JobRun.id, JobRun.job_name, JobRun.params)
+            .where(JobRun.status == 'queued').order_by(JobRun.id).limit(free * 4)
+        ).all()
+        worker = f'{socket.gethostname()}:{os.getpid()}'
+        for run_id, name, params in queued:
+            if free <= 0:
+                break
+            now = datetime.utcnow()
+            if name not in JOBS:
+                db.session.execute(
+                    update(JobRun).where(JobRun.id == run_id, JobRun.status == 'queued')
+                    .values(status='failed', finished_at=now, error=f'Unknown job: {name}')
+                )
+                db.session.commit()
+                continue
+            locked = db.session.execute(
+                update(Job).where(Job.name == name, Job.running_run_id.is_(None)).values(running_run_id=run_id)
+            ).rowcount
+            claimed = locked and db.session.execute(
+                update(JobRun).where(JobRun.id == run_id, JobRun.status == 'queued')
+                .values(status='running', started_at=now, heartbeat_at=now, worker=worker)
+            ).rowcount
+            if not claimed:
+                # Another run of the job is going, or another worker took this one
+                db.session.rollback()
+                continue
+            db.session.commit()
+            with self._lock:
+                self._active += 1
+                self._running.add(run_id)
+            free -= 1
+            self.metrics['started'] += 1
+            self._runs.put((run_id, name, json.loads(params) if params else {}))
+
+    def _work(self):
+        while True:
+            run_id, name, params = self._runs.get()
+            try:
+                with self.app.app_context():
+                    self._execute(run_id, name, params)
+            except Exception:
+                logger.exception('Could not record job result', extra={'job': name, 'run_id': run_id})
+            finally:
+                with self._lock:
+                    self._active -= 1
+                    self._running.discard(run_id)
+                self._wake.set()
+
+    def _execute(self, run_id, name, params):
+        started = datetime.utcnow()
+        status, result, error = 'succeeded', None, None
+        try:
+            value = JOBS[name].function(**params)
+            result = json.dumps(value, default=str) if value is not None else None
+        except Exception as e:
+            db.session.rollback()
+            status, error = 'failed', f'{type(e).__name__}: {e}'
+            logger.exception('Job failed', extra={'job': name, 'run_id': run_id})
+        self.metrics[status] += 1
+
+        finished = datetime.utcnow()
+        recorded = db.session.execute(
+            update(JobRun).where(JobRun.id == run_id, JobRun.status == 'running')
+            .values(status=status, result=result, error=error, finished_at=finished)
+        ).rowcount
+        db.session.execute(
+            update(Job).where(Job.name == name, Job.running_run_id == run_id)
+            .values(running_run_id=None, last_run_at=finished)
+        )
+        self._prune(name)
+        db.session.commit()
+        if not recorded:
+            logger.warning('Job finished after it was reaped; result dropped', extra={'job': name, 'run_id': run_id})
+        else:
+            logger.info('Job finished', extra={
+                'job': name, 'run_id': run_id, 'status': status,
+                'duration_ms': round((finished - started).total_seconds() * 1000, 1)
+            })
+
+    def _prune(self, name):
+        """Keep the newest `history` finished runs of a job"""
+        cutoff = db.session.execute(
+            select(JobRun.id).where(JobRun.job_name == name, JobRun.status.in_(FINISHED_STATUSES))
+            .order_by(JobRun.id.desc()).offset(self.history).limit(1)
+        ).scalar()
+        if cutoff is not None:
+            db.session.execute(delete(JobRun).where(
+                JobRun.job_name == name, JobRun.status.in_(FINISHED_STATUSES), JobRun.id <= cutoff
+            ))
+
+    def stats(self):
+        queued = db.session.execute(select(func.count()).where(JobRun.status == 'queued')).scalar()
+        return {
+            **self.metrics,
+            'mode': current_app.config['JOBS_MODE'],
+            'workers': self.workers,
+            'active': self.active,
+            'queued': queued
+        }
+
+
+def enqueue_job(name, params=None, requested_by=None):
+    """Queue a manual run of job `name`; raises KeyError for an unknown job, TypeError for bad params"""
+    params = params or {}
+    JOBS[name].check_params(params)
+    run = JobRun(job_name=name, trigger='manual', status='queued',
+                 params=json.dumps(params) if params else None, requested_by=requested_by)
+    db.session.add(run)
+    db.session.commit()
+    get_scheduler().wake()
+    return run
+
+
+def init_jobs(app):
+    """Create this process's scheduler; in-process mode starts it with the first request"""
+    if app.config['JOBS_MODE'] not in JOBS_MODES:
+        raise RuntimeError(f"JOBS_MODE must be one of: {', '.join(JOBS_MODES)}")
+    for name, schedule in app.config['JOB_SCHEDULES'].items():
+        if schedule is not None:
+            CronSchedule(schedule)
+    if app.config['JOB_HEARTBEAT_TIMEOUT'] < 3 * app.config['JOB_POLL_INTERVAL']:
+        # Heartbeats are sent once per poll; a couple of late ones must not reap a live run
+        raise RuntimeError('JOB_HEARTBEAT_TIMEOUT must be at least 3 x JOB_POLL_INTERVAL')
+    scheduler = JobScheduler(app, app.config['JOB_WORKERS'], app.config['JOB_POLL_INTERVAL'],
+                             app.config['JOB_HEARTBEAT_TIMEOUT'], app.config['JOB_RUN_HISTORY'])
+    if app.config['JOBS_MODE'] == 'in-process':
+        app.before_request(scheduler.ensure_started)
+    app.extensions['jobs'] = scheduler
+
+    @app.cli.command('run-jobs')
+    def run_jobs_command():
+        """Run the job scheduler and workers in the foreground (for JOBS_MODE=sidecar)"""
+        logger.info('Job runner started', extra={'workers': scheduler.workers, 'jobs': len(JOBS)})
+        scheduler.run_forever()
+
+
+def get_scheduler():
+    return current_app.extensions['jobs']
+
+
+@register_job('rebuild_rollups')
+def rebuild_rollups():
+    """Recompute the daily location rollup from all readings"""
+    from app.models.rollup import DailyLocationRollup
+    from app.middleware.cache import invalidate_analytics_cache
+    buckets = DailyLocationRollup.rebuild()
+    invalidate_analytics_cache()
+    return {'buckets': buckets}
+
+
+@register_job('apply_retention')
+def apply_retention(hot_days=None):
+    """Compact readings older than READINGS_HOT_DAYS into chunks and purge expired ones"""
+    from app.services.retention import apply_retention as apply
+    from app.middleware.cache import invalidate_analytics_cache
+    config = dict(current_app.config)
+    if hot_days is not None:
+        config['READINGS_HOT_DAYS'] = int(hot_days)
+    result = apply(config)
+    invalidate_analytics_cache()
+    return result
+
+
+@register_job('rescore_readings')
+def rescore_readings(chunk_size=50000, previous_tds_factor=None):
+    """Recompute status/total_dissolved_solids for every reading, hot and compacted"""
+    from app.database.migrations import rescore_readings as rescore, resummarize_chunks
+    from app.middleware.cache import invalidate_analytics_cache
+    processed = rescore(int(chunk_size), previous_tds_factor) + resummarize_chunks(previous_tds_factor)
+    invalidate_analytics_cache()
+    return {'readings': processed}
+
+
+@register_job('backfill_locations')
+def backfill_locations():
+    """Link readings without a location_id to Location rows"""
+    from app.database.migrations import backfill_locations as backfill
+    from app.middleware.cache import invalidate_analytics_cache
+    from app.services.geo import invalidate_location_index
+    result = backfill()
+    if result is None:
+        return {'locations_created': 0, 'readings_linked': 0}
+    invalidate_analytics_cache()
+    invalidate_location_index()
+    return {'locations_created': result[0], 'readings_linked': result[1]}
\ No newline at end of file
@@ -0,0 +1,119 @@
+"""Structured, non-blocking logging.
+
+Everything under the 'app' logger (Flask's app.logger and every module's
+logging.getLogger(__name__)) goes to a bounded in-memory queue; one
+listener thread formats the records and writes them to stdout. Request
+threads therefore never wait on the stream, and when the queue is full
+records are dropped and counted (log_records_dropped_total in /metrics)
+rather than blocking.
+
+Fields passed with extra={...} are kept as structure: key=value pairs in
+the 'text' format, keys of the object in the 'json' format.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+# LogRecord attributes that aren't user-supplied extra fields
+_RECORD_ATTRIBUTES = set(vars(logging.LogRecord('', 0, '', 0, '', None, None))) | {'message', 'asctime'}
+
+_listener = None
+
+
+def _extra_fields(record):
+    return {key: value for key, value in vars(record).items() if key not in _RECORD_ATTRIBUTES}
+
+
+class TextFormatter(logging.Formatter):
+    """2024-05-01T12:00:00.123Z INFO app.routes.auth: Login successful email=a@b.org"""
+    def format(self, record):
+        line = f'{_timestamp(record)} {record.levelname} {record.name}: {record.getMessage()}'
+        fields = _extra_fields(record)
+        if fields:
+            line += ' ' + ' '.join(f'{key}={value}' for key, value in fields.items())
+        if record.exc_text:
+            line += '\n' + record.exc_text
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message, extra fields and exception"""
+    def format(self, record):
+        entry = {
+            'time': _timestamp(record),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            **_extra_fields(record)
+        }
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def _timestamp(record):
+    return datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds').replace('+00:00', 'Z')
+
+
+class DroppingQueueHandler(QueueHandler):
+    """QueueHandler that drops (and counts) records instead of blocking when the queue is full"""
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Resolve the message and traceback now (the arguments may change once
+        # the caller moves on) but leave formatting to the listener thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _stop_listener():
+    global _listener
+    if _listener is not None:
+        try:
+            _listener.stop()  # writes out what is still queued
+        except queue.Full:
+            pass
+        _listener = None
+
+
+def init_logging(app):
+    """Route the 'app' logger through a queue to stdout, per LOG_LEVEL / LOG_FORMAT / LOG_QUEUE_SIZE"""
+    global _listener
+    logger = logging.getLogger('app')
+    # A second create_app() in the same process replaces the first one's handler
+    for handler in [handler for handler in logger.handlers if isinstance(handler, DroppingQueueHandler)]:
+        logger.removeHandler(handler)
+    _stop_listener()
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if app.config['LOG_FORMAT'] == 'json' else TextFormatter())
+    log_queue = queue.Queue(app.config['LOG_QUEUE_SIZE'])
+    handler = DroppingQueueHandler(log_queue)
+    _listener = QueueListener(log_queue, output)
+    _listener.start()
+
+    logger.addHandler(handler)
+    logger.setLevel(app.config['LOG_LEVEL'])
+    logger.propagate = False  # server/root handlers would print everything twice
+    app.extensions['log_handler'] = handler
+
+
+atexit.register(_stop_listener)
\ No newline at end of file
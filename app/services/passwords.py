@@ -0,0 +1,135 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+import bcrypt
+from flask import current_app
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when too many hash/verify jobs are already queued; callers answer 503"""
+    def __init__(self, retry_after):
+        super().__init__('Password hashing is at capacity, retry shortly')
+        self.retry_after = retry_after
+
+
+# Pools stay referenced until shutdown() or interpreter exit. One garbage
+# collected during exit (e.g. with a short-lived app) closes its wakeup pipe
+# while concurrent.futures' own exit hook is still about to write to it.
+_executors = set()
+
+
+def _pool_context():
+    """Start method for the pool's processes.
+
+    Never plain fork: the app worker is already running threads (log
+    listener, job scheduler, live feed), and a child forked while one of
+    them holds a lock can deadlock. The forkserver (spawn where there is
+    none) starts clean processes; it preloads this module so each new
+    process only has to fork from it.
+    """
+    if 'forkserver' in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context('forkserver')
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context('spawn')
+
+
+# Executed in the worker processes; must stay top-level so they can be pickled
+def _hash(password, rounds):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds)).decode('utf-8')
+
+
+def _check(password, hashed):
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+class PasswordHasher:
+    """Runs bcrypt on a small process pool so logins can't pin every request thread.
+
+    At most `max_pending` jobs may be queued or running per app worker;
+    beyond that PasswordHasherBusy is raised immediately (backpressure)
+    instead of letting requests pile up behind the CPU-bound hashes.
+    A job keeps its slot until it finishes, even after its caller has
+    given up waiting. With `workers=0` hashing runs inline but the same
+    limit applies.
+    """
+    def __init__(self, workers, max_pending, timeout, retry_after):
+        self.workers = workers
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._executor = None
+        self._executor_pid = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self):
+        # Created lazily and per process: a pool inherited through a fork (e.g.
+        # gunicorn --preload) is unusable in the child
+        with self._lock:
+            if self._executor is None or self._executor_pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+                self._executor_pid = os.getpid()
+                _executors.add(self._executor)
+            return self._executor
+
+    def _run(self, function, *args):
+        if not self._slots.acquire(blocking=False):
+            raise PasswordHasherBusy(self.retry_after)
+        if self.workers == 0:
+            try:
+                return function(*args)
+            finally:
+                self._slots.release()
+        try:
+            future = self._get_executor().submit(function, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # The slot is held until the job is done, not just until we stop
+        # waiting: a timed-out hash keeps a pool process busy until it finishes
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            future.cancel()  # only succeeds if it hasn't started
+            raise PasswordHasherBusy(self.retry_after)
+
+    def hash(self, password, rounds):
+        return self._run(_hash, password, rounds)
+
+    def check(self, password, hashed):
+        return self._run(_check, password, hashed)
+
+    def shutdown(self):
+        if self._executor is not None and self._executor_pid == os.getpid():
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            _executors.discard(self._executor)
+        self._executor = None
+
+
+def init_password_hasher(app):
+    app.extensions['password_hasher'] = PasswordHasher(
+        workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        timeout=app.config['PASSWORD_HASH_TIMEOUT'],
+        retry_after=app.config['PASSWORD_HASH_RETRY_AFTER']
+    )
+
+
+def hash_password(password):
+    """bcrypt hash at the configured BCRYPT_LOG_ROUNDS cost"""
+    return current_app.extensions['password_hasher'].hash(password, current_app.config['BCRYPT_LOG_ROUNDS'])
+
+
+def check_password(password, hashed):
+    return current_app.extensions['password_hasher'].check(password, hashed)
+
+
+def needs_rehash(hashed):
+    """True if a hash was made with a different cost than BCRYPT_LOG_ROUNDS"""
+    try:
+        # Format: $2b$<cost>$<salt+hash>
+        return int(hashed.split('$')[2]) != current_app.config['BCRYPT_LOG_ROUNDS']
+    except (AttributeError, IndexError, ValueError):
+        return True
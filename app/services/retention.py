@@ -0,0 +1,143 @@
+"""Tiered retention for readings.
+
+hot   water_quality rows, newer than READINGS_HOT_DAYS
+cold  reading_chunk rows: per-series compressed chunks, one per
+      READINGS_CHUNK_DAYS window (split at READINGS_CHUNK_ROWS readings)
+gone  chunks older than READINGS_RETENTION_DAYS (0 keeps them forever) are
+      dropped; their days stay in the daily rollup, so day/week/month
+      trends keep covering them
+
+compact_readings() moves whole windows from hot to cold and is safe to
+re-run; readings that arrive late for an already compacted window simply
+become an extra chunk next time.
+"""
+from datetime import datetime, timedelta
+from sqlalchemy import select, delete, func
+from app.database.connection import db
+from app.models.reading_chunk import ReadingChunk, EPOCH
+from app.models.water_quality import WaterQuality
+
+# Columns moved into chunks (status is re-derived on decode)
+_READING_COLUMNS = (
+    'id', 'location_name', 'location_id', 'timestamp', 'user_id', 'is_public', 'organization_id', 'client_reading_id',
+    'ph_level', 'turbidity_ntu', 'dissolved_oxygen', 'temperature_c', 'conductivity_us', 'total_dissolved_solids'
+)
+
+
+def _window_start(timestamp, window):
+    return EPOCH + (timestamp - EPOCH) // window * window
+
+
+def compaction_cutoff(hot_days, chunk_days, now=None):
+    """Readings before this are compacted: hot_days ago, rounded down to a whole window"""
+    return _window_start((now or datetime.utcnow()) - timedelta(days=hot_days), timedelta(days=chunk_days))
+
+
+def compact_readings(hot_days, chunk_days, chunk_rows):
+    """Move readings older than the cutoff into compressed chunks.
+
+    Works one series (location, author, visibility, organization) and one window at a
+    time, committing after each window. Returns (readings compacted,
+    chunks written, compressed bytes).
+    """
+    table = WaterQuality.__table__
+    cutoff = compaction_cutoff(hot_days, chunk_days)
+    window = timedelta(days=chunk_days)
+    series = db.session.execute(
+        select(table.c.location_name, table.c.user_id, table.c.is_public, table.c.organization_id)
+        .where(table.c.timestamp < cutoff)
+        .group_by(table.c.location_name, table.c.user_id, table.c.is_public, table.c.organization_id)
+    ).all()
+
+    compacted = chunks = size = 0
+    for location_name, user_id, is_public, organization_id in series:
+        in_series = (
+            table.c.user_id == user_id,
+            table.c.location_name == location_name,
+            table.c.is_public.is_(is_public),
+            table.c.organization_id.is_not_distinct_from(organization_id)
+        )
+        start = db.session.execute(select(func.min(table.c.timestamp)).where(*in_series)).scalar()
+        while start is not None and start < cutoff:
+            window_start = _window_start(start, window)
+            window_end = min(window_start + window, cutoff)
+            rows = db.session.execute(
+                select(*[table.c[name] for name in _READING_COLUMNS])
+                .where(*in_series, table.c.timestamp >= window_start, table.c.timestamp < window_end)
+                .order_by(table.c.timestamp, table.c.id)
+            ).all()
+            for offset in range(0, len(rows), chunk_rows):
+                readings = [dict(row._mapping) for row in rows[offset:offset + chunk_rows]]
+                chunk = ReadingChunk.from_readings(readings)
+                db.session.add(chunk)
+                db.session.execute(delete(table).where(table.c.id.in_([reading['id'] for reading in readings])))
+                chunks += 1
+                size += len(chunk.data)
+            compacted += len(rows)
+            db.session.commit()
+            start = db.session.execute(
+                select(func.min(table.c.timestamp)).where(*in_series, table.c.timestamp >= window_end)
+            ).scalar()
+    return compacted, chunks, size
+
+
+def purge_readings(retention_days):
+    """Drop readings older than retention_days from both tiers. Returns readings removed."""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    removed = db.session.execute(
+        select(func.coalesce(func.sum(ReadingChunk.reading_count), 0)).where(ReadingChunk.end_time < cutoff)
+    ).scalar()
+    db.session.execute(delete(ReadingChunk).where(ReadingChunk.end_time < cutoff))
+    removed += db.session.execute(delete(WaterQuality).where(WaterQuality.timestamp < cutoff)).rowcount
+    db.session.commit()
+    return int(removed)
+
+
+def apply_retention(config):
+    """Compact and purge according to the READINGS_* settings; returns a summary dict"""
+    compacted, chunks, size = compact_readings(
+        config['READINGS_HOT_DAYS'], config['READINGS_CHUNK_DAYS'], config['READINGS_CHUNK_ROWS']
+    )
+    purged = purge_readings(config['READINGS_RETENTION_DAYS']) if config['READINGS_RETENTION_DAYS'] else 0
+    return {'compacted': compacted, 'chunks': chunks, 'compressed_bytes': size, 'purged': purged}
+
+
+def retention_stats():
+    hot = db.session.execute(select(func.count(WaterQuality.id), func.min(WaterQuality.timestamp))).one()
+    cold = db.session.execute(select(
+        func.count(ReadingChunk.id),
+        func.coalesce(func.sum(ReadingChunk.reading_count), 0),
+        func.coalesce(func.sum(func.length(ReadingChunk.data)), 0),
+        func.min(ReadingChunk.start_time),
+        func.max(ReadingChunk.end_time)
+    )).one()
+    return {
+        'hot_readings': hot[0],
+        'hot_oldest': hot[1].isoformat() if hot[1] else None,
+        'cold_chunks': cold[0],
+        'cold_readings': int(cold[1]),
+        'cold_bytes': int(cold[2]),
+        'cold_bytes_per_reading': cold[2] / cold[1] if cold[1] else None,
+        'cold_oldest': cold[3].isoformat() if cold[3] else None,
+        'cold_newest': cold[4].isoformat() if cold[4] else None
+    }
+
+
+def delete_cold_reading(reading_id, user_id):
+    """Remove one reading from its chunk (re-encoding the rest). Returns the reading dict or None."""
+    candidates = ReadingChunk.query.filter(
+        ReadingChunk.user_id == user_id,
+        ReadingChunk.min_reading_id <= reading_id,
+        ReadingChunk.max_reading_id >= reading_id
+    ).all()
+    for chunk in candidates:
+        readings = chunk.readings()
+        remaining = [reading for reading in readings if reading['id'] != reading_id]
+        if len(remaining) == len(readings):
+            continue
+        deleted = next(reading for reading in readings if reading['id'] == reading_id)
+        db.session.delete(chunk)
+        if remaining:
+            db.session.add(ReadingChunk.from_readings(remaining))
+        return deleted
+    return None
\ No newline at end of file
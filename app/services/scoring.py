@@ -0,0 +1,142 @@
+from flask import current_app, has_app_context
+
+# NumPy is imported inside the batch functions only: it is the single largest
+# import in the app and the request path for single readings never needs it.
+
+# Status names indexed by the codes returned from score_batch(), best first
+STATUS_CODES = ('excellent', 'good', 'fair', 'poor')
+
+# Each scored parameter earns 2 points inside its 'good' range, 1 inside its
+# 'fair' range and 0 otherwise (or when missing). Ranges are inclusive
+# [low, high]; None means unbounded. A status needs at least its minimum
+# total score. Override any part with Config.WATER_QUALITY_THRESHOLDS.
+DEFAULT_THRESHOLDS = {
+    'ph_level': {'good': (6.5, 8.5), 'fair': (6.0, 9.0)},
+    'dissolved_oxygen': {'good': (5, None), 'fair': (3, None)},
+    'turbidity_ntu': {'good': (None, 5), 'fair': (None, 10)},
+    'status_min_scores': {'excellent': 5, 'good': 3, 'fair': 1},
+    # Approximate conversion: TDS (ppm) = Conductivity (μS/cm) × 0.64
+    'tds_factor': 0.64,
+}
+
+SCORED_PARAMETERS = ('ph_level', 'dissolved_oxygen', 'turbidity_ntu')
+
+
+def get_thresholds():
+    """Default thresholds with the app's WATER_QUALITY_THRESHOLDS overrides applied"""
+    overrides = current_app.config.get('WATER_QUALITY_THRESHOLDS') if has_app_context() else None
+    if not overrides:
+        return DEFAULT_THRESHOLDS
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(thresholds.get(key), dict):
+            thresholds[key] = {**thresholds[key], **value}
+        else:
+            thresholds[key] = value
+    return thresholds
+
+
+def _in_range(value, bounds):
+    low, high = bounds
+    return (low is None or value >= low) and (high is None or value <= high)
+
+
+def score_status(ph_level, dissolved_oxygen, turbidity_ntu, thresholds=None):
+    """Status name for a single reading (missing values score 0)"""
+    thresholds = thresholds or get_thresholds()
+    score = 0
+    for parameter, value in zip(SCORED_PARAMETERS, (ph_level, dissolved_oxygen, turbidity_ntu)):
+        if value is None:
+            continue
+        if _in_range(value, thresholds[parameter]['good']):
+            score += 2
+        elif _in_range(value, thresholds[parameter]['fair']):
+            score += 1
+    return _status_for_score(score, thresholds)
+
+
+def _status_for_score(score, thresholds):
+    min_scores = thresholds['status_min_scores']
+    for status in STATUS_CODES[:-1]:
+        if score >= min_scores[status]:
+            return status
+    return STATUS_CODES[-1]
+
+
+def tds_for(conductivity_us, thresholds=None):
+    """TDS (ppm) for a single conductivity value, or None"""
+    if conductivity_us:
+        return round(conductivity_us * (thresholds or get_thresholds())['tds_factor'], 2)
+    return None
+
+
+def as_column(values):
+    """Float array with NaN for missing values"""
+    import numpy as np
+    return np.asarray(values, dtype=float)
+
+
+def _range_mask(values, bounds):
+    import numpy as np
+    low, high = bounds
+    mask = ~np.isnan(values)
+    if low is not None:
+        mask &= values >= low
+    if high is not None:
+        mask &= values <= high
+    return mask
+
+
+def score_batch(ph_level, dissolved_oxygen, turbidity_ntu, thresholds=None):
+    """Status codes (indexes into STATUS_CODES) for whole columns of readings at once.
+
+    Accepts sequences or arrays; None/NaN values score 0 like score_status().
+    """
+    import numpy as np
+    thresholds = thresholds or get_thresholds()
+    score = None
+    for parameter, values in zip(SCORED_PARAMETERS, (ph_level, dissolved_oxygen, turbidity_ntu)):
+        values = as_column(values)
+        points = np.where(
+            _range_mask(values, thresholds[parameter]['good']), 2,
+            np.where(_range_mask(values, thresholds[parameter]['fair']), 1, 0)
+        )
+        score = points if score is None else score + points
+
+    min_scores = thresholds['status_min_scores']
+    codes = np.full(score.shape, len(STATUS_CODES) - 1, dtype=np.int8)
+    # Assign worst to best so the best matching status wins
+    for code in range(len(STATUS_CODES) - 2, -1, -1):
+        codes[score >= min_scores[STATUS_CODES[code]]] = code
+    return codes
+
+
+def tds_batch(conductivity_us, thresholds=None):
+    """TDS (ppm) for a column of conductivity values; NaN where conductivity is missing or 0"""
+    import numpy as np
+    conductivity = as_column(conductivity_us)
+    tds = np.round(conductivity * (thresholds or get_thresholds())['tds_factor'], 2)
+    tds[conductivity == 0] = np.nan
+    return tds
+
+
+def derived_tds_mask(tds, conductivity_us, thresholds=None):
+    """True where a TDS column holds the value derived from conductivity rather than a measurement.
+
+    Matches to within a cent, since single readings are rounded by round()
+    and batches by NumPy. Missing TDS or conductivity is never derived.
+    """
+    import numpy as np
+    difference = np.abs(as_column(tds) - tds_batch(conductivity_us, thresholds))
+    return ~np.isnan(difference) & (difference <= 0.01 + 1e-9)
+
+
+def status_names(codes):
+    """Map status codes back to their names"""
+    import numpy as np
+    return np.array(STATUS_CODES, dtype=object)[codes]
+
+
+def nan_to_none(values):
+    """List with NaN replaced by None, ready for the database"""
+    return [None if value != value else float(value) for value in values]
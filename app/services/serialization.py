@@ -0,0 +1,132 @@
+"""Fast serialization of reading lists, and an orjson-backed JSON provider.
+
+Readings are serialized from row tuples of a column query, never from ORM
+objects: a RowSerializer picks the requested fields out of each row by
+position, formats the timestamp with datetime.isoformat (C code, ~3x
+faster than strftime, same 'YYYY-MM-DD HH:MM:SS' output) and looks the
+status colour up in a bound dict method. It produces either a list of
+to_dict()-shaped objects or, for chart clients, one list per field.
+
+With JSON_BACKEND 'auto' (orjson when installed) or 'orjson', app.json
+encodes with orjson. Output matches Flask's default provider except that
+non-ASCII text is written as UTF-8 rather than \\u escapes and NaN/Infinity
+become null; anything orjson can't encode falls back to the stdlib.
+"""
+import json
+from operator import itemgetter
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+JSON_BACKENDS = ('auto', 'orjson', 'stdlib')
+
+# Shapes of a serialized reading list
+SHAPES = ('rows', 'columns')
+
+
+def format_timestamp(value):
+    """'YYYY-MM-DD HH:MM:SS' (the format readings have always been returned in), or None"""
+    return value.isoformat(' ', 'seconds') if value is not None else None
+
+
+class RowSerializer:
+    """Serialize row tuples whose columns are `columns` into the output `fields`.
+
+    fields may include 'status_color', which is derived from the 'status'
+    column; every other field must be one of the columns.
+    """
+    def __init__(self, columns, fields):
+        from app.models.water_quality import STATUS_COLORS
+        columns = list(columns)
+        self.fields = tuple(fields)
+        picks = [columns.index('status' if field == 'status_color' else field) for field in self.fields]
+        # itemgetter with one index returns the value rather than a 1-tuple
+        self._pick = itemgetter(*picks) if len(picks) > 1 else lambda row, index=picks[0]: (row[index],)
+        self._timestamp = self.fields.index('timestamp') if 'timestamp' in self.fields else None
+        self._color = self.fields.index('status_color') if 'status_color' in self.fields else None
+        self._color_for = STATUS_COLORS.get
+
+    def rows(self, rows):
+        """A list of {field: value} dicts, one per row"""
+        fields, pick, timestamp, color, color_for = \
+            self.fields, self._pick, self._timestamp, self._color, self._color_for
+        if timestamp is None and color is None:
+            return [dict(zip(fields, pick(row))) for row in rows]
+        result = []
+        for row in rows:
+            values = list(pick(row))
+            if timestamp is not None and values[timestamp] is not None:
+                values[timestamp] = values[timestamp].isoformat(' ', 'seconds')
+            if color is not None:
+                values[color] = color_for(values[color], 'secondary')
+            result.append(dict(zip(fields, values)))
+        return result
+
+    def columns(self, rows):
+        """{field: [value per row]}, in row order"""
+        pick = self._pick
+        transposed = list(zip(*map(pick, rows))) if rows else [()] * len(self.fields)
+        result = {}
+        for index, (field, values) in enumerate(zip(self.fields, transposed)):
+            if index == self._timestamp:
+                result[field] = [format_timestamp(value) for value in values]
+            elif index == self._color:
+                color_for = self._color_for
+                result[field] = [color_for(value, 'secondary') for value in values]
+            else:
+                result[field] = list(values)
+        return result
+
+    def serialize(self, rows, shape='rows'):
+        return self.columns(rows) if shape == 'columns' else self.rows(rows)
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding with orjson; same defaults (sorted keys, date format) as the stdlib one"""
+    # Dates go through Flask's default() so they keep the HTTP-date format
+    options = orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def _encode(self, obj, indent=False):
+        options = self.options
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if indent:
+            options |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(obj, default=self.default, option=options)
+        except orjson.JSONEncodeError:
+            # Integers beyond 64 bits, or a genuine TypeError the stdlib will raise too
+            layout = {'indent': 2} if indent else {'separators': (',', ':')}
+            return super().dumps(obj, **layout).encode('utf-8')
+
+    def dumps(self, obj, **kwargs):
+        # Anything beyond compact/indent=2 output (tojson filters, custom
+        # separators or encoders) is left to the stdlib
+        indent = kwargs.pop('indent', None)
+        separators = kwargs.pop('separators', None)
+        if kwargs or indent not in (None, 2) or separators not in (None, (',', ':')):
+            return super().dumps(obj, indent=indent, separators=separators, **kwargs)
+        return self._encode(obj, indent == 2).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if kwargs:
+            return json.loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        return self._app.response_class(self._encode(obj, indent) + b'\n', mimetype=self.mimetype)
+
+
+def init_json(app):
+    backend = app.config['JSON_BACKEND']
+    if backend not in JSON_BACKENDS:
+        raise RuntimeError(f"JSON_BACKEND must be one of: {', '.join(JSON_BACKENDS)}")
+    if backend == 'orjson' and orjson is None:
+        raise RuntimeError("JSON_BACKEND=orjson requires the 'orjson' package")
+    if backend != 'stdlib' and orjson is not None:
+        app.json = OrjsonProvider(app)
\ No newline at end of file
@@ -0,0 +1,289 @@
+"""Per-location reading series as NumPy arrays, and the statistics computed on them.
+
+A location's whole history (hot rows and compacted chunks) is loaded once
+into column arrays and kept in a per-worker LRU. Writes through this worker
+drop the affected locations; writes through other workers are noticed by a
+max(id) probe on the location_id index (new readings) or after
+ANALYTICS_SERIES_TTL (deletes). Visibility (including the organization) is
+applied per request as a mask, so one cached series serves every user.
+
+All statistics work on the readings that have a value for the parameter,
+in time order, and are vectorized: rolling windows use cumulative sums and
+searchsorted, baselines use bincount, and the EWMA is evaluated block-wise
+in closed form.
+"""
+import math
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+import numpy as np
+from flask import current_app
+from sqlalchemy import select, func
+from app.database.connection import db
+from app.services.tenancy import unscoped
+from app.services.timeseries import decode_columns
+
+SERIES_PARAMETERS = ('ph_level', 'turbidity_ntu', 'dissolved_oxygen', 'temperature_c', 'conductivity_us')
+PERCENTILES = (5, 25, 50, 75, 95)
+MICROS_PER_HOUR = 3600 * 10 ** 6
+MICROS_PER_DAY = 24 * MICROS_PER_HOUR
+
+
+class LocationSeries:
+    """Column arrays of every reading at one location, ordered by (timestamp, id)"""
+    def __init__(self, ids, timestamps, user_ids, is_public, organization_ids, values):
+        order = np.lexsort((ids, timestamps))
+        self.ids = ids[order]
+        self.timestamps = timestamps[order]  # microseconds since the epoch (UTC)
+        self.user_ids = user_ids[order]
+        self.is_public = is_public[order]
+        self.organization_ids = organization_ids[order]  # -1 where unknown
+        self.values = {name: column[order] for name, column in values.items()}
+        self.max_id = int(ids.max()) if ids.size else 0
+        self.loaded_at = time.monotonic()
+
+    def __len__(self):
+        return self.ids.size
+
+    def mask(self, user=None, since=None, until=None, organization_id=None):
+        """Readings visible to user (None: everyone's) in organization_id (None: any) within [since, until] (microseconds)"""
+        keep = np.ones(self.ids.size, dtype=bool)
+        if organization_id is not None:
+            keep &= self.organization_ids == organization_id
+        if user is not None and not user.can_view_all_data():
+            keep &= self.is_public | (self.user_ids == user.id)
+        if since is not None:
+            keep &= self.timestamps >= since
+        if until is not None:
+            keep &= self.timestamps <= until
+        return keep
+
+    def column(self, parameter, keep):
+        """(ids, timestamps, values) of the kept readings that have a value for parameter"""
+        values = self.values[parameter]
+        keep = keep & ~np.isnan(values)
+        return self.ids[keep], self.timestamps[keep], values[keep]
+
+
+def load_series(location_id, location_name):
+    """Read a location's readings (every organization's) from both tiers into a LocationSeries"""
+    from app.models.water_quality import WaterQuality
+    from app.models.reading_chunk import ReadingChunk, EPOCH
+    columns = ('id', 'timestamp', 'user_id', 'is_public', 'organization_id') + SERIES_PARAMETERS
+    parts = {name: [] for name in columns}
+    with unscoped():
+        rows = db.session.execute(
+            select(*[getattr(WaterQuality, name) for name in columns])
+            .where(WaterQuality.location_id == location_id, WaterQuality.timestamp.isnot(None))
+        ).all()
+        if rows:
+            hot = list(zip(*rows))
+            parts['id'].append(np.array(hot[0], dtype=np.int64))
+            # Integer timedelta division is ~5x faster than NumPy's datetime parsing of the objects
+            micro = timedelta(microseconds=1)
+            parts['timestamp'].append(np.fromiter(((stamp - EPOCH) // micro for stamp in hot[1]), dtype=np.int64, count=len(rows)))
+            parts['user_id'].append(np.array(hot[2], dtype=np.int64))
+            parts['is_public'].append(np.array([value is True for value in hot[3]], dtype=bool))
+            parts['organization_id'].append(np.array([-1 if value is None else value for value in hot[4]], dtype=np.int64))
+            for index, name in enumerate(SERIES_PARAMETERS, start=5):
+                parts[name].append(np.array(hot[index], dtype=float))
+        for chunk in ReadingChunk.query.filter(ReadingChunk.location_name == location_name):
+            decoded = decode_columns(chunk.data)  # status/TDS aren't needed here
+            count = chunk.reading_count
+            parts['id'].append(decoded['id'])
+            parts['timestamp'].append(decoded['timestamp'])
+            parts['user_id'].append(np.full(count, chunk.user_id, dtype=np.int64))
+            parts['is_public'].append(np.full(count, chunk.is_public is True, dtype=bool))
+            parts['organization_id'].append(np.full(count, -1 if chunk.organization_id is None else chunk.organization_id, dtype=np.int64))
+            for name in SERIES_PARAMETERS:
+                parts[name].append(decoded[name])
+
+    def joined(name, dtype):
+        return np.concatenate(parts[name]) if parts[name] else np.empty(0, dtype=dtype)
+
+    return LocationSeries(
+        joined('id', np.int64), joined('timestamp', np.int64), joined('user_id', np.int64),
+        joined('is_public', bool), joined('organization_id', np.int64),
+        {name: joined(name, float) for name in SERIES_PARAMETERS}
+    )
+
+
+class SeriesCache:
+    """LRU of LocationSeries keyed by location id, per worker"""
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, location_id, location_name):
+        from app.models.water_quality import WaterQuality
+        with self._lock:
+            series = self._entries.get(location_id)
+        if series is not None and time.monotonic() - series.loaded_at < self.ttl:
+            # Readings added by other workers since the load (only this request's
+            # organization is probed; the others' readings are masked out anyway)
+            newest = db.session.execute(
+                select(func.max(WaterQuality.id)).where(WaterQuality.location_id == location_id)
+            ).scalar() or 0
+            if newest <= series.max_id:
+                self.hits += 1
+                with self._lock:
+                    if location_id in self._entries:
+                        self._entries.move_to_end(location_id)
+                return series
+        self.misses += 1
+        series = load_series(location_id, location_name)
+        with self._lock:
+            self._entries[location_id] = series
+            self._entries.move_to_end(location_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return series
+
+    def invalidate(self, location_ids=None):
+        with self._lock:
+            if location_ids is None:
+                self._entries.clear()
+            for location_id in location_ids or ():
+                self._entries.pop(location_id, None)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        with self._lock:
+            cached = len(self._entries)
+            readings = sum(len(series) for series in self._entries.values())
+        return {
+            'series_cached': cached,
+            'readings_cached': readings,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': self.hits / lookups if lookups else 0.0
+        }
+
+
+def init_series(app):
+    app.extensions['series_cache'] = SeriesCache(app.config['ANALYTICS_SERIES_MAX_ENTRIES'], app.config['ANALYTICS_SERIES_TTL'])
+
+
+def get_series_cache():
+    return current_app.extensions['series_cache']
+
+
+def invalidate_series(readings=None):
+    """Drop cached series touched by readings (dicts or objects with location_id); None drops all"""
+    cache = current_app.extensions.get('series_cache')
+    if cache is None:
+        return
+    if readings is None:
+        cache.invalidate()
+        return
+    cache.invalidate({
+        reading['location_id'] if isinstance(reading, dict) else reading.location_id for reading in readings
+    })
+
+
+def rolling_stats(timestamps, values, window, exclude_current=False):
+    """Mean, sample std and count over the time window (t - window, t] ending at each reading.
+
+    With exclude_current the window is (t - window, t), i.e. what was known
+    before the reading arrived; used to score it.
+    """
+    count = values.size
+    shifted = values - (values.mean() if count else 0.0)  # keeps the sum-of-squares well conditioned
+    sums = np.concatenate(([0.0], np.cumsum(shifted)))
+    squares = np.concatenate(([0.0], np.cumsum(shifted * shifted)))
+    start = np.searchsorted(timestamps, timestamps - window, side='right')
+    end = np.arange(count) + (0 if exclude_current else 1)
+    n = end - start
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = (sums[end] - sums[start]) / n
+        variance = (squares[end] - squares[start] - n * mean * mean) / (n - 1)
+    std = np.sqrt(np.clip(variance, 0, None))
+    std[n < 2] = np.nan
+    mean += values.mean() if count else 0.0
+    return mean, std, n
+
+
+def percentiles(values):
+    if not values.size:
+        return {f'p{q}': None for q in PERCENTILES}
+    return {f'p{q}': float(value) for q, value in zip(PERCENTILES, np.percentile(values, PERCENTILES))}
+
+
+def seasonal_profile(timestamps, values, period, buckets):
+    """Mean, std and count of values grouped by position in a repeating period (UTC)"""
+    if period == 'hour_of_day':
+        slot = (timestamps // MICROS_PER_HOUR) % 24
+    else:  # day_of_week, Monday = 0 (1970-01-01 was a Thursday)
+        slot = (timestamps // MICROS_PER_DAY + 3) % 7
+    count = np.bincount(slot, minlength=buckets)
+    total = np.bincount(slot, weights=values, minlength=buckets)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mean = total / count
+        variance = np.bincount(slot, weights=(values - mean[slot]) ** 2, minlength=buckets) / (count - 1)
+    return slot, mean, np.sqrt(variance), count
+
+
+def ewma(values, alpha):
+    """y[t] = alpha * x[t] + (1 - alpha) * y[t - 1], y[0] = x[0].
+
+    Within a block, y[k] = d^(k+1) * (y_prev + alpha * sum_j x[j] / d^(j+1))
+    with d = 1 - alpha, so each block is one cumsum. Blocks are as long as
+    d^block stays clear of float64 underflow (the terms grow geometrically,
+    so the cumsum keeps full relative precision).
+    """
+    count = values.size
+    result = np.empty(count)
+    if not count:
+        return result
+    decay = 1.0 - alpha
+    if decay <= 0:
+        return values.copy()
+    block = max(1, min(65536, int(math.log(1e-250) / math.log(decay))))
+    powers = decay ** np.arange(1, block + 1)
+    previous = values[0]
+    for start in range(0, count, block):
+        chunk = values[start:start + block]
+        scale = powers[:chunk.size]
+        result[start:start + chunk.size] = scale * (previous + alpha * np.cumsum(chunk / scale))
+        previous = result[start + chunk.size - 1]
+    return result
+
+
+def zscore_anomalies(timestamps, values, window, threshold, min_periods=10):
+    """Score each reading against the rolling window before it; returns (scores, expected, flagged)"""
+    mean, std, n = rolling_stats(timestamps, values, window, exclude_current=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = (values - mean) / std
+    flagged = (n >= min_periods) & (np.abs(scores) > threshold) & (std > 0)
+    return scores, mean, flagged
+
+
+def seasonal_anomalies(timestamps, values, threshold, min_periods=10):
+    """Score each reading against the mean/std of its hour of day over the selected range"""
+    slot, mean, std, count = seasonal_profile(timestamps, values, 'hour_of_day', 24)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = (values - mean[slot]) / std[slot]
+    flagged = (count[slot] >= min_periods) & (np.abs(scores) > threshold) & (std[slot] > 0)
+    return scores, mean[slot], flagged
+
+
+def ewma_anomalies(values, alpha, threshold):
+    """Score each reading's deviation from the EWMA forecast by the EWMA of past squared deviations"""
+    count = values.size
+    if count < 2:
+        return np.full(count, np.nan), values.copy(), np.zeros(count, dtype=bool)
+    level = ewma(values, alpha)
+    forecast = np.concatenate(([values[0]], level[:-1]))
+    residual = values - forecast
+    variance = ewma(residual * residual, alpha)
+    previous_variance = np.concatenate(([np.nan], variance[:-1]))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        scores = residual / np.sqrt(previous_variance)
+    warm = np.arange(count) >= math.ceil(1 / alpha)
+    flagged = warm & (np.abs(scores) > threshold) & (previous_variance > 0)
+    return scores, forecast, flagged
\ No newline at end of file
@@ -0,0 +1,84 @@
+"""Tenant scoping: each request's queries only see its organization's rows.
+
+Users belong to an organization (users without one to the
+DEFAULT_ORGANIZATION), and readings, rollup buckets, compacted chunks and
+alerts are stamped with the organization of the user who submitted the
+reading. For a signed-in user other than an admin, every ORM select of a
+TenantScoped model gets `organization_id = <their organization>` added
+through with_loader_criteria, so handlers don't have to remember the
+filter and the organization-leading indexes keep each tenant's queries
+proportional to its own data.
+
+Admins, anonymous requests and background work (jobs, the ingest flush)
+are unscoped. TENANT_ISOLATION=false turns scoping off altogether.
+"""
+from contextlib import contextmanager
+from flask import g, has_app_context
+from flask_login import current_user
+from sqlalchemy import event, select
+from sqlalchemy.orm import with_loader_criteria
+from app.database.connection import db, RoutingSession
+from app.models.organization import Organization, TenantScoped
+
+# READINGS_PARTITIONING values: 'none', or 'organization' for one PostgreSQL partition per organization
+PARTITIONING_MODES = ('none', 'organization')
+
+
+def organization_of(user):
+    """The organization a user's readings belong to"""
+    return user.organization_id or Organization.default_id()
+
+
+def current_tenant():
+    """Organization id this request's queries are limited to, or None when unscoped"""
+    return g.get('tenant_id') if has_app_context() else None
+
+
+@contextmanager
+def unscoped():
+    """Run queries across every organization, e.g. to maintain shared per-worker caches or derived tables"""
+    tenant = g.pop('tenant_id', None)
+    try:
+        yield
+    finally:
+        if tenant is not None:
+            g.tenant_id = tenant
+
+
+def fill_organization_ids(rows):
+    """Set organization_id on reading row dicts that lack it, from their authors"""
+    from app.models.user import User
+    missing = {row['user_id'] for row in rows if row.get('organization_id') is None}
+    if not missing:
+        return
+    organizations = dict(db.session.execute(select(User.id, User.organization_id).where(User.id.in_(missing))).all())
+    for row in rows:
+        if row.get('organization_id') is None:
+            row['organization_id'] = organizations.get(row['user_id']) or Organization.default_id()
+
+
+@event.listens_for(RoutingSession, 'do_orm_execute')
+def _limit_to_tenant(execute_state):
+    tenant = current_tenant()
+    if tenant is None or not execute_state.is_select:
+        return
+    if execute_state.is_column_load or execute_state.is_relationship_load:
+        return
+    execute_state.statement = execute_state.statement.options(
+        with_loader_criteria(TenantScoped, lambda cls: cls.organization_id == tenant, include_aliases=True)
+    )
+
+
+def _scope_request():
+    if current_user.is_authenticated and not current_user.is_admin():
+        g.tenant_id = organization_of(current_user)
+
+
+def init_tenancy(app):
+    mode = app.config['READINGS_PARTITIONING']
+    if mode not in PARTITIONING_MODES:
+        raise ValueError(f"READINGS_PARTITIONING must be one of: {', '.join(PARTITIONING_MODES)}")
+    if mode == 'organization' and not app.config['SQLALCHEMY_DATABASE_URI'].startswith('postgresql'):
+        raise ValueError("READINGS_PARTITIONING='organization' requires PostgreSQL")
+    if app.config['TENANT_ISOLATION']:
+        app.before_request(_scope_request)
\ No newline at end of file
@@ -17,11 +17,11 @@ class AnalyticsDashboard {
         console.log('Initializing Analytics Dashboard...');
         
         try {
-            // Load all data in parallel for better performance
+            // Load all data in parallel for better performance; the statistics
+            // response also carries the status counts for the distribution chart
             await Promise.all([
                 this.loadStatistics(),
-                this.loadTrendsChart(),
-                this.loadQualityDistribution()
+                this.loadTrendsChart()
             ]);
             
             // Load role-specific analytics
@@ -33,6 +33,8 @@ class AnalyticsDashboard {
                 await this.loadUserStatistics();
             }
             
+            this.connectLiveFeed();
+            
             console.log('Analytics Dashboard initialized successfully');
         } catch (error) {
             console.error('Error initializing dashboard:', error);
@@ -40,6 +42,40 @@ class AnalyticsDashboard {
         }
     }
 
+    // Refresh the charts when readings change, at most once per LIVE_REFRESH_MS
+    connectLiveFeed() {
+        if (!window.EventSource || !window.liveFeedEnabled) return;
+        
+        this.liveFeed = new EventSource('/api/water/stream');
+        const scheduleRefresh = () => {
+            if (this.refreshTimer) return;
+            this.refreshTimer = setTimeout(() => {
+                this.refreshTimer = null;
+                this.refresh();
+            }, AnalyticsDashboard.LIVE_REFRESH_MS);
+        };
+        
+        this.liveFeed.addEventListener('reading', scheduleRefresh);
+        this.liveFeed.addEventListener('reading_deleted', scheduleRefresh);
+        this.liveFeed.addEventListener('resync', () => {
+            this.liveFeed.close();
+            scheduleRefresh();
+            this.connectLiveFeed();
+        });
+    }
+
+    async refresh() {
+        try {
+            await Promise.all([
+                this.loadStatistics(),
+                this.loadTrendsChart(),
+                this.userCanViewLocationInsights() ? this.loadLocationInsights() : null
+            ]);
+        } catch (error) {
+            console.error('Error refreshing dashboard:', error);
+        }
+    }
+
     // Role checking methods
     userCanViewLocationInsights() {
         return ['researcher', 'government', 'admin'].includes(window.currentUserRole);
@@ -63,16 +99,23 @@ class AnalyticsDashboard {
             document.getElementById('avg-ph').textContent = data.avg_ph.toFixed(2);
             document.getElementById('active-locations').textContent = data.active_locations.toLocaleString();
             
+            this.renderQualityDistribution(data.status_counts);
+            
         } catch (error) {
             console.error('Error loading statistics:', error);
             this.showErrorInCard('total-readings', 'Failed to load');
+            document.getElementById('distribution-loading').innerHTML = 
+                '<div class="text-danger">Failed to load distribution data</div>';
         }
     }
 
     // Trends Chart (Line Chart)
     async loadTrendsChart() {
         try {
-            const response = await fetch('/analytics/api/water-quality-trends');
+            // Never ask for more points than the canvas has room to draw
+            const canvas = document.getElementById('trendsChart');
+            const maxPoints = Math.max(50, Math.floor((canvas.clientWidth || 800) / 2));
+            const response = await fetch(`/analytics/api/water-quality-trends?max_points=${maxPoints}`);
             if (!response.ok) throw new Error('Failed to fetch trends data');
             
             const data = await response.json();
@@ -81,6 +124,7 @@ class AnalyticsDashboard {
             document.getElementById('trends-loading').style.display = 'none';
             
             const ctx = document.getElementById('trendsChart').getContext('2d');
+            if (this.charts.trends) this.charts.trends.destroy();  // live refresh redraws
             this.charts.trends = new Chart(ctx, {
                 type: 'line',
                 data: {
@@ -191,18 +235,29 @@ class AnalyticsDashboard {
         }
     }
 
-    // Quality Distribution (Pie Chart)
-    async loadQualityDistribution() {
+    // Quality Distribution (Pie Chart), built from the statistics status counts
+    renderQualityDistribution(statusCounts) {
         try {
-            const response = await fetch('/analytics/api/quality-distribution');
-            if (!response.ok) throw new Error('Failed to fetch quality distribution');
-            
-            const data = await response.json();
+            const statusColors = {
+                excellent: '#28a745',
+                good: '#20c997',
+                fair: '#ffc107',
+                poor: '#dc3545'
+            };
+            const statuses = Object.keys(statusColors).filter(status => statusCounts[status] > 0);
+            const data = statuses.length > 0
+                ? {
+                    labels: statuses.map(status => status.charAt(0).toUpperCase() + status.slice(1)),
+                    data: statuses.map(status => statusCounts[status]),
+                    colors: statuses.map(status => statusColors[status])
+                }
+                : { labels: ['No Data'], data: [1], colors: ['#6c757d'] };
             
             // Hide loading spinner
             document.getElementById('distribution-loading').style.display = 'none';
             
             const ctx = document.getElementById('qualityPieChart').getContext('2d');
+            if (this.charts.qualityPie) this.charts.qualityPie.destroy();  // live refresh redraws
             this.charts.qualityPie = new Chart(ctx, {
                 type: 'doughnut',
                 data: {
@@ -416,12 +471,16 @@ class AnalyticsDashboard {
 
     // Cleanup method (for page navigation)
     destroy() {
+        if (this.liveFeed) this.liveFeed.close();
+        clearTimeout(this.refreshTimer);
         Object.values(this.charts).forEach(chart => {
             if (chart) chart.destroy();
         });
     }
 }
 
+AnalyticsDashboard.LIVE_REFRESH_MS = 10000;
+
 // Initialize dashboard when page loads
 let analyticsDashboard;
 
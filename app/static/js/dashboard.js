@@ -3,6 +3,9 @@ class EnhancedWaterQualityDashboard {
     constructor() {
         this.readings = [];
         this.filteredReadings = [];
+        // Readings are loaded a page at a time; next_cursor of the last page loaded
+        this.pageSize = 100;
+        this.nextCursor = null;
         this.currentSort = { field: 'timestamp', direction: 'desc' };
         this.init();
     }
@@ -11,20 +14,62 @@ class EnhancedWaterQualityDashboard {
         await this.loadUserReadings();
         this.setupEventListeners();
         this.setupRealTimeFilters();
+        this.connectLiveFeed();
     }
 
-    // Load user's water readings
+    // Live feed: the server pushes readings changed elsewhere (other tabs, devices, bulk uploads)
+    connectLiveFeed() {
+        if (!window.EventSource || !window.liveFeedEnabled) return;
+
+        this.liveFeed = new EventSource('/api/water/stream?scope=own');
+
+        this.liveFeed.addEventListener('reading', (event) => {
+            const reading = JSON.parse(event.data);
+            if (this.readings.some(r => r.id === reading.id)) return;
+            this.readings.unshift(reading);
+            this.refreshReadings();
+        });
+
+        this.liveFeed.addEventListener('reading_deleted', (event) => {
+            const { id } = JSON.parse(event.data);
+            this.readings = this.readings.filter(r => r.id !== id);
+            this.refreshReadings();
+        });
+
+        // We fell too far behind (or the server restarted): reload everything, then reconnect
+        this.liveFeed.addEventListener('resync', async () => {
+            this.liveFeed.close();
+            await this.loadUserReadings();
+            this.connectLiveFeed();
+        });
+    }
+
+    refreshReadings() {
+        this.updateDashboardStats();
+        this.applyFilters();
+    }
+
+    // One page of the user's readings, newest first
+    async fetchReadingsPage(cursor) {
+        const url = cursor
+            ? `/api/water/readings?limit=${this.pageSize}&cursor=${encodeURIComponent(cursor)}`
+            : `/api/water/readings?limit=${this.pageSize}`;
+        const response = await fetch(url);
+
+        if (!response.ok) {
+            throw new Error(`HTTP ${response.status}: ${response.statusText}`);
+        }
+        return response.json();
+    }
+
+    // Load the newest page of the user's water readings; older ones come with "Load more"
     async loadUserReadings() {
         try {
             this.showLoading();
-            const response = await fetch('/api/water/readings');
-            
-            if (!response.ok) {
-                throw new Error(`HTTP ${response.status}: ${response.statusText}`);
-            }
-            
-            const data = await response.json();
+            const data = await this.fetchReadingsPage(null);
+
             this.readings = data.readings || [];
+            this.nextCursor = data.next_cursor;
             this.filteredReadings = [...this.readings];
             
             this.updateDashboardStats();
@@ -35,6 +80,30 @@ class EnhancedWaterQualityDashboard {
             console.error('Error loading readings:', error);
             this.showError(`Failed to load data: ${error.message}`);
         }
+        this.updateLoadMore();
+    }
+
+    // Append the next page of older readings
+    async loadMoreReadings() {
+        if (!this.nextCursor) return;
+        const button = document.getElementById('loadMoreReadings');
+        button.disabled = true;
+        try {
+            const data = await this.fetchReadingsPage(this.nextCursor);
+            const loaded = new Set(this.readings.map(r => r.id));
+            this.readings.push(...(data.readings || []).filter(r => !loaded.has(r.id)));
+            this.nextCursor = data.next_cursor;
+            this.refreshReadings();
+        } catch (error) {
+            console.error('Error loading more readings:', error);
+            this.showError(`Failed to load more readings: ${error.message}`);
+        }
+        button.disabled = false;
+        this.updateLoadMore();
+    }
+
+    updateLoadMore() {
+        document.getElementById('loadMoreReadings').classList.toggle('d-none', !this.nextCursor);
     }
 
     // Update dashboard statistics
@@ -44,7 +113,7 @@ class EnhancedWaterQualityDashboard {
         const latestTurbidity = document.getElementById('latestTurbidity');
         const latestOxygen = document.getElementById('latestOxygen');
 
-        totalReadings.textContent = this.readings.length;
+        totalReadings.textContent = `${this.readings.length}${this.nextCursor ? '+' : ''}`;
         
         if (this.readings.length > 0) {
             const latest = this.readings[0];
@@ -201,6 +270,8 @@ class EnhancedWaterQualityDashboard {
 
     // Setup event listeners
     setupEventListeners() {
+        document.getElementById('loadMoreReadings').addEventListener('click', () => this.loadMoreReadings());
+
         // Add reading form
         const form = document.getElementById('addReadingForm');
         if (form) {
@@ -331,6 +402,7 @@ class EnhancedWaterQualityDashboard {
             if (response.ok) {
                 this.showSuccess('Water quality reading added successfully!');
                 form.reset();
+                // Refetch even with the live feed open: its events arrive a poll later
                 await this.loadUserReadings();
             } else {
                 throw new Error(data.error || 'Failed to add reading');
@@ -540,13 +612,15 @@ class EnhancedWaterQualityDashboard {
     updateReadingCount() {
         const count = this.filteredReadings.length;
         const total = this.readings.length;
+        // Only loaded pages are counted; more exist while there is a next page
+        const more = this.nextCursor ? '+' : '';
         const badge = document.getElementById('readingCount');
         
         if (count === total) {
-            badge.textContent = `${count} reading${count !== 1 ? 's' : ''}`;
+            badge.textContent = `${count}${more} reading${count !== 1 || more ? 's' : ''}`;
             badge.className = 'badge bg-primary fs-6';
         } else {
-            badge.textContent = `${count} of ${total} reading${total !== 1 ? 's' : ''}`;
+            badge.textContent = `${count} of ${total}${more} reading${total !== 1 || more ? 's' : ''}`;
             badge.className = 'badge bg-warning fs-6';
         }
     }
@@ -0,0 +1,127 @@
+"""Per-reading cost of alert evaluation with thousands of active rules.
+
+Rules are spread over LOCATION_COUNT locations (plus a share of unscoped
+rules that apply everywhere) and cover every rule kind. The engine is
+timed directly on in-memory readings, then end to end through the bulk
+ingest endpoint with and without the rules loaded.
+
+Usage: python benchmarks/bench_alert_rules.py [readings] [rule_counts...]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import LOCATION_COUNT, Timer, login_client, make_app
+
+GLOBAL_SHARE = 0.02  # fraction of rules that are not scoped to a location
+
+# Roughly the 1st-99th percentile of the generated readings; rules sit just
+# outside so that, as in production, only a small share of readings trip one
+NORMAL_RANGES = {
+    'ph_level': (5.3, 9.1),
+    'turbidity_ntu': (0.05, 18),
+    'dissolved_oxygen': (1.1, 11.9),
+    'temperature_c': (5.3, 29.7),
+    'conductivity_us': (65, 1485)
+}
+
+
+def make_rules(count, rng):
+    from app.models.alert import ALERT_KINDS, ALERT_PARAMETERS, AlertRule
+    rules = []
+    for rule_id in range(1, count + 1):
+        parameter = rng.choice(ALERT_PARAMETERS)
+        kind = rng.choice(ALERT_KINDS)
+        operator = rng.choice(('>', '<'))
+        low, high = NORMAL_RANGES[parameter]
+        if kind == 'rate_of_change':
+            # Readings at one location are ~LOCATION_COUNT minutes apart
+            threshold = (high - low) * rng.uniform(1, 2) * (1 if operator == '>' else -1)
+        else:
+            threshold = high * rng.uniform(1, 1.2) if operator == '>' else low * rng.uniform(0.8, 1)
+        rules.append(AlertRule(
+            id=rule_id,
+            name=f'Rule {rule_id}',
+            parameter=parameter,
+            kind=kind,
+            operator=operator,
+            threshold=threshold,
+            window=rng.randint(2, 10),
+            location_name=None if rng.random() < GLOBAL_SHARE else f'Location {rng.randrange(LOCATION_COUNT)}',
+            severity='warning'
+        ))
+    return rules
+
+
+def make_readings(count, rng):
+    start = datetime.utcnow() - timedelta(minutes=count)
+    return [{
+        'id': index,
+        'location_name': f'Location {rng.randrange(LOCATION_COUNT)}',
+        'timestamp': start + timedelta(minutes=index),
+        'user_id': 1,
+        'organization_id': 1,
+        'is_public': True,
+        'ph_level': rng.gauss(7.2, 0.8),
+        'turbidity_ntu': rng.expovariate(1 / 4),
+        'dissolved_oxygen': rng.uniform(1, 12),
+        'temperature_c': rng.uniform(5, 30),
+        'conductivity_us': rng.uniform(50, 1500)
+    } for index in range(count)]
+
+
+def main():
+    readings_count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    rule_counts = [int(value) for value in sys.argv[2:]] or [0, 1000, 5000, 20000]
+
+    from app.database.connection import db
+    from app.services.alerts import AlertEngine, CompiledRule
+
+    rng = random.Random(42)
+    app = make_app()
+    readings = make_readings(readings_count, rng)
+
+    print(f"Engine only, {readings_count} readings over {LOCATION_COUNT} locations")
+    print(f"{'rules':>7} {'rules/reading':>14} {'µs/reading':>11} {'alerts':>7}")
+    for count in rule_counts:
+        engine = AlertEngine(ttl=3600)
+        engine.load([CompiledRule(rule) for rule in make_rules(count, random.Random(count))])
+        engine._loaded_at = float('inf')  # never reload from the (empty) table
+        checked = count * GLOBAL_SHARE + count * (1 - GLOBAL_SHARE) / LOCATION_COUNT
+        with Timer() as timer:
+            alerts, _ = engine.evaluate_rows(readings, {})
+        print(f'{count:7d} {checked:14.0f} {timer.elapsed / readings_count * 1e6:11.1f} {len(alerts):7d}')
+
+    # End to end: bulk uploads of 1000 readings with and without rules stored
+    client = login_client(app, 'government')
+    body = [{
+        'location_name': reading['location_name'],
+        'ph_level': round(reading['ph_level'], 2),
+        'turbidity_ntu': round(reading['turbidity_ntu'], 2),
+        'temperature_c': round(reading['temperature_c'], 2)
+    } for reading in readings[:1000]]
+
+    print(f"\nBulk ingest of {len(body)} readings")
+    for count in rule_counts:
+        with app.app_context():
+            from app.models.alert import Alert, AlertRule
+            Alert.query.delete()
+            AlertRule.query.delete()
+            for rule in make_rules(count, random.Random(count)):
+                rule.id = None
+                db.session.add(rule)
+            db.session.commit()
+            app.extensions['alert_engine'].invalidate()
+        client.post('/api/water/readings/bulk', json=body)  # warm up, loads the rules
+        with app.app_context():
+            before = Alert.query.count()
+        with Timer() as timer:
+            response = client.post('/api/water/readings/bulk', json=body)
+        assert response.status_code == 201, response.get_data(as_text=True)
+        with app.app_context():
+            raised = Alert.query.count() - before
+        print(f'{count:7d} rules: {timer.elapsed * 1000:8.1f} ms per upload, {raised} alerts raised')
+
+
+if __name__ == '__main__':
+    main()
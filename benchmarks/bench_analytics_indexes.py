@@ -0,0 +1,78 @@
+"""Time the analytics and readings endpoints with and without the WaterQuality indexes.
+
+Seeds a large synthetic dataset (1M readings by default), times every
+endpoint with all secondary indexes dropped, then applies the index
+migration and times them again.
+
+Usage: python benchmarks/bench_analytics_indexes.py [rows]
+"""
+import sys
+
+from sqlalchemy import inspect, text
+
+from common import Timer, login_client, make_app, seed_readings, time_request
+
+ENDPOINTS = [
+    ('community', '/analytics/api/statistics'),
+    ('community', '/analytics/api/water-quality-trends'),
+    ('community', '/analytics/api/quality-distribution'),
+    ('researcher', '/analytics/api/statistics'),
+    ('researcher', '/analytics/api/location-insights'),
+    ('admin', '/analytics/api/user-statistics'),
+    ('community', '/api/water/readings'),
+    ('community', '/api/water/public-readings'),
+]
+
+
+def drop_indexes(db):
+    for index in inspect(db.engine).get_indexes('water_quality'):
+        db.session.execute(text(f'DROP INDEX {index["name"]}'))
+    db.session.commit()
+
+
+def run_endpoints(clients):
+    return {
+        (role, url): time_request(clients[role], url, repeat=3)
+        for role, url in ENDPOINTS
+    }
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    
+    from app.database.connection import db
+    from app.database.migrations import upgrade_indexes
+    
+    app = make_app()
+    clients = {role: login_client(app, role) for role in ('community', 'researcher', 'government', 'admin')}
+    with app.app_context():
+        from app.models.user import User
+        user_ids = [user.id for user in User.query.all()]
+        drop_indexes(db)
+    
+    with Timer() as seeding:
+        seed_readings(app, rows, user_ids)
+    print(f'Seeded {rows} readings in {seeding.elapsed:.1f}s')
+    
+    with app.app_context():
+        db.session.execute(text('ANALYZE'))
+        db.session.commit()
+    before = run_endpoints(clients)
+    
+    with app.app_context():
+        with Timer() as migration:
+            upgrade_indexes()
+            db.session.execute(text('ANALYZE'))
+            db.session.commit()
+    print(f'Index migration took {migration.elapsed:.1f}s')
+    after = run_endpoints(clients)
+    
+    print(f"\n{'endpoint':58} {'before':>9} {'after':>9} {'speedup':>8}")
+    for role, url in ENDPOINTS:
+        (t_before, status), (t_after, _) = before[(role, url)], after[(role, url)]
+        print(f'{role + " " + url:58} {t_before * 1000:7.1f}ms {t_after * 1000:7.1f}ms '
+              f'{t_before / t_after:7.1f}x' + ('' if status < 400 else f'  (HTTP {status})'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+"""Compare rows/second of POST /api/water/reading vs /api/water/readings/bulk.
+
+Usage: python benchmarks/bench_bulk_ingest.py [rows] [batch_size]
+"""
+import random
+import sys
+
+from common import Timer, login_client, make_app
+
+
+def sample_reading(i):
+    return {
+        'location_name': f'Site {i % 25}',
+        'ph_level': round(random.uniform(5.5, 9.5), 2),
+        'turbidity_ntu': round(random.uniform(0, 15), 2),
+        'dissolved_oxygen': round(random.uniform(1, 12), 2),
+        'temperature_c': round(random.uniform(5, 30), 1),
+        'conductivity_us': round(random.uniform(50, 1500), 1)
+    }
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    batch_size = int(sys.argv[2]) if len(sys.argv) > 2 else 500
+    readings = [sample_reading(i) for i in range(rows)]
+    
+    app = make_app()
+    client = login_client(app)
+    
+    with Timer() as single:
+        for reading in readings:
+            assert client.post('/api/water/reading', json=reading).status_code == 201
+    
+    with Timer() as bulk:
+        for start in range(0, rows, batch_size):
+            response = client.post('/api/water/readings/bulk', json=readings[start:start + batch_size])
+            assert response.status_code == 201, response.get_data(as_text=True)
+    
+    print(f'single-row: {rows / single.elapsed:10.0f} rows/s ({single.elapsed:.2f}s)')
+    print(f'bulk x{batch_size}: {rows / bulk.elapsed:10.0f} rows/s ({bulk.elapsed:.2f}s)')
+    print(f'speedup:    {single.elapsed / bulk.elapsed:10.1f}x')
+
+
+if __name__ == '__main__':
+    main()
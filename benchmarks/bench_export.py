@@ -0,0 +1,61 @@
+"""Measure time-to-first-byte and peak Python memory of /api/water/export.
+
+Seeds the database in steps and exports it in each format after every
+step; with a server-side cursor both numbers should stay flat as the row
+count grows.
+
+Usage: python benchmarks/bench_export.py [max_rows]
+"""
+import importlib.util
+import sys
+import tracemalloc
+
+from common import Timer, login_client, make_app, seed_readings
+
+
+def stream(client, export_format):
+    """Return (seconds to first chunk, total seconds, bytes) for one export"""
+    with Timer() as total:
+        with Timer() as first_byte:
+            response = client.get(f'/api/water/export?format={export_format}', buffered=False)
+            chunks = iter(response.response)
+            size = len(next(chunks, b''))
+        size += sum(len(chunk) for chunk in chunks)
+        response.close()
+    return first_byte.elapsed, total.elapsed, size
+
+
+def measure(client, export_format):
+    ttfb, total, size = stream(client, export_format)
+    # Separate pass: tracemalloc slows everything down too much to time under it
+    tracemalloc.start()
+    stream(client, export_format)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return ttfb, total, peak, size
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    formats = ['csv', 'ndjson']
+    if importlib.util.find_spec('pyarrow') is not None:
+        formats.append('parquet')
+    
+    app = make_app()
+    client = login_client(app, 'researcher')
+    seeded = 0
+    step = max(max_rows // 100, 1000)
+    
+    print(f"{'rows':>10} {'format':8} {'ttfb':>9} {'total':>9} {'peak mem':>10} {'bytes':>12}")
+    while seeded < max_rows:
+        seed_readings(app, step, user_ids=[1], seed=seeded)
+        seeded += step
+        for export_format in formats:
+            ttfb, total, peak, size = measure(client, export_format)
+            print(f'{seeded:>10} {export_format:8} {ttfb * 1000:7.1f}ms {total:8.2f}s '
+                  f'{peak / 1e6:8.1f}MB {size:>12}')
+        step *= 10
+
+
+if __name__ == '__main__':
+    main()
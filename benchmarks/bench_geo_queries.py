@@ -0,0 +1,135 @@
+"""Map queries over thousands of monitoring sites: grid index vs SQL scans.
+
+Sites are clustered around a few regions (as real deployments are) with a
+scattering worldwide. Map viewports (bbox) and nearest-N lookups are timed
+on the in-process grid index, against the same query answered from the
+location table (a range filter on latitude/longitude, or a scan ranked by
+haversine distance), and end to end through /api/locations.
+
+Usage: python benchmarks/bench_geo_queries.py [sites] [queries]
+"""
+import random
+import statistics
+import sys
+
+from common import Timer, login_client, make_app
+
+# (latitude, longitude, spread in degrees)
+REGIONS = [(-1.0, 33.0, 3), (9.0, 38.7, 4), (-6.8, 39.3, 2), (52.5, 13.4, 5), (40.7, -74.0, 3)]
+WORLDWIDE_SHARE = 0.1
+
+
+def make_sites(count, rng):
+    sites = []
+    for index in range(count):
+        if rng.random() < WORLDWIDE_SHARE:
+            latitude, longitude = rng.uniform(-60, 70), rng.uniform(-180, 180)
+        else:
+            center_lat, center_lon, spread = rng.choice(REGIONS)
+            latitude, longitude = rng.gauss(center_lat, spread), rng.gauss(center_lon, spread)
+        sites.append({
+            'name': f'Site {index}',
+            'normalized_name': f'site {index}',
+            'latitude': max(-90.0, min(90.0, latitude)),
+            'longitude': (longitude + 180) % 360 - 180
+        })
+    return sites
+
+
+def viewport(rng, size):
+    center_lat, center_lon, spread = rng.choice(REGIONS)
+    lat, lon = rng.gauss(center_lat, spread), rng.gauss(center_lon, spread)
+    return lon - size / 2, lat - size / 2, lon + size / 2, lat + size / 2
+
+
+def median_ms(timings):
+    return statistics.median(timings) * 1000
+
+
+def main():
+    site_count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    queries = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+
+    from sqlalchemy import insert, select
+    from app.database.connection import db
+    from app.models.location import Location
+    from app.services.geo import haversine_km
+
+    rng = random.Random(42)
+    app = make_app()
+    with app.app_context():
+        db.session.execute(insert(Location), make_sites(site_count, rng))
+        db.session.commit()
+    client = login_client(app)
+
+    with app.app_context():
+        index_store = app.extensions['location_index']
+        with Timer() as timer:
+            index_store.get()
+        print(f'{site_count} sites, grid index built in {timer.elapsed * 1000:.1f} ms\n')
+
+    def time_api(urls):
+        timings, results = [], 0
+        for url in urls:
+            with Timer() as timer:
+                response = client.get(url)
+            assert response.status_code == 200, response.get_data(as_text=True)
+            timings.append(timer.elapsed)
+            results += response.get_json()['count']
+        return median_ms(timings), results / len(urls)
+
+    def time_local(run, arguments):
+        timings = []
+        with app.app_context():
+            for argument in arguments:
+                with Timer() as timer:
+                    run(argument)
+                timings.append(timer.elapsed)
+        return median_ms(timings)
+
+    def sql_bbox(box):
+        min_lon, min_lat, max_lon, max_lat = box
+        return db.session.execute(
+            select(Location.id, Location.name, Location.latitude, Location.longitude)
+            .where(Location.latitude.between(min_lat, max_lat), Location.longitude.between(min_lon, max_lon))
+        ).all()
+
+    def sql_nearest(point):
+        latitude, longitude = point
+        rows = db.session.execute(
+            select(Location.id, Location.name, Location.latitude, Location.longitude)
+            .where(Location.latitude.isnot(None))
+        ).all()
+        return sorted(rows, key=lambda row: haversine_km(latitude, longitude, row.latitude, row.longitude))[:10]
+
+    def grid_bbox(box):
+        return index_store.get().bbox(*box)
+
+    def grid_nearest(point):
+        return index_store.get().nearest(point[0], point[1], 10)
+
+    print(f"{'query':<28} {'grid ms':>9} {'SQL ms':>9} {'API ms':>9} {'results':>9}")
+
+    def report(label, grid, sql, arguments, urls):
+        api_ms, results = time_api(urls)
+        print(f'{label:<28} {time_local(grid, arguments):9.3f} {time_local(sql, arguments):9.3f} {api_ms:9.2f} {results:9.1f}')
+
+    for size in (1, 5, 20):
+        boxes = [viewport(rng, size) for _ in range(queries)]
+        urls = [f'/api/locations?bbox={",".join(f"{value:.4f}" for value in box)}' for box in boxes]
+        report(f'bbox {size}x{size} degrees', grid_bbox, sql_bbox, boxes, urls)
+
+    points = []
+    for _ in range(queries):
+        center_lat, center_lon, spread = rng.choice(REGIONS)
+        points.append((rng.gauss(center_lat, spread), rng.gauss(center_lon, spread)))
+    urls = [f'/api/locations/nearest?lat={lat:.4f}&lon={lon:.4f}&n=10' for lat, lon in points]
+    report('nearest 10', grid_nearest, sql_nearest, points, urls)
+
+    remote = [(rng.uniform(-60, -40), rng.uniform(-180, 180)) for _ in range(queries)]
+    urls = [f'/api/locations/nearest?lat={lat:.4f}&lon={lon:.4f}&n=10' for lat, lon in remote]
+    report('nearest 10 (remote point)', grid_nearest, sql_nearest, remote, urls)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""Latency of POST /api/water/reading with synchronous commits vs write-behind ingestion.
+
+Write-behind answers once the reading is in the local journal; the
+benchmark also reports how long the flush worker takes to drain the queue
+into the main database afterwards.
+
+Usage: python benchmarks/bench_ingest_latency.py [readings]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from common import Timer, login_client, make_app
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def post_readings(client, count, prefix):
+    latencies = []
+    for i in range(count):
+        payload = {
+            'location_name': f'Site {i % 20}',
+            'ph_level': 7.1,
+            'dissolved_oxygen': 6.5,
+            'turbidity_ntu': 2.0,
+            'conductivity_us': 420.0,
+            'client_reading_id': f'{prefix}-{i}'
+        }
+        start = time.perf_counter()
+        response = client.post('/api/water/reading', json=payload)
+        latencies.append(time.perf_counter() - start)
+        assert response.status_code in (201, 202), response.get_data(as_text=True)
+    return latencies
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+    from app.database.connection import db
+    from app.models.water_quality import WaterQuality
+    from app.services.ingest import IngestJournal, WriteBehindIngestor
+
+    app = make_app()
+    client = login_client(app)
+
+    journal_path = os.path.join(tempfile.mkdtemp(prefix='wqm-journal-'), 'journal.db')
+    modes = [
+        ('sync', None),
+        ('write-behind', WriteBehindIngestor(app, IngestJournal(journal_path), 500, 0.5, 60))
+    ]
+
+    print(f"{'mode':14} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'drain':>8}")
+    for name, ingestor in modes:
+        app.extensions['ingestor'] = ingestor
+        with Timer() as timer:
+            latencies = post_readings(client, count, name)
+
+        drain = 0.0
+        if ingestor is not None:
+            with Timer() as drain_timer:
+                while ingestor.journal.depth()[0]:
+                    time.sleep(0.01)
+            drain = drain_timer.elapsed
+        with app.app_context():
+            stored = db.session.query(WaterQuality).filter(WaterQuality.client_reading_id.like(f'{name}-%')).count()
+        assert stored == count, f'{name}: stored {stored} of {count}'
+
+        print(f'{name:14} {count / timer.elapsed:8.0f} {statistics.median(latencies) * 1000:6.2f}ms '
+              f'{percentile(latencies, 95) * 1000:6.2f}ms {percentile(latencies, 99) * 1000:6.2f}ms {drain:7.2f}s')
+
+
+if __name__ == '__main__':
+    main()
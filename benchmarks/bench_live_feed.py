@@ -0,0 +1,140 @@
+"""Database queries per minute for N open dashboards: polling vs the SSE live feed.
+
+Half of the simulated tabs are dashboards (GET /api/water/readings?limit=50),
+half are analytics pages (GET /analytics/api/statistics). One simulated
+minute has `writes` new readings posted by random users.
+
+- polling: every tab refetches each `interval` seconds
+- live feed: every tab holds /api/water/stream open and only reacts to events
+
+Usage: python benchmarks/bench_live_feed.py [tabs] [writes_per_minute] [poll_interval_s]
+"""
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+
+os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')  # setup logs in hundreds of users
+os.environ.setdefault('SSE_HEARTBEAT_SECONDS', '0.5')
+os.environ.setdefault('LIVE_FEED_ENABLED', 'true')
+
+from common import Timer, login_client, make_app, seed_readings
+
+
+class QueryCounter:
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def post_reading(client, label):
+    response = client.post('/api/water/reading', json={
+        'location_name': label, 'ph_level': round(random.uniform(6, 9), 2), 'turbidity_ntu': 3.0
+    })
+    assert response.status_code == 201, response.get_data(as_text=True)
+
+
+def poll_url(index):
+    return '/api/water/readings?limit=50' if index % 2 == 0 else '/analytics/api/statistics'
+
+
+def run_polling(clients, counter, writes, interval):
+    rounds = max(1, round(60 / interval))
+    writes_per_round = writes / rounds
+    start_count = counter.count
+    posted = 0
+    with Timer() as timer:
+        for round_number in range(rounds):
+            while posted < writes_per_round * (round_number + 1):
+                post_reading(random.choice(clients), f'Poll {posted}')
+                posted += 1
+            for index, client in enumerate(clients):
+                client.get(poll_url(index))
+    return counter.count - start_count, timer.elapsed
+
+
+def run_live_feed(app, clients, counter, writes):
+    stop = threading.Event()
+    connected = threading.Semaphore(0)
+    posted_at = {}
+    latencies = []
+    received = [0]
+    lock = threading.Lock()
+
+    def listen(index, client):
+        scope = 'own' if index % 2 == 0 else 'visible'
+        response = client.get(f'/api/water/stream?scope={scope}', buffered=False)
+        connected.release()
+        for chunk in response.response:
+            chunk = chunk.decode() if isinstance(chunk, bytes) else chunk
+            if chunk.startswith('id:') and '\nevent: reading\n' in chunk:
+                label = json.loads(chunk.split('data: ', 1)[1])['location_name']
+                arrived = time.perf_counter()
+                with lock:
+                    received[0] += 1
+                    latencies.append(arrived - posted_at[label])
+            if stop.is_set():
+                break
+        response.close()
+
+    connect_start = counter.count
+    threads = [threading.Thread(target=listen, args=(index, client), daemon=True) for index, client in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    for _ in threads:
+        connected.acquire()
+    connect_queries = counter.count - connect_start
+
+    start_count = counter.count
+    with Timer() as timer:
+        for number in range(writes):
+            label = f'Live {number}'
+            posted_at[label] = time.perf_counter()
+            post_reading(random.choice(clients), label)
+        # Let the fan-out finish before counting
+        time.sleep(1)
+    queries = counter.count - start_count
+
+    stop.set()
+    for thread in threads:
+        thread.join(timeout=5)
+    stats = app.extensions['event_broker'].stats()
+    return queries, connect_queries, timer.elapsed, received[0], latencies, stats
+
+
+def main():
+    tabs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    writes = int(sys.argv[2]) if len(sys.argv) > 2 else 60
+    interval = float(sys.argv[3]) if len(sys.argv) > 3 else 30
+
+    from app.database.connection import db
+
+    app = make_app()
+    with app.app_context():
+        counter = QueryCounter(db.engine)
+    roles = ['community', 'researcher', 'government', 'admin']
+    clients = [login_client(app, roles[index % len(roles)], f'tab{index}@bench.local') for index in range(tabs)]
+    seed_readings(app, 20000, user_ids=list(range(1, tabs + 1)))
+
+    polling_queries, polling_time = run_polling(clients, counter, writes, interval)
+    feed_queries, connect_queries, feed_time, delivered, latencies, stats = run_live_feed(app, clients, counter, writes)
+
+    print(f"{tabs} tabs, {writes} new readings/minute, polling every {interval:.0f}s")
+    print(f"{'mode':12} {'queries/min':>12} {'wall time':>10}")
+    print(f"{'polling':12} {polling_queries:12d} {polling_time:9.2f}s")
+    print(f"{'live feed':12} {feed_queries:12d} {feed_time:9.2f}s  (+{connect_queries} queries once to open {tabs} streams)")
+    if latencies:
+        latencies.sort()
+        print(f"live feed: {delivered} events delivered, latency p50 {statistics.median(latencies) * 1000:.1f}ms "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f}ms, dropped subscribers {stats['dropped_subscribers']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,189 @@
+"""Location statistics and anomaly detection on 100k readings per location.
+
+Seeds one site reporting every 15 minutes (with a daily cycle, drift and a
+few injected spikes), compacts the older part into chunks so the series
+spans both tiers, then times:
+
+- loading the series into NumPy arrays (hot SELECT + chunk decode)
+- each vectorized computation, against a plain Python loop where one is
+  the obvious alternative (rolling window with a deque, EWMA recurrence)
+- /analytics/api/location/<name>/stats and /anomalies with nothing cached,
+  with the series cached (response cache cleared), and as response cache hits
+
+Usage: python benchmarks/bench_location_stats.py [readings] [hot_days]
+"""
+import math
+import random
+import statistics
+import sys
+from collections import deque
+from datetime import datetime, timedelta
+
+from common import Timer, login_client, make_app
+
+INTERVAL = timedelta(minutes=15)
+LOCATION = 'Benchmark River'
+SPIKE_EVERY = 5000
+
+
+def seed_location(app, readings, user_id, rng):
+    from sqlalchemy import insert
+    from app.database.connection import db
+    from app.database.migrations import backfill_organizations
+    from app.models.location import Location
+    from app.models.water_quality import WaterQuality
+
+    with app.app_context():
+        location_id, location_name = Location.resolve([LOCATION])[LOCATION]
+        timestamp = datetime.utcnow() - INTERVAL * readings
+        ph, do, temperature, conductivity = 7.2, 8.0, 18.0, 600.0
+        batch = []
+        for index in range(readings):
+            timestamp += INTERVAL
+            daily = math.sin(2 * math.pi * (timestamp.hour * 60 + timestamp.minute) / 1440)
+            ph = min(9.0, max(6.0, ph + rng.gauss(0, 0.01)))
+            do = min(12.0, max(3.0, do + rng.gauss(0, 0.02)))
+            conductivity = max(50, conductivity + rng.gauss(0, 1))
+            row = {
+                'location_name': location_name, 'location_id': location_id, 'user_id': user_id,
+                'timestamp': timestamp, 'is_public': True,
+                'ph_level': round(ph + 0.2 * daily + rng.gauss(0, 0.03), 3),
+                'dissolved_oxygen': round(do + 0.5 * daily + rng.gauss(0, 0.05), 3),
+                'turbidity_ntu': round(max(0.0, rng.gauss(3, 0.3)), 2),
+                'temperature_c': round(temperature + 3 * daily + rng.gauss(0, 0.1), 2),
+                'conductivity_us': round(conductivity, 1)
+            }
+            if index % SPIKE_EVERY == SPIKE_EVERY // 2:
+                row['turbidity_ntu'] = 40.0
+            row['status'] = WaterQuality.status_for(row['ph_level'], row['dissolved_oxygen'], row['turbidity_ntu'])
+            row['total_dissolved_solids'] = WaterQuality.tds_for(row['conductivity_us'])
+            batch.append(row)
+            if len(batch) == 20000:
+                db.session.execute(insert(WaterQuality), batch)
+                batch = []
+        if batch:
+            db.session.execute(insert(WaterQuality), batch)
+        db.session.commit()
+        backfill_organizations()
+        return location_id, location_name
+
+
+def python_rolling_zscore(timestamps, values, window, threshold):
+    """The loop the vectorized version replaces: running sums over a deque"""
+    recent, total, squares, flagged = deque(), 0.0, 0.0, 0
+    for timestamp, value in zip(timestamps, values):
+        while recent and recent[0][0] <= timestamp - window:
+            _, old = recent.popleft()
+            total -= old
+            squares -= old * old
+        n = len(recent)
+        if n >= 10:
+            mean = total / n
+            std = math.sqrt(max(0.0, (squares - n * mean * mean) / (n - 1)))
+            if std and abs(value - mean) / std > threshold:
+                flagged += 1
+        recent.append((timestamp, value))
+        total += value
+        squares += value * value
+    return flagged
+
+
+def python_ewma(values, alpha):
+    level = values[0]
+    result = []
+    for value in values:
+        level = alpha * value + (1 - alpha) * level
+        result.append(level)
+    return result
+
+
+def median_ms(run, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            run()
+        timings.append(timer.elapsed)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    hot_days = int(sys.argv[2]) if len(sys.argv) > 2 else 365
+
+    from sqlalchemy import text
+    from app.database.connection import db
+    from app.middleware.cache import invalidate_analytics_cache
+    from app.services import series as series_stats
+    from app.services.retention import compact_readings, retention_stats
+
+    app = make_app()
+    client = login_client(app, 'researcher')
+    with app.app_context():
+        user_id = db.session.execute(text("SELECT id FROM user LIMIT 1")).scalar()
+    location_id, location_name = seed_location(app, readings, user_id, random.Random(42))
+    with app.app_context():
+        compact_readings(hot_days, app.config['READINGS_CHUNK_DAYS'], app.config['READINGS_CHUNK_ROWS'])
+        stats = retention_stats()
+        print(f"{readings} readings at one location: {stats['hot_readings']} hot, {stats['cold_readings']} "
+              f"in {stats['cold_chunks']} chunks\n")
+
+        cache = series_stats.get_series_cache()
+
+        def load():
+            cache.invalidate()
+            cache.get(location_id, location_name)
+
+        print(f"{'step':<40} {'NumPy ms':>10} {'Python ms':>10}")
+        print(f"{'load series (both tiers)':<40} {median_ms(load):10.1f}")
+
+        series = cache.get(location_id, location_name)
+        _, timestamps, values = series.column('turbidity_ntu', series.mask())
+        day = series_stats.MICROS_PER_DAY
+        steps = (
+            ('rolling mean/std, 24h', lambda: series_stats.rolling_stats(timestamps, values, day), None),
+            ('percentiles', lambda: series_stats.percentiles(values), None),
+            ('hour/weekday baselines', lambda: (
+                series_stats.seasonal_profile(timestamps, values, 'hour_of_day', 24),
+                series_stats.seasonal_profile(timestamps, values, 'day_of_week', 7)
+            ), None),
+            ('z-score anomalies, 24h window', lambda: series_stats.zscore_anomalies(timestamps, values, day, 3.0),
+             lambda: python_rolling_zscore(timestamps.tolist(), values.tolist(), day, 3.0)),
+            ('EWMA (alpha 0.1)', lambda: series_stats.ewma(values, 0.1),
+             lambda: python_ewma(values.tolist(), 0.1)),
+            ('EWMA anomalies', lambda: series_stats.ewma_anomalies(values, 0.1, 3.0), None),
+            ('seasonal anomalies', lambda: series_stats.seasonal_anomalies(timestamps, values, 3.0), None),
+        )
+        for label, vectorized, loop in steps:
+            python_ms = f'{median_ms(loop, 3):10.1f}' if loop else f"{'':>10}"
+            print(f'{label:<40} {median_ms(vectorized):10.2f} {python_ms}')
+        flagged = int(series_stats.zscore_anomalies(timestamps, values, day, 3.0)[2].sum())
+        print(f'\nz-score flagged {flagged} turbidity readings ({readings // SPIKE_EVERY} spikes injected)\n')
+
+    name = location_name.replace(' ', '%20')
+    urls = (
+        ('stats', f'/analytics/api/location/{name}/stats'),
+        ('anomalies, zscore', f'/analytics/api/location/{name}/anomalies'),
+        ('anomalies, ewma', f'/analytics/api/location/{name}/anomalies?method=ewma'),
+        ('anomalies, seasonal', f'/analytics/api/location/{name}/anomalies?method=seasonal'),
+    )
+    print(f"{'endpoint':<24} {'uncached ms':>12} {'series ms':>12} {'response ms':>12}")
+    for label, url in urls:
+        def uncached():
+            with app.app_context():
+                cache.invalidate()
+                invalidate_analytics_cache()
+            assert client.get(url).status_code == 200
+
+        def series_cached():
+            with app.app_context():
+                invalidate_analytics_cache()
+            assert client.get(url).status_code == 200
+
+        def response_cached():
+            assert client.get(url).status_code == 200
+
+        print(f'{label:<24} {median_ms(uncached):12.1f} {median_ms(series_cached):12.1f} {median_ms(response_cached):12.2f}')
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
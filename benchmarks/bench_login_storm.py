@@ -0,0 +1,86 @@
+"""Login storm: many concurrent logins while another client measures /health latency.
+
+Compares inline bcrypt (the old behaviour, unbounded) with the bounded
+process pool. Reports login throughput, how many logins were shed with
+503, and the latency of the unrelated probe endpoint.
+
+Usage: python benchmarks/bench_login_storm.py [login_threads] [seconds]
+"""
+import statistics
+import sys
+import threading
+import time
+
+from common import login_client, make_app
+
+PROBE_URL = '/health'
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))] if values else 0.0
+
+
+def storm(app, threads, seconds):
+    stop = threading.Event()
+    counts = {'ok': 0, 'shed': 0, 'failed': 0}
+    probe_latencies = []
+    lock = threading.Lock()
+
+    def login_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            response = client.post('/api/auth/login', json={'email': 'community@bench.local', 'password': 'benchmark'})
+            outcome = {200: 'ok', 503: 'shed'}.get(response.status_code, 'failed')
+            with lock:
+                counts[outcome] += 1
+
+    def probe_loop():
+        client = app.test_client()
+        while not stop.is_set():
+            start = time.perf_counter()
+            client.get(PROBE_URL)
+            probe_latencies.append(time.perf_counter() - start)
+            time.sleep(0.01)
+
+    workers = [threading.Thread(target=login_loop) for _ in range(threads)]
+    workers.append(threading.Thread(target=probe_loop))
+    for worker in workers:
+        worker.start()
+    time.sleep(seconds)
+    stop.set()
+    for worker in workers:
+        worker.join()
+    return counts, probe_latencies
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    seconds = float(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    from app.services.passwords import PasswordHasher
+
+    app = make_app()
+    login_client(app)
+    config = app.config
+    pool_workers = config['PASSWORD_HASH_WORKERS'] or 2
+    modes = [
+        ('inline, unbounded', PasswordHasher(0, threads + 1, config['PASSWORD_HASH_TIMEOUT'], 1)),
+        (f'pool x{pool_workers}, bounded', PasswordHasher(
+            pool_workers, config['PASSWORD_HASH_MAX_PENDING'], config['PASSWORD_HASH_TIMEOUT'], 1
+        ))
+    ]
+
+    print(f"{threads} login threads for {seconds:.0f}s, BCRYPT_LOG_ROUNDS={config['BCRYPT_LOG_ROUNDS']}")
+    print(f"{'mode':24} {'logins/s':>9} {'shed 503':>9} {'failed':>7} {'probe p50':>10} {'probe p95':>10} {'probe max':>10}")
+    for name, hasher in modes:
+        app.extensions['password_hasher'] = hasher
+        counts, latencies = storm(app, threads, seconds)
+        hasher.shutdown()
+        print(f"{name:24} {counts['ok'] / seconds:9.1f} {counts['shed']:9d} {counts['failed']:7d} "
+              f"{statistics.median(latencies) * 1000:8.1f}ms {percentile(latencies, 95) * 1000:8.1f}ms "
+              f"{max(latencies) * 1000:8.1f}ms")
+
+
+if __name__ == '__main__':
+    main()
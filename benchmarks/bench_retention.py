@@ -0,0 +1,131 @@
+"""Bytes per reading and scan speed of the hot (row) and cold (chunk) tiers.
+
+Seeds sensor-like series (each site/author reports every ~15 minutes with
+slowly drifting values), then compacts everything older than HOT_DAYS with
+the retention policy. Storage is measured per table, indexes included,
+with SQLite's dbstat (so this benchmark needs SQLite). Scan speed is a
+full read of each tier: hot rows through a plain SELECT, cold chunks
+decoded to NumPy columns and to reading dicts. History pages are timed
+through /api/water/readings on either side of the tier boundary.
+
+Usage: python benchmarks/bench_retention.py [readings] [series]
+"""
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import Timer, login_client, make_app
+
+HOT_DAYS = 30
+INTERVAL = timedelta(minutes=15)
+
+
+def seed_series(app, readings, series_count, user_id, rng):
+    from sqlalchemy import insert
+    from app.database.connection import db
+    from app.database.migrations import backfill_organizations
+    from app.models.location import Location
+    from app.models.water_quality import WaterQuality
+
+    per_series = readings // series_count
+    end = datetime.utcnow()
+    with app.app_context():
+        locations = Location.resolve([f'Site {index}' for index in range(series_count)])
+        for index in range(series_count):
+            location_id, location_name = locations[f'Site {index}']
+            ph, do, turbidity, temperature, conductivity = 7.2, 8.0, 3.0, 18.0, 600.0
+            timestamp = end - INTERVAL * per_series
+            batch = []
+            for _ in range(per_series):
+                timestamp += INTERVAL + timedelta(seconds=rng.randint(-2, 2))
+                ph = min(9.5, max(5.5, ph + rng.gauss(0, 0.02)))
+                do = min(14, max(0.5, do + rng.gauss(0, 0.05)))
+                turbidity = max(0.0, turbidity + rng.gauss(0, 0.1))
+                temperature = temperature + rng.gauss(0, 0.05)
+                conductivity = max(50, conductivity + rng.gauss(0, 2))
+                row = {
+                    'location_name': location_name, 'location_id': location_id, 'user_id': user_id,
+                    'timestamp': timestamp, 'is_public': True,
+                    'ph_level': round(ph, 2), 'dissolved_oxygen': round(do, 2), 'turbidity_ntu': round(turbidity, 2),
+                    'temperature_c': round(temperature, 1), 'conductivity_us': round(conductivity, 1)
+                }
+                row['status'] = WaterQuality.status_for(row['ph_level'], row['dissolved_oxygen'], row['turbidity_ntu'])
+                row['total_dissolved_solids'] = WaterQuality.tds_for(row['conductivity_us'])
+                batch.append(row)
+            db.session.execute(insert(WaterQuality), batch)
+            db.session.commit()
+        backfill_organizations()
+    return per_series * series_count
+
+
+def table_bytes(prefix):
+    """Bytes used by a table and its indexes, from SQLite's dbstat"""
+    from sqlalchemy import text
+    from app.database.connection import db
+    return db.session.execute(text(
+        "SELECT coalesce(sum(pgsize - unused), 0) FROM dbstat "
+        "WHERE name = :table OR name IN (SELECT name FROM sqlite_master WHERE tbl_name = :table AND type = 'index')"
+    ), {'table': prefix}).scalar()
+
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    series_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+
+    from sqlalchemy import select, text
+    from app.database.connection import db
+    from app.models.reading_chunk import ReadingChunk
+    from app.models.water_quality import WaterQuality
+    from app.services.retention import compact_readings, retention_stats
+
+    app = make_app()
+    client = login_client(app, 'government')
+    with app.app_context():
+        user_id = db.session.execute(text("SELECT id FROM user LIMIT 1")).scalar()
+    total = seed_series(app, readings, series_count, user_id, random.Random(42))
+    columns = [getattr(WaterQuality, name) for name in (
+        'id', 'location_name', 'location_id', 'timestamp', 'user_id', 'is_public', 'ph_level', 'turbidity_ntu',
+        'dissolved_oxygen', 'temperature_c', 'conductivity_us', 'total_dissolved_solids', 'status'
+    )]
+
+    with app.app_context():
+        hot_bytes = table_bytes('water_quality')
+        with Timer() as hot_scan:
+            scanned = len(db.session.execute(select(*columns)).all())
+        print(f'{total} readings in {series_count} series, one every {INTERVAL.seconds // 60} min\n')
+        print(f"{'tier':<30} {'bytes/reading':>14} {'scan rows/s':>14}")
+        print(f"{'hot (rows + indexes)':<30} {hot_bytes / total:14.1f} {scanned / hot_scan.elapsed:14,.0f}")
+
+        config = app.config
+        with Timer() as compaction:
+            compacted, chunks, size = compact_readings(HOT_DAYS, config['READINGS_CHUNK_DAYS'], config['READINGS_CHUNK_ROWS'])
+        cold_bytes = table_bytes('reading_chunk')
+        chunk_list = ReadingChunk.query.all()
+        with Timer() as columnar_scan:
+            decoded = sum(len(chunk.columns()['id']) for chunk in chunk_list)
+        with Timer() as row_scan:
+            decoded_rows = sum(1 for _ in ReadingChunk.iter_readings())
+        print(f"{'cold payload only':<30} {size / compacted:14.1f}")
+        print(f"{'cold (table + indexes)':<30} {cold_bytes / compacted:14.1f} {'':>14}")
+        print(f"{'cold, decoded to columns':<30} {'':>14} {decoded / columnar_scan.elapsed:14,.0f}")
+        print(f"{'cold, decoded to reading dicts':<30} {'':>14} {decoded_rows / row_scan.elapsed:14,.0f}")
+        print(f'\nCompacted {compacted} readings into {chunks} chunks in {compaction.elapsed:.1f}s; '
+              f'hot rows left: {retention_stats()["hot_readings"]}')
+
+    boundary = datetime.utcnow() - timedelta(days=HOT_DAYS + 7)
+    for label, url in (
+        ('history page, hot', '/api/water/readings?limit=100'),
+        ('history page, cold', f'/api/water/readings?limit=100&until={boundary.isoformat()}'),
+    ):
+        timings = []
+        for _ in range(20):
+            with Timer() as timer:
+                response = client.get(url)
+            assert response.status_code == 200 and response.get_json()['count'] == 100
+            timings.append(timer.elapsed)
+        timings.sort()
+        print(f'{label:<30} {timings[len(timings) // 2] * 1000:8.2f} ms median')
+
+
+if __name__ == '__main__':
+    main()
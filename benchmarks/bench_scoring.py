@@ -0,0 +1,48 @@
+"""Compare per-reading status/TDS scoring with the vectorized batch scorer,
+and time the chunked rescore backfill.
+
+Usage: python benchmarks/bench_scoring.py [rows]
+"""
+import random
+import sys
+
+from common import Timer, login_client, make_app, seed_readings
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    
+    app = make_app()
+    from app.database.migrations import rescore_readings
+    from app.services import scoring
+    
+    rng = random.Random(1)
+    ph = [rng.uniform(5, 10) for _ in range(rows)]
+    dissolved_oxygen = [rng.uniform(0, 12) for _ in range(rows)]
+    turbidity = [rng.uniform(0, 20) for _ in range(rows)]
+    conductivity = [rng.uniform(0, 1500) for _ in range(rows)]
+    
+    with app.app_context():
+        thresholds = scoring.get_thresholds()
+        with Timer() as scalar:
+            for values in zip(ph, dissolved_oxygen, turbidity, conductivity):
+                scoring.score_status(*values[:3], thresholds=thresholds)
+                scoring.tds_for(values[3], thresholds=thresholds)
+        
+        with Timer() as batch:
+            scoring.score_batch(ph, dissolved_oxygen, turbidity, thresholds=thresholds)
+            scoring.tds_batch(conductivity, thresholds=thresholds)
+    
+    print(f'per-reading: {rows / scalar.elapsed:12.0f} readings/s ({scalar.elapsed:.2f}s)')
+    print(f'batch:       {rows / batch.elapsed:12.0f} readings/s ({batch.elapsed:.2f}s)')
+    
+    login_client(app)
+    seed_readings(app, rows, user_ids=[1])
+    with app.app_context():
+        with Timer() as backfill:
+            processed = rescore_readings()
+    print(f'backfill:    {processed / backfill.elapsed:12.0f} rows/s ({backfill.elapsed:.2f}s for {processed} rows)')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Serializing 100k readings: ORM objects vs row tuples, rows vs columns, stdlib json vs orjson.
+
+Seeds one user's readings, then times each stage separately (fetching,
+building the response structure, encoding it) and finally the whole
+/api/water/readings request with the page size raised to cover every row.
+The 'per-row dict' step is the serializer this replaced: getattr per field
+and strftime per timestamp.
+
+Usage: python benchmarks/bench_serialization.py [readings]
+"""
+import statistics
+import sys
+
+from common import Timer, login_client, make_app, seed_readings
+
+
+def median_ms(run, repeat=5):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            run()
+        timings.append(timer.elapsed)
+    return statistics.median(timings) * 1000
+
+
+def legacy_rows(rows, fields):
+    from app.models.water_quality import WaterQuality
+    result = []
+    for row in rows:
+        record = {}
+        for field in fields:
+            if field == 'status_color':
+                record[field] = WaterQuality.color_for(row.status)
+            elif field == 'timestamp':
+                record[field] = row.timestamp.strftime('%Y-%m-%d %H:%M:%S') if row.timestamp else None
+            else:
+                record[field] = getattr(row, field)
+        result.append(record)
+    return result
+
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+
+    from flask.json.provider import DefaultJSONProvider
+    from sqlalchemy import text
+    from app.database.connection import db
+    from app.models.water_quality import WaterQuality
+    from app.routes.water import READING_OUTPUT_FIELDS, _projection_columns
+    from app.services.serialization import OrjsonProvider, RowSerializer, orjson
+
+    app = make_app()
+    app.config['READINGS_MAX_PAGE_SIZE'] = readings
+    client = login_client(app, 'community')
+    with app.app_context():
+        user_id = db.session.execute(text("SELECT id FROM user LIMIT 1")).scalar()
+    seed_readings(app, readings, [user_id])
+
+    providers = [('stdlib', DefaultJSONProvider(app))]
+    if orjson is not None:
+        providers.append(('orjson', OrjsonProvider(app)))
+
+    with app.app_context():
+        columns = _projection_columns(READING_OUTPUT_FIELDS)
+
+        def select_rows():
+            return db.session.query(*[getattr(WaterQuality, name) for name in columns])\
+                .filter(WaterQuality.user_id == user_id).all()
+
+        def select_objects():
+            return WaterQuality.query.filter(WaterQuality.user_id == user_id).all()
+
+        rows = select_rows()
+        objects = select_objects()
+        serializer = RowSerializer(columns, READING_OUTPUT_FIELDS)
+        print(f'{len(rows)} readings, {len(READING_OUTPUT_FIELDS)} fields\n')
+
+        print(f"{'fetch':<36} {'ms':>10}")
+        print(f"{'ORM objects':<36} {median_ms(select_objects, 3):10.1f}")
+        print(f"{'row tuples (column query)':<36} {median_ms(select_rows, 3):10.1f}")
+
+        print(f"\n{'build':<36} {'ms':>10}")
+        builds = (
+            ('to_dict() per object', lambda: [reading.to_dict() for reading in objects]),
+            ('per-row dict (previous)', lambda: legacy_rows(rows, READING_OUTPUT_FIELDS)),
+            ('RowSerializer rows', lambda: serializer.rows(rows)),
+            ('RowSerializer columns', lambda: serializer.columns(rows)),
+        )
+        for label, build in builds:
+            print(f'{label:<36} {median_ms(build):10.1f}')
+
+        payloads = (('rows', serializer.rows(rows)), ('columns', serializer.columns(rows)))
+        print(f"\n{'encode':<36} " + ' '.join(f'{name + " ms":>10}' for name, _ in providers) + f" {'KiB':>8}")
+        for label, payload in payloads:
+            timings = ' '.join(f"{median_ms(lambda: provider.response({'readings': payload})):10.1f}"
+                               for _, provider in providers)
+            size = len(providers[-1][1].response({'readings': payload}).get_data()) / 1024
+            print(f'{label:<36} {timings} {size:8.0f}')
+
+    print(f"\n{'GET /api/water/readings':<36} " + ' '.join(f'{name + " ms":>10}' for name, _ in providers))
+    for shape in ('rows', 'columns'):
+        url = f'/api/water/readings?limit={readings}&shape={shape}'
+
+        def request():
+            assert client.get(url).status_code == 200
+
+        timings = []
+        for _, provider in providers:
+            app.json = provider
+            timings.append(median_ms(request, 3))
+        print(f'{"shape=" + shape:<36} ' + ' '.join(f'{timing:10.1f}' for timing in timings))
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
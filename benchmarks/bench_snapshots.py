@@ -0,0 +1,81 @@
+"""Analytics served from job snapshots vs computed per request.
+
+Seeds readings over many locations, runs the location_insights and
+user_statistics jobs once, then times each endpoint with the response
+cache cleared before every request (as after a write):
+
+- inline:   ANALYTICS_SNAPSHOT_MAX_AGE=0, the group-by runs in the request
+- snapshot: the endpoint reads the job's stored result
+
+The job's own duration is what moved out of the request path.
+
+Usage: python benchmarks/bench_snapshots.py [readings] [locations]
+"""
+import statistics
+import sys
+import time
+
+import common
+from common import Timer, login_client, make_app, seed_readings
+
+
+def median_ms(run, repeat=9):
+    timings = []
+    for _ in range(repeat):
+        with Timer() as timer:
+            run()
+        timings.append(timer.elapsed)
+    return statistics.median(timings) * 1000
+
+
+def main():
+    readings = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    common.LOCATION_COUNT = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+
+    from sqlalchemy import text
+    from app.database.connection import db
+    from app.middleware.cache import invalidate_analytics_cache
+    from app.services.jobs import JOBS
+
+    app = make_app()
+    admin = login_client(app, 'admin')
+    researcher = login_client(app, 'researcher')
+    with app.app_context():
+        user_ids = [row[0] for row in db.session.execute(text("SELECT id FROM user"))]
+    seed_readings(app, readings, user_ids)
+    print(f'{readings} readings at {common.LOCATION_COUNT} locations\n')
+
+    endpoints = (
+        ('location_insights', '/analytics/api/location-insights', researcher),
+        ('user_statistics', '/analytics/api/user-statistics', admin),
+    )
+    print(f"{'endpoint':<36} {'job ms':>10} {'inline ms':>10} {'snapshot ms':>12}")
+    for job, url, client in endpoints:
+        def run_job():
+            with app.app_context():
+                JOBS[job].function()
+
+        def request():
+            with app.app_context():
+                invalidate_analytics_cache()
+            assert client.get(url).status_code == 200
+
+        job_ms = median_ms(run_job, 3)
+        app.config['ANALYTICS_SNAPSHOT_MAX_AGE'] = 0
+        inline_ms = median_ms(request)
+
+        app.config['ANALYTICS_SNAPSHOT_MAX_AGE'] = 900
+        response = admin.post(f'/api/jobs/{job}/runs')
+        assert response.status_code == 202
+        scheduler = app.extensions['jobs']
+        scheduler.ensure_started()
+        run_id = response.get_json()['run']['id']
+        while admin.get(f'/api/jobs/runs/{run_id}').get_json()['status'] in ('queued', 'running'):
+            scheduler.wake()
+            time.sleep(0.05)
+        snapshot_ms = median_ms(request)
+        print(f'{url:<36} {job_ms:10.1f} {inline_ms:10.1f} {snapshot_ms:12.1f}')
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
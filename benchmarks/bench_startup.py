@@ -0,0 +1,91 @@
+"""Startup benchmark: import time and time-to-first-request of a cold process.
+
+Each measurement runs in a fresh interpreter. Reports the slowest imports
+from `python -X importtime`, then time to create_app() and serve the first
+request with AUTO_MIGRATE on and off (fast boot). With --budget-ms, exits
+non-zero when fast boot exceeds the budget, so it can gate CI.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--budget-ms MS]
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FIRST_REQUEST = '''
+import json, time
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+created = time.perf_counter()
+response = app.test_client().get('/')
+assert response.status_code == 200
+done = time.perf_counter()
+print(json.dumps({'create_app': created - start, 'first_request': done - start}))
+'''
+
+
+def run_python(args, env):
+    return subprocess.run(
+        [sys.executable] + args, cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def slowest_imports(env, count=10):
+    result = run_python(['-X', 'importtime', '-c', 'import app'], env)
+    timings = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = [part.strip() for part in line.split(':', 1)[1].split('|')]
+        timings.append((int(cumulative_us), int(self_us), name))
+    return sorted(timings, reverse=True)[:count]
+
+
+def time_first_request(env, runs):
+    samples = [json.loads(run_python(['-c', FIRST_REQUEST], env).stdout.strip().splitlines()[-1]) for _ in range(runs)]
+    samples.sort(key=lambda sample: sample['first_request'])
+    return samples[len(samples) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float)
+    options = parser.parse_args()
+    
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='wqm-startup-')
+    os.close(fd)
+    env = dict(os.environ, DATABASE_URL=os.environ.get('DATABASE_URL', f'sqlite:///{path}'),
+               SECRET_KEY='benchmark', AUTO_MIGRATE='true',
+               # Per-host stores next to the database, not in the working tree
+               ANALYTICS_CACHE_VERSION_PATH=f'{path}.cache-version', RATE_LIMIT_STORE_PATH=f'{path}.rate-limits',
+               INGEST_JOURNAL_PATH=f'{path}.ingest-journal')
+    
+    # First run creates the schema so both modes start from the same database
+    run_python(['-c', 'from app import create_app; create_app()'], env)
+    
+    print('Slowest imports (cumulative):')
+    for cumulative_us, self_us, name in slowest_imports(env):
+        print(f'  {cumulative_us / 1000:8.1f}ms  {name}')
+    
+    results = {}
+    for mode, auto_migrate in (('auto-migrate', 'true'), ('fast boot', 'false')):
+        results[mode] = time_first_request(dict(env, AUTO_MIGRATE=auto_migrate), options.runs)
+        print(f"{mode:13} create_app {results[mode]['create_app'] * 1000:7.1f}ms   "
+              f"first request {results[mode]['first_request'] * 1000:7.1f}ms")
+    
+    if options.budget_ms is not None:
+        fast = results['fast boot']['first_request'] * 1000
+        if fast > options.budget_ms:
+            print(f'FAIL: fast boot took {fast:.1f}ms, budget {options.budget_ms:.1f}ms')
+            sys.exit(1)
+        print(f'OK: fast boot within {options.budget_ms:.1f}ms budget')
+
+
+if __name__ == '__main__':
+    main()
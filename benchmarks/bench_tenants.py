@@ -0,0 +1,80 @@
+"""Per-tenant analytics latency as the number of organizations grows.
+
+Adds organizations in steps (1, 4, 16, 64 by default), each with a
+community user contributing a fixed number of readings and a researcher.
+After each step the first organization's researcher requests every
+analytics endpoint and a full export, with the response cache cleared
+before each request (as after a write). With tenant scoping the tenant's
+latency should stay roughly flat while the total grows; the admin column
+(unscoped, every organization) shows what each request would read without it.
+
+Usage: python benchmarks/bench_tenants.py [readings_per_tenant] [max_tenants]
+"""
+import statistics
+import sys
+
+import common
+from common import Timer, login_client, make_app, seed_readings
+
+ENDPOINTS = (
+    '/analytics/api/statistics',
+    '/analytics/api/quality-distribution',
+    '/analytics/api/water-quality-trends?granularity=hour',
+    '/analytics/api/location-insights',
+    '/api/water/export?format=ndjson',
+)
+
+
+def median_ms(app, client, url, repeat=5):
+    from app.middleware.cache import invalidate_analytics_cache
+    timings = []
+    for _ in range(repeat):
+        with app.app_context():
+            invalidate_analytics_cache()
+        with Timer() as timer:
+            response = client.get(url, headers={'Accept': 'application/json'})
+            response.get_data()
+        assert response.status_code in (200, 403), (url, response.status_code)
+        timings.append(timer.elapsed)
+    return statistics.median(timings) * 1000 if response.status_code == 200 else None
+
+
+def main():
+    per_tenant = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    max_tenants = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    steps = [count for count in (1, 4, 16, 64, 256) if count <= max_tenants]
+    common.LOCATION_COUNT = 20
+
+    from sqlalchemy import select
+    from app.database.connection import db
+    from app.models.user import User
+
+    app = make_app()
+    admin = login_client(app, 'admin')
+    researcher = None
+    tenants = 0
+    print(f'{per_tenant} readings per organization, first organization\'s researcher vs admin\n')
+    print(f"{'tenants':>7} {'readings':>9}  {'endpoint':<54} {'tenant ms':>10} {'admin ms':>10}")
+    for step in steps:
+        emails = []
+        for index in range(tenants, step):
+            organization = f'Tenant {index}'
+            if index == 0:
+                researcher = login_client(app, 'researcher', 'researcher0@bench.local', organization)
+            login_client(app, 'community', f'community{index}@bench.local', organization)
+            emails.append(f'community{index}@bench.local')
+        with app.app_context():
+            user_ids = db.session.execute(select(User.id).where(User.email.in_(emails))).scalars().all()
+        seed_readings(app, per_tenant * len(user_ids), user_ids, seed=step)
+        tenants = step
+
+        for url in ENDPOINTS:
+            tenant_ms = median_ms(app, researcher, url)
+            admin_ms = median_ms(app, admin, url, 3)
+            admin_column = f'{admin_ms:10.1f}' if admin_ms is not None else f"{'-':>10}"
+            print(f'{tenants:7d} {tenants * per_tenant:9d}  {url:<54} {tenant_ms:10.1f} {admin_column}')
+        print()
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file
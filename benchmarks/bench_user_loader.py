@@ -0,0 +1,37 @@
+"""Requests/second on authenticated endpoints with and without the user loader cache.
+
+Usage: python benchmarks/bench_user_loader.py [requests]
+"""
+import sys
+
+from common import Timer, login_client, make_app, seed_readings
+
+ENDPOINTS = ['/api/auth/me', '/api/water/readings?limit=20', '/analytics/api/statistics']
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    
+    app = make_app()
+    client = login_client(app)
+    seed_readings(app, 1000, user_ids=[1])
+    user_cache = app.extensions.get('user_cache')
+    
+    print(f"{'endpoint':34} {'no cache':>12} {'cached':>12}")
+    for url in ENDPOINTS:
+        rates = []
+        for cache in (None, user_cache):
+            if cache is None:
+                app.extensions.pop('user_cache', None)
+            else:
+                app.extensions['user_cache'] = cache
+            client.get(url)  # warm up
+            with Timer() as timer:
+                for _ in range(requests):
+                    client.get(url)
+            rates.append(requests / timer.elapsed)
+        print(f'{url:34} {rates[0]:8.0f} rps {rates[1]:8.0f} rps')
+
+
+if __name__ == '__main__':
+    main()
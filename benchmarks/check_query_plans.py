@@ -0,0 +1,73 @@
+"""Check that the hot WaterQuality queries are served by the model's indexes.
+
+Runs EXPLAIN QUERY PLAN (SQLite) or EXPLAIN (PostgreSQL) on each query and
+exits non-zero if an expected index is not used.
+
+Usage: python benchmarks/check_query_plans.py
+"""
+import sys
+
+from sqlalchemy import func, text
+
+from common import login_client, make_app, seed_readings
+
+
+def hot_queries():
+    from app.models.water_quality import WaterQuality
+    
+    return [
+        ('user readings page', 'ix_water_quality_user_timestamp',
+         WaterQuality.query
+            .filter(WaterQuality.user_id == 1)
+            .order_by(WaterQuality.timestamp.desc(), WaterQuality.id.desc())
+            .limit(101)),
+        ('public readings', 'ix_water_quality_public_timestamp',
+         WaterQuality.query
+            .filter(WaterQuality.is_public == True)
+            .order_by(WaterQuality.timestamp.desc())
+            .limit(10)),
+        ('quality distribution', 'ix_water_quality_status',
+         WaterQuality.query
+            .with_entities(WaterQuality.status, func.count(WaterQuality.id))
+            .group_by(WaterQuality.status)),
+        ('excellent readings', 'ix_water_quality_status',
+         WaterQuality.query
+            .with_entities(func.count(WaterQuality.id))
+            .filter(WaterQuality.status == 'excellent')),
+    ]
+
+
+def explain(db, query):
+    sql = str(query.statement.compile(db.engine, compile_kwargs={'literal_binds': True}))
+    if db.engine.dialect.name == 'sqlite':
+        rows = db.session.execute(text(f'EXPLAIN QUERY PLAN {sql}')).all()
+        return '\n'.join(str(row[-1]) for row in rows)
+    # Tiny benchmark tables make PostgreSQL prefer sequential scans regardless
+    db.session.execute(text('SET enable_seqscan = off'))
+    rows = db.session.execute(text(f'EXPLAIN {sql}')).all()
+    return '\n'.join(row[0] for row in rows)
+
+
+def main():
+    from app.database.connection import db
+    
+    app = make_app()
+    login_client(app)
+    seed_readings(app, 5000, user_ids=[1])
+    failures = 0
+    
+    with app.app_context():
+        db.session.execute(text('ANALYZE'))
+        for name, index_name, query in hot_queries():
+            plan = explain(db, query)
+            ok = index_name in plan
+            failures += not ok
+            print(f"{'OK  ' if ok else 'FAIL'} {name:22} expects {index_name}")
+            if not ok:
+                print('     ' + plan.replace('\n', '\n     '))
+    
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == '__main__':
+    main()
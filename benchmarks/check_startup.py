@@ -0,0 +1,80 @@
+"""Check that fast boot (AUTO_MIGRATE off) runs no schema DDL and stays within the startup budget.
+
+Migrates a fresh database once, then starts the app with AUTO_MIGRATE off
+in new interpreters, recording every statement sent to the database up to
+the first request. Exits non-zero if any of them is DDL (CREATE, ALTER,
+DROP) or if the median time to first request exceeds the budget. CI runs
+it on every push (.github/workflows/startup-check.yml).
+
+Usage: python benchmarks/check_startup.py [--runs N] [--budget-ms MS]
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from bench_startup import run_python
+
+BUDGET_MS = 1000
+
+FAST_BOOT = '''
+import json, re, time
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+ddl = []
+@event.listens_for(Engine, 'before_cursor_execute')
+def record(conn, cursor, statement, parameters, context, executemany):
+    if re.match(r'\\s*(CREATE|ALTER|DROP)\\b', statement, re.IGNORECASE):
+        ddl.append(' '.join(statement.split())[:120])
+start = time.perf_counter()
+from app import create_app
+app = create_app()
+response = app.test_client().get('/')
+assert response.status_code == 200
+done = time.perf_counter()
+print(json.dumps({'first_request': done - start, 'ddl': ddl}))
+'''
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget-ms', type=float, default=BUDGET_MS)
+    options = parser.parse_args()
+
+    fd, path = tempfile.mkstemp(suffix='.db', prefix='wqm-startup-')
+    os.close(fd)
+    env = dict(os.environ, DATABASE_URL=os.environ.get('DATABASE_URL', f'sqlite:///{path}'),
+               SECRET_KEY='benchmark', AUTO_MIGRATE='true',
+               # Per-host stores next to the database, not in the working tree
+               ANALYTICS_CACHE_VERSION_PATH=f'{path}.cache-version', RATE_LIMIT_STORE_PATH=f'{path}.rate-limits',
+               INGEST_JOURNAL_PATH=f'{path}.ingest-journal')
+    run_python(['-c', 'from app import create_app; create_app()'], env)
+    env['AUTO_MIGRATE'] = 'false'
+
+    samples = [json.loads(run_python(['-c', FAST_BOOT], env).stdout.strip().splitlines()[-1])
+               for _ in range(options.runs)]
+    failed = False
+
+    ddl = sorted({statement for sample in samples for statement in sample['ddl']})
+    if ddl:
+        failed = True
+        print(f'FAIL: fast boot ran {len(ddl)} DDL statement(s):')
+        for statement in ddl:
+            print(f'  {statement}')
+    else:
+        print('OK: fast boot ran no DDL')
+
+    first_request = sorted(sample['first_request'] for sample in samples)[len(samples) // 2] * 1000
+    if first_request > options.budget_ms:
+        failed = True
+        print(f'FAIL: fast boot took {first_request:.1f}ms, budget {options.budget_ms:.1f}ms')
+    else:
+        print(f'OK: fast boot took {first_request:.1f}ms, within {options.budget_ms:.1f}ms budget')
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""Shared helpers for the benchmark scripts.
+
+Each benchmark builds the real app against a throwaway SQLite database (or
+DATABASE_URL if set) and drives it through Flask's test client, so the
+numbers include routing, auth and serialization but not network I/O.
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# app.config reads the environment at import time, so configure it up front
+if 'DATABASE_URL' not in os.environ:
+    _fd, _path = tempfile.mkstemp(suffix='.db', prefix='wqm-bench-')
+    os.close(_fd)
+    os.environ['DATABASE_URL'] = f'sqlite:///{_path}'
+os.environ.setdefault('SECRET_KEY', 'benchmark')
+# Fresh per-host stores per run (cache versions, live feed log), not the instance folder's
+_stores = tempfile.mkdtemp(prefix='wqm-bench-')
+os.environ.setdefault('ANALYTICS_CACHE_VERSION_PATH', os.path.join(_stores, 'cache_version.db'))
+os.environ.setdefault('SSE_EVENT_LOG_PATH', os.path.join(_stores, 'live_feed_events.db'))
+# Benchmarks drive routes harder than any client is allowed to; bench_rate_limit.py measures the limits themselves
+os.environ.setdefault('RATE_LIMIT_ENABLED', 'false')
+os.environ.setdefault('ADMISSION_MAX_CONCURRENCY', '0')
+
+
+def make_app():
+    """Create the app on a fresh temporary SQLite database unless DATABASE_URL is set"""
+    from app import create_app
+    from app.database.migrations import upgrade_schema
+    app = create_app()
+    app.config['TESTING'] = True
+    # What 'flask upgrade-db' does on deploy; boot itself runs no DDL
+    with app.app_context():
+        upgrade_schema()
+    return app
+
+
+def login_client(app, role='community', email=None, organization=None):
+    """Register (if needed) and log in a user, returning an authenticated test client.
+
+    With `organization`, the user is placed in it (created if needed), as
+    an admin would after registration.
+    """
+    email = email or f'{role}@bench.local'
+    client = app.test_client()
+    client.post('/api/auth/register', json={
+        'name': f'Bench {role}',
+        'email': email,
+        'address': 'Benchmark Street',
+        'telephone': '000',
+        'password': 'benchmark',
+        'role': role,
+        'organization': organization
+    })
+    if organization is not None:
+        from app.database.connection import db
+        from app.models.organization import Organization
+        from app.models.user import User
+        with app.app_context():
+            tenant = Organization.resolve(organization)
+            user = User.query.filter_by(email=email).one()
+            user.organization_id, user.organization = tenant.id, tenant.name
+            db.session.commit()
+    response = client.post('/api/auth/login', json={'email': email, 'password': 'benchmark'})
+    assert response.status_code == 200, response.get_data(as_text=True)
+    return client
+
+
+class Timer:
+    """Context manager measuring wall-clock seconds"""
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, *exc):
+        self.elapsed = time.perf_counter() - self.start
+
+
+LOCATION_COUNT = 50
+
+
+def seed_readings(app, rows, user_ids, chunk_size=50000, days=365, seed=42):
+    """Bulk-insert `rows` synthetic readings spread over the last `days` days, then rebuild the rollup"""
+    from app.database.migrations import backfill_organizations
+    import random
+    from datetime import datetime, timedelta
+    from sqlalchemy import insert
+    from app.database.connection import db
+    from app.models.water_quality import WaterQuality
+    from app.models.location import Location
+    from app.models.rollup import DailyLocationRollup
+    
+    rng = random.Random(seed)
+    now = datetime.utcnow()
+    span = days * 86400
+    
+    with app.app_context():
+        locations = Location.resolve([f'Site {index}' for index in range(LOCATION_COUNT)])
+        db.session.commit()
+        for start in range(0, rows, chunk_size):
+            batch = []
+            for _ in range(min(chunk_size, rows - start)):
+                ph = round(rng.gauss(7.2, 0.8), 2)
+                do = round(rng.uniform(1, 12), 2)
+                turbidity = round(rng.expovariate(1 / 4), 2)
+                conductivity = round(rng.uniform(50, 1500), 1)
+                location_id, location_name = locations[f'Site {rng.randrange(LOCATION_COUNT)}']
+                batch.append({
+                    'location_name': location_name,
+                    'location_id': location_id,
+                    'ph_level': ph,
+                    'turbidity_ntu': turbidity,
+                    'dissolved_oxygen': do,
+                    'temperature_c': round(rng.uniform(5, 30), 1),
+                    'conductivity_us': conductivity,
+                    'timestamp': now - timedelta(seconds=rng.randrange(span)),
+                    'user_id': rng.choice(user_ids),
+                    'total_dissolved_solids': WaterQuality.tds_for(conductivity),
+                    'status': WaterQuality.status_for(ph, do, turbidity),
+                    'is_public': rng.random() < 0.7
+                })
+            db.session.execute(insert(WaterQuality), batch)
+            db.session.commit()
+        
+        # Stamp the readings with their authors' organizations
+        backfill_organizations()
+        DailyLocationRollup.rebuild()
+
+
+def time_request(client, url, repeat=5):
+    """Median seconds for GET `url`, plus the last status code"""
+    timings = []
+    status = None
+    for _ in range(repeat):
+        with Timer() as timer:
+            status = client.get(url).status_code
+        timings.append(timer.elapsed)
+    timings.sort()
+    return timings[len(timings) // 2], status
@@ -0,0 +1,694 @@
+"""Load test: every API route under concurrent clients, with JSON results to compare runs.
+
+Seeds a synthetic dataset into a throwaway SQLite database, or into the
+database DATABASE_URL points at (e.g. a local PostgreSQL):
+
+- users in all four roles
+- sites with coordinates, clustered in a few regions
+- readings from two sources. Fixed sensors (government/researcher owned)
+  report at a steady interval with a daily temperature cycle and
+  occasional turbidity spikes. Community members report by hand, mostly
+  in daytime and less at weekends.
+- an alert rule and a backlog of alerts
+
+Each route's scenario then runs with --concurrency clients, each logged
+in as its own user of the scenario's role, for --requests requests. The
+report gives throughput and p50/p95/p99 latency per route. Routes run one
+after another, so a slow route doesn't hide behind a fast one.
+
+Two modes:
+
+- In-process (default): Flask test clients on threads. This measures
+  routing, auth, queries and serialization with no network I/O; the
+  threads share the GIL with the app.
+- --base-url: the same scenarios go over HTTP to a running server. Seed
+  its database first with --seed-only, using the same DATABASE_URL.
+
+--output saves the results as JSON. --compare BASELINE.json marks routes
+whose p95 or throughput got worse by more than --tolerance, or whose error
+count grew, and exits with status 1, so a run can gate CI.
+
+Usage:
+    python benchmarks/load_test.py --readings 100000 --output baseline.json
+    python benchmarks/load_test.py --output run.json --compare baseline.json
+    python benchmarks/load_test.py --list
+"""
+import argparse
+import http.client
+import itertools
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import urllib.parse
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+# Quiet, unthrottled app logging unless asked otherwise (set before the app config is imported)
+os.environ.setdefault('LOG_LEVEL', 'WARNING')
+os.environ.setdefault('LOG_SLOW_REQUEST_MS', '0')
+
+from common import make_app
+
+ROLES = ('community', 'researcher', 'government', 'admin')
+PASSWORD = 'loadtest'
+EMAIL_DOMAIN = 'load.test'
+
+# (latitude, longitude, spread in degrees) sites are clustered around
+REGIONS = [(-1.0, 33.0, 2), (9.0, 38.7, 3), (-6.8, 39.3, 1.5), (52.5, 13.4, 3), (40.7, -74.0, 2)]
+
+# Relative likelihood of a manual report in each hour of the day (UTC)
+MANUAL_HOURS = [0.1] * 6 + [0.5, 1, 2, 3, 3, 3, 2.5, 2.5, 3, 3, 2.5, 2, 1, 0.5] + [0.2] * 4
+
+SENSOR_SHARE = 0.7
+SPIKE_RATE = 0.01
+ALERT_THRESHOLD = 25.0
+
+# Routes deliberately left out of the scenarios (endpoint -> reason)
+SKIPPED = {
+    'stream_readings': 'server-sent events; the stream never ends (see bench_live_feed.py)',
+    'logout': 'HTML logout redirect; /api/auth/logout is covered',
+    'static': 'static files',
+}
+
+
+def email_for(role, index):
+    return f'{role}{index}@{EMAIL_DOMAIN}'
+
+
+# ---------------------------------------------------------------------------
+# Dataset
+
+def seed_dataset(app, users_per_role, location_count, readings, days, rng):
+    from sqlalchemy import insert, select
+    from app.database.connection import db
+    from app.database.migrations import backfill_organizations
+    from app.models.user import User
+    from app.models.location import Location
+    from app.models.water_quality import WaterQuality
+    from app.models.rollup import DailyLocationRollup
+    from app.models.alert import Alert, AlertRule
+    from app.services.passwords import hash_password
+
+    with app.app_context():
+        # One bcrypt hash for everyone: logins still pay the full check
+        password = hash_password(PASSWORD)
+        existing = set(db.session.execute(select(User.email)).scalars())
+        users = [
+            User(name=f'Load {role} {index}', email=email_for(role, index), address='Load Street', telephone='000',
+                 organization='Load Test', role=role, password=password)
+            for role in ROLES for index in range(users_per_role) if email_for(role, index) not in existing
+        ]
+        db.session.add_all(users)
+        db.session.commit()
+        by_role = {role: list(db.session.execute(
+            select(User.id).where(User.role == role, User.email.like(f'%@{EMAIL_DOMAIN}'))
+        ).scalars()) for role in ROLES}
+
+        names = [f'Load Site {index}' for index in range(location_count)]
+        locations = Location.resolve(names)
+        for name in names:
+            location = db.session.get(Location, locations[name][0])
+            if location.latitude is None:
+                center_lat, center_lon, spread = rng.choice(REGIONS)
+                location.latitude = max(-90.0, min(90.0, rng.gauss(center_lat, spread)))
+                location.longitude = (rng.gauss(center_lon, spread) + 180) % 360 - 180
+        db.session.commit()
+
+        end = datetime.utcnow()
+        start = end - timedelta(days=days)
+        owners = by_role['government'] + by_role['researcher']
+        sensor_readings = int(readings * SENSOR_SHARE)
+        per_sensor = max(1, sensor_readings // location_count)
+        interval = (end - start) / per_sensor
+        batch = []
+
+        def add(location, user_id, timestamp, is_public, baseline):
+            daily = math.sin(2 * math.pi * (timestamp.hour + timestamp.minute / 60 - 9) / 24)
+            ph = round(rng.gauss(baseline, 0.15), 2)
+            do = round(max(0.5, rng.gauss(8.5 - daily, 0.6)), 2)
+            turbidity = round(rng.expovariate(1 / 3), 2)
+            if rng.random() < SPIKE_RATE:
+                turbidity = round(rng.uniform(ALERT_THRESHOLD, 80), 1)
+            conductivity = round(rng.gauss(600, 80), 1)
+            batch.append({
+                'location_name': location[1], 'location_id': location[0], 'user_id': user_id,
+                'timestamp': timestamp, 'is_public': is_public,
+                'ph_level': ph, 'dissolved_oxygen': do, 'turbidity_ntu': turbidity,
+                'temperature_c': round(18 + 4 * daily + rng.gauss(0, 0.5), 1), 'conductivity_us': conductivity,
+                'status': WaterQuality.status_for(ph, do, turbidity),
+                'total_dissolved_solids': WaterQuality.tds_for(conductivity)
+            })
+            if len(batch) >= 20000:
+                db.session.execute(insert(WaterQuality), batch)
+                db.session.commit()
+                batch.clear()
+
+        for name in names:
+            location = locations[name]
+            owner = rng.choice(owners)
+            baseline = rng.gauss(7.2, 0.3)
+            timestamp = start + interval * rng.random()
+            for _ in range(per_sensor):
+                add(location, owner, timestamp, rng.random() < 0.9, baseline)
+                timestamp += interval + timedelta(seconds=rng.uniform(-30, 30))
+
+        for _ in range(readings - per_sensor * location_count):
+            while True:
+                day = start + timedelta(days=rng.randrange(days))
+                if day.weekday() < 5 or rng.random() < 0.5:
+                    break
+            hour = rng.choices(range(24), MANUAL_HOURS)[0]
+            timestamp = day.replace(hour=hour, minute=rng.randrange(60), second=rng.randrange(60))
+            add(locations[rng.choice(names)], rng.choice(by_role['community']), timestamp, rng.random() < 0.6,
+                rng.gauss(7.2, 0.3))
+        if batch:
+            db.session.execute(insert(WaterQuality), batch)
+            db.session.commit()
+        backfill_organizations()
+        DailyLocationRollup.rebuild()
+
+        rule = AlertRule.query.filter_by(name='Load: high turbidity').first()
+        if rule is None:
+            rule = AlertRule(name='Load: high turbidity', parameter='turbidity_ntu', operator='>',
+                             threshold=ALERT_THRESHOLD, severity='warning', created_by=by_role['admin'][0])
+            db.session.add(rule)
+            db.session.commit()
+        spikes = db.session.execute(
+            select(WaterQuality.id, WaterQuality.location_name, WaterQuality.turbidity_ntu, WaterQuality.user_id,
+                   WaterQuality.is_public, WaterQuality.timestamp, WaterQuality.organization_id)
+            .where(WaterQuality.turbidity_ntu > ALERT_THRESHOLD)
+        ).all()
+        if spikes:
+            db.session.execute(insert(Alert), [{
+                'rule_id': rule.id, 'reading_id': spike.id, 'location_name': spike.location_name,
+                'parameter': 'turbidity_ntu', 'value': spike.turbidity_ntu, 'severity': 'warning',
+                'message': f'{rule.name}: turbidity_ntu {spike.turbidity_ntu} > {ALERT_THRESHOLD}',
+                'user_id': spike.user_id, 'is_public': spike.is_public, 'triggered_at': spike.timestamp,
+                'organization_id': spike.organization_id
+            } for spike in spikes])
+            db.session.commit()
+
+
+def load_context(app, users_per_role):
+    """What the scenarios pick from: sites, unacknowledged alerts and the community users"""
+    from sqlalchemy import select
+    from app.database.connection import db
+    from app.models.location import Location
+    from app.models.alert import Alert
+    from app.models.user import User
+
+    with app.app_context():
+        locations = db.session.execute(
+            select(Location.id, Location.name, Location.latitude, Location.longitude)
+            .where(Location.name.like('Load Site %'))
+        ).all()
+        alert_ids = list(db.session.execute(select(Alert.id).where(Alert.acknowledged_at.is_(None))).scalars())
+        members = db.session.execute(
+            select(User.id, User.organization_id).where(User.role == 'community', User.email.like(f'%@{EMAIL_DOMAIN}'))
+        ).all()
+        dialect = db.engine.dialect.name
+    if not locations:
+        raise SystemExit('No load-test dataset found; run without --skip-seed first')
+    return {
+        'locations': [tuple(location) for location in locations],
+        'alert_ids': alert_ids,
+        'members': [tuple(member) for member in members],
+        'users_per_role': users_per_role,
+        'dialect': dialect,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Clients
+
+class InProcessClient:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, body=None):
+        response = self.client.open(path, method=method, json=body)
+        return response.status_code, response.get_data()  # drains streamed bodies too
+
+
+class HttpClient:
+    """Keep-alive HTTP client holding its own session cookie"""
+    def __init__(self, base_url):
+        parts = urllib.parse.urlsplit(base_url)
+        connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+        self.connection = connection_class(parts.netloc, timeout=120)
+        self.prefix = parts.path.rstrip('/')
+        self.cookies = {}
+
+    def request(self, method, path, body=None):
+        headers = {}
+        data = None
+        if body is not None:
+            data = json.dumps(body).encode('utf-8')
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{name}={value}' for name, value in self.cookies.items())
+        try:
+            self.connection.request(method, self.prefix + path, data, headers)
+            response = self.connection.getresponse()
+            payload = response.read()
+        except (http.client.HTTPException, OSError):
+            self.connection.close()
+            raise
+        for cookie in response.headers.get_all('Set-Cookie') or ():
+            name, _, rest = cookie.partition('=')
+            self.cookies[name.strip()] = rest.split(';', 1)[0]
+        return response.status, payload
+
+
+class ClientPool:
+    """One logged-in client per (role, worker), reused across scenarios"""
+    def __init__(self, factory, users_per_role):
+        self.factory = factory
+        self.users_per_role = users_per_role
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def login(self, role, index):
+        client = self.factory()
+        if role != 'anonymous':
+            status, payload = client.request('POST', '/api/auth/login', {
+                'email': email_for(role, index % self.users_per_role), 'password': PASSWORD
+            })
+            if status != 200:
+                raise RuntimeError(f'Login as {role} failed ({status}): {payload[:200]!r}')
+        return client
+
+    def get(self, role, worker):
+        with self._lock:
+            client = self._clients.get((role, worker))
+        if client is None:
+            client = self.login(role, worker)
+            with self._lock:
+                self._clients[(role, worker)] = client
+        return client
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+
+class Scenario:
+    """One route under load.
+
+    path and body may be callables (ctx, client, rng) -> value; they run
+    untimed, so they can also prepare what the request needs (e.g. create
+    the reading a DELETE removes); such paths give an example URL for the
+    coverage check. fresh_session gives every request a newly logged-in
+    client (for logout). limit caps requests for bcrypt-bound routes.
+    """
+    def __init__(self, name, method, role, path, body=None, expect=200, fresh_session=False, limit=None,
+                 example=None):
+        self.name = name
+        self.method = method
+        self.role = role
+        self.path = path
+        self.body = body
+        self.expect = expect
+        self.fresh_session = fresh_session
+        self.limit = limit
+        self.example = example
+
+
+def _location(ctx, rng):
+    return rng.choice(ctx['locations'])
+
+
+def _reading_body(ctx, rng):
+    location = _location(ctx, rng)
+    return {
+        'location_name': location[1],
+        'ph_level': round(rng.gauss(7.2, 0.4), 2),
+        'dissolved_oxygen': round(rng.uniform(4, 11), 2),
+        'turbidity_ntu': round(rng.expovariate(1 / 3), 2),
+        'temperature_c': round(rng.uniform(10, 28), 1),
+        'conductivity_us': round(rng.gauss(600, 80), 1),
+        'is_public': rng.random() < 0.7
+    }
+
+
+def _created_reading_path(ctx, client, rng):
+    status, payload = client.request('POST', '/api/water/reading', _reading_body(ctx, rng))
+    return f"/api/water/reading/{json.loads(payload)['reading_id']}"
+
+
+def _rule_body(ctx, client, rng):
+    return {'name': f'Load rule {uuid.uuid4().hex[:8]}', 'parameter': 'ph_level', 'operator': '<',
+            'threshold': round(rng.uniform(5, 6.5), 2), 'severity': 'warning', 'location_name': _location(ctx, rng)[1]}
+
+
+def _created_rule_path(ctx, client, rng):
+    status, payload = client.request('POST', '/api/alerts/rules', _rule_body(ctx, client, rng))
+    return f"/api/alerts/rules/{json.loads(payload)['rule']['id']}"
+
+
+def _alert_path(ctx, client, rng):
+    try:
+        alert_id = ctx['alert_ids'].pop()
+    except IndexError:
+        alert_id = 0  # backlog used up: a 404
+    return f'/api/alerts/{alert_id}/acknowledge'
+
+
+def _bbox(ctx, rng):
+    latitude, longitude, _ = rng.choice(REGIONS)
+    return f'{longitude - 3:.3f},{latitude - 3:.3f},{longitude + 3:.3f},{latitude + 3:.3f}'
+
+
+def _queued_run_path(ctx, client, rng):
+    status, payload = client.request('POST', '/api/jobs/user_statistics/runs', None)
+    return f"/api/jobs/runs/{json.loads(payload)['run']['id']}"
+
+
+def _recent(days):
+    return (datetime.utcnow() - timedelta(days=days)).strftime('%Y-%m-%d')
+
+
+def _quoted_location(ctx, rng):
+    return urllib.parse.quote(_location(ctx, rng)[1])
+
+
+def build_scenarios():
+    return [
+        # Public and health
+        Scenario('index', 'GET', 'anonymous', '/'),
+        Scenario('health', 'GET', 'anonymous', '/health'),
+        Scenario('test-db', 'GET', 'anonymous', '/api/test-db'),
+        Scenario('metrics', 'GET', 'anonymous', '/metrics'),
+        Scenario('login page', 'GET', 'anonymous', '/login'),
+        Scenario('register page', 'GET', 'anonymous', '/register'),
+        Scenario('dashboard page', 'GET', 'community', '/dashboard'),
+        Scenario('analytics dashboard page', 'GET', 'researcher', '/analytics/dashboard'),
+
+        # Auth
+        Scenario('auth check', 'GET', 'community', '/api/auth/check'),
+        Scenario('auth me', 'GET', 'community', '/api/auth/me'),
+        Scenario('login', 'POST', 'anonymous', '/api/auth/login',
+                 body=lambda ctx, client, rng: {'email': email_for('community', rng.randrange(ctx['users_per_role'])),
+                                                'password': PASSWORD}, limit=50),
+        Scenario('register', 'POST', 'anonymous', '/api/auth/register',
+                 body=lambda ctx, client, rng: {'name': 'Load new', 'email': f'new-{uuid.uuid4().hex}@{EMAIL_DOMAIN}',
+                                                'address': 'Load Street', 'telephone': '000', 'password': PASSWORD},
+                 expect=201, limit=50),
+        Scenario('logout', 'POST', 'community', '/api/auth/logout', fresh_session=True, limit=50),
+
+        # Readings
+        Scenario('add reading', 'POST', 'community', '/api/water/reading',
+                 body=lambda ctx, client, rng: _reading_body(ctx, rng), expect=201),
+        Scenario('bulk add 100', 'POST', 'community', '/api/water/readings/bulk',
+                 body=lambda ctx, client, rng: [_reading_body(ctx, rng) for _ in range(100)], expect=201, limit=200),
+        Scenario('delete reading', 'DELETE', 'community', _created_reading_path, example='/api/water/reading/1'),
+        Scenario('readings page (community)', 'GET', 'community', '/api/water/readings?limit=100'),
+        Scenario('readings page (researcher)', 'GET', 'researcher', '/api/water/readings?limit=100'),
+        Scenario('readings page, columns', 'GET', 'researcher', '/api/water/readings?limit=1000&shape=columns'),
+        Scenario('public readings', 'GET', 'community', '/api/water/public-readings'),
+        Scenario('export csv, last 7 days', 'GET', 'researcher', f'/api/water/export?format=csv&since={_recent(7)}',
+                 limit=100),
+        Scenario('ingest stats', 'GET', 'admin', '/api/water/ingest-stats'),
+        Scenario('retention stats', 'GET', 'admin', '/api/water/retention-stats'),
+        Scenario('stream stats', 'GET', 'admin', '/api/water/stream-stats'),
+
+        # Locations
+        Scenario('locations', 'GET', 'community', '/api/locations'),
+        Scenario('locations bbox', 'GET', 'community',
+                 lambda ctx, client, rng: f'/api/locations?bbox={_bbox(ctx, rng)}'),
+        Scenario('locations nearest', 'GET', 'community',
+                 lambda ctx, client, rng: f'/api/locations/nearest?lat={rng.uniform(-10, 10):.3f}'
+                                          f'&lon={rng.uniform(30, 40):.3f}&n=10'),
+        Scenario('location', 'GET', 'community',
+                 lambda ctx, client, rng: f'/api/locations/{_location(ctx, rng)[0]}'),
+        Scenario('update location', 'PUT', 'government',
+                 lambda ctx, client, rng: f'/api/locations/{_location(ctx, rng)[0]}',
+                 body=lambda ctx, client, rng: {'latitude': round(rng.uniform(-10, 10), 4),
+                                                'longitude': round(rng.uniform(30, 40), 4)}),
+
+        # Alerts
+        Scenario('alerts', 'GET', 'community', '/api/alerts'),
+        Scenario('alerts (researcher)', 'GET', 'researcher', '/api/alerts?unacknowledged=1'),
+        Scenario('alert rules', 'GET', 'researcher', '/api/alerts/rules'),
+        Scenario('create alert rule', 'POST', 'government', '/api/alerts/rules', body=_rule_body, expect=201),
+        Scenario('update alert rule', 'PUT', 'government', _created_rule_path,
+                 body=lambda ctx, client, rng: {'threshold': round(rng.uniform(5, 6.5), 2)},
+                 example='/api/alerts/rules/1'),
+        Scenario('delete alert rule', 'DELETE', 'government', _created_rule_path, example='/api/alerts/rules/1'),
+        Scenario('acknowledge alert', 'POST', 'government', _alert_path, example='/api/alerts/1/acknowledge'),
+
+        # Analytics (fixed URLs are mostly response-cache hits, as on a busy dashboard)
+        Scenario('statistics', 'GET', 'community', '/analytics/api/statistics'),
+        Scenario('statistics (researcher)', 'GET', 'researcher', '/analytics/api/statistics'),
+        Scenario('trends', 'GET', 'community', '/analytics/api/water-quality-trends'),
+        Scenario('trends, varying window', 'GET', 'researcher',
+                 lambda ctx, client, rng: f'/analytics/api/water-quality-trends?start={_recent(rng.randrange(7, 365))}'),
+        Scenario('trends, hourly', 'GET', 'researcher', '/analytics/api/water-quality-trends?bucket=hour'),
+        Scenario('quality distribution', 'GET', 'community', '/analytics/api/quality-distribution'),
+        Scenario('location insights', 'GET', 'researcher', '/analytics/api/location-insights'),
+        Scenario('user statistics', 'GET', 'admin', '/analytics/api/user-statistics'),
+        Scenario('cache stats', 'GET', 'admin', '/analytics/api/cache-stats'),
+
+        # Background jobs (admin); user_statistics is the cheapest job to trigger
+        Scenario('jobs', 'GET', 'admin', '/api/jobs'),
+        Scenario('job runs', 'GET', 'admin', '/api/jobs/location_insights/runs'),
+        Scenario('trigger job', 'POST', 'admin', '/api/jobs/user_statistics/runs', expect=202),
+        Scenario('job run', 'GET', 'admin', _queued_run_path, example='/api/jobs/runs/1'),
+        Scenario('update job', 'PUT', 'admin', '/api/jobs/user_statistics', body={'enabled': True}),
+        Scenario('location stats', 'GET', 'researcher',
+                 lambda ctx, client, rng: f'/analytics/api/location/{_quoted_location(ctx, rng)}/stats'),
+        Scenario('location anomalies', 'GET', 'researcher',
+                 lambda ctx, client, rng: f'/analytics/api/location/{_quoted_location(ctx, rng)}/anomalies'
+                                          f'?method={rng.choice(("zscore", "ewma", "seasonal"))}'),
+
+        # Organizations (admin); users are "moved" to the organization they're in, leaving visibility unchanged
+        Scenario('organizations', 'GET', 'admin', '/api/organizations'),
+        Scenario('create organization', 'POST', 'admin', '/api/organizations',
+                 body=lambda ctx, client, rng: {'name': f'Load org {uuid.uuid4().hex[:8]}'}, expect=201, limit=50),
+        Scenario('move user', 'PUT', 'admin',
+                 lambda ctx, client, rng: f'/api/users/{rng.choice(ctx["members"])[0]}/organization',
+                 body=lambda ctx, client, rng: {'organization_id': ctx['members'][0][1]}),
+    ]
+
+
+def coverage(app, scenarios, ctx):
+    """Endpoints no scenario reaches and SKIPPED doesn't explain"""
+    adapter = app.url_map.bind('localhost')
+    rng = random.Random(0)
+    covered = set()
+    for scenario in scenarios:
+        path = scenario.example or scenario.path
+        if callable(path):
+            path = path(ctx, None, rng)
+        endpoint, _ = adapter.match(urllib.parse.urlsplit(path).path, method=scenario.method)
+        covered.add(endpoint)
+    return sorted(
+        (rule.endpoint, rule.rule) for rule in app.url_map.iter_rules()
+        if rule.endpoint not in covered and rule.endpoint not in SKIPPED
+    )
+
+
+# ---------------------------------------------------------------------------
+# Running and reporting
+
+def percentile(ordered, p):
+    """Nearest-rank percentile of an ascending list"""
+    if not ordered:
+        return None
+    return ordered[max(0, math.ceil(p / 100 * len(ordered)) - 1)]
+
+
+def run_scenario(scenario, pool, ctx, concurrency, requests, seed):
+    total = min(requests, scenario.limit) if scenario.limit else requests
+    tickets = itertools.count()
+    lock = threading.Lock()
+    timings, statuses, busy = [], Counter(), [0.0] * concurrency
+
+    def worker(index):
+        rng = random.Random(seed * 7919 + index)
+        client = pool.get(scenario.role, index)
+        while next(tickets) < total:
+            if scenario.fresh_session:
+                client = pool.login(scenario.role, index)
+            try:
+                path = scenario.path(ctx, client, rng) if callable(scenario.path) else scenario.path
+                body = scenario.body(ctx, client, rng) if callable(scenario.body) else scenario.body
+                started = time.perf_counter()
+                status, _ = client.request(scenario.method, path, body)
+                elapsed = time.perf_counter() - started
+            except Exception as e:
+                status, elapsed = f'error: {type(e).__name__}', 0.0
+            with lock:
+                statuses[status] += 1
+                if elapsed:
+                    timings.append(elapsed)
+                    busy[index] += elapsed
+
+    threads = [threading.Thread(target=worker, args=(index,)) for index in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    timings.sort()
+    # Requests per second of time spent inside timed requests (preparation excluded)
+    busy_seconds = sum(busy) / concurrency
+    errors = sum(count for status, count in statuses.items() if status != scenario.expect)
+    return {
+        'method': scenario.method,
+        'role': scenario.role,
+        'requests': len(timings),
+        'errors': errors,
+        'statuses': {str(status): count for status, count in statuses.items()},
+        'throughput_rps': round(len(timings) / busy_seconds, 2) if busy_seconds else None,
+        'mean_ms': round(sum(timings) / len(timings) * 1000, 3) if timings else None,
+        'p50_ms': round(percentile(timings, 50) * 1000, 3) if timings else None,
+        'p95_ms': round(percentile(timings, 95) * 1000, 3) if timings else None,
+        'p99_ms': round(percentile(timings, 99) * 1000, 3) if timings else None,
+        'max_ms': round(timings[-1] * 1000, 3) if timings else None,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def print_results(routes):
+    print(f"\n{'route':<34} {'reqs':>6} {'err':>5} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, result in routes.items():
+        def number(key, width, digits):
+            value = result[key]
+            return f'{value:{width}.{digits}f}' if value is not None else f"{'-':>{width}}"
+        print(f"{name:<34} {result['requests']:6d} {result['errors']:5d} {number('throughput_rps', 9, 1)} "
+              f"{number('p50_ms', 9, 2)} {number('p95_ms', 9, 2)} {number('p99_ms', 9, 2)}")
+
+
+def compare(baseline, current, tolerance, floor_ms):
+    """Print p95/throughput changes per route; returns the names of regressed routes"""
+    regressed = []
+    print(f"\n{'route':<34} {'p95 base':>9} {'p95 now':>9} {'change':>8} {'rps base':>9} {'rps now':>9} {'change':>8}")
+    for name, now in current['routes'].items():
+        base = baseline['routes'].get(name)
+        if base is None or not base['p95_ms'] or not now['p95_ms']:
+            print(f'{name:<34} {"(new)":>9}')
+            continue
+        p95_change = now['p95_ms'] / base['p95_ms'] - 1
+        rps_change = now['throughput_rps'] / base['throughput_rps'] - 1 if base['throughput_rps'] else 0.0
+        reasons = []
+        # Below floor_ms, differences are timer noise rather than regressions
+        if p95_change > tolerance and now['p95_ms'] - base['p95_ms'] > floor_ms:
+            reasons.append('p95')
+        if rps_change < -tolerance and now['p95_ms'] - base['p95_ms'] > floor_ms:
+            reasons.append('throughput')
+        if now['errors'] > base['errors']:
+            reasons.append('errors')
+        if reasons:
+            regressed.append(name)
+        print(f"{name:<34} {base['p95_ms']:9.2f} {now['p95_ms']:9.2f} {p95_change:+8.1%} "
+              f"{base['throughput_rps'] or 0:9.1f} {now['throughput_rps'] or 0:9.1f} {rps_change:+8.1%}"
+              f"{'  REGRESSION: ' + ', '.join(reasons) if reasons else ''}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--readings', type=int, default=50000, help='readings to seed')
+    parser.add_argument('--locations', type=int, default=50, help='sites to seed')
+    parser.add_argument('--users-per-role', type=int, default=10, help='users seeded in each of the four roles')
+    parser.add_argument('--days', type=int, default=365, help='days of history the readings span')
+    parser.add_argument('--concurrency', type=int, default=8, help='concurrent clients per route')
+    parser.add_argument('--requests', type=int, default=400, help='requests per route')
+    parser.add_argument('--routes', help='comma-separated substrings; only matching scenarios run')
+    parser.add_argument('--base-url', help='drive a running server over HTTP instead of in-process')
+    parser.add_argument('--skip-seed', action='store_true', help='reuse the dataset already in DATABASE_URL')
+    parser.add_argument('--seed-only', action='store_true', help='seed DATABASE_URL and exit')
+    parser.add_argument('--seed', type=int, default=42, help='random seed')
+    parser.add_argument('--output', help='write results to this JSON file')
+    parser.add_argument('--compare', help='baseline JSON to compare against (exit status 1 on regression)')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed relative p95/throughput change')
+    parser.add_argument('--floor-ms', type=float, default=1.0, help='ignore p95 changes smaller than this')
+    parser.add_argument('--list', action='store_true', help='list scenarios and uncovered routes, then exit')
+    args = parser.parse_args()
+
+    if args.concurrency > args.users_per_role:
+        print(f'note: {args.concurrency} clients share {args.users_per_role} users per role')
+    scenarios = build_scenarios()
+    if args.routes:
+        wanted = [part.strip() for part in args.routes.split(',')]
+        scenarios = [scenario for scenario in scenarios if any(part in scenario.name for part in wanted)]
+
+    app = make_app()
+    if not args.skip_seed and not args.list:
+        started = time.perf_counter()
+        seed_dataset(app, args.users_per_role, args.locations, args.readings, args.days, random.Random(args.seed))
+        print(f'Seeded {args.readings} readings, {args.locations} sites, {args.users_per_role} users per role '
+              f'in {time.perf_counter() - started:.1f}s')
+    if args.seed_only:
+        return
+    ctx = load_context(app, args.users_per_role) if not args.list else {
+        'locations': [(1, 'Load Site 0', 0.0, 0.0)], 'alert_ids': [], 'members': [(1, 1)],
+        'users_per_role': args.users_per_role
+    }
+
+    missing = coverage(app, build_scenarios(), ctx)
+    if args.list:
+        for scenario in scenarios:
+            print(f'{scenario.method:<7} {scenario.role:<11} {scenario.name}')
+        for endpoint, reason in SKIPPED.items():
+            print(f'skipped  {endpoint}: {reason}')
+    for endpoint, rule in missing:
+        print(f'warning: no scenario covers {rule} ({endpoint})')
+    if args.list:
+        return
+
+    factory = (lambda: HttpClient(args.base_url)) if args.base_url else (lambda: InProcessClient(app))
+    pool = ClientPool(factory, args.users_per_role)
+    routes = {}
+    for index, scenario in enumerate(scenarios):
+        routes[scenario.name] = run_scenario(scenario, pool, ctx, args.concurrency, args.requests, args.seed + index)
+        result = routes[scenario.name]
+        print(f"  {scenario.name:<34} p95 {result['p95_ms'] or 0:8.2f} ms  {result['errors']} errors")
+
+    results = {
+        'meta': {
+            'time': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+            'revision': git_revision(),
+            'mode': 'http' if args.base_url else 'in-process',
+            'database': ctx['dialect'],
+            'python': platform.python_version(),
+            'cpus': os.cpu_count(),
+            'readings': args.readings,
+            'locations': args.locations,
+            'users_per_role': args.users_per_role,
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+        },
+        'routes': routes,
+    }
+    print_results(routes)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f'\nResults written to {args.output}')
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressed = compare(baseline, results, args.tolerance, args.floor_ms)
+        if regressed:
+            print(f"\n{len(regressed)} route(s) regressed: {', '.join(regressed)}")
+            sys.exit(1)
+        print('\nNo regressions')
+
+
+if __name__ == '__main__':
+    main()
\ No newline at end of file